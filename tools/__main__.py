@@ -0,0 +1,41 @@
+"""Command dispatcher: ``python -m tools <command> [options]``."""
+from __future__ import annotations
+
+import importlib
+import sys
+from typing import Dict, List, Optional
+
+COMMANDS: Dict[str, str] = {
+    "bench": "benchmarks.run",
+    "build": "build_site",
+    "check": "check_all",
+    "check-links": "check_links",
+    "check-utf8": "check_utf8",
+    "dedupe-assets": "dedupe_assets",
+    "guard": "utf8_guard",
+    "image-dimensions": "image_dimensions",
+    "index": "site_index",
+    "merge-reports": "merge_reports",
+    "minify": "minify_html",
+    "optimise-images": "optimise_images",
+    "page-weight": "page_weight",
+    "preview": "preview",
+    "redirects": "redirect_map",
+    "search-index": "search_index",
+    "serve": "server",
+    "unused-css": "unused_css",
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS:
+        print("usage: python -m tools <command> [options]", file=sys.stderr)
+        print("commands: " + ", ".join(sorted(COMMANDS)), file=sys.stderr)
+        return 0 if argv and argv[0] in {"-h", "--help"} else 2
+    module = importlib.import_module(f".{COMMANDS[argv[0]]}", __package__)
+    return module.main(argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Synthetic-corpus benchmarks for the snapshot tools."""
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Generate a reproducible synthetic mirror for the benchmarks.
+
+The corpus imitates the HTTrack snapshot: pages spread over deep
+directories, a third of them in Windows-1251, a third in UTF-8 and a third
+double-encoded (Windows-1251 bytes read as Latin-1 and stored as UTF-8, with
+the legacy ``charset`` still declared). Every page references a shared set of
+stylesheets, scripts and images with relative URLs, so asset resolution walks
+real ``../`` chains. An SEO baseline in the ``generate_seo_baseline.py`` format
+is written next to the pages, and the parameters to ``corpus.json``.
+
+The same ``--pages``/``--seed`` always produce byte-identical files.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import random
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_PAGES = 2000
+DEFAULT_SEED = 1251
+DEFAULT_DEPTH = 4
+VARIANTS = ("cp1251", "utf-8", "double-encoded")
+BASELINE_NAME = "seo_baseline.json.gz"
+PARAMETERS_NAME = "corpus.json"
+
+WORDS = (
+    "нейро", "лингвистическое", "программирование", "тренинг", "семинар", "практика",
+    "коммуникация", "убеждение", "мастер", "метод", "модель", "рефрейминг",
+    "раппорт", "якорь", "стратегия", "цель", "результат", "обучение", "курс",
+    "группа", "Москва", "занятие", "упражнение", "навык", "состояние", "ресурс",
+)
+STYLESHEETS = ("assets/css/main.css", "assets/css/print.css")
+SCRIPTS = ("assets/js/jquery.js", "assets/js/site.js")
+IMAGES = tuple(f"assets/images/photo-{index:02d}.jpg" for index in range(24))
+
+
+@dataclass
+class Corpus:
+    root: Path
+    pages: List[Path] = field(default_factory=list)
+    assets: List[Path] = field(default_factory=list)
+    variants: Dict[str, List[Path]] = field(default_factory=dict)
+    baseline: Optional[Path] = None
+    # Generation parameters; ``None`` for a corpus written without corpus.json.
+    seed: Optional[int] = None
+    depth: Optional[int] = None
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[:1].upper() + text[1:]
+
+
+def _page_dir(index: int, depth: int) -> Path:
+    parts = [f"section-{index % 7}"]
+    for level in range(1, depth):
+        parts.append(f"level{level}-{(index // (7 * level)) % 5}")
+    return Path(*parts[: 1 + index % depth])
+
+
+def render_page(rng: random.Random, index: int, prefix: str, charset: str) -> str:
+    title = _sentence(rng, 4)
+    description = _sentence(rng, 12)
+    images = rng.sample(IMAGES, 4)
+    paragraphs = "\n".join(f"<p>{_sentence(rng, rng.randint(30, 80))}.</p>" for _ in range(rng.randint(4, 12)))
+    links = "\n".join(
+        f'<li><a href="{prefix}section-{target % 7}/page-{target:05d}.html">{_sentence(rng, 2)}</a></li>'
+        for target in rng.sample(range(max(index, 1) * 2 + 10), 6)
+    )
+    return f"""<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset={charset}">
+<title>{title} — НЛП-центр</title>
+<meta name="description" content="{description}">
+<meta name="keywords" content="{', '.join(rng.sample(WORDS, 5))}">
+{''.join(f'<link rel="stylesheet" href="{prefix}{css}">' for css in STYLESHEETS)}
+{''.join(f'<script src="{prefix}{js}"></script>' for js in SCRIPTS)}
+</head>
+<body>
+<h1>{title}</h1>
+{''.join(f'<img src="{prefix}{image}" alt="{_sentence(rng, 2)}">' for image in images)}
+{paragraphs}
+<ul>
+{links}
+</ul>
+</body>
+</html>
+"""
+
+
+def encode_page(html: str, variant: str) -> bytes:
+    if variant == "cp1251":
+        return html.encode("cp1251")
+    if variant == "utf-8":
+        return html.encode("utf-8")
+    return html.encode("cp1251").decode("latin1").encode("utf-8")
+
+
+def generate_corpus(
+    root: Path,
+    *,
+    pages: int = DEFAULT_PAGES,
+    seed: int = DEFAULT_SEED,
+    depth: int = DEFAULT_DEPTH,
+) -> Corpus:
+    """Write the synthetic mirror below ``root`` and describe it."""
+
+    rng = random.Random(seed)
+    corpus = Corpus(root=root, variants={variant: [] for variant in VARIANTS}, seed=seed, depth=depth)
+
+    for name in STYLESHEETS + SCRIPTS:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(("/* " + _sentence(rng, 20) + " */\n").encode("utf-8") * 200)
+        corpus.assets.append(path)
+    for name in IMAGES:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes(rng.getrandbits(8) for _ in range(4096)) * rng.randint(4, 32))
+        corpus.assets.append(path)
+
+    html_records = []
+    for index in range(pages):
+        variant = VARIANTS[index % len(VARIANTS)]
+        directory = _page_dir(index, depth)
+        prefix = "../" * len(directory.parts)
+        charset = "utf-8" if variant == "utf-8" else "windows-1251"
+        html = render_page(rng, index, prefix, charset)
+        path = root / directory / f"page-{index:05d}.html"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(encode_page(html, variant))
+        corpus.pages.append(path)
+        corpus.variants[variant].append(path)
+        title = html.split("<title>", 1)[1].split("</title>", 1)[0]
+        html_records.append(
+            {
+                "path": (directory / path.name).as_posix(),
+                "title": title,
+                "h1": title.split(" — ", 1)[0],
+                "meta": {"description": html.split('name="description" content="', 1)[1].split('"', 1)[0]},
+            }
+        )
+
+    corpus.baseline = root / BASELINE_NAME
+    with gzip.GzipFile(corpus.baseline, "wb", mtime=0) as raw:
+        raw.write(json.dumps({"source": "synthetic", "html": html_records, "feeds": []}, ensure_ascii=False).encode("utf-8"))
+    (root / PARAMETERS_NAME).write_text(
+        json.dumps({"pages": pages, "seed": seed, "depth": depth}) + "\n", encoding="utf-8"
+    )
+    return corpus
+
+
+def describe_corpus(root: Path) -> Corpus:
+    """Describe a corpus generated earlier into ``root``."""
+
+    corpus = Corpus(root=root, variants={variant: [] for variant in VARIANTS}, baseline=root / BASELINE_NAME)
+    corpus.pages = sorted(root.rglob("page-*.html"), key=lambda path: path.name)
+    for path in corpus.pages:
+        index = int(path.stem.split("-", 1)[1])
+        corpus.variants[VARIANTS[index % len(VARIANTS)]].append(path)
+    corpus.assets = sorted(path for path in (root / "assets").rglob("*") if path.is_file())
+    parameters = root / PARAMETERS_NAME
+    if parameters.is_file():
+        stored = json.loads(parameters.read_text(encoding="utf-8"))
+        corpus.seed, corpus.depth = stored.get("seed"), stored.get("depth")
+    return corpus
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", type=Path, help="Directory to write the corpus into")
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES, help=f"Number of pages (default: {DEFAULT_PAGES})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"Random seed (default: {DEFAULT_SEED})")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help=f"Maximum directory depth (default: {DEFAULT_DEPTH})")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.output.exists() and any(args.output.iterdir()):
+        print(f"Output directory {args.output} is not empty", file=sys.stderr)
+        return 1
+    corpus = generate_corpus(args.output, pages=args.pages, seed=args.seed, depth=args.depth)
+    print(f"Generated {len(corpus.pages)} pages and {len(corpus.assets)} assets in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
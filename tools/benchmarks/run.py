@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Benchmark the hot paths of the snapshot tools on a synthetic mirror.
+
+Usage: ``python -m tools bench`` (or ``python -m tools.benchmarks.run``).
+
+A corpus from :mod:`tools.benchmarks.corpus` is generated into a temporary
+directory (or ``--corpus DIR``, reused when it already exists) and every
+benchmark runs ``--repeat`` times after one warm-up round. The median is
+compared with ``tools/benchmarks/baseline.json``; a benchmark slower than the
+baseline by more than ``--threshold`` (default 25 %) is a regression and
+makes the run exit with status 1. Results are written to
+``logs/benchmarks-<timestamp>.json``.
+
+Baselines are machine specific: refresh them with ``--update-baseline`` on
+the machine that runs the comparison, using the default corpus size. A run
+whose Python, machine or corpus (page count, seed, depth) differs from the
+baseline's recorded environment is not compared and exits with status 1,
+unless ``--ignore-environment`` is given.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .. import check_utf8, generate_md5_baseline, list_assets, reencode
+from .corpus import DEFAULT_PAGES, DEFAULT_SEED, Corpus, describe_corpus, generate_corpus
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+LOG_DIR = PROJECT_ROOT / "logs"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25
+HTTP_REQUESTS = 200
+# Environment keys that must match the baseline for timings to be comparable.
+COMPARED_ENVIRONMENT = ("python", "implementation", "machine", "pages", "seed", "depth")
+
+# setup(corpus, stack) -> (workload, items): the workload is timed, ``items``
+# is the number of units it processes (for the throughput column).
+Setup = Callable[[Corpus, contextlib.ExitStack], Tuple[Callable[[], object], int]]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    description: str
+    setup: Setup
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    items: int
+    runs: int
+    min_seconds: float
+    median_seconds: float
+    mean_seconds: float
+
+
+@dataclass
+class Regression:
+    name: str
+    baseline_seconds: float
+    median_seconds: float
+    ratio: float
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, description: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = Benchmark(name=name, description=description, setup=setup)
+        return setup
+
+    return register
+
+
+def _read_all(paths: Sequence[Path]) -> List[bytes]:
+    return [path.read_bytes() for path in paths]
+
+
+def _decoded_pages(corpus: Corpus) -> List[Tuple[Path, str]]:
+    return [(path, check_utf8.decode_content(path.read_bytes())[0]) for path in corpus.pages]
+
+
+@benchmark("detect_encoding", "reencode.detect_encoding on every page")
+def _detect_encoding(corpus: Corpus, stack: contextlib.ExitStack):
+    payloads = _read_all(corpus.pages)
+
+    def run() -> None:
+        for payload in payloads:
+            reencode.detect_encoding(payload)
+
+    return run, len(payloads)
+
+
+@benchmark("double_encoded", "reencode._maybe_decode_double_encoded on UTF-8 pages")
+def _double_encoded(corpus: Corpus, stack: contextlib.ExitStack):
+    payloads = _read_all(corpus.variants["utf-8"] + corpus.variants["double-encoded"])
+
+    def run() -> None:
+        for payload in payloads:
+            reencode._maybe_decode_double_encoded(payload)
+
+    return run, len(payloads)
+
+
+@benchmark("asset_collector", "list_assets.AssetCollector on every page")
+def _asset_collector(corpus: Corpus, stack: contextlib.ExitStack):
+    pages = _decoded_pages(corpus)
+
+    def run() -> None:
+        for path, text in pages:
+            collector = list_assets.AssetCollector(path)
+            collector.feed(text)
+            collector.to_entries()
+
+    return run, len(pages)
+
+
+@benchmark("seo_parser", "check_utf8.SeoHTMLParser on every page")
+def _seo_parser(corpus: Corpus, stack: contextlib.ExitStack):
+    pages = _decoded_pages(corpus)
+
+    def run() -> None:
+        for _, text in pages:
+            parser = check_utf8.SeoHTMLParser()
+            parser.feed(text)
+            parser.close()
+            parser.result()
+
+    return run, len(pages)
+
+
+@benchmark("load_baseline", "check_utf8.load_baseline on the corpus SEO baseline")
+def _load_baseline(corpus: Corpus, stack: contextlib.ExitStack):
+    assert corpus.baseline is not None
+    baseline = corpus.baseline
+    return (lambda: check_utf8.load_baseline(baseline)), len(corpus.pages)
+
+
+@benchmark("md5", "generate_md5_baseline.hash_file over pages and assets")
+def _md5(corpus: Corpus, stack: contextlib.ExitStack):
+    paths = corpus.pages + corpus.assets
+
+    def run() -> None:
+        for path in paths:
+            generate_md5_baseline.hash_file(path)
+
+    return run, len(paths)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@benchmark("http_probe", f"check_utf8.probe_http against a local server ({HTTP_REQUESTS} pages)")
+def _http_probe(corpus: Corpus, stack: contextlib.ExitStack):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=str(corpus.root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stack.callback(server.server_close)
+    stack.callback(server.shutdown)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    request_paths = ["/" + path.relative_to(corpus.root).as_posix() for path in corpus.pages[:HTTP_REQUESTS]]
+
+    def run() -> None:
+        for request_path in request_paths:
+            probe = check_utf8.probe_http(base, request_path, timeout=5)
+            if not probe.ok:
+                raise RuntimeError(f"HTTP probe failed for {probe.url}: {probe.error or probe.status}")
+
+    return run, len(request_paths)
+
+
+def run_benchmark(bench: Benchmark, corpus: Corpus, *, repeat: int) -> BenchmarkResult:
+    with contextlib.ExitStack() as stack:
+        workload, items = bench.setup(corpus, stack)
+        workload()  # warm-up
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            workload()
+            timings.append(time.perf_counter() - started)
+    return BenchmarkResult(
+        name=bench.name,
+        items=items,
+        runs=repeat,
+        min_seconds=round(min(timings), 6),
+        median_seconds=round(statistics.median(timings), 6),
+        mean_seconds=round(statistics.fmean(timings), 6),
+    )
+
+
+def load_baseline(path: Path) -> Dict[str, float]:
+    """Return ``{benchmark: median seconds}`` from a stored baseline."""
+
+    if not path.exists():
+        return {}
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    return {name: entry["median_seconds"] for name, entry in payload.get("results", {}).items()}
+
+
+def find_regressions(
+    results: Sequence[BenchmarkResult], baseline: Dict[str, float], threshold: float
+) -> List[Regression]:
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.name)
+        if not expected:
+            continue
+        ratio = result.median_seconds / expected
+        if ratio > 1 + threshold:
+            regressions.append(
+                Regression(name=result.name, baseline_seconds=expected, median_seconds=result.median_seconds, ratio=round(ratio, 3))
+            )
+    return regressions
+
+
+def load_baseline_environment(path: Path) -> Dict[str, object]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8")).get("environment", {})
+
+
+def environment(args: argparse.Namespace, corpus: Corpus) -> Dict[str, object]:
+    """Where the timings come from; the corpus fields describe the corpus actually used."""
+
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "pages": len(corpus.pages),
+        "seed": corpus.seed,
+        "depth": corpus.depth,
+        "repeat": args.repeat,
+    }
+
+
+def environment_mismatches(
+    current: Dict[str, object], stored: Dict[str, object]
+) -> Dict[str, Tuple[object, object]]:
+    """``{key: (baseline value, current value)}`` for every compared key that differs."""
+
+    return {
+        key: (stored.get(key), current.get(key))
+        for key in COMPARED_ENVIRONMENT
+        if stored.get(key) != current.get(key)
+    }
+
+
+def write_baseline(path: Path, results: Sequence[BenchmarkResult], env: Dict[str, object]) -> None:
+    """Store ``results``, keeping entries of benchmarks that were not run in the same environment."""
+
+    stored = {}
+    if path.exists() and not environment_mismatches(env, load_baseline_environment(path)):
+        stored = json.loads(path.read_text(encoding="utf-8")).get("results", {})
+    stored.update({result.name: asdict(result) for result in results})
+    payload = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "environment": env,
+        "results": dict(sorted(stored.items())),
+    }
+    path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def print_results(results: Sequence[BenchmarkResult], baseline: Dict[str, float]) -> None:
+    print(f"{'benchmark':<18} {'items':>6} {'median s':>10} {'min s':>10} {'items/s':>10} {'vs base':>8}")
+    for result in results:
+        expected = baseline.get(result.name)
+        change = f"{result.median_seconds / expected - 1:+.0%}" if expected else "n/a"
+        rate = result.items / result.median_seconds if result.median_seconds else float("inf")
+        print(
+            f"{result.name:<18} {result.items:>6} {result.median_seconds:>10.4f} "
+            f"{result.min_seconds:>10.4f} {rate:>10.0f} {change:>8}"
+        )
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--corpus",
+        type=Path,
+        help="Directory for the synthetic corpus (generated if missing or empty; default: temporary directory)",
+    )
+    parser.add_argument("--pages", type=int, default=DEFAULT_PAGES, help=f"Corpus size (default: {DEFAULT_PAGES})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"Corpus seed (default: {DEFAULT_SEED})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"Timed runs per benchmark (default: {DEFAULT_REPEAT})")
+    parser.add_argument(
+        "--only",
+        action="append",
+        choices=sorted(BENCHMARKS),
+        help="Run only this benchmark (can repeat)",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=DEFAULT_BASELINE,
+        help="Stored baseline to compare with (default: tools/benchmarks/baseline.json)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Allowed slowdown of the median before failing (default: {DEFAULT_THRESHOLD:.2f})",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Store the results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--ignore-environment",
+        action="store_true",
+        help="Compare with the baseline even if it was recorded with another Python, machine or corpus",
+    )
+    parser.add_argument("--output", type=Path, help="Results path (default: logs/benchmarks-<timestamp>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    selected = [BENCHMARKS[name] for name in (args.only or BENCHMARKS)]
+
+    with contextlib.ExitStack() as stack:
+        if args.corpus is None:
+            root = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="bench-corpus-")))
+        else:
+            root = args.corpus
+        if root.exists() and any(root.iterdir()):
+            corpus = describe_corpus(root)
+        else:
+            corpus = generate_corpus(root, pages=args.pages, seed=args.seed)
+        env = environment(args, corpus)
+        mismatches = {} if args.update_baseline else environment_mismatches(env, load_baseline_environment(args.baseline))
+        if mismatches and load_baseline(args.baseline):
+            details = ", ".join(f"{key} {stored!r} vs {current!r}" for key, (stored, current) in mismatches.items())
+            if not args.ignore_environment:
+                print(
+                    f"Baseline {args.baseline} was recorded in another environment ({details}); "
+                    "rerun with matching --pages/--seed/--corpus, refresh it with --update-baseline, "
+                    "or pass --ignore-environment",
+                    file=sys.stderr,
+                )
+                return 1
+            print(f"warning: comparing with a baseline from another environment ({details})", file=sys.stderr)
+        results = [run_benchmark(bench, corpus, repeat=args.repeat) for bench in selected]
+
+    if args.update_baseline:
+        write_baseline(args.baseline, results, env)
+        print_results(results, {})
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    print_results(results, baseline)
+    regressions = find_regressions(results, baseline, args.threshold)
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output = args.output or LOG_DIR / f"benchmarks-{timestamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "environment": env,
+        "environment_mismatches": {key: list(values) for key, values in mismatches.items()},
+        "baseline": str(args.baseline),
+        "threshold": args.threshold,
+        "results": [asdict(result) for result in results],
+        "regressions": [asdict(regression) for regression in regressions],
+    }
+    output.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    print(f"Results written to {output}")
+
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression.name}: {regression.median_seconds:.4f} s vs baseline "
+            f"{regression.baseline_seconds:.4f} s (x{regression.ratio})",
+            file=sys.stderr,
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
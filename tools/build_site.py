@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Build the Cloudflare Pages output with content-hashed asset names.
+
+The mirror itself is never modified. ``python -m tools build`` copies the
+deployable part of the tree to ``dist/`` and:
+
+* copies every local stylesheet, script, image and font referenced by a page
+  to ``dist/assets/<name>.<md5[:10]><ext>``. Stylesheets have their
+  ``url()``/``@import`` references rewritten first: hashed dependencies get
+  their hashed names, everything else gets a path relative to ``assets/``.
+  A stylesheet's hash therefore changes whenever one of its images does;
+* rewrites the page references found by the ``list_assets`` parser to the
+  hashed copies. A page is only changed when its re-parsed asset list
+  matches (see ``dedupe_assets.references_match``); otherwise it is copied
+  as is;
+* writes ``dist/_headers``: ``/assets/*`` is cached for a year as
+  ``immutable`` and everything else (HTML and unhashed files) gets a short
+  ``--html-max-age``;
+* leaves out the pages that ``_redirects`` (see ``redirect_map.py``) sends
+  elsewhere, since Pages answers their URLs with the redirect.
+
+Names depend only on file contents, so an unchanged asset keeps its URL
+across deploys. The originals are copied too, for links and scripts that
+reference them outside of the markup. The manifest (original path to hashed
+path) goes to ``logs/build_site-<timestamp>.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import posixpath
+import re
+import shutil
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    from . import profiling
+    from .dedupe_assets import references_match, rewrite_references
+    from .fileio import decode_page
+    from .list_assets import (
+        CSS_REFERENCE_RE,
+        HTML_EXTENSIONS,
+        PROJECT_ROOT,
+        REMOTE_PREFIXES,
+        AssetCollector,
+    )
+    from .redirect_map import load_redirects, redirected_files
+    from .walker import IgnoreRules, add_ignore_arguments, ignore_rules_from_args, scan_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from dedupe_assets import references_match, rewrite_references  # type: ignore
+    from fileio import decode_page  # type: ignore
+    from list_assets import (  # type: ignore
+        CSS_REFERENCE_RE,
+        HTML_EXTENSIONS,
+        PROJECT_ROOT,
+        REMOTE_PREFIXES,
+        AssetCollector,
+    )
+    from redirect_map import load_redirects, redirected_files  # type: ignore
+    from walker import IgnoreRules, add_ignore_arguments, ignore_rules_from_args, scan_files  # type: ignore
+
+DEFAULT_OUTPUT = PROJECT_ROOT / "dist"
+LOG_DIR = PROJECT_ROOT / "logs"
+ASSET_DIR = "assets"
+HASH_LENGTH = 10
+FINGERPRINT_EXTENSIONS = {
+    ".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".ico", ".svg", ".webp",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+}
+# Repository files that are not part of the site.
+NOT_DEPLOYED = frozenset(
+    {
+        "tools",
+        "memory-bank",
+        "README.md",
+        "DOROZHNAYA_KARTA.md",
+        "INSTRUKTSIYA_VYPOLNENIYA.md",
+        "requirements-dev.txt",
+        "cookies.txt",
+        ".gitignore",
+        ".gitattributes",
+    }
+)
+HEADERS_MARKER = "# Generated by tools/build_site.py"
+HEADERS_TEMPLATE = """{marker}; rebuild instead of editing.
+/*
+  Cache-Control: public, max-age={html_max_age}, must-revalidate
+
+/{asset_dir}/*
+  ! Cache-Control
+  Cache-Control: public, max-age=31536000, immutable
+"""
+
+
+class BuildError(RuntimeError):
+    """Raised when the output directory cannot be (re)created safely."""
+
+
+@dataclass
+class BuildResult:
+    files: int = 0
+    redirected: int = 0
+    pages: int = 0
+    pages_rewritten: int = 0
+    references_rewritten: int = 0
+    refused: List[str] = field(default_factory=list)
+    manifest: Dict[str, str] = field(default_factory=dict)
+    asset_bytes: int = 0
+
+
+def rewrite_css(text: str, replace: Callable[[str], Optional[str]]) -> str:
+    """Return ``text`` with each reference ``replace`` maps to a new URL substituted."""
+
+    def substitute(match: re.Match) -> str:
+        url = match.group("url") if match.group("import") is None else match.group("import")
+        replacement = replace(url.strip()) if url.strip() else None
+        if replacement is None:
+            return match.group(0)
+        if match.group("import") is not None:
+            return f'@import "{replacement}"'
+        return f'url("{replacement}")'
+
+    return CSS_REFERENCE_RE.sub(substitute, text)
+
+
+def css_target(stylesheet: str, url: str) -> Optional[str]:
+    """Source-relative path a stylesheet URL points to (``None`` for remote/data/absolute)."""
+
+    if url.startswith(REMOTE_PREFIXES + ("data:", "#", "/")):
+        return None
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    target = posixpath.normpath(posixpath.join(posixpath.dirname(stylesheet), parts.path))
+    return None if target.startswith("../") or target == ".." else target
+
+
+def hashed_name(name: str, data: bytes) -> str:
+    stem, suffix = posixpath.splitext(posixpath.basename(name))
+    return f"{ASSET_DIR}/{stem}.{hashlib.md5(data).hexdigest()[:HASH_LENGTH]}{suffix}"
+
+
+class Fingerprinter:
+    """Content-hash assets below ``source``; stylesheets after their dependencies."""
+
+    def __init__(self, source: Path) -> None:
+        self.source = source
+        self.names: Dict[str, str] = {}
+        self.contents: Dict[str, bytes] = {}
+        self._active: Set[str] = set()
+
+    def fingerprint(self, name: str) -> Optional[str]:
+        if name in self.names:
+            return self.names[name]
+        path = self.source / name
+        if name in self._active or posixpath.splitext(name)[1].lower() not in FINGERPRINT_EXTENSIONS or not path.is_file():
+            return None  # an @import cycle keeps the plain relative URL
+        self._active.add(name)
+        try:
+            with profiling.track_file(path):
+                data = path.read_bytes()
+                if name.lower().endswith(".css"):
+                    data = self._rewrite_stylesheet(name, data)
+                with profiling.phase("hash"):
+                    hashed = hashed_name(name, data)
+        finally:
+            self._active.discard(name)
+        self.names[name] = hashed
+        self.contents[hashed] = data
+        return hashed
+
+    def _rewrite_stylesheet(self, name: str, data: bytes) -> bytes:
+        text, encoding = decode_page(data)
+        if text is None:
+            return data
+
+        def replace(url: str) -> Optional[str]:
+            target = css_target(name, url)
+            if target is None:
+                return None
+            new_path = self.fingerprint(target) or target
+            parts = urlsplit(url)
+            return urlunsplit(("", "", posixpath.relpath(new_path, ASSET_DIR), parts.query, parts.fragment))
+
+        return rewrite_css(text, replace).encode(encoding)
+
+
+def _as_resolved(path: Path) -> str:
+    """``path`` in the form ``list_assets.resolve_local_path`` reports it."""
+
+    try:
+        return path.relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def _parse_page(page: Path, text: str) -> List[str]:
+    collector = AssetCollector(page)
+    collector.feed(text)
+    collector.close()
+    return [
+        entry.resolved_path
+        for entries in collector.to_entries().values()
+        for entry in entries
+        if entry.resolved_path and entry.exists
+    ]
+
+
+def deploy_ignore(rules: IgnoreRules, source: Path, output: Path) -> IgnoreRules:
+    paths = set(rules.paths) | NOT_DEPLOYED
+    try:
+        paths.add(output.resolve().relative_to(source.resolve()).as_posix())
+    except ValueError:
+        pass
+    return IgnoreRules(names=set(rules.names) | set(rules.patterns), paths=paths, base=source)
+
+
+def is_build(output: Path) -> bool:
+    """Whether ``output`` holds a previous build (its ``_headers`` is ours)."""
+
+    headers = output / "_headers"
+    return headers.is_file() and headers.read_text(encoding="utf-8").startswith(HEADERS_MARKER)
+
+
+def prepare_output(output: Path, source: Path) -> None:
+    output, source = output.resolve(), source.resolve()
+    if output == source or output in source.parents:
+        raise BuildError(f"refusing to build into {output}: it contains the source tree")
+    if output.exists():
+        if any(output.iterdir()) and not is_build(output):
+            raise BuildError(f"refusing to replace {output}: it is not a previous build")
+        shutil.rmtree(output)
+    output.mkdir(parents=True)
+
+
+def build_site(
+    source: Path,
+    output: Path,
+    *,
+    ignore: IgnoreRules,
+    html_max_age: int = 300,
+) -> BuildResult:
+    result = BuildResult()
+    prepare_output(output, source)
+    with profiling.phase("walk"):
+        files = [Path(entry.path) for entry in scan_files(source, ignore=deploy_ignore(ignore, source, output))]
+    redirects = source / "_redirects"
+    if redirects.is_file():
+        skipped = redirected_files(load_redirects(redirects))
+        kept = [path for path in files if path.relative_to(source).as_posix() not in skipped]
+        result.redirected = len(files) - len(kept)
+        files = kept
+    result.files = len(files)
+
+    pages: Dict[Path, Tuple[str, str]] = {}
+    fingerprinter = Fingerprinter(source)
+    mapping: Dict[str, str] = {}
+    for path in files:
+        if path.suffix.lower() not in HTML_EXTENSIONS:
+            continue
+        with profiling.track_file(path):
+            with profiling.phase("read"):
+                raw = path.read_bytes()
+            text, encoding = decode_page(raw)
+            if text is None:
+                continue
+            with profiling.phase("parse"):
+                resolved_paths = _parse_page(path, text)
+        pages[path] = (text, encoding)
+        for resolved in resolved_paths:
+            absolute = PROJECT_ROOT / resolved
+            try:
+                name = absolute.relative_to(source).as_posix()
+            except ValueError:
+                continue
+            hashed = fingerprinter.fingerprint(name)
+            if hashed is not None:
+                mapping[Path(resolved).as_posix()] = _as_resolved(source / hashed)
+    result.pages = len(pages)
+    result.manifest = dict(sorted(fingerprinter.names.items()))
+
+    with profiling.phase("write"):
+        for path in files:
+            destination = output / path.relative_to(source)
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            if path not in pages:
+                shutil.copyfile(path, destination)
+                continue
+            text, encoding = pages[path]
+            rewritten, count = rewrite_references(text, path, mapping)
+            if count and references_match(path, text, rewritten, mapping):
+                destination.write_bytes(rewritten.encode(encoding))
+                result.pages_rewritten += 1
+                result.references_rewritten += count
+                continue
+            if count:
+                result.refused.append(path.relative_to(source).as_posix())
+            shutil.copyfile(path, destination)
+        (output / ASSET_DIR).mkdir(exist_ok=True)
+        for hashed, data in fingerprinter.contents.items():
+            (output / hashed).write_bytes(data)
+            result.asset_bytes += len(data)
+        (output / "_headers").write_text(
+            HEADERS_TEMPLATE.format(marker=HEADERS_MARKER, html_max_age=html_max_age, asset_dir=ASSET_DIR),
+            encoding="utf-8",
+        )
+    return result
+
+
+def write_log(log_dir: Path, result: BuildResult, output: Path, profile: Optional[dict] = None) -> Path:
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"build_site-{timestamp}.json"
+    payload: Dict[str, object] = {"generated_at": timestamp, "output": str(output), **asdict(result)}
+    if profile is not None:
+        payload["profile"] = profile
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return output_path
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Build directory, replaced on each run (default: dist)")
+    parser.add_argument(
+        "--html-max-age",
+        type=int,
+        default=300,
+        help="Cache-Control max-age in seconds for pages and unhashed files (default: 300)",
+    )
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help="Where to store the JSON report (default: logs)")
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    with profiling.session(args) as profiler:
+        try:
+            result = build_site(PROJECT_ROOT, args.output, ignore=ignore_rules_from_args(args), html_max_age=args.html_max_age)
+        except BuildError as exc:
+            print(f"Build failed: {exc}", file=sys.stderr)
+            return 1
+        log_path = write_log(args.log_dir, result, args.output, profile=profiling.report_of(profiler))
+
+    print(
+        f"Built {result.files} files into {args.output} ({result.redirected} redirected pages left out): "
+        f"{len(result.manifest)} hashed assets "
+        f"({result.asset_bytes} bytes), {result.references_rewritten} references rewritten in "
+        f"{result.pages_rewritten} of {result.pages} pages; log: {log_path}"
+    )
+    for page in result.refused:
+        print(f" - {page}: asset references differ after rewriting, copied unchanged", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Run ``check_links`` and ``check_utf8`` over the same targets in one pass.
+
+After each batch both checkers used to run back to back, so every document
+was read, decoded and tokenised twice. This runner loads each document once
+through :class:`document.DocumentCache` (one tokenizer pass for assets, SEO,
+charset and mojibake analysis) and hands the results to the unchanged
+checker logic. Both usual reports are written to ``logs/``:
+``check_links-<timestamp>.json`` and ``check_utf8-<timestamp>.json``.
+
+Usage: ``python -m tools check --scope index.html --scope rss/index.html``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from . import check_links, check_utf8, profiling, server_client
+    from .document import DocumentCache
+    from .walker import add_ignore_arguments, ignore_rules_from_args
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import check_links  # type: ignore
+    import check_utf8  # type: ignore
+    import profiling  # type: ignore
+    import server_client  # type: ignore
+    from document import DocumentCache  # type: ignore
+    from walker import add_ignore_arguments, ignore_rules_from_args  # type: ignore
+
+Target = Tuple[str, Path, Optional[str]]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--scope",
+        action="append",
+        dest="scopes",
+        default=None,
+        help="Directory or document to check (can repeat).",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        help="File with URLs or relative paths to check in addition to the scopes.",
+    )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=check_utf8.DEFAULT_ROOT,
+        help="Root directory used to resolve manifest paths (default: project root).",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=check_utf8.DEFAULT_BASELINE,
+        help="SEO baseline file (default: snapshot/seo_baseline.json.gz).",
+    )
+    parser.add_argument(
+        "--base",
+        type=str,
+        help="Base URL for HTTP checks (e.g. http://localhost:8000).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=10.0,
+        help="Timeout for HTTP requests in seconds (default: 10).",
+    )
+    parser.add_argument(
+        "--include-remote",
+        action="store_true",
+        help="Check remote assets over HTTP and keep remote manifest entries.",
+    )
+    parser.add_argument(
+        "--primary-host",
+        type=str,
+        help="Treat this host (and its subdomains) as local when parsing the manifest.",
+    )
+    parser.add_argument(
+        "--links-output",
+        type=Path,
+        help="Link report path (default: logs/check_links-<timestamp>.json).",
+    )
+    parser.add_argument(
+        "--utf8-output",
+        type=Path,
+        help="UTF-8 report path (default: logs/check_utf8-<timestamp>.json).",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Write the UTF-8 report without indentation.",
+    )
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    server_client.add_server_arguments(parser)
+    return parser
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    return build_parser().parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    with profiling.session(args) as profiler:
+        return run(args, profiler)
+
+
+def run(args: argparse.Namespace, profiler: Optional[profiling.Profiler] = None) -> int:
+    scopes = [Path(scope) for scope in args.scopes] if args.scopes else []
+    ignore = ignore_rules_from_args(args)
+
+    links_targets: List[Target] = []
+    utf8_targets: List[Target] = []
+    sources: List[str] = []
+    if args.manifest:
+        try:
+            links_targets.extend(check_links.manifest_targets(args.manifest, args.root))
+            utf8_targets.extend(
+                check_utf8.manifest_targets(
+                    args.manifest,
+                    args.root,
+                    include_remote=args.include_remote,
+                    primary_host=args.primary_host or check_utf8.derive_primary_host(args.root),
+                )
+            )
+        except FileNotFoundError as exc:
+            print(str(exc), file=sys.stderr)
+            return 1
+        sources.append(f"manifest:{args.manifest}")
+    if scopes:
+        with profiling.phase("walk"):
+            links_targets.extend(check_links.scope_targets(scopes, ignore))
+            utf8_targets.extend(check_utf8.scope_targets(scopes, ignore))
+        sources.extend(check_links.ensure_relative(scope.resolve()) for scope in scopes)
+
+    if not links_targets and not utf8_targets:
+        print("No targets resolved — provide --manifest or --scope entries.", file=sys.stderr)
+        return 1
+
+    request = {
+        "links": check_links.server_request(args, links_targets, sources),
+        "utf8": check_utf8.server_request(args, utf8_targets, args.manifest),
+    }
+    forwarded = server_client.forward(args, "/check", request)
+    if forwarded is not None:
+        links_payload, utf8_payload = forwarded["links"], forwarded["utf8"]
+        print("Checked by the validation server")
+    else:
+        links_payload, utf8_payload = check_locally(args, links_targets, utf8_targets, sources, profiler)
+
+    links_output = args.links_output or check_links.default_log_path()
+    utf8_output = args.utf8_output or check_utf8.default_log_path()
+    try:
+        with profiling.phase("write"):
+            check_links.write_report(links_payload, links_output)
+            check_utf8.write_report(utf8_payload, utf8_output, compact=args.compact)
+    except OSError as exc:
+        print(f"Failed to write reports: {exc}", file=sys.stderr)
+        return 1
+
+    check_links.print_summary(links_payload["summary"])
+    print(f"Reports written to {links_output} and {utf8_output}")
+    if check_links.has_failures(links_payload["summary"]) or check_utf8.has_failures(utf8_payload["summary"]):
+        return 1
+    return 0
+
+
+def check_locally(
+    args: argparse.Namespace,
+    links_targets: Sequence[Target],
+    utf8_targets: Sequence[Target],
+    sources: Sequence[str],
+    profiler: Optional[profiling.Profiler] = None,
+) -> Tuple[Dict[str, object], Dict[str, object]]:
+    try:
+        with profiling.phase("baseline"):
+            baseline_map = check_utf8.load_baseline(args.baseline)
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f"Failed to load baseline {args.baseline}: {exc}", file=sys.stderr)
+        baseline_map = {}
+
+    cache = DocumentCache()
+    documents = check_links.analyse_documents(
+        targets=links_targets,
+        base_url=args.base,
+        timeout=args.timeout,
+        include_remote=args.include_remote,
+        index=cache,
+    )
+    reports = [
+        check_utf8.inspect_document(
+            source,
+            path,
+            request_path,
+            baseline_map,
+            base=args.base,
+            timeout=args.timeout,
+            index=cache,
+        )
+        for source, path, request_path in utf8_targets
+    ]
+    print(f"Read {cache.reads} documents once for both checks")
+    profile = profiling.report_of(profiler)
+    return (
+        check_links.build_report(documents, args.base, sources, profile=profile),
+        check_utf8.build_report(
+            reports,
+            manifest=args.manifest,
+            baseline=args.baseline,
+            base=args.base,
+            profile=profile,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,12 +23,24 @@ from urllib.error import HTTPError, URLError
 from urllib.parse import ParseResult, quote, urlparse
 from urllib.request import Request, urlopen
 
-from list_assets import (  # type: ignore
-    AssetCollector,
-    AssetEntry,
-    PROJECT_ROOT,
-    iter_html_files,
-)
+try:
+    from . import checkpoint, profiling, server_client, shards
+    from .list_assets import AssetCollector, AssetEntry, PROJECT_ROOT, iter_html_files
+    from .site_index import open_site_index
+    from .walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import checkpoint  # type: ignore
+    import profiling  # type: ignore
+    import server_client  # type: ignore
+    import shards  # type: ignore
+    from list_assets import (  # type: ignore
+        AssetCollector,
+        AssetEntry,
+        PROJECT_ROOT,
+        iter_html_files,
+    )
+    from site_index import open_site_index  # type: ignore
+    from walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args  # type: ignore
 
 LOG_DIR = PROJECT_ROOT / "logs"
 DEFAULT_SCOPE = PROJECT_ROOT
@@ -110,6 +122,16 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Also perform HTTP checks for remote (absolute) asset URLs.",
     )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        help="Read asset references from a site index built by site_index.py.",
+    )
+    add_ignore_arguments(parser)
+    shards.add_shard_arguments(parser)
+    checkpoint.add_checkpoint_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    server_client.add_server_arguments(parser)
     return parser
 
 
@@ -170,9 +192,11 @@ def manifest_targets(manifest_path: Path, root: Path) -> List[Tuple[str, Path, O
     return targets
 
 
-def scope_targets(scopes: Iterable[Path]) -> List[Tuple[str, Path, Optional[str]]]:
+def scope_targets(
+    scopes: Iterable[Path], ignore: IgnoreRules = DEFAULT_IGNORE
+) -> List[Tuple[str, Path, Optional[str]]]:
     targets: List[Tuple[str, Path, Optional[str]]] = []
-    html_files = list(iter_html_files(scopes))
+    html_files = list(iter_html_files(scopes, ignore))
     for html in html_files:
         relative = ensure_relative(html)
         request_path = "/" + relative.replace("\\", "/")
@@ -192,6 +216,7 @@ def build_http_url(base: str, path: Optional[str]) -> str:
     return base + encoded
 
 
+@profiling.timed_http
 def try_http(url: str, timeout: float) -> HTTPCheck:
     request = Request(url, method="HEAD")
     try:
@@ -214,14 +239,98 @@ def try_http(url: str, timeout: float) -> HTTPCheck:
         return HTTPCheck(url=url, status=None, ok=False, error=str(exc))
 
 
-def load_assets(html_path: Path) -> Dict[str, List[AssetEntry]]:
+def load_assets(html_path: Path, index=None) -> Dict[str, List[AssetEntry]]:
+    if index is not None:
+        indexed = index.assets(ensure_relative(html_path))
+        if indexed is not None:
+            return indexed
     collector = AssetCollector(html_path)
-    try:
-        text = html_path.read_text(encoding="utf-8")
-    except UnicodeDecodeError:
-        text = html_path.read_text(encoding="cp1251", errors="replace")
-    collector.feed(text)
-    return collector.to_entries()
+    with profiling.phase("read"):
+        try:
+            text = html_path.read_text(encoding="utf-8")
+        except UnicodeDecodeError:
+            text = html_path.read_text(encoding="cp1251", errors="replace")
+    with profiling.phase("parse"):
+        collector.feed(text)
+        return collector.to_entries()
+
+
+def analyse_target(
+    seen: Dict[str, DocumentCheck],
+    source: str,
+    path: Path,
+    request_path: Optional[str],
+    base_url: Optional[str],
+    timeout: float,
+    include_remote: bool,
+    index=None,
+) -> DocumentCheck:
+    """Check one target, merging it into ``seen`` when its path was met before."""
+
+    key = ensure_relative(path)
+    doc = seen.get(key)
+    if doc is None:
+        http_result = try_http(build_http_url(base_url, request_path), timeout) if base_url else None
+        doc = DocumentCheck(
+            source=source,
+            path=key,
+            exists=path.exists(),
+            http=http_result,
+        )
+        if not doc.exists:
+            doc.issues.append("missing_file")
+        if http_result and not (http_result.ok or http_result.status is None):
+            doc.issues.append("http_error")
+        seen[key] = doc
+    else:
+        # If we already saw the document but had no HTTP path earlier, try now.
+        if base_url and doc.http is None and request_path is not None:
+            doc.http = try_http(build_http_url(base_url, request_path), timeout)
+            if doc.http and not (doc.http.ok or doc.http.status is None):
+                doc.issues.append("http_error")
+
+    if not path.exists():
+        return doc
+
+    if doc.assets:
+        # Assets already analysed for this document (avoid duplicates when
+        # the same path appears from multiple sources).
+        return doc
+
+    asset_map = load_assets(path, index)
+    for category, entries in asset_map.items():
+        for entry in entries:
+            asset_http: Optional[HTTPCheck] = None
+            status = "ok"
+            if entry.resolved_path is None:
+                if include_remote:
+                    asset_http = try_http(entry.url, timeout)
+                    if asset_http.ok is False:
+                        status = "http_error"
+                        doc.issues.append("asset_http_error")
+                else:
+                    status = "skipped_remote"
+            else:
+                if entry.exists is False:
+                    status = "missing_file"
+                    doc.issues.append("missing_asset")
+                if base_url:
+                    asset_url = build_http_url(base_url, "/" + entry.resolved_path.replace("\\", "/"))
+                    asset_http = try_http(asset_url, timeout)
+                    if asset_http.ok is False:
+                        status = "http_error"
+                        doc.issues.append("asset_http_error")
+            doc.assets.append(
+                AssetCheck(
+                    url=entry.url,
+                    category=category,
+                    resolved_path=entry.resolved_path,
+                    exists=entry.exists,
+                    http=asset_http,
+                    status=status,
+                )
+            )
+    return doc
 
 
 def analyse_documents(
@@ -229,72 +338,22 @@ def analyse_documents(
     base_url: Optional[str],
     timeout: float,
     include_remote: bool,
+    index=None,
+    journal=None,
 ) -> List[DocumentCheck]:
-    seen: Dict[str, DocumentCheck] = {}
-    for source, path, request_path in targets:
-        key = ensure_relative(path)
-        doc = seen.get(key)
-        if doc is None:
-            http_result = try_http(build_http_url(base_url, request_path), timeout) if base_url else None
-            doc = DocumentCheck(
-                source=source,
-                path=key,
-                exists=path.exists(),
-                http=http_result,
-            )
-            if not doc.exists:
-                doc.issues.append("missing_file")
-            if http_result and not (http_result.ok or http_result.status is None):
-                doc.issues.append("http_error")
-            seen[key] = doc
-        else:
-            # If we already saw the document but had no HTTP path earlier, try now.
-            if base_url and doc.http is None and request_path is not None:
-                doc.http = try_http(build_http_url(base_url, request_path), timeout)
-                if doc.http and not (doc.http.ok or doc.http.status is None):
-                    doc.issues.append("http_error")
+    """Check every target; with a :class:`checkpoint.Journal`, skip and reuse finished ones."""
 
-        if not path.exists():
-            continue
-
-        if doc.assets:
-            # Assets already analysed for this document (avoid duplicates when
-            # the same path appears from multiple sources).
+    seen: Dict[str, DocumentCheck] = {}
+    if journal is not None:
+        for entry in journal.done.values():
+            seen[entry["path"]] = document_from_entry(entry)
+    for position, (source, path, request_path) in enumerate(targets):
+        if journal is not None and position in journal.done:
             continue
-
-        asset_map = load_assets(path)
-        for category, entries in asset_map.items():
-            for entry in entries:
-                asset_http: Optional[HTTPCheck] = None
-                status = "ok"
-                if entry.resolved_path is None:
-                    if include_remote:
-                        asset_http = try_http(entry.url, timeout)
-                        if asset_http.ok is False:
-                            status = "http_error"
-                            doc.issues.append("asset_http_error")
-                    else:
-                        status = "skipped_remote"
-                else:
-                    if entry.exists is False:
-                        status = "missing_file"
-                        doc.issues.append("missing_asset")
-                    if base_url:
-                        asset_url = build_http_url(base_url, "/" + entry.resolved_path.replace("\\", "/"))
-                        asset_http = try_http(asset_url, timeout)
-                        if asset_http.ok is False:
-                            status = "http_error"
-                            doc.issues.append("asset_http_error")
-                doc.assets.append(
-                    AssetCheck(
-                        url=entry.url,
-                        category=category,
-                        resolved_path=entry.resolved_path,
-                        exists=entry.exists,
-                        http=asset_http,
-                        status=status,
-                    )
-                )
+        with profiling.track_file(path):
+            doc = analyse_target(seen, source, path, request_path, base_url, timeout, include_remote, index)
+        if journal is not None:
+            journal.record(position, document_entry(doc))
     return list(seen.values())
 
 
@@ -321,43 +380,115 @@ def summarise(documents: Sequence[DocumentCheck]) -> Dict[str, int]:
     return summary
 
 
-def dump_report(
+def document_entry(doc: DocumentCheck) -> Dict[str, object]:
+    return {
+        "source": doc.source,
+        "path": doc.path,
+        "exists": doc.exists,
+        "http": asdict(doc.http) if doc.http else None,
+        "issues": doc.issues,
+        "assets": [
+            {
+                "url": asset.url,
+                "category": asset.category,
+                "resolved_path": asset.resolved_path,
+                "exists": asset.exists,
+                "status": asset.status,
+                "http": asdict(asset.http) if asset.http else None,
+            }
+            for asset in doc.assets
+        ],
+    }
+
+
+def document_from_entry(entry: Dict[str, object]) -> DocumentCheck:
+    """Inverse of :func:`document_entry`."""
+
+    def http(data: Optional[Dict[str, object]]) -> Optional[HTTPCheck]:
+        return HTTPCheck(**data) if data else None
+
+    return DocumentCheck(
+        source=entry["source"],
+        path=entry["path"],
+        exists=entry["exists"],
+        http=http(entry["http"]),
+        assets=[AssetCheck(**{**asset, "http": http(asset["http"])}) for asset in entry["assets"]],
+        issues=list(entry["issues"]),
+    )
+
+
+def documents_from_payload(payload: Dict[str, object]) -> List[DocumentCheck]:
+    """Rebuild the checks of a written report (used to merge shard reports)."""
+
+    return [document_from_entry(entry) for entry in payload["documents"]]
+
+
+def has_failures(summary: Dict[str, int]) -> bool:
+    return bool(
+        summary["documents_missing"]
+        or summary["documents_http_errors"]
+        or summary["assets_missing"]
+        or summary["assets_http_errors"]
+    )
+
+
+def print_summary(summary: Dict[str, int]) -> None:
+    print(
+        "Checked {documents} documents (missing={documents_missing}, http_errors={documents_http_errors},"
+        " assets={assets_total}, missing_assets={assets_missing}, asset_http_errors={assets_http_errors})"
+        .format(**summary)
+    )
+
+
+def build_report(
     documents: Sequence[DocumentCheck],
-    output_path: Path,
     base_url: Optional[str],
     sources: Sequence[str],
-) -> None:
-    payload = {
+    profile: Optional[Dict[str, object]] = None,
+) -> Dict[str, object]:
+    payload: Dict[str, object] = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "base_url": base_url,
         "sources": list(sources),
         "summary": summarise(documents),
-        "documents": [
-            {
-                "source": doc.source,
-                "path": doc.path,
-                "exists": doc.exists,
-                "http": asdict(doc.http) if doc.http else None,
-                "issues": doc.issues,
-                "assets": [
-                    {
-                        "url": asset.url,
-                        "category": asset.category,
-                        "resolved_path": asset.resolved_path,
-                        "exists": asset.exists,
-                        "status": asset.status,
-                        "http": asdict(asset.http) if asset.http else None,
-                    }
-                    for asset in doc.assets
-                ],
-            }
-            for doc in documents
-        ],
+        "documents": [document_entry(doc) for doc in documents],
     }
+    if profile is not None:
+        payload["profile"] = profile
+    return payload
+
+
+def write_report(payload: Dict[str, object], output_path: Path) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
     output_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
 
 
+def dump_report(
+    documents: Sequence[DocumentCheck],
+    output_path: Path,
+    base_url: Optional[str],
+    sources: Sequence[str],
+    profile: Optional[Dict[str, object]] = None,
+) -> None:
+    write_report(build_report(documents, base_url, sources, profile), output_path)
+
+
+def server_request(
+    args: argparse.Namespace,
+    targets: Sequence[Tuple[str, Path, Optional[str]]],
+    sources: Sequence[str],
+) -> Dict[str, object]:
+    """Body of a ``POST /check/links`` request to the validation server."""
+
+    return {
+        "targets": [[source, str(path.resolve()), request_path] for source, path, request_path in targets],
+        "sources": list(sources),
+        "base": args.base,
+        "timeout": args.timeout,
+        "include_remote": args.include_remote,
+    }
+
+
 def main(argv: Optional[Sequence[str]] = None) -> int:
     args = parse_args(argv)
 
@@ -370,38 +501,70 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
     targets: List[Tuple[str, Path, Optional[str]]] = []
     target_sources: List[str] = []
 
-    if args.manifest:
-        manifest_entries = manifest_targets(args.manifest, args.root)
-        targets.extend(manifest_entries)
-        target_sources.append(f"manifest:{args.manifest}")
-
-    if scopes:
-        scope_entries = scope_targets(scopes)
-        targets.extend(scope_entries)
-        target_sources.extend([ensure_relative(Path(scope).resolve()) for scope in scopes])
-
-    if not targets:
-        print("No HTML documents found for provided inputs.", file=sys.stderr)
-        return 1
-
-    documents = analyse_documents(
-        targets=targets,
-        base_url=args.base,
-        timeout=args.timeout,
-        include_remote=args.include_remote,
-    )
-
-    output_path = args.output or default_log_path()
-    dump_report(documents, output_path, args.base, target_sources)
-
-    summary = summarise(documents)
-    print(
-        "Checked {documents} documents (missing={documents_missing}, http_errors={documents_http_errors},"
-        " assets={assets_total}, missing_assets={assets_missing}, asset_http_errors={assets_http_errors})"
-        .format(**summary)
-    )
-    print(f"Report saved to {output_path}")
-    return 0 if summary["documents_missing"] == 0 and summary["documents_http_errors"] == 0 and summary["assets_missing"] == 0 and summary["assets_http_errors"] == 0 else 1
+    with profiling.session(args) as profiler:
+        if args.manifest:
+            manifest_entries = manifest_targets(args.manifest, args.root)
+            targets.extend(manifest_entries)
+            target_sources.append(f"manifest:{args.manifest}")
+
+        if scopes:
+            with profiling.phase("walk"):
+                scope_entries = scope_targets(scopes, ignore_rules_from_args(args))
+            targets.extend(scope_entries)
+            target_sources.extend([ensure_relative(Path(scope).resolve()) for scope in scopes])
+
+        if not targets:
+            print("No HTML documents found for provided inputs.", file=sys.stderr)
+            return 1
+        if args.shard:
+            targets, positions = shards.select_targets(targets, args.shard, ensure_relative)
+            positions = shards.first_positions(targets, positions, ensure_relative)
+
+        output_path = args.output or default_log_path()
+        journal = None
+        payload = server_client.forward(args, "/check/links", server_request(args, targets, target_sources))
+        if payload is None:
+            try:
+                journal = checkpoint.open_journal(
+                    args, "check_links", output_path, targets, args.base, args.include_remote, args.index
+                )
+            except (OSError, ValueError) as exc:
+                print(f"Cannot use checkpoint journal: {exc}", file=sys.stderr)
+                return 1
+            if journal is not None and journal.done:
+                print(f"Resuming: {len(journal.done)} of {len(targets)} targets already checked")
+            index = open_site_index(args.index) if args.index else None
+            try:
+                documents = analyse_documents(
+                    targets=targets,
+                    base_url=args.base,
+                    timeout=args.timeout,
+                    include_remote=args.include_remote,
+                    index=index,
+                    journal=journal,
+                )
+            except KeyboardInterrupt:
+                if journal is None:
+                    raise
+                journal.close()
+                print(f"Interrupted; continue with --resume {journal.path}", file=sys.stderr)
+                return 130
+            finally:
+                if index is not None:
+                    index.close()
+            payload = build_report(documents, args.base, target_sources, profile=profiling.report_of(profiler))
+        if args.shard:
+            payload["shard"] = shards.shard_info(args.shard, positions)
+
+        with profiling.phase("write"):
+            write_report(payload, output_path)
+        if journal is not None:
+            journal.discard()
+
+        summary = payload["summary"]
+        print_summary(summary)
+        print(f"Report saved to {output_path}")
+        return 1 if has_failures(summary) else 0
 
 
 if __name__ == "__main__":
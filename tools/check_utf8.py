@@ -31,6 +31,16 @@ from urllib.error import HTTPError, URLError
 from urllib.parse import ParseResult, quote, urlparse
 from urllib.request import Request, urlopen
 
+try:
+    from . import checkpoint, profiling, server_client, shards
+    from .walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, iter_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import checkpoint  # type: ignore
+    import profiling  # type: ignore
+    import server_client  # type: ignore
+    import shards  # type: ignore
+    from walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, iter_files  # type: ignore
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 TOOLS_ROOT = PROJECT_ROOT / "tools"
 DEFAULT_MANIFEST = TOOLS_ROOT / "url_manifest.txt"
@@ -167,6 +177,16 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Skip manifest targets even if the default manifest file is present.",
     )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        help="Answer encoding and SEO questions from a site index built by site_index.py.",
+    )
+    add_ignore_arguments(parser)
+    shards.add_shard_arguments(parser)
+    checkpoint.add_checkpoint_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    server_client.add_server_arguments(parser)
     return parser
 
 
@@ -259,17 +279,13 @@ def manifest_targets(
     return targets
 
 
-def scope_targets(scopes: Iterable[Path]) -> List[Tuple[str, Path, Optional[str]]]:
+def scope_targets(
+    scopes: Iterable[Path], ignore: IgnoreRules = DEFAULT_IGNORE
+) -> List[Tuple[str, Path, Optional[str]]]:
     targets: List[Tuple[str, Path, Optional[str]]] = []
-    for scope in scopes:
-        if scope.is_dir():
-            for path in sorted(scope.rglob("*")):
-                if path.suffix.lower() in TEXT_EXTENSIONS and path.is_file():
-                    relative = ensure_relative(path)
-                    targets.append((f"scope:{relative}", path, "/" + relative.replace("\\", "/")))
-        elif scope.is_file() and scope.suffix.lower() in TEXT_EXTENSIONS:
-            relative = ensure_relative(scope)
-            targets.append((f"scope:{relative}", scope, "/" + relative.replace("\\", "/")))
+    for path in iter_files(scopes, suffixes=TEXT_EXTENSIONS, ignore=ignore):
+        relative = ensure_relative(path)
+        targets.append((f"scope:{relative}", path, "/" + relative.replace("\\", "/")))
     return targets
 
 
@@ -290,6 +306,7 @@ def build_http_url(base: str, path: Optional[str]) -> str:
     return base + encoded
 
 
+@profiling.timed_http
 def probe_http(base: str, request_path: Optional[str], timeout: float) -> HTTPProbe:
     url = build_http_url(base, request_path)
     last_error: Optional[str] = None
@@ -329,6 +346,7 @@ def detect_declared_charset(text: str) -> Optional[str]:
     return None
 
 
+@profiling.timed("decode")
 def decode_content(raw: bytes) -> Tuple[str, str]:
     for encoding in ("utf-8", "utf-8-sig", "cp1251"):
         try:
@@ -395,6 +413,7 @@ class SeoHTMLParser(HTMLParser):
         )
 
 
+@profiling.timed("parse")
 def extract_seo(text: str) -> SeoSnapshot:
     parser = SeoHTMLParser()
     parser.feed(text)
@@ -469,19 +488,33 @@ def inspect_document(
     *,
     base: Optional[str],
     timeout: float,
+    index=None,
 ) -> DocumentReport:
     relative_path = ensure_relative(path)
-    report = DocumentReport(source=source, path=relative_path, exists=path.exists())
+    indexed = index.document(relative_path) if index is not None else None
+    if indexed is not None and indexed.kind == "other":
+        indexed = None
+    report = DocumentReport(source=source, path=relative_path, exists=indexed is not None or path.exists())
     if not report.exists:
         report.issues.append("missing_file")
         return report
 
-    raw = path.read_bytes()
-    text, detected_encoding = decode_content(raw)
-    report.detected_encoding = detected_encoding
-    report.declared_charset = detect_declared_charset(text)
-    report.contains_replacement = ("\ufffd" in text) or (b"\xef\xbf\xbd" in raw)
-    report.contains_suspect_sequences = detect_suspect_sequences(text, raw)
+    if indexed is not None:
+        report.detected_encoding = indexed.detected_encoding
+        report.declared_charset = indexed.declared_charset
+        report.contains_replacement = indexed.contains_replacement
+        report.contains_suspect_sequences = indexed.contains_suspect_sequences
+        report.seo = indexed.seo
+    else:
+        with profiling.phase("read"):
+            raw = path.read_bytes()
+        text, detected_encoding = decode_content(raw)
+        report.detected_encoding = detected_encoding
+        with profiling.phase("detect"):
+            report.declared_charset = detect_declared_charset(text)
+            report.contains_replacement = ("\ufffd" in text) or (b"\xef\xbf\xbd" in raw)
+            report.contains_suspect_sequences = detect_suspect_sequences(text, raw)
+        report.seo = extract_seo(text)
 
     if base:
         report.http = probe_http(base, request_path, timeout)
@@ -494,7 +527,6 @@ def inspect_document(
             else:
                 report.issues.append("missing_charset_header")
 
-    report.seo = extract_seo(text)
     baseline = baseline_map.get(relative_path)
     report.baseline_available = baseline is not None
     comparisons, seo_issues = compare_seo(baseline, report.seo)
@@ -504,6 +536,32 @@ def inspect_document(
     return report
 
 
+def inspect_targets(
+    targets: Sequence[Tuple[str, Path, Optional[str]]],
+    baseline_map: Dict[str, SeoSnapshot],
+    *,
+    base: Optional[str],
+    timeout: float,
+    index=None,
+    journal=None,
+) -> List[DocumentReport]:
+    """Inspect every target; with a :class:`checkpoint.Journal`, skip and reuse finished ones."""
+
+    reports: List[DocumentReport] = []
+    for position, (source, path, request_path) in enumerate(targets):
+        if journal is not None and position in journal.done:
+            reports.append(report_from_entry(journal.done[position]))
+            continue
+        with profiling.track_file(path):
+            report = inspect_document(
+                source, path, request_path, baseline_map, base=base, timeout=timeout, index=index
+            )
+        if journal is not None:
+            journal.record(position, report_entry(report))
+        reports.append(report)
+    return reports
+
+
 def summarise(reports: List[DocumentReport]) -> Dict[str, int]:
     summary: Dict[str, int] = {}
     for report in reports:
@@ -524,116 +582,210 @@ def summarise(reports: List[DocumentReport]) -> Dict[str, int]:
     return summary
 
 
-def dump_report(
+def report_entry(report: DocumentReport) -> Dict[str, object]:
+    return {
+        **{
+            "source": report.source,
+            "path": report.path,
+            "exists": report.exists,
+            "declared_charset": report.declared_charset,
+            "detected_encoding": report.detected_encoding,
+            "contains_replacement": report.contains_replacement,
+            "contains_suspect_sequences": report.contains_suspect_sequences,
+            "issues": report.issues,
+            "baseline_available": report.baseline_available,
+        },
+        **(
+            {"http": asdict(report.http)}
+            if report.http is not None
+            else {}
+        ),
+        "seo": asdict(report.seo),
+        "comparisons": [asdict(comp) for comp in report.comparisons],
+    }
+
+
+def report_from_entry(entry: Dict[str, object]) -> DocumentReport:
+    """Inverse of :func:`report_entry`."""
+
+    return DocumentReport(
+        source=entry["source"],
+        path=entry["path"],
+        exists=entry["exists"],
+        declared_charset=entry["declared_charset"],
+        detected_encoding=entry["detected_encoding"],
+        contains_replacement=entry["contains_replacement"],
+        contains_suspect_sequences=entry["contains_suspect_sequences"],
+        http=HTTPProbe(**entry["http"]) if entry.get("http") else None,
+        seo=SeoSnapshot(**entry["seo"]),
+        baseline_available=entry["baseline_available"],
+        comparisons=[SeoComparison(**comparison) for comparison in entry["comparisons"]],
+        issues=list(entry["issues"]),
+    )
+
+
+def reports_from_payload(payload: Dict[str, object]) -> List[DocumentReport]:
+    """Rebuild the reports of a written report (used to merge shard reports)."""
+
+    return [report_from_entry(entry) for entry in payload["results"]]
+
+
+def has_failures(summary: Dict[str, int]) -> bool:
+    if summary.get("missing_file") or summary.get("content_type_mismatch") or summary.get("replacement_chars"):
+        return True
+    return any(key.startswith("seo_mismatch:") for key in summary)
+
+
+def build_report(
     reports: List[DocumentReport],
-    output_path: Path,
     *,
-    compact: bool,
     manifest: Optional[Path],
     baseline: Optional[Path],
     base: Optional[str],
-) -> None:
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    payload = {
+    profile: Optional[Dict[str, object]] = None,
+) -> Dict[str, object]:
+    payload: Dict[str, object] = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "manifest": str(manifest) if manifest else None,
         "baseline": str(baseline) if baseline else None,
         "base_url": base,
         "summary": summarise(reports),
-        "results": [
-            {
-                **{
-                    "source": report.source,
-                    "path": report.path,
-                    "exists": report.exists,
-                    "declared_charset": report.declared_charset,
-                    "detected_encoding": report.detected_encoding,
-                    "contains_replacement": report.contains_replacement,
-                    "contains_suspect_sequences": report.contains_suspect_sequences,
-                    "issues": report.issues,
-                    "baseline_available": report.baseline_available,
-                },
-                **(
-                    {"http": asdict(report.http)}
-                    if report.http is not None
-                    else {}
-                ),
-                "seo": asdict(report.seo),
-                "comparisons": [asdict(comp) for comp in report.comparisons],
-            }
-            for report in reports
-        ],
+        "results": [report_entry(report) for report in reports],
     }
+    if profile is not None:
+        payload["profile"] = profile
+    return payload
+
+
+def write_report(payload: Dict[str, object], output_path: Path, *, compact: bool) -> None:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
     json_text = json.dumps(payload, ensure_ascii=False, indent=None if compact else 2)
     output_path.write_text(json_text, encoding="utf-8")
 
 
+def dump_report(
+    reports: List[DocumentReport],
+    output_path: Path,
+    *,
+    compact: bool,
+    manifest: Optional[Path],
+    baseline: Optional[Path],
+    base: Optional[str],
+    profile: Optional[Dict[str, object]] = None,
+) -> None:
+    payload = build_report(reports, manifest=manifest, baseline=baseline, base=base, profile=profile)
+    write_report(payload, output_path, compact=compact)
+
+
+def server_request(
+    args: argparse.Namespace,
+    targets: Sequence[Tuple[str, Path, Optional[str]]],
+    manifest: Optional[Path],
+) -> Dict[str, object]:
+    """Body of a ``POST /check/utf8`` request to the validation server."""
+
+    return {
+        "targets": [[source, str(path.resolve()), request_path] for source, path, request_path in targets],
+        "manifest": str(manifest) if manifest else None,
+        "baseline": str(args.baseline),
+        "base": args.base,
+        "timeout": args.timeout,
+    }
+
+
 def main(argv: Optional[Sequence[str]] = None) -> int:
     args = parse_args(argv)
     manifest_path: Optional[Path] = None if args.no_manifest else args.manifest
-    reports: List[DocumentReport] = []
 
-    try:
-        baseline_map = load_baseline(args.baseline)
-    except (OSError, json.JSONDecodeError) as exc:
-        print(f"Failed to load baseline {args.baseline}: {exc}", file=sys.stderr)
-        baseline_map = {}
-
-    targets: List[Tuple[str, Path, Optional[str]]] = []
-    if manifest_path:
-        try:
-            primary_host = args.primary_host or derive_primary_host(args.root)
-            targets.extend(
-                manifest_targets(
-                    manifest_path,
-                    args.root,
-                    include_remote=args.include_remote,
-                    primary_host=primary_host,
+    with profiling.session(args) as profiler:
+        targets: List[Tuple[str, Path, Optional[str]]] = []
+        if manifest_path:
+            try:
+                primary_host = args.primary_host or derive_primary_host(args.root)
+                targets.extend(
+                    manifest_targets(
+                        manifest_path,
+                        args.root,
+                        include_remote=args.include_remote,
+                        primary_host=primary_host,
+                    )
                 )
-            )
-        except FileNotFoundError as exc:
-            print(str(exc), file=sys.stderr)
+            except FileNotFoundError as exc:
+                print(str(exc), file=sys.stderr)
+                return 1
+        if args.scopes:
+            extra = [Path(scope) for scope in args.scopes]
+            with profiling.phase("walk"):
+                targets.extend(scope_targets(extra, ignore_rules_from_args(args)))
+
+        if not targets:
+            print("No targets resolved — provide --manifest or --scope entries.", file=sys.stderr)
             return 1
-    if args.scopes:
-        extra = [Path(scope) for scope in args.scopes]
-        targets.extend(scope_targets(extra))
-
-    if not targets:
-        print("No targets resolved — provide --manifest or --scope entries.", file=sys.stderr)
-        return 1
-
-    for source, path, request_path in targets:
-        report = inspect_document(
-            source,
-            path,
-            request_path,
-            baseline_map,
-            base=args.base,
-            timeout=args.timeout,
-        )
-        reports.append(report)
+        if args.shard:
+            targets, positions = shards.select_targets(targets, args.shard, ensure_relative)
+
+        output_path = args.output or default_log_path()
+        journal = None
+        payload = server_client.forward(args, "/check/utf8", server_request(args, targets, manifest_path))
+        if payload is None:
+            try:
+                journal = checkpoint.open_journal(
+                    args, "check_utf8", output_path, targets, args.baseline, args.base, args.index
+                )
+            except (OSError, ValueError) as exc:
+                print(f"Cannot use checkpoint journal: {exc}", file=sys.stderr)
+                return 1
+            if journal is not None and journal.done:
+                print(f"Resuming: {len(journal.done)} of {len(targets)} targets already checked")
+            try:
+                with profiling.phase("baseline"):
+                    baseline_map = load_baseline(args.baseline)
+            except (OSError, json.JSONDecodeError) as exc:
+                print(f"Failed to load baseline {args.baseline}: {exc}", file=sys.stderr)
+                baseline_map = {}
+
+            index = None
+            if args.index:
+                # site_index imports this module, so it is loaded on first use.
+                try:
+                    from .site_index import open_site_index
+                except ImportError:  # pragma: no cover - executed as a script from tools/
+                    from site_index import open_site_index  # type: ignore
+                index = open_site_index(args.index)
+            try:
+                reports = inspect_targets(
+                    targets, baseline_map, base=args.base, timeout=args.timeout, index=index, journal=journal
+                )
+            except KeyboardInterrupt:
+                if journal is None:
+                    raise
+                journal.close()
+                print(f"Interrupted; continue with --resume {journal.path}", file=sys.stderr)
+                return 130
+            finally:
+                if index is not None:
+                    index.close()
+            payload = build_report(
+                reports,
+                manifest=manifest_path,
+                baseline=args.baseline,
+                base=args.base,
+                profile=profiling.report_of(profiler),
+            )
+        if args.shard:
+            payload["shard"] = shards.shard_info(args.shard, positions)
 
-    output_path = args.output or default_log_path()
-    try:
-        dump_report(
-            reports,
-            output_path,
-            compact=args.compact,
-            manifest=manifest_path,
-            baseline=args.baseline,
-            base=args.base,
-        )
-    except OSError as exc:
-        print(f"Failed to write report to {output_path}: {exc}", file=sys.stderr)
-        return 1
+        try:
+            with profiling.phase("write"):
+                write_report(payload, output_path, compact=args.compact)
+        except OSError as exc:
+            print(f"Failed to write report to {output_path}: {exc}", file=sys.stderr)
+            return 1
+        if journal is not None:
+            journal.discard()
 
-    print(f"Report written to {output_path}")
-    summary = summarise(reports)
-    if summary.get("missing_file") or summary.get("content_type_mismatch") or summary.get("replacement_chars"):
-        return 1
-    if any(key.startswith("seo_mismatch:") for key in summary):
-        return 1
-    return 0
+        print(f"Report written to {output_path}")
+        return 1 if has_failures(payload["summary"]) else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+"""Append-only checkpoint journals for long checker runs.
+
+``check_links.py`` and ``check_utf8.py`` only write their report at the end,
+so a run with ``--base``/``--include-remote`` that dies on a network error or
+Ctrl-C used to lose every probe it had made. While they run, both checkers
+now append one JSON line per finished target to a journal next to the
+report (``<report>.journal.jsonl``)::
+
+    {"tool": "check_utf8", "fingerprint": "…", "targets": 2292}
+    {"position": 0, "entry": {…report entry…}}
+    {"position": 1, "entry": {…}}
+
+``--resume <journal>`` replays the finished entries, skips their targets and
+keeps appending to the same file; the final report is the same as that of an
+uninterrupted run. The fingerprint (target list and result-affecting
+options) stops a journal from being resumed with different inputs. The
+journal is removed once the report has been written.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import IO, Dict, Optional, Sequence
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+
+class JournalError(ValueError):
+    """Raised when a journal cannot be resumed for the current run."""
+
+
+def add_checkpoint_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--resume",
+        type=Path,
+        metavar="JOURNAL",
+        help="Continue an interrupted run from its checkpoint journal.",
+    )
+    parser.add_argument(
+        "--no-checkpoint",
+        action="store_true",
+        help="Do not write a checkpoint journal while checking.",
+    )
+
+
+def journal_path_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.stem + JOURNAL_SUFFIX)
+
+
+def fingerprint(*parts: object) -> str:
+    """Stable digest of the inputs that determine a run's results."""
+
+    text = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class Journal:
+    """One checker run's journal; ``done`` maps target positions to entries."""
+
+    def __init__(self, path: Path, handle: IO[str], done: Dict[int, Dict[str, object]]) -> None:
+        self.path = path
+        self._handle = handle
+        self.done = done
+
+    @classmethod
+    def create(cls, path: Path, tool: str, digest: str, targets: int) -> "Journal":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle = path.open("w", encoding="utf-8")
+        handle.write(json.dumps({"tool": tool, "fingerprint": digest, "targets": targets}) + "\n")
+        handle.flush()
+        return cls(path, handle, {})
+
+    @classmethod
+    def resume(cls, path: Path, tool: str, digest: str) -> "Journal":
+        raw = path.read_bytes()
+        if raw and not raw.endswith(b"\n"):
+            # The run died half-way through a line; drop the fragment before appending.
+            raw = raw[: raw.rfind(b"\n") + 1]
+            path.write_bytes(raw)
+        lines = raw.decode("utf-8").splitlines()
+        if not lines:
+            raise JournalError(f"{path} is empty")
+        header = json.loads(lines[0])
+        if header.get("tool") != tool:
+            raise JournalError(f"{path} was written by {header.get('tool')}, not {tool}")
+        if header.get("fingerprint") != digest:
+            raise JournalError(f"{path} was written for different targets or options")
+        done: Dict[int, Dict[str, object]] = {}
+        for line in lines[1:]:
+            record = json.loads(line)
+            done[int(record["position"])] = record["entry"]
+        return cls(path, path.open("a", encoding="utf-8"), done)
+
+    def record(self, position: int, entry: Dict[str, object]) -> None:
+        self._handle.write(json.dumps({"position": position, "entry": entry}, ensure_ascii=False) + "\n")
+        self._handle.flush()
+
+    def close(self) -> None:
+        self._handle.close()
+
+    def discard(self) -> None:
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+
+def open_journal(
+    args: argparse.Namespace,
+    tool: str,
+    output_path: Path,
+    targets: Sequence[object],
+    *options: object,
+) -> Optional[Journal]:
+    """Start or resume the journal requested by ``args`` (``None`` when disabled)."""
+
+    digest = fingerprint([[str(part) for part in target] for target in targets], *options)
+    if args.resume:
+        return Journal.resume(args.resume, tool, digest)
+    if args.no_checkpoint:
+        return None
+    return Journal.create(journal_path_for(output_path), tool, digest, len(targets))
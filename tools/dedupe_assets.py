@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""Point every reference to a duplicated asset at one canonical copy.
+
+HTTrack saved some files more than once (a favicon under the site root and
+under ``webinar.nlping.ru/``, the same script under several hashed names …).
+Each copy is a separate browser and CDN cache entry for identical bytes. This
+tool:
+
+1. collects the local asset references of the pages with ``list_assets.py``
+   (on the fly, or from an ``artifacts/assets.json`` report via
+   ``--inventory``); pages referenced as assets (HTTrack error stubs) are
+   ignored;
+2. groups the referenced files by MD5. Digests come from
+   ``snapshot/baseline_md5.txt.gz`` when its stat sidecar shows the file is
+   unchanged, otherwise the file is hashed;
+3. picks a canonical path per group: the most referenced one, then the
+   shortest, then the first in sort order;
+4. rewrites the ``src``/``href``/``srcset``/``data`` attributes that point to
+   the other copies into relative URLs of the canonical path, keeping the
+   query and fragment.
+
+A page is only written (atomically, in its own encoding) if its re-parsed
+asset list equals the old one with the duplicates replaced. Otherwise it is
+reported as ``refused`` (or ``missed`` when no attribute could be
+rewritten). The duplicate files themselves are kept, since stylesheets or
+external links may still point to them. The report
+(``logs/dedupe_assets-<timestamp>.json``) lists the groups, the pages and the
+bytes and cache entries a visitor no longer downloads separately.
+"""
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    from . import profiling
+    from .fileio import decode_page, write_atomic
+    from .generate_md5_baseline import DEFAULT_OUTPUT as DEFAULT_BASELINE
+    from .generate_md5_baseline import load_previous, md5sum
+    from .list_assets import HTML_EXTENSIONS, PROJECT_ROOT, AssetCollector, collect_assets, iter_html_files, resolve_local_path
+    from .walker import add_ignore_arguments, ignore_rules_from_args
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from fileio import decode_page, write_atomic  # type: ignore
+    from generate_md5_baseline import DEFAULT_OUTPUT as DEFAULT_BASELINE  # type: ignore
+    from generate_md5_baseline import load_previous, md5sum  # type: ignore
+    from list_assets import HTML_EXTENSIONS, PROJECT_ROOT, AssetCollector, collect_assets, iter_html_files, resolve_local_path  # type: ignore
+    from walker import add_ignore_arguments, ignore_rules_from_args  # type: ignore
+
+LOG_DIR = PROJECT_ROOT / "logs"
+
+# Tags and attributes that AssetCollector reads asset URLs from.
+ASSET_TAG_RE = re.compile(
+    r"""<(?:link|script|img|iframe|embed|audio|video|source|track|object)\b(?:"[^"]*"|'[^']*'|[^'">])*>""",
+    re.IGNORECASE,
+)
+ASSET_ATTR_RE = re.compile(
+    r"""(?<=[\s"'/])(?P<name>src|href|srcset|data-src|data-original|data)(?P<equals>\s*=\s*)"""
+    r"""(?:"(?P<double>[^"]*)"|'(?P<single>[^']*)'|(?P<bare>[^\s"'>]+))""",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class DuplicateGroup:
+    digest: str
+    size: int
+    canonical: str
+    duplicates: List[str]
+    references: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class PageResult:
+    path: str
+    status: str
+    rewritten: int = 0
+    reason: Optional[str] = None
+
+
+def _resolved(entry: object) -> Optional[str]:
+    """Resolved path of an existing local asset (``AssetEntry`` or its JSON form)."""
+
+    resolved = entry["resolved_path"] if isinstance(entry, dict) else entry.resolved_path
+    exists = entry["exists"] if isinstance(entry, dict) else entry.exists
+    return Path(resolved).as_posix() if resolved and exists else None
+
+
+def referenced_assets(report: Mapping[str, Mapping[str, Sequence[object]]]) -> Dict[str, int]:
+    """Count the pages referencing each existing local, non-HTML asset."""
+
+    counts: Counter = Counter()
+    for assets in report.values():
+        names: Set[str] = set()
+        for entries in assets.values():
+            for entry in entries:
+                resolved = _resolved(entry)
+                if resolved and Path(resolved).suffix.lower() not in HTML_EXTENSIONS:
+                    names.add(resolved)
+        counts.update(names)
+    return {name: count for name, count in counts.items() if (PROJECT_ROOT / name).is_file()}
+
+
+def digest_assets(names: Iterable[str], baseline: Optional[Path]) -> Dict[str, str]:
+    """MD5 of each asset, reused from the baseline when size and mtime match."""
+
+    previous = load_previous(baseline, "md5") if baseline is not None else {}
+    digests: Dict[str, str] = {}
+    for name in names:
+        path = PROJECT_ROOT / name
+        stat = path.stat()
+        known = previous.get(name)
+        if known is not None and known[1:] == (stat.st_size, stat.st_mtime_ns):
+            digests[name] = known[0]
+        else:
+            with profiling.track_file(path):
+                digests[name] = md5sum(path)
+    return digests
+
+
+def find_duplicates(references: Mapping[str, int], digests: Mapping[str, str]) -> List[DuplicateGroup]:
+    by_digest: Dict[str, List[str]] = defaultdict(list)
+    for name in references:
+        by_digest[digests[name]].append(name)
+    groups = []
+    for digest, names in sorted(by_digest.items()):
+        if len(names) < 2:
+            continue
+        names.sort(key=lambda name: (-references[name], len(name), name))
+        groups.append(
+            DuplicateGroup(
+                digest=digest,
+                size=(PROJECT_ROOT / names[0]).stat().st_size,
+                canonical=names[0],
+                duplicates=names[1:],
+                references={name: references[name] for name in names},
+            )
+        )
+    return groups
+
+
+def canonical_map(groups: Iterable[DuplicateGroup]) -> Dict[str, str]:
+    return {duplicate: group.canonical for group in groups for duplicate in group.duplicates}
+
+
+def _canonical_url(url: str, page: Path, mapping: Mapping[str, str]) -> Optional[str]:
+    resolved, _ = resolve_local_path(page, url)
+    canonical = mapping.get(Path(resolved).as_posix()) if resolved else None
+    if canonical is None:
+        return None
+    parts = urlsplit(url)
+    relative = Path(os.path.relpath(PROJECT_ROOT / canonical, page.resolve().parent)).as_posix()
+    return urlunsplit(("", "", relative, parts.query, parts.fragment))
+
+
+def _rewrite_value(name: str, value: str, page: Path, mapping: Mapping[str, str]) -> Optional[str]:
+    if name != "srcset":
+        return _canonical_url(html.unescape(value).strip(), page, mapping)
+    candidates = []
+    changed = False
+    for candidate in html.unescape(value).split(","):
+        url, _, descriptor = candidate.strip().partition(" ")
+        replacement = _canonical_url(url, page, mapping) if url else None
+        changed = changed or replacement is not None
+        candidates.append(" ".join(part for part in (replacement or url, descriptor.strip()) if part))
+    return ", ".join(candidates) if changed else None
+
+
+def rewrite_references(text: str, page: Path, mapping: Mapping[str, str]) -> Tuple[str, int]:
+    """Return ``text`` with asset URLs of duplicates replaced, and the number replaced."""
+
+    count = 0
+
+    def attribute(match: re.Match) -> str:
+        nonlocal count
+        value = next(match.group(kind) for kind in ("double", "single", "bare") if match.group(kind) is not None)
+        replacement = _rewrite_value(match.group("name").lower(), value, page, mapping)
+        if replacement is None:
+            return match.group(0)
+        count += 1
+        return f'{match.group("name")}{match.group("equals")}"{html.escape(replacement)}"'
+
+    def tag(match: re.Match) -> str:
+        return ASSET_ATTR_RE.sub(attribute, match.group(0))
+
+    return ASSET_TAG_RE.sub(tag, text), count
+
+
+def _asset_keys(page: Path, text: str, mapping: Optional[Mapping[str, str]] = None) -> Set[Tuple[str, str]]:
+    collector = AssetCollector(page)
+    collector.feed(text)
+    collector.close()
+    keys = set()
+    for category, entries in collector.to_entries().items():
+        for entry in entries:
+            if entry.resolved_path is None:
+                keys.add((category, entry.url))
+                continue
+            resolved = Path(entry.resolved_path).as_posix()
+            keys.add((category, (mapping or {}).get(resolved, resolved)))
+    return keys
+
+
+def _relative(path: Path) -> str:
+    try:
+        return path.resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
+def references_match(page: Path, before: str, after: str, mapping: Mapping[str, str]) -> bool:
+    """True when ``after`` references the assets of ``before`` with ``mapping`` applied."""
+
+    return _asset_keys(page, after) == _asset_keys(page, before, mapping)
+
+
+@profiling.timed("rewrite")
+def rewrite_page(page: Path, mapping: Mapping[str, str], *, dry_run: bool = False) -> PageResult:
+    result = PageResult(path=_relative(page), status="unchanged")
+    try:
+        raw = page.read_bytes()
+    except OSError as exc:
+        result.status, result.reason = "error", str(exc)
+        return result
+    text, encoding = decode_page(raw)
+    if text is None:
+        result.status, result.reason = "skipped", "not UTF-8 or Windows-1251"
+        return result
+    rewritten, result.rewritten = rewrite_references(text, page, mapping)
+    if not result.rewritten:
+        result.status, result.reason = "missed", "no rewritable attribute found for the duplicate"
+        return result
+    if not references_match(page, text, rewritten, mapping):
+        result.status, result.reason = "refused", "asset references differ after rewriting"
+        return result
+    result.status = "would_rewrite" if dry_run else "rewritten"
+    if not dry_run:
+        try:
+            write_atomic(page, rewritten.encode(encoding))
+        except (OSError, UnicodeEncodeError) as exc:
+            result.status, result.reason = "error", str(exc)
+    return result
+
+
+def pages_to_rewrite(report: Mapping[str, Mapping[str, Sequence[object]]], mapping: Mapping[str, str]) -> List[Path]:
+    return [
+        PROJECT_ROOT / page
+        for page, assets in sorted(report.items())
+        if any(_resolved(entry) in mapping for entries in assets.values() for entry in entries)
+    ]
+
+
+def summarise(groups: Sequence[DuplicateGroup], pages: Sequence[PageResult]) -> Dict[str, int]:
+    """Bytes and cache entries saved assume a visitor who loads every page once."""
+
+    summary: Dict[str, int] = {
+        "groups": len(groups),
+        "cache_entries_consolidated": sum(len(group.duplicates) for group in groups),
+        "bytes_saved": sum(group.size * len(group.duplicates) for group in groups),
+        "pages": len(pages),
+        "references_rewritten": sum(page.rewritten for page in pages if page.status in ("rewritten", "would_rewrite")),
+    }
+    for page in pages:
+        summary[page.status] = summary.get(page.status, 0) + 1
+    return summary
+
+
+def write_log(
+    log_dir: Path,
+    groups: Sequence[DuplicateGroup],
+    pages: Sequence[PageResult],
+    *,
+    dry_run: bool,
+    profile: Optional[dict] = None,
+) -> Path:
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"dedupe_assets-{timestamp}.json"
+    payload: Dict[str, object] = {
+        "generated_at": timestamp,
+        "dry_run": dry_run,
+        "summary": summarise(groups, pages),
+        "groups": [asdict(group) for group in groups],
+        "pages": [asdict(page) for page in pages],
+    }
+    if profile is not None:
+        payload["profile"] = profile
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return output_path
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["."],
+        help="Files or directories whose HTML pages are scanned for assets (default: project root)",
+    )
+    parser.add_argument("--inventory", type=Path, help="Take references from a list_assets.py JSON report instead")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=DEFAULT_BASELINE,
+        help="MD5 baseline whose digests are reused for unchanged files (default: snapshot/baseline_md5.txt.gz)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Report the duplicates without rewriting any page")
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help="Where to store the JSON report (default: logs)")
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    with profiling.session(args) as profiler:
+        if args.inventory:
+            try:
+                report = json.loads(args.inventory.read_text(encoding="utf-8"))["files"]
+            except (OSError, ValueError, KeyError) as exc:
+                print(f"Failed to read inventory {args.inventory}: {exc}", file=sys.stderr)
+                return 1
+        else:
+            with profiling.phase("walk"):
+                html_files = list(iter_html_files([Path(p).resolve() for p in args.paths], ignore_rules_from_args(args)))
+            report = collect_assets(html_files)
+        references = referenced_assets(report)
+        if not references:
+            print("No referenced assets found.", file=sys.stderr)
+            return 1
+
+        groups = find_duplicates(references, digest_assets(sorted(references), args.baseline))
+        mapping = canonical_map(groups)
+        results = [rewrite_page(page, mapping, dry_run=args.dry_run) for page in pages_to_rewrite(report, mapping)]
+        with profiling.phase("write"):
+            log_path = write_log(args.log_dir, groups, results, dry_run=args.dry_run, profile=profiling.report_of(profiler))
+
+    summary = summarise(groups, results)
+    verb = "Would rewrite" if args.dry_run else "Rewrote"
+    print(
+        f"{summary['groups']} duplicate groups among {len(references)} referenced assets: "
+        f"{summary['cache_entries_consolidated']} cache entries and {summary['bytes_saved']} bytes consolidated. "
+        f"{verb} {summary['references_rewritten']} references in "
+        f"{summary.get('rewritten', 0) + summary.get('would_rewrite', 0)} pages; log: {log_path}"
+    )
+    for result in results:
+        if result.status in ("refused", "missed", "error"):
+            print(f" - {result.path}: {result.status}: {result.reason}", file=sys.stderr)
+    return 1 if summary.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
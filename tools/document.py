@@ -0,0 +1,156 @@
+"""Single-pass analysis of one HTML/XML document.
+
+``check_utf8`` and ``check_links`` used to read, decode and tokenise every
+page separately. :class:`DocumentParser` feeds one ``HTMLParser`` pass into
+both the SEO extraction of ``check_utf8`` and the asset collection of
+``list_assets``; :func:`analyse_document` adds the charset and mojibake checks
+on the same decoded text. :class:`DocumentCache` exposes the results through
+the same ``document()``/``assets()`` interface as ``site_index.SiteIndex`` so
+the checkers can consume either.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from . import profiling
+    from .check_utf8 import (
+        SeoHTMLParser,
+        SeoSnapshot,
+        decode_content,
+        detect_declared_charset,
+        detect_suspect_sequences,
+    )
+    from .list_assets import AssetCollector, AssetEntry
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from check_utf8 import (  # type: ignore
+        SeoHTMLParser,
+        SeoSnapshot,
+        decode_content,
+        detect_declared_charset,
+        detect_suspect_sequences,
+    )
+    from list_assets import AssetCollector, AssetEntry  # type: ignore
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+HTML_EXTENSIONS = {".html", ".htm", ".xhtml"}
+XML_EXTENSIONS = {".xml", ".rss", ".atom"}
+
+
+def file_kind(name: str) -> str:
+    suffix = os.path.splitext(name)[1].lower()
+    if suffix in HTML_EXTENSIONS:
+        return "html"
+    if suffix in XML_EXTENSIONS:
+        return "xml"
+    return "other"
+
+
+class DocumentParser(SeoHTMLParser):
+    """SEO parser that also feeds every start tag to an ``AssetCollector``."""
+
+    def __init__(self, html_path: Path) -> None:
+        super().__init__()
+        self.collector = AssetCollector(html_path)
+
+    def handle_starttag(self, tag: str, attrs):
+        super().handle_starttag(tag, attrs)
+        self.collector.handle_starttag(tag, attrs)
+
+
+@dataclass
+class DocumentFacts:
+    path: str
+    kind: str
+    detected_encoding: Optional[str]
+    declared_charset: Optional[str]
+    contains_replacement: bool
+    contains_suspect_sequences: bool
+    seo: SeoSnapshot
+    assets: Dict[str, List[AssetEntry]] = field(default_factory=dict)
+
+
+def analyse_document(path: Path, raw: bytes, key: Optional[str] = None) -> DocumentFacts:
+    """Decode ``raw`` once and run every per-document check on the text."""
+
+    text, detected = decode_content(raw)
+    with profiling.phase("parse"):
+        parser = DocumentParser(path)
+        parser.feed(text)
+        parser.close()
+    with profiling.phase("detect"):
+        declared = detect_declared_charset(text)
+        replacement = ("\ufffd" in text) or (b"\xef\xbf\xbd" in raw)
+        suspect = detect_suspect_sequences(text, raw)
+    return DocumentFacts(
+        path=key if key is not None else str(path),
+        kind=file_kind(path.name),
+        detected_encoding=detected,
+        declared_charset=declared,
+        contains_replacement=replacement,
+        contains_suspect_sequences=suspect,
+        seo=parser.result(),
+        assets=parser.collector.to_entries(),
+    )
+
+
+class DocumentCache:
+    """Analyse each document on first request and keep the facts in memory.
+
+    Keys are the ``ensure_relative`` strings used by the checkers (relative to
+    the project root, or absolute for paths outside it). With ``revalidate``
+    (used by the long-lived ``server.py``) every access compares the file's
+    size and ``mtime_ns`` with the cached copy and re-reads changed files;
+    asset ``exists`` flags are then checked again on each request.
+    """
+
+    def __init__(self, *, revalidate: bool = False) -> None:
+        self.revalidate = revalidate
+        self._facts: Dict[str, Optional[DocumentFacts]] = {}
+        self._stamps: Dict[str, Optional[Tuple[int, int]]] = {}
+        self.reads = 0
+
+    def _load(self, key: str) -> Optional[DocumentFacts]:
+        path = PROJECT_ROOT / key
+        if self.revalidate:
+            try:
+                stat = path.stat()
+                stamp: Optional[Tuple[int, int]] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                stamp = None
+            if self._stamps.get(key, stamp) != stamp:
+                del self._facts[key]
+            self._stamps[key] = stamp
+        if key not in self._facts:
+            try:
+                with profiling.phase("read"):
+                    raw = path.read_bytes()
+            except OSError:
+                self._facts[key] = None
+            else:
+                self.reads += 1
+                self._facts[key] = analyse_document(path, raw, key)
+        return self._facts[key]
+
+    def document(self, key: str) -> Optional[DocumentFacts]:
+        return self._load(key)
+
+    def assets(self, key: str) -> Optional[Dict[str, List[AssetEntry]]]:
+        facts = self._load(key)
+        if facts is None:
+            return None
+        if not self.revalidate:
+            return facts.assets
+        return {
+            category: [
+                replace(entry, exists=(PROJECT_ROOT / entry.resolved_path).exists())
+                if entry.resolved_path is not None
+                else entry
+                for entry in entries
+            ]
+            for category, entries in facts.assets.items()
+        }
@@ -0,0 +1,37 @@
+"""Small file helpers shared by the tools that rewrite the mirror in place."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+PAGE_ENCODINGS = ("utf-8", "cp1251")
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Replace ``path`` with ``data`` without ever leaving a half-written file.
+
+    The bytes go to a hidden temporary file in the same directory, which then
+    takes the original's permission bits and is renamed over it.
+    """
+
+    temporary = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    try:
+        temporary.write_bytes(data)
+        if path.exists():
+            os.chmod(temporary, path.stat().st_mode & 0o7777)
+        os.replace(temporary, path)
+    finally:
+        if temporary.exists():
+            temporary.unlink()
+
+
+def decode_page(raw: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """Decode a mirrored page as UTF-8 or Windows-1251; ``(None, None)`` otherwise."""
+
+    for encoding in PAGE_ENCODINGS:
+        try:
+            return raw.decode(encoding), encoding
+        except UnicodeDecodeError:
+            continue
+    return None, None
@@ -1,33 +1,111 @@
 #!/usr/bin/env python3
-"""Generate a compressed MD5 checksum baseline for the site mirror."""
+"""Generate a compressed MD5 checksum baseline for the site mirror.
+
+Files are hashed by a thread pool (``hashlib`` releases the GIL for large
+updates) and written in sorted path order, so the output is identical for any
+``--jobs`` value. The first line records the digest algorithm
+(``# algorithm: md5``) so verifiers know how to check the entries.
+
+Next to the baseline a stat sidecar (``baseline_md5.stat.gz``) stores the size
+and ``mtime_ns`` of every entry. Later runs reuse the previous digest of files
+whose stat is unchanged and rehash only the rest; ``--paranoid`` forces a full
+rehash.
+
+``--verify`` compares the tree against an existing baseline instead of writing
+one and lists modified, added and removed files (exit code 1 on drift). It
+uses the same stat shortcut, so only files whose stat changed are hashed
+unless ``--paranoid`` is given.
+"""
 from __future__ import annotations
 
 import argparse
 import gzip
 import hashlib
+import json
+import mmap
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Iterable
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    from . import profiling
+    from .site_index import open_site_index
+    from .walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, scan_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from site_index import open_site_index  # type: ignore
+    from walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, scan_files  # type: ignore
 
 ROOT = Path(__file__).resolve().parent.parent
 DEFAULT_SOURCE = ROOT
 DEFAULT_OUTPUT = ROOT / "snapshot" / "baseline_md5.txt.gz"
+ALGORITHMS = ("md5", "blake2b")
+HEADER_PREFIX = "# algorithm: "
+READ_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 4 * 1024 * 1024
 
 
-def iter_files(source: Path) -> Iterable[Path]:
-    for path in sorted(source.rglob("*")):
-        if path.is_file():
-            yield path
+@dataclass
+class VerifyResult:
+    algorithm: str
+    checked: int = 0
+    hashed: int = 0
+    modified: List[str] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
 
+    @property
+    def clean(self) -> bool:
+        return not (self.modified or self.added or self.removed)
 
-def md5sum(path: Path) -> str:
-    digest = hashlib.md5()
+
+def iter_files(source: Path, ignore: IgnoreRules = DEFAULT_IGNORE) -> Iterable[Path]:
+    for entry in scan_files(source, ignore=ignore):
+        yield Path(entry.path)
+
+
+@profiling.timed("hash")
+def hash_file(path: Path, algorithm: str = "md5") -> str:
+    digest = hashlib.new(algorithm)
     with path.open("rb") as handle:
-        for chunk in iter(lambda: handle.read(8192), b""):
-            digest.update(chunk)
+        size = os.fstat(handle.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                digest.update(view)
+        else:
+            for chunk in iter(lambda: handle.read(READ_SIZE), b""):
+                digest.update(chunk)
     return digest.hexdigest()
 
 
+def md5sum(path: Path) -> str:
+    return hash_file(path, "md5")
+
+
+def hash_files(paths: Iterable[Path], algorithm: str, jobs: int) -> Iterator[Tuple[Path, str]]:
+    """Yield ``(path, digest)`` pairs in the order of ``paths``."""
+
+    if jobs <= 1:
+        for path in paths:
+            with profiling.track_file(path):
+                digest = hash_file(path, algorithm)
+            yield path, digest
+        return
+    ordered: List[Path] = list(paths)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        yield from zip(ordered, profiling.map_files(executor, lambda item: hash_file(item, algorithm), ordered))
+
+
+def relative_name(path: Path, source: Path) -> str:
+    try:
+        return path.relative_to(ROOT).as_posix()
+    except ValueError:
+        return path.relative_to(source).as_posix()
+
+
 def open_output(path: Path, compress: bool):
     path.parent.mkdir(parents=True, exist_ok=True)
     if compress:
@@ -35,7 +113,134 @@ def open_output(path: Path, compress: bool):
     return path.open("w", encoding="utf-8")
 
 
-def parse_args() -> argparse.Namespace:
+def open_input(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return path.open("r", encoding="utf-8")
+
+
+def stat_sidecar_path(output: Path) -> Path:
+    """Return ``baseline_md5.stat.gz`` for ``baseline_md5.txt.gz`` and so on."""
+
+    name = output.name
+    compressed = name.endswith(".gz")
+    for suffix in (".gz", ".txt"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return output.with_name(name + ".stat" + (".gz" if compressed else ""))
+
+
+def load_baseline(path: Path) -> Tuple[str, Dict[str, str]]:
+    """Read a baseline into ``(algorithm, {relative path: digest})``.
+
+    Baselines written before the algorithm header existed are MD5.
+    """
+
+    algorithm = "md5"
+    entries: Dict[str, str] = {}
+    with open_input(path) as handle:
+        for line in handle:
+            line = line.rstrip("\n")
+            if line.startswith(HEADER_PREFIX):
+                algorithm = line[len(HEADER_PREFIX):].strip()
+                continue
+            if not line or line.startswith("#"):
+                continue
+            digest, _, name = line.partition("  ")
+            entries[name] = digest
+    return algorithm, entries
+
+
+def load_stats(path: Path) -> Dict[str, Tuple[int, int]]:
+    stats: Dict[str, Tuple[int, int]] = {}
+    with open_input(path) as handle:
+        for line in handle:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            numbers, _, name = line.partition("  ")
+            size, _, mtime_ns = numbers.partition(" ")
+            stats[name] = (int(size), int(mtime_ns))
+    return stats
+
+
+def load_previous(output: Path, algorithm: str) -> Dict[str, Tuple[str, int, int]]:
+    """Return reusable ``{relative path: (digest, size, mtime_ns)}`` entries.
+
+    Nothing is reused when either file is missing or unreadable, or when the
+    previous baseline was produced with a different algorithm.
+    """
+
+    sidecar = stat_sidecar_path(output)
+    if not output.exists() or not sidecar.exists():
+        return {}
+    try:
+        previous_algorithm, digests = load_baseline(output)
+        stats = load_stats(sidecar)
+    except (OSError, ValueError, EOFError) as exc:
+        print(f"Ignoring previous baseline {output}: {exc}", file=sys.stderr)
+        return {}
+    if previous_algorithm != algorithm:
+        return {}
+    return {
+        name: (digest, *stats[name])
+        for name, digest in digests.items()
+        if name in stats
+    }
+
+
+def load_index_digests(path: Path) -> Dict[str, Tuple[str, int, int]]:
+    """Return ``{relative path: (md5, size, mtime_ns)}`` from a site index."""
+
+    with open_site_index(path) as index:
+        return {
+            Path(name).as_posix(): (digest, size, mtime_ns)
+            for name, size, mtime_ns, digest in index.file_stats()
+        }
+
+
+def verify_tree(
+    source: Path,
+    baseline: Path,
+    *,
+    jobs: int,
+    paranoid: bool,
+    ignore: IgnoreRules = DEFAULT_IGNORE,
+) -> VerifyResult:
+    """Diff ``source`` against ``baseline`` without writing a new baseline."""
+
+    algorithm, expected = load_baseline(baseline)
+    sidecar = stat_sidecar_path(baseline)
+    stats = {} if paranoid or not sidecar.exists() else load_stats(sidecar)
+    result = VerifyResult(algorithm=algorithm)
+
+    seen = set()
+    pending: List[Path] = []
+    for entry in profiling.iterate("walk", scan_files(source, ignore=ignore)):
+        path = Path(entry.path)
+        rel_path = relative_name(path, source)
+        seen.add(rel_path)
+        result.checked += 1
+        if rel_path not in expected:
+            result.added.append(rel_path)
+            continue
+        known = stats.get(rel_path)
+        if known is not None:
+            stat = entry.stat()
+            if known == (stat.st_size, stat.st_mtime_ns):
+                continue
+        pending.append(path)
+
+    for path, digest in hash_files(pending, algorithm, jobs):
+        result.hashed += 1
+        rel_path = relative_name(path, source)
+        if digest != expected[rel_path]:
+            result.modified.append(rel_path)
+    result.removed = sorted(name for name in expected if name not in seen)
+    return result
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument(
         "--source",
@@ -54,26 +259,126 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Write plain text instead of gzip if set",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of hashing threads (default: CPU count)",
+    )
+    parser.add_argument(
+        "--algorithm",
+        choices=ALGORITHMS,
+        default="md5",
+        help="Digest algorithm recorded in the header (default: md5)",
+    )
+    parser.add_argument(
+        "--paranoid",
+        action="store_true",
+        help="Rehash every file instead of trusting unchanged size/mtime from the stat sidecar",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Compare the tree against the baseline at --output instead of writing it",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        help="With --verify, also write the differences as JSON to this path",
+    )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        help="Reuse MD5 digests from a site index built by site_index.py when the stat matches",
+    )
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
 
+def run_verify(args: argparse.Namespace, profiler: Optional[profiling.Profiler] = None) -> int:
+    if not args.output.exists():
+        print(f"Baseline {args.output} not found", file=sys.stderr)
+        return 1
+    result = verify_tree(
+        args.source,
+        args.output,
+        jobs=args.jobs,
+        paranoid=args.paranoid,
+        ignore=ignore_rules_from_args(args),
+    )
+
+    for label, names in (("M", result.modified), ("A", result.added), ("D", result.removed)):
+        for name in names:
+            print(f"{label} {name}")
+    print(
+        f"Verified {result.checked} files against {args.output} "
+        f"({result.algorithm}, hashed {result.hashed}): modified {len(result.modified)}, "
+        f"added {len(result.added)}, removed {len(result.removed)}"
+    )
+    if args.report:
+        payload = asdict(result)
+        if profiler is not None:
+            payload["profile"] = profiler.report()
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    elif profiler is not None:
+        profiling.write_profile(profiler, "generate_md5_baseline")
+    return 0 if result.clean else 1
 
-def main() -> int:
-    args = parse_args()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
     source = args.source
     if not source.exists():
         print(f"Source directory {source} not found", file=sys.stderr)
         return 1
 
+    with profiling.session(args) as profiler:
+        if args.verify:
+            return run_verify(args, profiler)
+        return run_generate(args, profiler)
+
+
+def run_generate(args: argparse.Namespace, profiler: Optional[profiling.Profiler] = None) -> int:
+    source = args.source
     compress = not args.no_gzip and args.output.suffix == ".gz"
-    total = 0
-    with open_output(args.output, compress) as handle:
-        for path in iter_files(source):
-            digest = md5sum(path)
-            rel_path = path.relative_to(ROOT).as_posix()
-            handle.write(f"{digest}  {rel_path}\n")
-            total += 1
-
-    print(f"Captured {total} files into {args.output}")
+    with profiling.phase("baseline"):
+        previous = {} if args.paranoid else load_previous(args.output, args.algorithm)
+        if args.index and not args.paranoid and args.algorithm == "md5":
+            previous.update(load_index_digests(args.index))
+
+    entries: List[Tuple[str, os.stat_result]] = []
+    digests: Dict[str, str] = {}
+    pending: List[Path] = []
+    for entry in profiling.iterate("walk", scan_files(source, ignore=ignore_rules_from_args(args))):
+        path = Path(entry.path)
+        rel_path = relative_name(path, source)
+        stat = entry.stat()
+        entries.append((rel_path, stat))
+        known = previous.get(rel_path)
+        if known is not None and known[1:] == (stat.st_size, stat.st_mtime_ns):
+            digests[rel_path] = known[0]
+        else:
+            pending.append(path)
+    reused = len(digests)
+    for path, digest in hash_files(pending, args.algorithm, args.jobs):
+        digests[relative_name(path, source)] = digest
+
+    with profiling.phase("write"):
+        with open_output(args.output, compress) as handle:
+            handle.write(f"{HEADER_PREFIX}{args.algorithm}\n")
+            for rel_path, _ in entries:
+                handle.write(f"{digests[rel_path]}  {rel_path}\n")
+        with open_output(stat_sidecar_path(args.output), compress) as handle:
+            for rel_path, stat in entries:
+                handle.write(f"{stat.st_size} {stat.st_mtime_ns}  {rel_path}\n")
+
+    print(
+        f"Captured {len(entries)} files into {args.output} "
+        f"(hashed {len(pending)}, reused {reused})"
+    )
+    profiling.write_profile(profiler, "generate_md5_baseline")
     return 0
 
 
@@ -8,23 +8,39 @@ files, and captures channel metadata from XML feeds.
 By default the result is written as a gzip-compressed JSON file to
 ``snapshot/seo_baseline.json.gz`` so the repository does not carry a
 massive text artifact. Use ``--output``/``--no-gzip`` to override.
+
+Documents are parsed by a process pool (``--jobs``) and HTML records are
+streamed into the (gzip) writer in sorted path order as they complete, so the
+output is identical for any number of jobs and memory stays flat. Feed
+records are few and are buffered until the HTML array is closed.
 """
 from __future__ import annotations
 
 import argparse
 import gzip
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
 from html.parser import HTMLParser
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
 import xml.etree.ElementTree as ET
 
+try:
+    from . import profiling
+    from .walker import add_ignore_arguments, ignore_rules_from_args, iter_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from walker import add_ignore_arguments, ignore_rules_from_args, iter_files  # type: ignore
+
 ROOT = Path(__file__).resolve().parent.parent
 CONTENT_ROOT = ROOT
 DEFAULT_OUTPUT_PATH = ROOT / "snapshot" / "seo_baseline.json.gz"
+HTML_EXTENSIONS = {".html", ".htm", ".xhtml"}
+XML_EXTENSIONS = {".xml", ".rss", ".atom"}
 
 
 class SeoHTMLParser(HTMLParser):
@@ -147,7 +163,31 @@ def parse_xml(path: Path) -> Optional[XmlRecord]:
     )
 
 
-def parse_args() -> argparse.Namespace:
+def parse_document(path: Path) -> Tuple[str, Optional[Dict[str, object]]]:
+    """Parse one file; return its payload key and record (``None`` if empty)."""
+
+    if path.suffix.lower() in HTML_EXTENSIONS:
+        html_record = parse_html(path)
+        return "html", asdict(html_record) if html_record else None
+    xml_record = parse_xml(path)
+    return "feeds", asdict(xml_record) if xml_record else None
+
+
+def parse_documents(paths: Iterable[Path], jobs: int) -> Iterator[Tuple[str, Optional[Dict[str, object]]]]:
+    """Yield :func:`parse_document` results in the order of ``paths``."""
+
+    if jobs <= 1:
+        for path in paths:
+            with profiling.track_file(path), profiling.phase("parse"):
+                result = parse_document(path)
+            yield result
+        return
+    ordered = list(paths)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from profiling.iterate("parse", profiling.map_files(executor, parse_document, ordered, chunksize=16))
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument(
         "--output",
@@ -165,55 +205,122 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Write compact JSON without indentation",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of parser processes (default: CPU count)",
+    )
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
 
 
-def dump_payload(payload: Dict[str, object], output_path: Path, *, pretty: bool, force_plain: bool) -> None:
+def open_output(output_path: Path, *, force_plain: bool) -> TextIO:
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    json_text = json.dumps(payload, ensure_ascii=False, indent=None if not pretty else 2)
-    compress = not force_plain and output_path.suffix == ".gz"
-    if compress:
-        with gzip.open(output_path, "wt", encoding="utf-8") as handle:
-            handle.write(json_text)
-    else:
-        output_path.write_text(json_text, encoding="utf-8")
-
-
-def main() -> int:
-    args = parse_args()
+    if not force_plain and output_path.suffix == ".gz":
+        return gzip.open(output_path, "wt", encoding="utf-8")
+    return output_path.open("w", encoding="utf-8")
+
+
+class JsonStreamWriter:
+    """Write a top-level JSON object whose arrays are filled incrementally.
+
+    The output is byte-for-byte what ``json.dumps(payload, indent=2)`` (or
+    ``indent=None``) would produce for the complete object.
+    """
+
+    def __init__(self, handle: TextIO, *, pretty: bool) -> None:
+        self.handle = handle
+        self.pretty = pretty
+        self._keys = 0
+        self._items = 0
+
+    def _dumps(self, value: object, depth: int) -> str:
+        text = json.dumps(value, ensure_ascii=False, indent=2 if self.pretty else None)
+        if self.pretty and depth:
+            text = text.replace("\n", "\n" + "  " * depth)
+        return text
+
+    def _key(self, key: str) -> None:
+        if self.pretty:
+            self.handle.write(("{\n" if not self._keys else ",\n") + "  ")
+        else:
+            self.handle.write("{" if not self._keys else ", ")
+        self.handle.write(json.dumps(key, ensure_ascii=False) + ": ")
+        self._keys += 1
+
+    def field(self, key: str, value: object) -> None:
+        self._key(key)
+        self.handle.write(self._dumps(value, 1))
+
+    def begin_array(self, key: str) -> None:
+        self._key(key)
+        self.handle.write("[")
+        self._items = 0
+
+    def item(self, value: object) -> None:
+        if self.pretty:
+            self.handle.write(("\n" if not self._items else ",\n") + "    ")
+        elif self._items:
+            self.handle.write(", ")
+        self.handle.write(self._dumps(value, 2))
+        self._items += 1
+
+    def end_array(self) -> None:
+        if self.pretty and self._items:
+            self.handle.write("\n  ")
+        self.handle.write("]")
+
+    def close(self) -> None:
+        if not self._keys:
+            self.handle.write("{")
+        self.handle.write("\n}" if self.pretty and self._keys else "}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
     if not CONTENT_ROOT.exists():
         print(f"Content folder {CONTENT_ROOT} not found", file=sys.stderr)
         return 1
 
-    html_records: List[HtmlRecord] = []
-    xml_records: List[XmlRecord] = []
-
-    for path in sorted(CONTENT_ROOT.rglob("*")):
-        if not path.is_file():
-            continue
-        suffix = path.suffix.lower()
-        if suffix in {".html", ".htm", ".xhtml"}:
-            record = parse_html(path)
-            if record:
-                html_records.append(record)
-        elif suffix in {".xml", ".rss", ".atom"}:
-            record = parse_xml(path)
-            if record:
-                xml_records.append(record)
-
-    payload = {
-        "generated_at": datetime.now(timezone.utc).isoformat(),
-        "source": str(CONTENT_ROOT.as_posix()),
-        "html": [asdict(r) for r in html_records],
-        "feeds": [asdict(r) for r in xml_records],
-    }
-    dump_payload(payload, args.output, pretty=not args.compact, force_plain=args.no_gzip)
-    print(
-        "Captured {html} HTML records and {xml} XML records into {path}".format(
-            html=len(html_records), xml=len(xml_records), path=args.output
+    suffixes = HTML_EXTENSIONS | XML_EXTENSIONS
+    with profiling.session(args) as profiler:
+        paths = profiling.iterate(
+            "walk", iter_files([CONTENT_ROOT], suffixes=suffixes, ignore=ignore_rules_from_args(args))
         )
-    )
-    return 0
+        html_count = 0
+        feeds: List[Dict[str, object]] = []
+
+        with open_output(args.output, force_plain=args.no_gzip) as handle:
+            writer = JsonStreamWriter(handle, pretty=not args.compact)
+            writer.field("generated_at", datetime.now(timezone.utc).isoformat())
+            writer.field("source", str(CONTENT_ROOT.as_posix()))
+            writer.begin_array("html")
+            for key, record in parse_documents(paths, args.jobs):
+                if record is None:
+                    continue
+                with profiling.phase("write"):
+                    if key == "html":
+                        writer.item(record)
+                        html_count += 1
+                    else:
+                        feeds.append(record)
+            with profiling.phase("write"):
+                writer.end_array()
+                writer.begin_array("feeds")
+                for record in feeds:
+                    writer.item(record)
+                writer.end_array()
+                writer.close()
+
+        print(
+            "Captured {html} HTML records and {xml} XML records into {path}".format(
+                html=html_count, xml=len(feeds), path=args.output
+            )
+        )
+        profiling.write_profile(profiler, "generate_seo_baseline")
+        return 0
 
 
 if __name__ == "__main__":
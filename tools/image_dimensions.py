@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""Add intrinsic ``width``/``height`` and ``loading="lazy"`` to ``<img>`` tags.
+
+Most ``<img>`` tags in the mirror (the logo, the ``preview-img`` thumbnails
+on ``index.html`` …) have no dimensions, so the page reflows as each image
+arrives, and every image is fetched eagerly, even far below the fold. This
+tool:
+
+1. keeps a dimension index of every PNG, JPEG and GIF in the mirror in
+   ``artifacts/image_dimensions.json``. Only the file headers are read (the
+   PNG ``IHDR`` chunk, the GIF logical screen, the JPEG ``SOF`` segment plus
+   the EXIF orientation, which swaps width and height for rotated photos).
+   Entries whose size and ``mtime_ns`` are unchanged are reused;
+2. rewrites every ``<img>`` whose ``src`` is a local, indexed image:
+
+   * without ``width`` and ``height``, both are added;
+   * with only one of them (in pixels), the other is derived from the
+     image's aspect ratio;
+   * ``loading="lazy"`` is added unless the tag sets ``loading`` or
+     ``fetchpriority`` or is one of the first ``--eager`` images of the page
+     (default: 2, the logo and the first content image).
+
+   Remote images (counters, badges) are never touched, since their size is
+   unknown and lazy-loading an off-screen counter would stop it from firing.
+   Tags inside comments, ``<script>``, ``<style>`` and ``<textarea>`` are
+   left alone.
+
+A page is written (atomically, in its own encoding) only if re-parsing it
+gives the same asset references and, for every ``<img>``, the original
+attributes plus nothing but the added ones. Otherwise it is reported as
+``refused``. The report goes to ``logs/image_dimensions-<timestamp>.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import html
+import json
+import re
+import struct
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from . import profiling
+    from .fileio import decode_page, write_atomic
+    from .list_assets import PROJECT_ROOT, AssetCollector, iter_html_files, resolve_local_path
+    from .optimise_images import (
+        EXIF_HEADER,
+        IMAGE_EXTENSIONS,
+        JPEG_SOI,
+        JPEG_SOS,
+        JPEG_STANDALONE,
+        PNG_SIGNATURE,
+        ImageFormatError,
+        exif_orientation,
+    )
+    from .walker import add_ignore_arguments, ignore_rules_from_args, iter_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from fileio import decode_page, write_atomic  # type: ignore
+    from list_assets import PROJECT_ROOT, AssetCollector, iter_html_files, resolve_local_path  # type: ignore
+    from optimise_images import (  # type: ignore
+        EXIF_HEADER,
+        IMAGE_EXTENSIONS,
+        JPEG_SOI,
+        JPEG_SOS,
+        JPEG_STANDALONE,
+        PNG_SIGNATURE,
+        ImageFormatError,
+        exif_orientation,
+    )
+    from walker import add_ignore_arguments, ignore_rules_from_args, iter_files  # type: ignore
+
+LOG_DIR = PROJECT_ROOT / "logs"
+DEFAULT_INDEX = PROJECT_ROOT / "artifacts" / "image_dimensions.json"
+DEFAULT_EAGER = 2
+
+# SOFn markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) share the range.
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_EOI = 0xD9
+JPEG_APP1 = 0xE1
+
+SKIPPED_RE = re.compile(
+    r"""<!--.*?-->|<(script|style|textarea)\b(?:"[^"]*"|'[^']*'|[^'">])*>.*?</\1\s*>""", re.IGNORECASE | re.DOTALL
+)
+IMG_TAG_RE = re.compile(r"""<img\b(?:"[^"]*"|'[^']*'|[^'">])*>""", re.IGNORECASE)
+TAG_ATTR_RE = re.compile(r"""([^\s"'<>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?""")
+PIXELS_RE = re.compile(r"^\s*(\d+)(?:px)?\s*$")
+
+
+# --- image headers -----------------------------------------------------------
+
+
+def _read(handle: BinaryIO, size: int) -> bytes:
+    data = handle.read(size)
+    if len(data) != size:
+        raise ImageFormatError("truncated header")
+    return data
+
+
+def _jpeg_dimensions(handle: BinaryIO) -> Tuple[int, int]:
+    orientation = None
+    while True:
+        if _read(handle, 1) != b"\xff":
+            raise ImageFormatError("expected a JPEG marker")
+        marker = _read(handle, 1)[0]
+        while marker == 0xFF:
+            marker = _read(handle, 1)[0]  # fill bytes
+        if marker in JPEG_STANDALONE:
+            continue
+        if marker in (JPEG_SOS, JPEG_EOI):
+            raise ImageFormatError("no SOF segment before the image data")
+        (length,) = struct.unpack(">H", _read(handle, 2))
+        if length < 2:
+            raise ImageFormatError(f"bad length for segment 0x{marker:02X}")
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">HH", _read(handle, 5)[1:5])
+            return (height, width) if orientation and orientation >= 5 else (width, height)
+        if marker == JPEG_APP1 and orientation is None:
+            payload = _read(handle, length - 2)
+            if payload.startswith(EXIF_HEADER):
+                try:
+                    orientation = exif_orientation(payload)
+                except (ImageFormatError, struct.error):
+                    orientation = None
+        else:
+            handle.seek(length - 2, 1)
+
+
+def read_dimensions(path: Path) -> Tuple[int, int]:
+    """``(width, height)`` as displayed, from the file header; raises :class:`ImageFormatError`."""
+
+    with path.open("rb") as handle:
+        head = handle.read(26)
+        if head.startswith(PNG_SIGNATURE):
+            if head[12:16] != b"IHDR" or len(head) < 24:
+                raise ImageFormatError("PNG without a leading IHDR chunk")
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(JPEG_SOI):
+            handle.seek(2)
+            return _jpeg_dimensions(handle)
+    raise ImageFormatError("not a PNG, JPEG or GIF file")
+
+
+def _relative(path: Path) -> str:
+    try:
+        return path.resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
+def load_index(path: Path) -> Dict[str, List[int]]:
+    """``{image: [width, height, size, mtime_ns]}`` from a previous run, or empty."""
+
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))["images"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+@dataclass
+class IndexStats:
+    images: int = 0
+    read: int = 0
+    reused: int = 0
+    unreadable: Dict[str, str] = field(default_factory=dict)
+
+
+def build_index(images: Sequence[Path], previous: Dict[str, List[int]]) -> Tuple[Dict[str, List[int]], IndexStats]:
+    """Index ``images``, reusing entries of ``previous`` whose size and ``mtime_ns`` still match."""
+
+    index: Dict[str, List[int]] = {}
+    stats = IndexStats(images=len(images))
+    for image in images:
+        key = _relative(image)
+        try:
+            stat = image.stat()
+        except OSError as exc:
+            stats.unreadable[key] = str(exc)
+            continue
+        entry = previous.get(key)
+        if entry is not None and entry[2:] == [stat.st_size, stat.st_mtime_ns]:
+            index[key] = entry
+            stats.reused += 1
+            continue
+        with profiling.track_file(image):
+            try:
+                width, height = read_dimensions(image)
+            except (OSError, ImageFormatError) as exc:
+                stats.unreadable[key] = str(exc)  # mostly HTTrack error pages saved under an image name
+                continue
+        index[key] = [width, height, stat.st_size, stat.st_mtime_ns]
+        stats.read += 1
+    return index, stats
+
+
+def save_index(path: Path, index: Dict[str, List[int]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "generated_at": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        "images": dict(sorted(index.items())),
+    }
+    write_atomic(path, (json.dumps(payload, indent=1) + "\n").encode("utf-8"))
+
+
+# --- pages -------------------------------------------------------------------
+
+
+@dataclass
+class PageResult:
+    path: str
+    status: str = "unchanged"
+    images: int = 0
+    dimensions_added: int = 0
+    lazy_added: int = 0
+    not_indexed: List[str] = field(default_factory=list)
+    reason: Optional[str] = None
+
+
+def _tag_attributes(tag: str) -> Dict[str, str]:
+    body = tag[4:-1].rstrip("/")
+    attributes: Dict[str, str] = {}
+    for match in TAG_ATTR_RE.finditer(body):
+        value = next((group for group in match.groups()[1:] if group is not None), "")
+        attributes.setdefault(match.group(1).lower(), html.unescape(value))
+    return attributes
+
+
+def _pixels(value: Optional[str]) -> Optional[int]:
+    match = PIXELS_RE.match(value or "")
+    return int(match.group(1)) if match else None
+
+
+def added_attributes(
+    attributes: Dict[str, str], size: Tuple[int, int], *, lazy: bool
+) -> List[Tuple[str, str]]:
+    """Attributes to append to an ``<img>`` with ``attributes`` showing an image of ``size``."""
+
+    width, height = size
+    added: List[Tuple[str, str]] = []
+    if width and height:
+        has_width, has_height = "width" in attributes, "height" in attributes
+        if not has_width and not has_height:
+            added += [("width", str(width)), ("height", str(height))]
+        elif has_width and not has_height and _pixels(attributes["width"]):
+            added.append(("height", str(max(1, round(_pixels(attributes["width"]) * height / width)))))
+        elif has_height and not has_width and _pixels(attributes["height"]):
+            added.append(("width", str(max(1, round(_pixels(attributes["height"]) * width / height)))))
+    if lazy and "loading" not in attributes and "fetchpriority" not in attributes:
+        added.append(("loading", "lazy"))
+    return added
+
+
+def _insert(tag: str, added: Sequence[Tuple[str, str]]) -> str:
+    text = "".join(f' {name}="{value}"' for name, value in added)
+    if tag.endswith("/>"):
+        return f"{tag[:-2].rstrip()}{text} />"
+    return f"{tag[:-1].rstrip()}{text}>"
+
+
+def rewrite_images(
+    text: str, page: Path, index: Dict[str, List[int]], *, eager: int = DEFAULT_EAGER, lazy: bool = True
+) -> Tuple[str, PageResult]:
+    """Return ``text`` with dimensions and lazy loading added to its local ``<img>`` tags."""
+
+    result = PageResult(_relative(page))
+    parts: List[str] = []
+    position = 0
+    skipped = [(match.start(), match.end()) for match in SKIPPED_RE.finditer(text)]
+    for match in IMG_TAG_RE.finditer(text):
+        if any(start <= match.start() < end for start, end in skipped):
+            continue
+        result.images += 1
+        attributes = _tag_attributes(match.group(0))
+        resolved, _ = resolve_local_path(page, attributes.get("src", "").strip())
+        if resolved is None:
+            continue
+        key = Path(resolved).as_posix()
+        entry = index.get(key)
+        if entry is None:
+            if Path(resolved).suffix.lower() in IMAGE_EXTENSIONS:
+                result.not_indexed.append(key)
+            continue
+        added = added_attributes(attributes, (entry[0], entry[1]), lazy=lazy and result.images > eager)
+        if not added:
+            continue
+        result.dimensions_added += sum(1 for name, _ in added if name in ("width", "height"))
+        result.lazy_added += sum(1 for name, _ in added if name == "loading")
+        parts.append(text[position : match.start()])
+        parts.append(_insert(match.group(0), added))
+        position = match.end()
+    parts.append(text[position:])
+    return "".join(parts), result
+
+
+class _ImageParser(AssetCollector):
+    """Asset collector that also records the attributes of every ``<img>``."""
+
+    def __init__(self, page: Path) -> None:
+        super().__init__(page)
+        self.images: List[Dict[str, Optional[str]]] = []
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        super().handle_starttag(tag, attrs)
+        if tag == "img":
+            self.images.append({name.lower(): value for name, value in attrs if name})
+
+
+def _parse(page: Path, text: str) -> _ImageParser:
+    parser = _ImageParser(page)
+    parser.feed(text)
+    parser.close()
+    return parser
+
+
+def images_match(page: Path, before: str, after: str) -> bool:
+    """True when ``after`` only adds ``width``/``height``/``loading`` to the ``<img>`` tags of ``before``."""
+
+    old, new = _parse(page, before), _parse(page, after)
+    if old.to_entries() != new.to_entries() or len(old.images) != len(new.images):
+        return False
+    for original, rewritten in zip(old.images, new.images):
+        if any(rewritten.get(name) != value for name, value in original.items()):
+            return False
+        if set(rewritten) - set(original) - {"width", "height", "loading"}:
+            return False
+    return True
+
+
+def rewrite_page(
+    page: Path, index: Dict[str, List[int]], *, eager: int = DEFAULT_EAGER, lazy: bool = True, dry_run: bool = False
+) -> PageResult:
+    try:
+        raw = page.read_bytes()
+    except OSError as exc:
+        return PageResult(_relative(page), status="error", reason=str(exc))
+    text, encoding = decode_page(raw)
+    if text is None:
+        return PageResult(_relative(page), status="skipped", reason="not UTF-8 or Windows-1251")
+    rewritten, result = rewrite_images(text, page, index, eager=eager, lazy=lazy)
+    if rewritten == text:
+        return result
+    if not images_match(page, text, rewritten):
+        result.status, result.reason = "refused", "image attributes or asset references differ after rewriting"
+        return result
+    result.status = "would_rewrite" if dry_run else "rewritten"
+    if not dry_run:
+        try:
+            write_atomic(page, rewritten.encode(encoding))
+        except (OSError, UnicodeEncodeError) as exc:
+            result.status, result.reason = "error", str(exc)
+    return result
+
+
+def summarise(index_stats: IndexStats, pages: Sequence[PageResult]) -> Dict[str, int]:
+    summary: Dict[str, int] = {
+        "index_images": index_stats.images,
+        "index_read": index_stats.read,
+        "index_reused": index_stats.reused,
+        "index_unreadable": len(index_stats.unreadable),
+    }
+    summary["pages"] = len(pages)
+    for key in ("images", "dimensions_added", "lazy_added"):
+        summary[key] = sum(getattr(page, key) for page in pages)
+    summary["not_indexed"] = sum(len(page.not_indexed) for page in pages)
+    for page in pages:
+        summary[page.status] = summary.get(page.status, 0) + 1
+    return summary
+
+
+def write_log(
+    log_dir: Path,
+    index_stats: IndexStats,
+    pages: Sequence[PageResult],
+    *,
+    dry_run: bool,
+    profile: Optional[dict] = None,
+) -> Path:
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"image_dimensions-{timestamp}.json"
+    payload: Dict[str, object] = {
+        "generated_at": timestamp,
+        "dry_run": dry_run,
+        "summary": summarise(index_stats, pages),
+        "unreadable_images": index_stats.unreadable,
+        "pages": [asdict(page) for page in pages if page.status != "unchanged" or page.not_indexed],
+    }
+    if profile is not None:
+        payload["profile"] = profile
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return output_path
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", default=["."], help="HTML files or directories to rewrite (default: project root)")
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=DEFAULT_INDEX,
+        help="Dimension index to refresh and use (default: artifacts/image_dimensions.json)",
+    )
+    parser.add_argument("--index-only", action="store_true", help="Refresh the dimension index without touching any page")
+    parser.add_argument(
+        "--eager",
+        type=int,
+        default=DEFAULT_EAGER,
+        help=f"Leading <img> tags per page that are not lazy-loaded (default: {DEFAULT_EAGER})",
+    )
+    parser.add_argument("--no-lazy", action="store_true", help='Only add dimensions, never loading="lazy"')
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without rewriting any page")
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help="Where to store the JSON report (default: logs)")
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    ignore = ignore_rules_from_args(args)
+    with profiling.session(args) as profiler:
+        with profiling.phase("index"):
+            images = list(iter_files([PROJECT_ROOT], suffixes=IMAGE_EXTENSIONS, ignore=ignore))
+            index, index_stats = build_index(images, load_index(args.index))
+            save_index(args.index, index)
+        results: List[PageResult] = []
+        if not args.index_only:
+            with profiling.phase("walk"):
+                pages = list(iter_html_files([Path(p).resolve() for p in args.paths], ignore))
+            with profiling.phase("rewrite"):
+                for page in pages:
+                    with profiling.track_file(page):
+                        results.append(
+                            rewrite_page(page, index, eager=args.eager, lazy=not args.no_lazy, dry_run=args.dry_run)
+                        )
+        with profiling.phase("write"):
+            log_path = write_log(args.log_dir, index_stats, results, dry_run=args.dry_run, profile=profiling.report_of(profiler))
+
+    summary = summarise(index_stats, results)
+    print(
+        f"Indexed {len(index)} images ({summary['index_read']} read, {summary['index_reused']} reused, "
+        f"{summary['index_unreadable']} unreadable) into {args.index}"
+    )
+    if not args.index_only:
+        verb = "Would add" if args.dry_run else "Added"
+        print(
+            f"{verb} {summary['dimensions_added']} dimensions and {summary['lazy_added']} loading=lazy to "
+            f"{summary['images']} <img> tags in {summary.get('rewritten', 0) + summary.get('would_rewrite', 0)} "
+            f"of {summary['pages']} pages; log: {log_path}"
+        )
+    for result in results:
+        if result.status in ("refused", "error"):
+            print(f" - {result.path}: {result.status}: {result.reason}", file=sys.stderr)
+    return 1 if summary.get("error") else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,27 +3,60 @@
 
 The script walks through provided scopes (files or directories) and inspects
 HTML/XHTML files for linked assets (stylesheets, scripts, images, media, other
-external resources). The resulting mapping is written to a JSON artifact that
-will be used during structure refactors to ensure referenced files are moved
-together with their dependants.
+external resources). Stylesheets reached from those pages are followed as well:
+their ``@import`` and ``url()`` references (fonts, background images) are
+recorded under a separate ``stylesheets`` key. The resulting mapping is written
+to a JSON artifact that will be used during structure refactors to ensure
+referenced files are moved together with their dependants.
 """
 from __future__ import annotations
 
 import argparse
 import json
+import re
 import sys
 from collections import defaultdict
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
 from html.parser import HTMLParser
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
+try:
+    from . import profiling
+    from .walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, iter_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, iter_files  # type: ignore
+
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DEFAULT_OUTPUT = PROJECT_ROOT / "artifacts" / "assets.json"
 HTML_EXTENSIONS = {".html", ".htm", ".xhtml"}
 REMOTE_PREFIXES = ("http://", "https://", "//", "mailto:", "tel:", "javascript:")
+FONT_EXTENSIONS = {".woff", ".woff2", ".ttf", ".otf", ".eot"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".avif", ".ico", ".cur", ".bmp"}
+# Formats a current browser downloads from an ``@font-face`` ``src`` list.
+SUPPORTED_FONT_FORMATS = {"woff2", "woff", "truetype", "opentype", "collection"}
+FONT_FORMATS = {
+    ".woff2": "woff2",
+    ".woff": "woff",
+    ".ttf": "truetype",
+    ".otf": "opentype",
+    ".eot": "embedded-opentype",
+    ".svg": "svg",
+}
+
+CSS_REFERENCE_RE = re.compile(
+    r"""url\(\s*(?P<quote>['"]?)(?P<url>[^'")]*?)(?P=quote)\s*\)"""
+    r"""|@import\s+(?P<import_quote>['"])(?P<import>[^'"]*)(?P=import_quote)""",
+    re.IGNORECASE,
+)
+CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+CSS_IMPORT_BEFORE_RE = re.compile(r"@import\s*$", re.IGNORECASE)
+FONT_FACE_RE = re.compile(r"@font-face\s*\{(?P<body>[^}]*)\}", re.IGNORECASE)
+FONT_SRC_RE = re.compile(r"(?:^|;)\s*src\s*:(?P<value>[^;]*)", re.IGNORECASE)
+FONT_FORMAT_RE = re.compile(r"""\s*format\(\s*['"]?(?P<format>[\w-]+)""", re.IGNORECASE)
 
 
 @dataclass
@@ -91,13 +124,17 @@ class AssetCollector(HTMLParser):
         self.assets[category].add((url, resolved_path, exists))
 
     def to_entries(self) -> Dict[str, List[AssetEntry]]:
-        return {
-            category: [
-                AssetEntry(url=url, resolved_path=resolved, exists=exists, category=category)
-                for url, resolved, exists in sorted(values)
-            ]
-            for category, values in sorted(self.assets.items())
-        }
+        return _to_entries(self.assets)
+
+
+def _to_entries(assets: Dict[str, Set[Tuple[str, Optional[str], Optional[bool]]]]) -> Dict[str, List[AssetEntry]]:
+    return {
+        category: [
+            AssetEntry(url=url, resolved_path=resolved, exists=exists, category=category)
+            for url, resolved, exists in sorted(values)
+        ]
+        for category, values in sorted(assets.items())
+    }
 
 
 def _split_srcset(value: str) -> Iterable[str]:
@@ -125,26 +162,167 @@ def resolve_local_path(html_path: Path, url: str) -> Tuple[Optional[str], Option
         return str(candidate), candidate.exists()
 
 
-def iter_html_files(scopes: Iterable[Path]) -> Iterable[Path]:
-    for scope in scopes:
-        if scope.is_dir():
-            for path in sorted(scope.rglob("*")):
-                if path.suffix.lower() in HTML_EXTENSIONS and path.is_file():
-                    yield path
-        elif scope.is_file() and scope.suffix.lower() in HTML_EXTENSIONS:
-            yield scope
+def css_references(text: str) -> Iterator[str]:
+    """Yield the ``url()`` and ``@import`` targets of a stylesheet, in order."""
+
+    for match in CSS_REFERENCE_RE.finditer(text):
+        url = match.group("url") if match.group("import") is None else match.group("import")
+        if url.strip():
+            yield url.strip()
+
+
+def _font_face_roles(text: str) -> Dict[int, str]:
+    """Map the offset of every ``url()`` inside ``@font-face`` to its category.
+
+    Browsers use the last ``src`` declaration and download the first source in
+    it whose format they support (from ``format()``, else the extension); that
+    one is ``fonts``, the others are ``font-fallbacks`` that are never fetched.
+    """
+
+    roles: Dict[int, str] = {}
+    for face in FONT_FACE_RE.finditer(text):
+        base = face.start("body")
+        references = list(CSS_REFERENCE_RE.finditer(text, base, face.end("body")))
+        for reference in references:
+            roles[reference.start()] = "font-fallbacks"
+        # ``data:`` URIs contain ``;``: blank out every url() before splitting declarations.
+        body = face.group("body")
+        for reference in references:
+            start, end = reference.start() - base, reference.end() - base
+            body = body[:start] + "_" * (end - start) + body[end:]
+        sources = list(FONT_SRC_RE.finditer(body))
+        if not sources:
+            continue
+        start, end = base + sources[-1].start("value"), base + sources[-1].end("value")
+        for reference in references:
+            if not start <= reference.start() < end:
+                continue
+            url = (reference.group("url") or "").strip()
+            hint = FONT_FORMAT_RE.match(text, reference.end())
+            if hint is not None:
+                font_format = hint.group("format").lower().replace("-variations", "")
+            elif url.startswith("data:"):
+                font_format = "woff"  # inline, whatever its type: nothing further is fetched
+            else:
+                font_format = FONT_FORMATS.get(Path(urlparse(url).path).suffix.lower(), "")
+            if font_format in SUPPORTED_FONT_FORMATS:
+                roles[reference.start()] = "fonts"
+                break
+    return roles
+
+
+def collect_css_assets(css_path: Path, text: str) -> Dict[str, List[AssetEntry]]:
+    """Asset references of a stylesheet, in the same shape as :class:`AssetCollector`.
+
+    ``@import`` targets are ``stylesheets``; ``url()`` values are ``fonts``,
+    ``images`` or ``other`` by extension, except inside ``@font-face`` (see
+    :func:`_font_face_roles`). Comments, ``data:`` URIs and fragment-only
+    references are skipped; URLs resolve against the stylesheet's directory.
+    """
+
+    text = CSS_COMMENT_RE.sub(lambda match: " " * len(match.group()), text)
+    roles = _font_face_roles(text)
+    assets: Dict[str, Set[Tuple[str, Optional[str], Optional[bool]]]] = defaultdict(set)
+    for match in CSS_REFERENCE_RE.finditer(text):
+        if match.group("import") is not None:
+            url, category = match.group("import").strip(), "stylesheets"
+        else:
+            url = match.group("url").strip()
+            suffix = Path(urlparse(url).path).suffix.lower()
+            if CSS_IMPORT_BEFORE_RE.search(text, max(0, match.start() - 32), match.start()):
+                category = "stylesheets"
+            elif match.start() in roles:
+                category = roles[match.start()]
+            elif suffix in FONT_EXTENSIONS:
+                category = "fonts"
+            elif suffix in IMAGE_EXTENSIONS:
+                category = "images"
+            else:
+                category = "stylesheets" if suffix == ".css" else "other"
+        if not url or url.startswith(("data:", "#")):
+            continue
+        resolved_path, exists = resolve_local_path(css_path, url)
+        assets[category].add((url, resolved_path, exists))
+    return _to_entries(assets)
+
 
+def stylesheet_assets(key: str, index=None) -> Dict[str, List[AssetEntry]]:
+    """Asset references of the stylesheet at ``key`` (from ``index`` when it knows it).
 
-def collect_assets(html_files: Iterable[Path]) -> Dict[str, Dict[str, List[AssetEntry]]]:
+    Only ``.css`` files are read: anything else linked as a stylesheet (HTTrack
+    saved some missing ones as ``.html`` error pages) is served with another
+    content type, which browsers refuse to apply.
+    """
+
+    if not key.lower().endswith(".css"):
+        return {}
+    if index is not None:
+        indexed = index.assets(key)
+        if indexed is not None:
+            return indexed
+    path = PROJECT_ROOT / key
+    with profiling.track_file(path):
+        with profiling.phase("read"):
+            text = path.read_bytes().decode("utf-8", errors="replace")
+        with profiling.phase("parse"):
+            return collect_css_assets(path, text)
+
+
+def collect_stylesheet_assets(
+    report: Dict[str, Dict[str, List[AssetEntry]]], index=None
+) -> Dict[str, Dict[str, List[AssetEntry]]]:
+    """Assets of every local stylesheet ``report`` links, following ``@import`` chains."""
+
+    result: Dict[str, Dict[str, List[AssetEntry]]] = {}
+    pending = [
+        entry.resolved_path
+        for assets in report.values()
+        for entry in assets.get("stylesheets", [])
+        if entry.exists and entry.resolved_path is not None
+    ]
+    while pending:
+        key = pending.pop()
+        if key in result or not (PROJECT_ROOT / key).is_file():
+            continue
+        result[key] = stylesheet_assets(key, index)
+        pending.extend(
+            entry.resolved_path
+            for entry in result[key].get("stylesheets", [])
+            if entry.exists and entry.resolved_path is not None
+        )
+    return result
+
+
+def iter_html_files(scopes: Iterable[Path], ignore: IgnoreRules = DEFAULT_IGNORE) -> Iterable[Path]:
+    return iter_files(scopes, suffixes=HTML_EXTENSIONS, ignore=ignore)
+
+
+def _relative(path: Path) -> str:
+    try:
+        return str(path.resolve().relative_to(PROJECT_ROOT))
+    except ValueError:
+        return str(path.resolve())
+
+
+def collect_assets(html_files: Iterable[Path], index=None) -> Dict[str, Dict[str, List[AssetEntry]]]:
     report: Dict[str, Dict[str, List[AssetEntry]]] = {}
     for html_file in html_files:
-        collector = AssetCollector(html_file)
-        try:
-            text = html_file.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
-            text = html_file.read_text(encoding="cp1251", errors="replace")
-        collector.feed(text)
-        report[str(html_file.relative_to(PROJECT_ROOT))] = collector.to_entries()
+        key = _relative(html_file)
+        if index is not None:
+            indexed = index.assets(key)
+            if indexed is not None:
+                report[key] = indexed
+                continue
+        with profiling.track_file(html_file):
+            collector = AssetCollector(html_file)
+            with profiling.phase("read"):
+                try:
+                    text = html_file.read_text(encoding="utf-8")
+                except UnicodeDecodeError:
+                    text = html_file.read_text(encoding="cp1251", errors="replace")
+            with profiling.phase("parse"):
+                collector.feed(text)
+                report[key] = collector.to_entries()
     return report
 
 
@@ -156,8 +334,13 @@ def summarize(report: Dict[str, Dict[str, List[AssetEntry]]]) -> Dict[str, int]:
     return dict(summary)
 
 
-def dump_report(report: Dict[str, Dict[str, List[AssetEntry]]], output_path: Path) -> None:
-    payload = {
+def dump_report(
+    report: Dict[str, Dict[str, List[AssetEntry]]],
+    output_path: Path,
+    profile: Optional[Dict[str, object]] = None,
+    stylesheets: Optional[Dict[str, Dict[str, List[AssetEntry]]]] = None,
+) -> None:
+    payload: Dict[str, object] = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "scopes": sorted(report.keys()),
         "files": {
@@ -169,6 +352,13 @@ def dump_report(report: Dict[str, Dict[str, List[AssetEntry]]], output_path: Pat
         },
         "summary": summarize(report),
     }
+    if stylesheets is not None:
+        payload["stylesheets"] = {
+            sheet: {category: [asdict(entry) for entry in entries] for category, entries in assets.items()}
+            for sheet, assets in sorted(stylesheets.items())
+        }
+    if profile is not None:
+        payload["profile"] = profile
     output_path.parent.mkdir(parents=True, exist_ok=True)
     output_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
 
@@ -187,20 +377,43 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         default=DEFAULT_OUTPUT,
         help="Path to write the JSON report (default: artifacts/assets.json)",
     )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        help="Read asset references from a site index built by site_index.py",
+    )
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
     return parser.parse_args(argv)
 
 
 def main(argv: Optional[List[str]] = None) -> int:
     args = parse_args(argv)
     scopes = [Path(p).resolve() if not Path(p).is_absolute() else Path(p) for p in args.paths]
-    html_files = list(iter_html_files(scopes))
-    if not html_files:
-        print("No HTML files found for the provided scopes.", file=sys.stderr)
-        return 1
-    report = collect_assets(html_files)
-    dump_report(report, args.output)
-    print(f"Collected assets for {len(html_files)} HTML files → {args.output}")
-    return 0
+    with profiling.session(args) as profiler:
+        with profiling.phase("walk"):
+            html_files = list(iter_html_files(scopes, ignore_rules_from_args(args)))
+        if not html_files:
+            print("No HTML files found for the provided scopes.", file=sys.stderr)
+            return 1
+        if args.index:
+            # site_index imports this module, so it is loaded on first use.
+            try:
+                from .site_index import open_site_index
+            except ImportError:  # pragma: no cover - executed as a script from tools/
+                from site_index import open_site_index  # type: ignore
+            with open_site_index(args.index) as index:
+                report = collect_assets(html_files, index)
+                stylesheets = collect_stylesheet_assets(report, index)
+        else:
+            report = collect_assets(html_files)
+            stylesheets = collect_stylesheet_assets(report)
+        with profiling.phase("write"):
+            dump_report(report, args.output, profile=profiling.report_of(profiler), stylesheets=stylesheets)
+        print(
+            f"Collected assets for {len(html_files)} HTML files and {len(stylesheets)} stylesheets → {args.output}"
+        )
+        return 0
 
 
 if __name__ == "__main__":
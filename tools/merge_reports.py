@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Merge the shard reports of ``check_links.py`` or ``check_utf8.py``.
+
+Each CI runner checks one partition (``--shard i/N``) and uploads its JSON
+report; this command combines them into one report with the layout of an
+unsharded run. Entries are put back in their original order, ``summary`` is
+recomputed with the checker's own ``summarise`` and per-shard ``profile``
+sections are dropped. All N shards must be present exactly once.
+
+Usage::
+
+    python -m tools merge-reports logs/check_utf8-shard*.json --output logs/check_utf8-merged.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from . import check_links, check_utf8
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import check_links  # type: ignore
+    import check_utf8  # type: ignore
+
+ENTRY_KEYS = {"links": "documents", "utf8": "results"}
+
+
+class MergeError(ValueError):
+    """Raised when the given reports do not form one complete sharded run."""
+
+
+def report_kind(payload: Dict[str, object]) -> str:
+    if "results" in payload:
+        return "utf8"
+    if "documents" in payload:
+        return "links"
+    raise MergeError("not a check_links or check_utf8 report")
+
+
+def merge_reports(payloads: Sequence[Dict[str, object]]) -> Dict[str, object]:
+    """Combine the reports of shards 1..N into the report of a full run."""
+
+    if not payloads:
+        raise MergeError("no reports given")
+    kinds = {report_kind(payload) for payload in payloads}
+    if len(kinds) != 1:
+        raise MergeError("cannot merge check_links and check_utf8 reports together")
+    kind = kinds.pop()
+    key = ENTRY_KEYS[kind]
+
+    shards = [payload.get("shard") for payload in payloads]
+    if any(shard is None for shard in shards):
+        raise MergeError("every report must come from a --shard run")
+    counts = {shard["count"] for shard in shards}
+    if len(counts) != 1:
+        raise MergeError(f"reports come from different shard counts: {sorted(counts)}")
+    count = counts.pop()
+    indices = sorted(shard["index"] for shard in shards)
+    if indices != list(range(1, count + 1)):
+        raise MergeError(f"expected shards 1..{count} once each, got {indices}")
+
+    entries = sorted(
+        (
+            (position, entry)
+            for payload in payloads
+            for position, entry in zip(payload["shard"]["positions"], payload[key])
+        ),
+        key=lambda item: item[0],
+    )
+    merged = {name: value for name, value in payloads[0].items() if name not in {"shard", "profile"}}
+    merged["generated_at"] = datetime.now(timezone.utc).isoformat()
+    merged[key] = [entry for _, entry in entries]
+    if kind == "links":
+        merged["summary"] = check_links.summarise(check_links.documents_from_payload(merged))
+    else:
+        merged["summary"] = check_utf8.summarise(check_utf8.reports_from_payload(merged))
+    return merged
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("reports", nargs="+", type=Path, help="Shard reports to merge")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Merged report path (default: logs/check_links-<timestamp>.json or logs/check_utf8-<timestamp>.json)",
+    )
+    parser.add_argument("--compact", action="store_true", help="Write compact JSON (check_utf8 reports)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    payloads: List[Dict[str, object]] = []
+    for path in args.reports:
+        try:
+            payloads.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, json.JSONDecodeError) as exc:
+            print(f"Failed to read {path}: {exc}", file=sys.stderr)
+            return 1
+    try:
+        merged = merge_reports(payloads)
+    except MergeError as exc:
+        print(f"Cannot merge reports: {exc}", file=sys.stderr)
+        return 1
+
+    summary = merged["summary"]
+    if report_kind(merged) == "links":
+        output_path = args.output or check_links.default_log_path()
+        check_links.write_report(merged, output_path)
+        check_links.print_summary(summary)
+        failed = check_links.has_failures(summary)
+    else:
+        output_path = args.output or check_utf8.default_log_path()
+        check_utf8.write_report(merged, output_path, compact=args.compact)
+        failed = check_utf8.has_failures(summary)
+    print(f"Merged {len(payloads)} shard reports into {output_path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""Minify mirrored HTML pages without touching their SEO fields or assets.
+
+HTTrack output is indented, commented and padded with blank lines. This pass
+removes what browsers ignore:
+
+* comments, except conditional comments (``<!--[if IE]>``) and Yandex
+  ``<!--noindex-->`` markers;
+* runs of ASCII whitespace in text, collapsed to one space, or dropped
+  entirely inside ``<head>`` and next to ``<html>``/``<body>``/table tags;
+* whitespace inside tags outside of attribute values;
+* comments and insignificant whitespace in inline ``<style>``;
+* indentation and blank lines in inline JavaScript. Scripts with template
+  literals or backslash line continuations are left alone, because stripping
+  them could change string values.
+
+``<pre>``, ``<textarea>``, ``<title>`` and ``<h1>`` are copied verbatim.
+Pages keep their encoding (UTF-8 or Windows-1251).
+
+Every file is checked before it is replaced. ``check_utf8.extract_seo``
+(title, meta, first h1) and the ``list_assets`` asset extraction run on the
+original and on the minified text. If anything differs, the file is left
+unchanged and reported as ``refused``. Files are processed by a process pool
+(``--jobs``) and written atomically. A report goes to
+``logs/minify_html-<timestamp>.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from . import profiling
+    from .check_utf8 import HTML_EXTENSIONS, extract_seo
+    from .fileio import decode_page, write_atomic
+    from .list_assets import PROJECT_ROOT, AssetCollector
+    from .walker import add_ignore_arguments, ignore_rules_from_args, iter_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from check_utf8 import HTML_EXTENSIONS, extract_seo  # type: ignore
+    from fileio import decode_page, write_atomic  # type: ignore
+    from list_assets import PROJECT_ROOT, AssetCollector  # type: ignore
+    from walker import add_ignore_arguments, ignore_rules_from_args, iter_files  # type: ignore
+
+LOG_DIR = PROJECT_ROOT / "logs"
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<comment><!--.*?-->)
+    | (?P<raw><(?P<raw_tag>script|style|pre|textarea|title|h1)\b(?:"[^"]*"|'[^']*'|[^'">])*>.*?</(?P=raw_tag)\s*>)
+    | (?P<tag></?(?P<tag_name>[a-zA-Z][\w:-]*)(?:"[^"]*"|'[^']*'|[^'">])*>)
+    | (?P<decl><![^>]*>|<\?[^>]*>)
+    """,
+    re.IGNORECASE | re.DOTALL | re.VERBOSE,
+)
+TAG_PARTS_RE = re.compile(r"""("[^"]*"|'[^']*')|[ \t\r\n\f]+""")
+WHITESPACE_RE = re.compile(r"[ \t\r\n\f]+")
+KEPT_COMMENT_RE = re.compile(r"<!--\s*(?:\[if\b|<!\[endif\]|/?noindex\b)", re.IGNORECASE)
+SCRIPT_TYPE_RE = re.compile(r"""\btype\s*=\s*["']?([^"'\s>]+)""", re.IGNORECASE)
+JS_TYPES = {"text/javascript", "application/javascript", "application/x-javascript", "module"}
+
+CSS_SPACE_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|/\*.*?\*/|\s+""", re.DOTALL)
+CSS_PUNCTUATION_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|\s*([{};,>])\s*""")
+CSS_LAST_SEMICOLON_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|;+(})""")
+JS_LINE_RE = re.compile(r"\r\n|\r|\n")
+
+# Whitespace next to these tags is never rendered (outside of exotic CSS);
+# everywhere else a run is kept as one space, since ``display`` may be inline.
+STRUCTURE_TAGS = frozenset(
+    {"html", "head", "body", "table", "caption", "colgroup", "col", "thead", "tbody", "tfoot", "tr", "td", "th"}
+)
+HEAD_TAGS = frozenset({"html", "head", "meta", "link", "base", "title", "style", "script", "noscript"})
+
+
+@dataclass
+class MinifyResult:
+    path: str
+    status: str
+    encoding: Optional[str] = None
+    before_size: int = 0
+    after_size: int = 0
+    reason: Optional[str] = None
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and whitespace the CSS tokenizer ignores; strings are kept."""
+
+    def space(match: re.Match) -> str:
+        return match.group(1) or " "
+
+    def punctuation(match: re.Match) -> str:
+        return match.group(1) or match.group(2)
+
+    def last_semicolon(match: re.Match) -> str:
+        return match.group(1) or match.group(2)
+
+    css = CSS_SPACE_RE.sub(space, css)
+    css = CSS_PUNCTUATION_RE.sub(punctuation, css)
+    return CSS_LAST_SEMICOLON_RE.sub(last_semicolon, css).strip()
+
+
+def minify_js(js: str) -> str:
+    """Strip indentation and blank lines, keeping every line break (ASI)."""
+
+    if "`" in js:
+        return js
+    lines = [line.strip(" \t") for line in JS_LINE_RE.split(js)]
+    if any(line.endswith("\\") for line in lines):
+        return js
+    return "\n".join(line for line in lines if line)
+
+
+def _minify_tag(tag: str) -> str:
+    def part(match: re.Match) -> str:
+        return match.group(1) or " "
+
+    collapsed = TAG_PARTS_RE.sub(part, tag)
+    return collapsed[:-2] + ">" if collapsed.endswith(" >") else collapsed
+
+
+def _minify_raw(raw: str, name: str) -> str:
+    if name not in ("script", "style"):
+        return raw
+    open_end = raw.index(">") + 1
+    close_start = raw.lower().rindex("</")
+    open_tag, body, close_tag = raw[:open_end], raw[open_end:close_start], raw[close_start:]
+    if name == "style":
+        body = minify_css(body)
+    else:
+        declared = SCRIPT_TYPE_RE.search(open_tag)
+        if declared and declared.group(1).lower() not in JS_TYPES:
+            return _minify_tag(open_tag) + body + close_tag
+        body = minify_js(body)
+    return _minify_tag(open_tag) + body + close_tag
+
+
+def minify_html(text: str) -> str:
+    """Return ``text`` without comments and insignificant whitespace."""
+
+    output: List[str] = []
+    pending: List[str] = []  # text since the last emitted token
+    in_head = True
+    previous_structure = True
+    position = 0
+
+    def flush(next_structure: bool) -> None:
+        if not pending:
+            return
+        collapsed = WHITESPACE_RE.sub(" ", "".join(pending))
+        pending.clear()
+        if previous_structure:
+            collapsed = collapsed.lstrip(" ")
+        if next_structure:
+            collapsed = collapsed.rstrip(" ")
+        if collapsed.startswith(" ") and output and output[-1].endswith(" "):
+            collapsed = collapsed[1:]
+        if collapsed:
+            output.append(collapsed)
+
+    for match in TOKEN_RE.finditer(text):
+        pending.append(text[position : match.start()])
+        position = match.end()
+        token = match.group(0)
+
+        if match.group("comment"):
+            if not KEPT_COMMENT_RE.match(token):
+                continue  # the text on both sides of a dropped comment is joined
+            flush(in_head)
+            output.append(token)
+            previous_structure = in_head
+            continue
+        if match.group("decl"):
+            flush(True)
+            output.append(token)
+            previous_structure = True
+            continue
+
+        name = (match.group("raw_tag") or match.group("tag_name")).lower()
+        if in_head and (name not in HEAD_TAGS or name == "head" and token.startswith("</")):
+            in_head = name == "head"  # </head> itself still belongs to the head
+        structure = in_head or name in STRUCTURE_TAGS
+        flush(structure)
+        output.append(_minify_raw(token, name) if match.group("raw") else _minify_tag(token))
+        previous_structure = structure
+        if name == "head" and token.startswith("</"):
+            in_head = False
+
+    pending.append(text[position:])
+    flush(True)
+    return "".join(output)
+
+
+def _fingerprint(path: Path, text: str) -> Tuple[object, object]:
+    collector = AssetCollector(path)
+    collector.feed(text)
+    collector.close()
+    return extract_seo(text), collector.to_entries()
+
+
+@profiling.timed("minify")
+def minify_file(path: Path, *, dry_run: bool = False) -> MinifyResult:
+    result = MinifyResult(path=_relative(path), status="unchanged")
+    try:
+        raw = path.read_bytes()
+    except OSError as exc:
+        result.status, result.reason = "error", str(exc)
+        return result
+    result.before_size = result.after_size = len(raw)
+    text, encoding = decode_page(raw)
+    if text is None:
+        result.status, result.reason = "skipped", "not UTF-8 or Windows-1251"
+        return result
+    result.encoding = encoding
+
+    minified = minify_html(text)
+    if len(minified) >= len(text):
+        return result
+    before_seo, before_assets = _fingerprint(path, text)
+    after_seo, after_assets = _fingerprint(path, minified)
+    if before_seo != after_seo or before_assets != after_assets:
+        result.status = "refused"
+        result.reason = "seo fields differ" if before_seo != after_seo else "asset references differ"
+        return result
+
+    data = minified.encode(encoding)
+    result.after_size = len(data)
+    result.status = "would_minify" if dry_run else "minified"
+    if not dry_run:
+        try:
+            write_atomic(path, data)
+        except OSError as exc:
+            result.status, result.reason = "error", str(exc)
+            result.after_size = result.before_size
+    return result
+
+
+def minify_files(paths: Sequence[Path], *, jobs: int, dry_run: bool) -> Iterator[MinifyResult]:
+    """Yield :func:`minify_file` results in the order of ``paths``."""
+
+    worker = functools.partial(minify_file, dry_run=dry_run)
+    if jobs <= 1:
+        for path in paths:
+            with profiling.track_file(path):
+                result = worker(path)
+            yield result
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from profiling.iterate("minify", profiling.map_files(executor, worker, paths, chunksize=16))
+
+
+def _relative(path: Path) -> str:
+    try:
+        return path.resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
+def summarise(results: Sequence[MinifyResult]) -> Dict[str, int]:
+    summary: Dict[str, int] = {"files": len(results), "bytes_before": 0, "bytes_after": 0}
+    for result in results:
+        summary[result.status] = summary.get(result.status, 0) + 1
+        summary["bytes_before"] += result.before_size
+        summary["bytes_after"] += result.after_size
+    summary["bytes_saved"] = summary["bytes_before"] - summary["bytes_after"]
+    return summary
+
+
+def write_log(log_dir: Path, results: Sequence[MinifyResult], *, dry_run: bool, profile: Optional[dict] = None) -> Path:
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"minify_html-{timestamp}.json"
+    payload: Dict[str, object] = {
+        "generated_at": timestamp,
+        "dry_run": dry_run,
+        "summary": summarise(results),
+        "files": [asdict(result) for result in results],
+    }
+    if profile is not None:
+        payload["profile"] = profile
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return output_path
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", default=["."], help="HTML files or directories (default: project root)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the savings without rewriting any file")
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help="Where to store the JSON report (default: logs)")
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    with profiling.session(args) as profiler:
+        with profiling.phase("walk"):
+            paths = list(iter_files([Path(p) for p in args.paths], suffixes=HTML_EXTENSIONS, ignore=ignore_rules_from_args(args)))
+        if not paths:
+            print("No HTML files found for the provided paths.", file=sys.stderr)
+            return 1
+        results = list(minify_files(paths, jobs=args.jobs, dry_run=args.dry_run))
+        with profiling.phase("write"):
+            log_path = write_log(args.log_dir, results, dry_run=args.dry_run, profile=profiling.report_of(profiler))
+
+    summary = summarise(results)
+    verb = "Would save" if args.dry_run else "Saved"
+    changed = summary.get("minified", 0) + summary.get("would_minify", 0)
+    print(
+        f"{verb} {summary['bytes_saved']} of {summary['bytes_before']} bytes in {changed} of "
+        f"{summary['files']} pages; refused {summary.get('refused', 0)}; log: {log_path}"
+    )
+    for result in results:
+        if result.status in ("refused", "error"):
+            print(f" - {result.path}: {result.status}: {result.reason}", file=sys.stderr)
+    return 1 if summary.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
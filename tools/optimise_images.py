@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""Losslessly recompress the images referenced by the mirrored pages.
+
+Candidates come from the asset inventory of ``list_assets.py`` (every local
+``<img>``, icon, ``srcset`` … reference that exists on disk), either
+collected on the fly from the given scopes or read from an
+``artifacts/assets.json`` report via ``--inventory``. Files are processed by a
+process pool (``--jobs``) and only rewritten (atomically) when they shrink:
+
+* **PNG** – all ``IDAT`` chunks are merged and re-deflated at level 9 (default
+  and filtered strategies, whichever is smaller); ``tEXt``/``zTXt``/``iTXt``
+  and ``tIME`` chunks are dropped. Colour chunks (``gAMA``, ``cHRM``,
+  ``sRGB``, ``iCCP``, ``tRNS`` …) and animation chunks are kept.
+* **JPEG** – comments, XMP, Photoshop/Ducky blocks and EXIF are removed at the
+  marker level; the entropy-coded data is copied byte for byte. EXIF is kept
+  when it carries a non-default orientation (browsers rotate by it), as are
+  ICC profiles, JFIF and Adobe segments.
+* **GIF** – comment extensions and application extensions other than looping
+  and ICC profiles are dropped.
+
+Every result is re-parsed and compared with the original (decompressed
+scanlines for PNG, rendering segments for JPEG/GIF) before it is written, so
+rendered pixels never change. Before/after sizes and MD5 values are merged
+into ``snapshot/optimised_images.txt.gz`` next to ``baseline_md5.txt.gz`` so
+baseline drift can be traced back to this step; a per-run report is written to
+``logs/optimise_images-<timestamp>.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import gzip
+import hashlib
+import json
+import os
+import struct
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from . import profiling
+    from .fileio import write_atomic
+    from .list_assets import PROJECT_ROOT, collect_assets, iter_html_files
+    from .walker import add_ignore_arguments, ignore_rules_from_args
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from fileio import write_atomic  # type: ignore
+    from list_assets import PROJECT_ROOT, collect_assets, iter_html_files  # type: ignore
+    from walker import add_ignore_arguments, ignore_rules_from_args  # type: ignore
+
+DEFAULT_RECORD = PROJECT_ROOT / "snapshot" / "optimised_images.txt.gz"
+LOG_DIR = PROJECT_ROOT / "logs"
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".jpe", ".gif"}
+RECORD_HEADER = "# before_md5 after_md5 before_size after_size path"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_STRIPPED_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_SOS = 0xDA
+JPEG_STANDALONE = {0x01} | set(range(0xD0, 0xD8))
+EXIF_HEADER = b"Exif\x00\x00"
+ICC_HEADER = b"ICC_PROFILE\x00"
+
+GIF_KEPT_APPLICATIONS = {b"NETSCAPE2.0", b"ANIMEXTS1.0", b"ICCRGBG1012"}
+
+
+class ImageFormatError(ValueError):
+    """Raised for files that cannot be parsed safely; they are left untouched."""
+
+
+@dataclass
+class ImageResult:
+    path: str
+    kind: str
+    status: str
+    before_size: int = 0
+    after_size: int = 0
+    before_md5: Optional[str] = None
+    after_md5: Optional[str] = None
+    removed: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+# -- PNG -----------------------------------------------------------------------
+
+
+def _png_chunks(data: bytes) -> List[Tuple[bytes, bytes]]:
+    if not data.startswith(PNG_SIGNATURE):
+        raise ImageFormatError("not a PNG file")
+    chunks: List[Tuple[bytes, bytes]] = []
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        if offset + 8 > len(data):
+            raise ImageFormatError("truncated chunk header")
+        length, kind = struct.unpack(">I4s", data[offset : offset + 8])
+        end = offset + 12 + length
+        if end > len(data):
+            raise ImageFormatError(f"truncated {kind!r} chunk")
+        chunks.append((kind, data[offset + 8 : offset + 8 + length]))
+        offset = end
+        if kind == b"IEND":
+            break
+    if not chunks or chunks[0][0] != b"IHDR" or chunks[-1][0] != b"IEND":
+        raise ImageFormatError("missing IHDR or IEND")
+    return chunks
+
+
+def _png_chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I4s", len(body), kind) + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def _png_rendering(data: bytes) -> Tuple[List[Tuple[bytes, bytes]], bytes]:
+    chunks = _png_chunks(data)
+    kept = [(kind, body) for kind, body in chunks if kind not in PNG_STRIPPED_CHUNKS and kind != b"IDAT"]
+    try:
+        scanlines = zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+    except zlib.error as exc:
+        raise ImageFormatError(f"corrupt IDAT stream: {exc}") from None
+    return kept, scanlines
+
+
+def optimise_png(data: bytes) -> Tuple[bytes, List[str]]:
+    chunks = _png_chunks(data)
+    idat = b"".join(body for kind, body in chunks if kind == b"IDAT")
+    try:
+        scanlines = zlib.decompress(idat)
+    except zlib.error as exc:
+        raise ImageFormatError(f"corrupt IDAT stream: {exc}") from None
+    best = idat
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        candidate = compressor.compress(scanlines) + compressor.flush()
+        if len(candidate) < len(best):
+            best = candidate
+
+    removed: List[str] = []
+    output = [PNG_SIGNATURE]
+    idat_written = False
+    for kind, body in chunks:
+        if kind in PNG_STRIPPED_CHUNKS:
+            removed.append(kind.decode("latin-1"))
+        elif kind == b"IDAT":
+            if not idat_written:
+                output.append(_png_chunk(b"IDAT", best))
+                idat_written = True
+        else:
+            output.append(_png_chunk(kind, body))
+    if best is not idat:
+        removed.append("IDAT re-deflated")
+    return b"".join(output), removed
+
+
+# -- JPEG ----------------------------------------------------------------------
+
+
+def _jpeg_segments(data: bytes) -> Tuple[List[Tuple[int, bytes]], bytes]:
+    """Split a JPEG into header segments and everything from the first SOS on."""
+
+    if not data.startswith(JPEG_SOI):
+        raise ImageFormatError("not a JPEG file")
+    segments: List[Tuple[int, bytes]] = []
+    offset = 2
+    while offset < len(data):
+        if data[offset] != 0xFF:
+            raise ImageFormatError(f"expected a marker at byte {offset}")
+        while offset < len(data) and data[offset] == 0xFF:
+            offset += 1  # fill bytes
+        if offset >= len(data):
+            break
+        marker = data[offset]
+        offset += 1
+        if marker in JPEG_STANDALONE:
+            segments.append((marker, b""))
+            continue
+        if marker == JPEG_SOS:
+            return segments, data[offset - 2 :]
+        if offset + 2 > len(data):
+            raise ImageFormatError("truncated segment length")
+        (length,) = struct.unpack(">H", data[offset : offset + 2])
+        if length < 2 or offset + length > len(data):
+            raise ImageFormatError(f"truncated segment 0x{marker:02X}")
+        segments.append((marker, data[offset + 2 : offset + length]))
+        offset += length
+    raise ImageFormatError("no SOS marker")
+
+
+def exif_orientation(payload: bytes) -> Optional[int]:
+    tiff = payload[len(EXIF_HEADER) :]
+    if len(tiff) < 8 or tiff[:2] not in (b"II", b"MM"):
+        raise ImageFormatError("unreadable EXIF header")
+    order = "<" if tiff[:2] == b"II" else ">"
+    (ifd,) = struct.unpack(order + "I", tiff[4:8])
+    if ifd + 2 > len(tiff):
+        raise ImageFormatError("unreadable EXIF IFD0")
+    (count,) = struct.unpack(order + "H", tiff[ifd : ifd + 2])
+    for index in range(count):
+        start = ifd + 2 + index * 12
+        if start + 12 > len(tiff):
+            raise ImageFormatError("truncated EXIF IFD0")
+        tag, kind = struct.unpack(order + "HH", tiff[start : start + 4])
+        if tag == 0x0112 and kind == 3:
+            return struct.unpack(order + "H", tiff[start + 8 : start + 10])[0]
+    return None
+
+
+def _jpeg_removable(marker: int, payload: bytes) -> Optional[str]:
+    """Name of a segment that does not affect rendering, else ``None``."""
+
+    if marker == 0xFE:
+        return "COM"
+    if marker == 0xE1:
+        if payload.startswith(EXIF_HEADER):
+            try:
+                orientation = exif_orientation(payload)
+            except (ImageFormatError, struct.error):
+                return None  # keep what we cannot read
+            return "EXIF" if orientation in (None, 1) else None
+        return "APP1"  # XMP and extended XMP
+    if marker == 0xE2 and not payload.startswith(ICC_HEADER):
+        return "APP2"
+    if marker in (0xEC, 0xED):
+        return f"APP{marker - 0xE0}"
+    return None
+
+
+def _jpeg_rendering(data: bytes) -> Tuple[List[Tuple[int, bytes]], bytes]:
+    segments, scans = _jpeg_segments(data)
+    return [(marker, payload) for marker, payload in segments if _jpeg_removable(marker, payload) is None], scans
+
+
+def optimise_jpeg(data: bytes) -> Tuple[bytes, List[str]]:
+    segments, scans = _jpeg_segments(data)
+    output = [JPEG_SOI]
+    removed: List[str] = []
+    for marker, payload in segments:
+        name = _jpeg_removable(marker, payload)
+        if name is not None:
+            removed.append(name)
+        elif marker in JPEG_STANDALONE:
+            output.append(bytes((0xFF, marker)))
+        else:
+            output.append(bytes((0xFF, marker)) + struct.pack(">H", len(payload) + 2) + payload)
+    output.append(scans)
+    return b"".join(output), removed
+
+
+# -- GIF -----------------------------------------------------------------------
+
+
+def _gif_sub_blocks(data: bytes, offset: int) -> int:
+    while True:
+        if offset >= len(data):
+            raise ImageFormatError("truncated GIF data block")
+        size = data[offset]
+        offset += 1 + size
+        if size == 0:
+            return offset
+
+
+def _gif_blocks(data: bytes) -> List[Tuple[str, bytes]]:
+    """Split a GIF into (kind, raw bytes) blocks; kinds are header/ext:XX/image/trailer."""
+
+    if data[:6] not in (b"GIF87a", b"GIF89a") or len(data) < 13:
+        raise ImageFormatError("not a GIF file")
+    flags = data[10]
+    offset = 13 + (3 * 2 ** ((flags & 0x07) + 1) if flags & 0x80 else 0)
+    blocks: List[Tuple[str, bytes]] = [("header", data[:offset])]
+    while offset < len(data):
+        start = offset
+        introducer = data[offset]
+        if introducer == 0x3B:
+            blocks.append(("trailer", data[offset:]))
+            return blocks
+        if introducer == 0x21:
+            if offset + 2 > len(data):
+                raise ImageFormatError("truncated extension")
+            kind = f"ext:{data[offset + 1]:02X}"
+            offset = _gif_sub_blocks(data, offset + 2)
+        elif introducer == 0x2C:
+            if offset + 10 > len(data):
+                raise ImageFormatError("truncated image descriptor")
+            flags = data[offset + 9]
+            offset += 10 + (3 * 2 ** ((flags & 0x07) + 1) if flags & 0x80 else 0)
+            kind = "image"
+            offset = _gif_sub_blocks(data, offset + 1)  # LZW minimum code size
+        else:
+            raise ImageFormatError(f"unexpected GIF block 0x{introducer:02X}")
+        blocks.append((kind, data[start:offset]))
+    raise ImageFormatError("missing GIF trailer")
+
+
+def _gif_removable(kind: str, raw: bytes) -> Optional[str]:
+    if kind == "ext:FE":
+        return "comment"
+    if kind == "ext:FF" and raw[3:14] not in GIF_KEPT_APPLICATIONS:
+        return "application:" + raw[3:14].decode("latin-1", errors="replace")
+    return None
+
+
+def _gif_rendering(data: bytes) -> List[Tuple[str, bytes]]:
+    return [(kind, raw) for kind, raw in _gif_blocks(data) if _gif_removable(kind, raw) is None]
+
+
+def optimise_gif(data: bytes) -> Tuple[bytes, List[str]]:
+    output: List[bytes] = []
+    removed: List[str] = []
+    for kind, raw in _gif_blocks(data):
+        name = _gif_removable(kind, raw)
+        if name is None:
+            output.append(raw)
+        else:
+            removed.append(name)
+    return b"".join(output), removed
+
+
+# -- driver --------------------------------------------------------------------
+
+OPTIMISERS: Dict[str, Tuple[Callable[[bytes], Tuple[bytes, List[str]]], Callable[[bytes], object]]] = {
+    "png": (optimise_png, _png_rendering),
+    "jpeg": (optimise_jpeg, _jpeg_rendering),
+    "gif": (optimise_gif, _gif_rendering),
+}
+
+
+def image_kind(data: bytes) -> Optional[str]:
+    if data.startswith(PNG_SIGNATURE):
+        return "png"
+    if data.startswith(JPEG_SOI):
+        return "jpeg"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
+def optimise_bytes(data: bytes) -> Tuple[str, bytes, List[str]]:
+    """Return ``(kind, optimised bytes, removed parts)``; raises :class:`ImageFormatError`."""
+
+    kind = image_kind(data)
+    if kind is None:
+        raise ImageFormatError("unknown image format")
+    optimise, rendering = OPTIMISERS[kind]
+    optimised, removed = optimise(data)
+    if rendering(optimised) != rendering(data):
+        raise ImageFormatError("optimised image would render differently")
+    return kind, optimised, removed
+
+
+@profiling.timed("optimise")
+def optimise_file(path: Path, *, dry_run: bool = False) -> ImageResult:
+    relative = _relative(path)
+    try:
+        data = path.read_bytes()
+    except OSError as exc:
+        return ImageResult(path=relative, kind="unknown", status="error", error=str(exc))
+    result = ImageResult(
+        path=relative,
+        kind=image_kind(data) or "unknown",
+        status="unchanged",
+        before_size=len(data),
+        after_size=len(data),
+        before_md5=hashlib.md5(data).hexdigest(),
+        after_md5=hashlib.md5(data).hexdigest(),
+    )
+    try:
+        _, optimised, removed = optimise_bytes(data)
+    except (ImageFormatError, struct.error) as exc:
+        result.status = "skipped"
+        result.error = str(exc)
+        return result
+    if len(optimised) >= len(data):
+        return result
+    result.status = "would_optimise" if dry_run else "optimised"
+    result.after_size = len(optimised)
+    result.after_md5 = hashlib.md5(optimised).hexdigest()
+    result.removed = removed
+    if not dry_run:
+        try:
+            write_atomic(path, optimised)
+        except OSError as exc:
+            result.status = "error"
+            result.error = str(exc)
+    return result
+
+
+def optimise_files(paths: Sequence[Path], *, jobs: int, dry_run: bool) -> Iterator[ImageResult]:
+    """Yield :func:`optimise_file` results in the order of ``paths``."""
+
+    worker = functools.partial(optimise_file, dry_run=dry_run)
+    if jobs <= 1:
+        for path in paths:
+            with profiling.track_file(path):
+                result = worker(path)
+            yield result
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from profiling.iterate("optimise", profiling.map_files(executor, worker, paths, chunksize=8))
+
+
+def _relative(path: Path) -> str:
+    try:
+        return path.resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
+def inventory_images(report: Dict[str, Dict[str, List[object]]]) -> List[Path]:
+    """Existing local image files referenced anywhere in a ``list_assets`` report."""
+
+    found = set()
+    for assets in report.values():
+        for entries in assets.values():
+            for entry in entries:
+                resolved = entry["resolved_path"] if isinstance(entry, dict) else entry.resolved_path
+                exists = entry["exists"] if isinstance(entry, dict) else entry.exists
+                if resolved and exists and Path(resolved).suffix.lower() in IMAGE_EXTENSIONS:
+                    found.add(resolved)
+    return [PROJECT_ROOT / name for name in sorted(found)]
+
+
+def load_record(path: Path) -> Dict[str, Tuple[str, str, int, int]]:
+    if not path.exists():
+        return {}
+    entries: Dict[str, Tuple[str, str, int, int]] = {}
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            if line.startswith("#") or not line.strip():
+                continue
+            before_md5, after_md5, before_size, after_size, name = line.rstrip("\n").split(" ", 4)
+            entries[name] = (before_md5, after_md5, int(before_size), int(after_size))
+    return entries
+
+
+def update_record(path: Path, results: Iterable[ImageResult]) -> int:
+    """Merge optimised files into the record, keeping the original ``before`` values."""
+
+    entries = load_record(path)
+    changed = 0
+    for result in results:
+        if result.status != "optimised":
+            continue
+        previous = entries.get(result.path)
+        if previous is not None and previous[1] == result.before_md5:
+            before_md5, before_size = previous[0], previous[2]
+        else:
+            before_md5, before_size = result.before_md5, result.before_size
+        entries[result.path] = (before_md5, result.after_md5, before_size, result.after_size)
+        changed += 1
+    if changed:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as handle:
+            handle.write(RECORD_HEADER + "\n")
+            for name in sorted(entries):
+                before_md5, after_md5, before_size, after_size = entries[name]
+                handle.write(f"{before_md5} {after_md5} {before_size} {after_size} {name}\n")
+    return changed
+
+
+def summarise(results: Sequence[ImageResult]) -> Dict[str, int]:
+    summary: Dict[str, int] = {"files": len(results), "bytes_before": 0, "bytes_after": 0}
+    for result in results:
+        summary[result.status] = summary.get(result.status, 0) + 1
+        summary["bytes_before"] += result.before_size
+        summary["bytes_after"] += result.after_size
+    summary["bytes_saved"] = summary["bytes_before"] - summary["bytes_after"]
+    return summary
+
+
+def write_log(log_dir: Path, results: Sequence[ImageResult], *, dry_run: bool, profile: Optional[dict] = None) -> Path:
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"optimise_images-{timestamp}.json"
+    payload: Dict[str, object] = {
+        "generated_at": timestamp,
+        "dry_run": dry_run,
+        "summary": summarise(results),
+        "files": [asdict(result) for result in results],
+    }
+    if profile is not None:
+        payload["profile"] = profile
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return output_path
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        default=["."],
+        help="Files or directories whose HTML pages are scanned for images (default: project root)",
+    )
+    parser.add_argument("--inventory", type=Path, help="Take candidates from a list_assets.py JSON report instead")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the savings without rewriting any file")
+    parser.add_argument(
+        "--record",
+        type=Path,
+        default=DEFAULT_RECORD,
+        help="Before/after MD5 record to update (default: snapshot/optimised_images.txt.gz)",
+    )
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help="Where to store the JSON report (default: logs)")
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    with profiling.session(args) as profiler:
+        if args.inventory:
+            try:
+                report = json.loads(args.inventory.read_text(encoding="utf-8"))["files"]
+            except (OSError, ValueError, KeyError) as exc:
+                print(f"Failed to read inventory {args.inventory}: {exc}", file=sys.stderr)
+                return 1
+        else:
+            with profiling.phase("walk"):
+                html_files = list(iter_html_files([Path(p).resolve() for p in args.paths], ignore_rules_from_args(args)))
+            report = collect_assets(html_files)
+        images = inventory_images(report)
+        if not images:
+            print("No referenced images found.", file=sys.stderr)
+            return 1
+
+        results = list(optimise_files(images, jobs=args.jobs, dry_run=args.dry_run))
+        with profiling.phase("write"):
+            recorded = 0 if args.dry_run else update_record(args.record, results)
+            log_path = write_log(args.log_dir, results, dry_run=args.dry_run, profile=profiling.report_of(profiler))
+
+    summary = summarise(results)
+    verb = "Would save" if args.dry_run else "Saved"
+    print(
+        f"{verb} {summary['bytes_saved']} of {summary['bytes_before']} bytes in "
+        f"{summary.get('optimised', 0) + summary.get('would_optimise', 0)} of {summary['files']} images; log: {log_path}"
+    )
+    if recorded:
+        print(f"Recorded {recorded} before/after checksums in {args.record}")
+    errors = [result for result in results if result.status == "error"]
+    for result in errors:
+        print(f" - {result.path}: {result.error}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
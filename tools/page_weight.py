@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Report the transitive download weight of every page and enforce budgets.
+
+For each HTML page the tool adds up the bytes a first visit fetches from the
+mirror: the page itself, the stylesheets, scripts, images, media and embeds
+it references and, through the stylesheets, their ``@import`` chains and the
+fonts and background images named by ``url()``. Every file is counted once
+per page, under the category through which it is first reached.
+
+* Inside ``@font-face`` only the source a browser would pick is counted (see
+  ``list_assets.collect_css_assets``); the EOT/SVG fallbacks are not.
+* ``<link>`` references other than stylesheets and icons (canonical,
+  alternate, feeds) are not downloads and are left out.
+* Background images and ``unicode-range`` font subsets count whether or not
+  the page uses them, so on that side the figure is an upper bound.
+* Remote references are counted but have no size; local references to files
+  missing from the mirror are listed.
+* A page that is neither UTF-8 nor Windows-1251 cannot be parsed: it is
+  listed as skipped and left out of the budgets and the summary figures.
+
+With ``--index`` the asset lists and sizes come from the site index (run
+``python tools/site_index.py`` first), so no page or stylesheet is read.
+Without it each page is parsed once, and each stylesheet and each file size
+is looked up once per run, however many pages share it.
+
+Budgets are given as ``--budget NAME=LIMIT`` where ``NAME`` is ``total``,
+``requests`` or a category; sizes take a ``KB``/``MB`` suffix (1 KB = 1024
+bytes). Pages over any budget are listed and the exit status is 1. The
+report goes to ``logs/page_weight-<timestamp>.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import statistics
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    from . import profiling
+    from .fileio import decode_page
+    from .list_assets import (
+        PROJECT_ROOT,
+        AssetCollector,
+        AssetEntry,
+        iter_html_files,
+        stylesheet_assets,
+    )
+    from .site_index import open_site_index
+    from .walker import add_ignore_arguments, ignore_rules_from_args
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from fileio import decode_page  # type: ignore
+    from list_assets import (  # type: ignore
+        PROJECT_ROOT,
+        AssetCollector,
+        AssetEntry,
+        iter_html_files,
+        stylesheet_assets,
+    )
+    from site_index import open_site_index  # type: ignore
+    from walker import add_ignore_arguments, ignore_rules_from_args  # type: ignore
+
+LOG_DIR = PROJECT_ROOT / "logs"
+CATEGORIES = ("html", "stylesheets", "scripts", "images", "fonts", "media", "embeds", "other")
+BUDGET_NAMES = ("total", "requests") + CATEGORIES
+# Page references that are not fetched (``<link rel="canonical">`` …) and
+# font sources a browser skips.
+PAGE_SKIPPED = {"other"}
+STYLESHEET_SKIPPED = {"font-fallbacks"}
+REMOTE_URL_PREFIXES = ("http://", "https://", "//")
+SIZE_RE = re.compile(r"^\s*(?P<number>\d+(?:\.\d+)?)\s*(?P<unit>b|kb|kib|mb|mib)?\s*$", re.IGNORECASE)
+UNITS = {"b": 1, "kb": 1024, "kib": 1024, "mb": 1024 * 1024, "mib": 1024 * 1024}
+DEFAULT_TOP = 10
+UNDECODABLE = "not UTF-8 or Windows-1251"
+
+
+@dataclass
+class PageWeight:
+    path: str
+    total: int = 0
+    requests: int = 0
+    categories: Dict[str, int] = field(default_factory=dict)
+    remote: int = 0
+    missing: List[str] = field(default_factory=list)
+    over_budget: Dict[str, int] = field(default_factory=dict)
+    skipped: Optional[str] = None
+
+
+def parse_budget(value: str) -> Tuple[str, int]:
+    """Parse ``NAME=LIMIT`` for ``--budget``."""
+
+    name, separator, limit = value.partition("=")
+    name = name.strip().lower()
+    if not separator or name not in BUDGET_NAMES:
+        raise argparse.ArgumentTypeError(f"expected NAME=LIMIT with NAME one of {', '.join(BUDGET_NAMES)}, got {value!r}")
+    if name == "requests":
+        if not limit.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"requests budget must be a whole number, got {limit!r}")
+        return name, int(limit)
+    match = SIZE_RE.match(limit)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"expected a size such as 500KB or 1.5MB, got {limit!r}")
+    return name, int(float(match.group("number")) * UNITS[(match.group("unit") or "b").lower()])
+
+
+def format_size(size: int) -> str:
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.2f} MB"
+    if size >= 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size} B"
+
+
+def relative_key(path: Path) -> str:
+    try:
+        return str(path.relative_to(PROJECT_ROOT))
+    except ValueError:
+        return str(path)
+
+
+class AssetGraph:
+    """Asset lists and file sizes, each looked up once per run."""
+
+    def __init__(self, index=None) -> None:
+        self.index = index
+        self.sizes: Dict[str, Optional[int]] = {}
+        self.stylesheets: Dict[str, Dict[str, List[AssetEntry]]] = {}
+        if index is not None:
+            self.sizes.update((path, size) for path, size, _, _ in index.file_stats())
+
+    def size(self, key: str) -> Optional[int]:
+        """Size of the file at ``key`` (``None`` if it is not a file)."""
+
+        if key not in self.sizes:
+            path = PROJECT_ROOT / key
+            self.sizes[key] = path.stat().st_size if path.is_file() else None
+        return self.sizes[key]
+
+    def page_assets(self, page: Path) -> Optional[Dict[str, List[AssetEntry]]]:
+        """Asset references of ``page``; ``None`` if it cannot be decoded."""
+
+        if self.index is not None:
+            key = relative_key(page)
+            indexed = self.index.assets(key)
+            document = self.index.document(key) if indexed is not None else None
+            # The index decodes what it cannot read as UTF-8 with replacement
+            # characters, so only those pages need their bytes checked here.
+            if document is not None and not document.contains_replacement:
+                return indexed
+        text, _ = decode_page(page.read_bytes())
+        if text is None:
+            return None
+        with profiling.phase("parse"):
+            collector = AssetCollector(page)
+            collector.feed(text)
+            collector.close()
+            return collector.to_entries()
+
+    def stylesheet_assets(self, key: str) -> Dict[str, List[AssetEntry]]:
+        if key not in self.stylesheets:
+            self.stylesheets[key] = stylesheet_assets(key, self.index)
+        return self.stylesheets[key]
+
+
+def page_weight(page: Path, graph: AssetGraph) -> PageWeight:
+    """Transitive weight of ``page``, broken down by category."""
+
+    result = PageWeight(path=relative_key(page), categories={category: 0 for category in CATEGORIES})
+    seen: Set[str] = set()
+
+    def add(category: str, key: str) -> bool:
+        if key in seen:
+            return False
+        seen.add(key)
+        size = graph.size(key)
+        if size is None:
+            result.missing.append(key)
+            return False
+        result.categories[category] += size
+        result.total += size
+        result.requests += 1
+        return True
+
+    def follow(category: str, entries: Sequence[AssetEntry]) -> None:
+        for entry in entries:
+            if entry.resolved_path is None:
+                if entry.url.startswith(REMOTE_URL_PREFIXES):
+                    result.remote += 1
+            elif add(category, entry.resolved_path) and category == "stylesheets":
+                for sub_category, sub_entries in graph.stylesheet_assets(entry.resolved_path).items():
+                    if sub_category not in STYLESHEET_SKIPPED:
+                        follow(sub_category, sub_entries)
+
+    add("html", result.path)
+    assets = graph.page_assets(page)
+    if assets is None:
+        result.skipped = UNDECODABLE
+        return result
+    for category, entries in assets.items():
+        if category not in PAGE_SKIPPED:
+            follow(category, entries)
+    return result
+
+
+def apply_budgets(page: PageWeight, budgets: Dict[str, int]) -> None:
+    if page.skipped:
+        return
+    for name, limit in budgets.items():
+        if name == "total":
+            measured = page.total
+        elif name == "requests":
+            measured = page.requests
+        else:
+            measured = page.categories[name]
+        if measured > limit:
+            page.over_budget[name] = measured
+
+
+def summarise(pages: Sequence[PageWeight]) -> Dict[str, int]:
+    skipped = sum(1 for page in pages if page.skipped)
+    pages = [page for page in pages if not page.skipped]
+    summary: Dict[str, int] = {
+        "pages": len(pages),
+        "skipped": skipped,
+        "over_budget": sum(1 for page in pages if page.over_budget),
+    }
+    if pages:
+        totals = [page.total for page in pages]
+        summary["median_total"] = int(statistics.median(totals))
+        summary["max_total"] = max(totals)
+        summary["median_requests"] = int(statistics.median(page.requests for page in pages))
+        for category in CATEGORIES:
+            summary[f"max_{category}"] = max(page.categories[category] for page in pages)
+    summary["remote"] = sum(page.remote for page in pages)
+    summary["missing"] = sum(len(page.missing) for page in pages)
+    return summary
+
+
+def write_log(
+    log_dir: Path,
+    pages: Sequence[PageWeight],
+    *,
+    budgets: Dict[str, int],
+    profile: Optional[dict] = None,
+) -> Path:
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"page_weight-{timestamp}.json"
+    payload: Dict[str, object] = {
+        "generated_at": timestamp,
+        "budgets": budgets,
+        "summary": summarise(pages),
+        "pages": [asdict(page) for page in sorted(pages, key=lambda page: (-page.total, page.path))],
+    }
+    if profile is not None:
+        payload["profile"] = profile
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return output_path
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", default=["."], help="HTML files or directories to weigh (default: project root)")
+    parser.add_argument(
+        "--budget",
+        type=parse_budget,
+        action="append",
+        default=[],
+        metavar="NAME=LIMIT",
+        help="Fail when a page exceeds LIMIT, e.g. total=1.5MB, images=800KB, requests=40 (repeatable)",
+    )
+    parser.add_argument("--index", type=Path, help="Read asset references and sizes from a site index built by site_index.py")
+    parser.add_argument(
+        "--top", type=int, default=DEFAULT_TOP, help=f"Heaviest pages to print (default: {DEFAULT_TOP})"
+    )
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help="Where to store the JSON report (default: logs)")
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def weigh(pages: Sequence[Path], budgets: Dict[str, int], index=None) -> List[PageWeight]:
+    graph = AssetGraph(index)
+    results: List[PageWeight] = []
+    for page in pages:
+        with profiling.track_file(page):
+            result = page_weight(page, graph)
+        apply_budgets(result, budgets)
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    budgets = dict(args.budget)
+    with profiling.session(args) as profiler:
+        with profiling.phase("walk"):
+            pages = list(iter_html_files([Path(p).resolve() for p in args.paths], ignore_rules_from_args(args)))
+        with profiling.phase("weigh"):
+            if args.index:
+                with open_site_index(args.index) as index:
+                    results = weigh(pages, budgets, index)
+            else:
+                results = weigh(pages, budgets)
+        with profiling.phase("write"):
+            log_path = write_log(args.log_dir, results, budgets=budgets, profile=profiling.report_of(profiler))
+
+    summary = summarise(results)
+    weighed = sorted((page for page in results if not page.skipped), key=lambda page: (-page.total, page.path))
+    if weighed:
+        print(
+            f"Weighed {summary['pages']} pages: median {format_size(summary['median_total'])} in "
+            f"{summary['median_requests']} requests, heaviest {format_size(summary['max_total'])}; log: {log_path}"
+        )
+    else:
+        print(f"No HTML pages weighed; log: {log_path}")
+    for page in results:
+        if page.skipped:
+            print(f"skipped: {page.path}: {page.skipped}", file=sys.stderr)
+    for page in weighed[: args.top]:
+        breakdown = ", ".join(
+            f"{category} {format_size(size)}" for category, size in page.categories.items() if size
+        )
+        print(f" - {page.path}: {format_size(page.total)} ({breakdown})")
+    over = [page for page in results if page.over_budget]
+    for page in over:
+        details = ", ".join(
+            f"{name} {measured if name == 'requests' else format_size(measured)} > "
+            f"{budgets[name] if name == 'requests' else format_size(budgets[name])}"
+            for name, measured in page.over_budget.items()
+        )
+        print(f"over budget: {page.path}: {details}", file=sys.stderr)
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
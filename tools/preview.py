@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""Local static server that answers like Cloudflare Pages.
+
+``python -m http.server`` speaks HTTP/1.0, closes every connection, reads
+every file from disk and knows nothing about the Pages routing rules, so
+``--base`` runs against it are slower than they need to be and differ from
+production. ``python -m tools preview`` serves a directory (the project
+root, or ``dist/`` after ``python -m tools build``) with:
+
+* a thread per connection and HTTP/1.1 keep-alive;
+* ``_redirects`` applied before anything else (exact paths, ``*``/``:splat``
+  and ``:placeholder`` patterns, 301/302/303/307/308, and 200 rewrites);
+* Pages clean URLs: ``/page`` serves ``page.html``, ``/dir/`` serves
+  ``dir/index.html``, and ``/page.html``, ``/dir/index.html`` and ``/dir``
+  answer 308 with the canonical form;
+* ``_headers`` rules, with values from several rules joined by ``, `` and
+  ``! Name`` detaching a header set by an earlier rule;
+* ``Content-Type`` with ``charset=utf-8`` for text types (as Pages sends it,
+  whatever the page declares), ``ETag``/``If-None-Match``, single byte
+  ranges and gzip for compressible types;
+* the nearest ``404.html`` for missing paths. Without a top-level one, Pages
+  assumes a single-page app and answers ``/index.html`` with 200, and so
+  does this server (a warning is printed at start-up). That hides missing
+  assets from ``--base`` checks, so pass ``--strict-404`` to answer a plain
+  404 instead while checking.
+
+File contents are held in an LRU cache (``--cache-mb``) keyed by path and
+revalidated by size and ``mtime_ns`` on every request, so edits show up
+immediately while unchanged files are served from memory.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import mimetypes
+import posixpath
+import re
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote, unquote, urlsplit
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+CONFIG_FILES = frozenset({"_redirects", "_headers", "_routes.json", "_worker.js"})
+REDIRECT_STATUSES = frozenset({200, 301, 302, 303, 307, 308})
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml")
+GZIP_MIN_SIZE = 1024
+MAX_CACHED_FILE = 8 * 1024 * 1024
+URL_SAFE = "/!$&'()*+,;=:@-._~"
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("image/x-icon", ".ico")
+mimetypes.add_type("font/woff2", ".woff2")
+
+
+@dataclass
+class Rule:
+    pattern: re.Pattern
+    target: str = ""
+    status: int = 302
+    headers: List[Tuple[str, str]] = field(default_factory=list)
+    detach: List[str] = field(default_factory=list)
+
+
+def compile_pattern(source: str) -> re.Pattern:
+    """``/blog/:slug/*`` → a regex with ``slug`` and ``splat`` groups."""
+
+    parts = []
+    for token in re.split(r"(\*|:[A-Za-z]\w*)", source):
+        if token == "*":
+            parts.append("(?P<splat>.*)")
+        elif token.startswith(":"):
+            parts.append(f"(?P<{token[1:]}>[^/]+)")
+        else:
+            parts.append(re.escape(token))
+    return re.compile("^" + "".join(parts) + "$")
+
+
+def parse_redirects(text: str) -> List[Rule]:
+    rules = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 2 or fields[0].startswith("#"):
+            continue
+        status = int(fields[2]) if len(fields) > 2 else 302
+        if status in REDIRECT_STATUSES:
+            rules.append(Rule(pattern=compile_pattern(fields[0]), target=fields[1], status=status))
+    return rules
+
+
+def parse_headers(text: str) -> List[Rule]:
+    rules: List[Rule] = []
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if not line[0].isspace():
+            rules.append(Rule(pattern=compile_pattern(line.strip())))
+        elif rules and line.strip().startswith("!"):
+            rules[-1].detach.append(line.strip()[1:].strip().lower())
+        elif rules and ":" in line:
+            name, _, value = line.strip().partition(":")
+            rules[-1].headers.append((name.strip(), value.strip()))
+    return rules
+
+
+def headers_for(rules: Sequence[Rule], path: str) -> Dict[str, str]:
+    """Headers ``_headers`` adds to ``path``; rules apply in file order."""
+
+    headers: Dict[str, Tuple[str, str]] = {}  # lower-case name -> (name, value)
+    for rule in rules:
+        if not rule.pattern.match(path):
+            continue
+        for name in rule.detach:
+            headers.pop(name, None)
+        for name, value in rule.headers:
+            previous = headers.get(name.lower())
+            headers[name.lower()] = (name, f"{previous[1]}, {value}" if previous else value)
+    return dict(headers.values())
+
+
+def content_type(path: Path) -> str:
+    kind = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if kind.startswith(COMPRESSIBLE_TYPES):
+        return f"{kind}; charset=utf-8"
+    return kind
+
+
+@dataclass
+class CachedFile:
+    size: int
+    mtime_ns: int
+    data: bytes
+    etag: str
+    gzipped: Optional[bytes] = None
+
+
+class FileCache:
+    """Thread-safe LRU of file contents, revalidated by ``(size, mtime_ns)``."""
+
+    def __init__(self, limit_bytes: int) -> None:
+        self.limit = limit_bytes
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Path, CachedFile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path) -> CachedFile:
+        stat = path.stat()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and (entry.size, entry.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+        data = path.read_bytes()
+        entry = CachedFile(stat.st_size, stat.st_mtime_ns, data, '"' + hashlib.md5(data).hexdigest() + '"')
+        with self._lock:
+            self.misses += 1
+            previous = self._entries.pop(path, None)
+            if previous is not None:
+                self.used -= len(previous.data) + len(previous.gzipped or b"")
+            if len(data) <= MAX_CACHED_FILE:
+                self._entries[path] = entry
+                self.used += len(data)
+                while self.used > self.limit and self._entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    self.used -= len(evicted.data) + len(evicted.gzipped or b"")
+        return entry
+
+    def gzipped(self, entry: CachedFile) -> bytes:
+        if entry.gzipped is None:
+            entry.gzipped = gzip.compress(entry.data, compresslevel=6, mtime=0)
+            with self._lock:
+                if any(cached is entry for cached in self._entries.values()):
+                    self.used += len(entry.gzipped)
+        return entry.gzipped
+
+
+@dataclass
+class Resolution:
+    status: int
+    file: Optional[Path] = None
+    location: Optional[str] = None
+
+
+class PagesSite:
+    """Routing state for one served directory."""
+
+    def __init__(self, root: Path, cache_bytes: int = 256 * 1024 * 1024, *, strict_404: bool = False) -> None:
+        self.root = root.resolve()
+        self.strict_404 = strict_404
+        self.cache = FileCache(cache_bytes)
+        self._config: Dict[str, Tuple[Tuple[int, int], List[Rule]]] = {}
+
+    def _rules(self, name: str, parser) -> List[Rule]:
+        path = self.root / name
+        try:
+            stat = path.stat()
+        except OSError:
+            return []
+        key = (stat.st_size, stat.st_mtime_ns)
+        cached = self._config.get(name)
+        if cached is None or cached[0] != key:
+            cached = (key, parser(path.read_text(encoding="utf-8")))
+            self._config[name] = cached
+        return cached[1]
+
+    def redirect_rules(self) -> List[Rule]:
+        return self._rules("_redirects", parse_redirects)
+
+    def header_rules(self) -> List[Rule]:
+        return self._rules("_headers", parse_headers)
+
+    @property
+    def spa_fallback(self) -> bool:
+        return not self.strict_404 and not (self.root / "404.html").is_file()
+
+    def _file(self, relative: str) -> Optional[Path]:
+        if not relative or relative in CONFIG_FILES:
+            return None
+        try:
+            candidate = (self.root / relative).resolve()
+        except (ValueError, OSError):  # NUL bytes, over-long names
+            return None
+        if self.root not in candidate.parents or not candidate.is_file():
+            return None
+        return candidate
+
+    def resolve(self, path: str) -> Resolution:
+        """Apply ``_redirects``, then the Pages clean-URL and 404 rules, to a decoded path."""
+
+        for rule in self.redirect_rules():
+            match = rule.pattern.match(path)
+            if match is None:
+                continue
+            target = rule.target
+            for name, value in match.groupdict().items():
+                target = target.replace(f":{name}", value)
+            if rule.status != 200:
+                return Resolution(rule.status, location=target)
+            path = unquote(urlsplit(target).path)
+            break
+        return self._route(path)
+
+    def _route(self, path: str) -> Resolution:
+        relative = posixpath.normpath(path).lstrip("/") if path not in ("", "/") else ""
+        if relative.startswith("../"):
+            return self._not_found(path)
+        directory = path.endswith("/")
+        if relative.endswith(".html") and self._file(relative):
+            return Resolution(308, location=_canonical(relative))
+        if relative == "index" or relative.endswith("/index"):
+            if self._file(relative + ".html"):
+                return Resolution(308, location=_canonical(relative + ".html"))
+        if directory or not relative:
+            index = posixpath.join(relative, "index.html") if relative else "index.html"
+            if self._file(index):
+                return Resolution(200, self._file(index))
+            if relative and self._file(relative + ".html"):
+                return Resolution(308, location=_canonical(relative + ".html"))
+            return self._not_found(path)
+        found = self._file(relative)
+        if found is not None:
+            return Resolution(200, found)
+        if self._file(relative + ".html"):
+            return Resolution(200, self._file(relative + ".html"))
+        if self._file(relative + "/index.html"):
+            return Resolution(308, location=_canonical(relative + "/index.html"))
+        return self._not_found(path)
+
+    def _not_found(self, path: str) -> Resolution:
+        directory = posixpath.dirname(path.rstrip("/")).strip("/")
+        while True:
+            candidate = self._file(posixpath.join(directory, "404.html") if directory else "404.html")
+            if candidate is not None:
+                return Resolution(404, candidate)
+            if not directory:
+                break
+            directory = posixpath.dirname(directory)
+        if self.spa_fallback and self._file("index.html"):
+            return Resolution(200, self._file("index.html"))
+        return Resolution(404)
+
+
+def _canonical(relative: str) -> str:
+    if relative == "index.html" or relative.endswith("/index.html"):
+        relative = relative[: -len("index.html")]
+    elif relative.endswith(".html"):
+        relative = relative[: -len(".html")]
+    return "/" + quote(relative, safe=URL_SAFE)
+
+
+def byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """``(start, end)`` of a single ``bytes=`` range; ``(-1, -1)`` when unsatisfiable."""
+
+    match = RANGE_RE.match((header or "").strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return (-1, -1)
+        return (max(size - length, 0), size - 1)
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return (-1, -1)
+    return (start, end)
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    site: PagesSite
+    protocol_version = "HTTP/1.1"
+    server_version = "pages-preview"
+    disable_nagle_algorithm = True  # headers and body are separate writes on a kept-alive socket
+
+    def do_GET(self) -> None:
+        self._serve(head=False)
+
+    def do_HEAD(self) -> None:
+        self._serve(head=True)
+
+    def _serve(self, *, head: bool) -> None:
+        parts = urlsplit(self.path)
+        resolution = self.site.resolve(unquote(parts.path))
+        if resolution.location is not None:
+            location = resolution.location
+            if parts.query and "?" not in location:
+                location += "?" + parts.query
+            self._send(resolution.status, b"", {"Location": location}, head=head)
+            return
+        if resolution.file is None:
+            self._send(404, b"Not Found", {"Content-Type": "text/plain; charset=utf-8"}, head=head)
+            return
+        try:
+            entry = self.site.cache.get(resolution.file)
+        except OSError:
+            self._send(404, b"Not Found", {"Content-Type": "text/plain; charset=utf-8"}, head=head)
+            return
+
+        headers = {"Content-Type": content_type(resolution.file), "ETag": entry.etag, "Accept-Ranges": "bytes"}
+        headers.update(headers_for(self.site.header_rules(), parts.path))
+        if resolution.status == 200 and self.headers.get("If-None-Match") == entry.etag:
+            self._send(304, b"", headers, head=True)
+            return
+        body, status = entry.data, resolution.status
+        requested = byte_range(self.headers.get("Range"), len(body)) if status == 200 else None
+        if requested == (-1, -1):
+            self._send(416, b"", {"Content-Range": f"bytes */{len(body)}"}, head=head)
+            return
+        if requested is not None:
+            start, end = requested
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            body, status = body[start : end + 1], 206
+        elif headers["Content-Type"].startswith(COMPRESSIBLE_TYPES) and len(body) >= GZIP_MIN_SIZE:
+            headers["Vary"] = "Accept-Encoding"
+            if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                body = self.site.cache.gzipped(entry)
+                headers["Content-Encoding"] = "gzip"
+        self._send(status, body, headers, head=head)
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str], *, head: bool) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+
+def make_server(site: PagesSite, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, *, verbose: bool = False):
+    handler = type("BoundPreviewHandler", (PreviewHandler,), {"site": site})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose  # type: ignore[attr-defined]
+    return server
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Interface to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--root", type=Path, default=PROJECT_ROOT, help="Directory to serve (default: project root; use dist after a build)")
+    parser.add_argument("--cache-mb", type=int, default=256, help="In-memory file cache size in MiB (default: 256)")
+    parser.add_argument(
+        "--strict-404",
+        action="store_true",
+        help="Answer 404 instead of the Pages single-page-app fallback when there is no 404.html",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Log every request to stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.root.is_dir():
+        print(f"{args.root} is not a directory", file=sys.stderr)
+        return 1
+    site = PagesSite(args.root, args.cache_mb * 1024 * 1024, strict_404=args.strict_404)
+    server = make_server(site, args.host, args.port, verbose=args.verbose)
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    if site.spa_fallback:
+        print(
+            "No 404.html at the top level: missing paths get index.html with status 200, as on Pages"
+            " (use --strict-404 for link checks)",
+            file=sys.stderr,
+        )
+    print(f"Serving {site.root} on {url} (Ctrl-C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
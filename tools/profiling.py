@@ -0,0 +1,357 @@
+"""Opt-in timing instrumentation shared by the snapshot tools.
+
+Every tool accepts ``--profile`` (see :func:`add_profile_arguments`). While a
+:func:`session` is active, the instrumented code records:
+
+* wall and CPU time per phase (walk, read, decode, detect, parse, hash, http,
+  write, ...); phases do not nest, time outside them is reported as ``other``;
+* the duration of every processed file, keeping the ``--profile-top`` slowest;
+* the latency and status of every HTTP request;
+* the peak RSS of the process and of finished worker processes.
+
+The data is added to the tool's JSON report under ``"profile"`` (or written to
+``logs/<tool>-profile-<timestamp>.json`` by tools without a report) and a
+short table is printed to stderr. Without ``--profile`` the helpers below are
+no-ops, so the hot paths only pay a ``None`` check.
+
+Phase and file timings recorded in worker threads add up across threads;
+worker processes report per-file wall time back to the parent and their CPU
+time appears as ``children_cpu_seconds``.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import heapq
+import json
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, TypeVar
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+LOG_DIR = PROJECT_ROOT / "logs"
+DEFAULT_TOP = 10
+
+T = TypeVar("T")
+_NULL_CONTEXT: ContextManager[None] = contextlib.nullcontext()
+
+
+@dataclass
+class PhaseTiming:
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+
+
+class Profiler:
+    """Accumulates timings for one tool run (thread-safe)."""
+
+    def __init__(self, top: int = DEFAULT_TOP) -> None:
+        self.top = top
+        self.phases: Dict[str, PhaseTiming] = {}
+        self.files_timed = 0
+        self.files_seconds = 0.0
+        self._slowest: List[Tuple[float, str]] = []
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._wall_started = time.perf_counter()
+        self._cpu_started = time.process_time()
+
+    def add_phase(self, name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            timing = self.phases.setdefault(name, PhaseTiming())
+            timing.calls += 1
+            timing.wall += wall
+            timing.cpu += cpu
+
+    def add_file(self, path: object, seconds: float) -> None:
+        entry = (seconds, str(path))
+        with self._lock:
+            self.files_timed += 1
+            self.files_seconds += seconds
+            if len(self._slowest) < self.top:
+                heapq.heappush(self._slowest, entry)
+            elif self.top:
+                heapq.heappushpop(self._slowest, entry)
+
+    def add_request(self, url: str, seconds: float, status: Optional[int]) -> None:
+        with self._lock:
+            self.requests.append({"url": url, "status": status, "seconds": round(seconds, 6)})
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    @contextlib.contextmanager
+    def track_file(self, path: object) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_file(path, time.perf_counter() - started)
+
+    def report(self) -> Dict[str, Any]:
+        wall = time.perf_counter() - self._wall_started
+        cpu = time.process_time() - self._cpu_started
+        with self._lock:
+            phases = {
+                name: {"calls": timing.calls, "wall_seconds": round(timing.wall, 6), "cpu_seconds": round(timing.cpu, 6)}
+                for name, timing in self.phases.items()
+            }
+            slowest = [{"path": path, "seconds": round(seconds, 6)} for seconds, path in sorted(self._slowest, reverse=True)]
+            requests = list(self.requests)
+            files_timed = self.files_timed
+            files_seconds = self.files_seconds
+        latencies = [request["seconds"] for request in requests]
+        return {
+            "wall_seconds": round(wall, 6),
+            "cpu_seconds": round(cpu, 6),
+            "children_cpu_seconds": _children_cpu(),
+            "peak_rss_bytes": _peak_rss("self"),
+            "children_peak_rss_bytes": _peak_rss("children"),
+            "phases": phases,
+            "files": {"timed": files_timed, "total_seconds": round(files_seconds, 6), "slowest": slowest},
+            "http": {
+                "requests": len(requests),
+                "total_seconds": round(sum(latencies), 6),
+                "max_seconds": max(latencies, default=0.0),
+                "per_request": requests,
+            },
+        }
+
+    def print_table(self, stream: Optional[TextIO] = None) -> None:
+        stream = stream or sys.stderr
+        data = self.report()
+        rss = data["peak_rss_bytes"]
+        print(
+            "Profile: wall {wall:.2f} s, cpu {cpu:.2f} s, children cpu {children:.2f} s, peak RSS {rss}".format(
+                wall=data["wall_seconds"],
+                cpu=data["cpu_seconds"],
+                children=data["children_cpu_seconds"] or 0.0,
+                rss=f"{rss / 2**20:.1f} MiB" if rss is not None else "n/a",
+            ),
+            file=stream,
+        )
+        print(f"  {'phase':<12} {'calls':>8} {'wall s':>9} {'cpu s':>9} {'share':>7}", file=stream)
+        total = data["wall_seconds"] or 1e-9
+        accounted = 0.0
+        for name, timing in sorted(data["phases"].items(), key=lambda item: -item[1]["wall_seconds"]):
+            accounted += timing["wall_seconds"]
+            print(
+                f"  {name:<12} {timing['calls']:>8} {timing['wall_seconds']:>9.3f} {timing['cpu_seconds']:>9.3f}"
+                f" {timing['wall_seconds'] / total:>7.1%}",
+                file=stream,
+            )
+        other = max(0.0, data["wall_seconds"] - accounted)
+        print(f"  {'other':<12} {'':>8} {other:>9.3f} {'':>9} {other / total:>7.1%}", file=stream)
+        files = data["files"]
+        if files["slowest"]:
+            print(f"  slowest of {files['timed']} files ({files['total_seconds']:.3f} s in total):", file=stream)
+            for item in files["slowest"]:
+                print(f"    {item['seconds']:>9.3f} s  {item['path']}", file=stream)
+        http = data["http"]
+        if http["requests"]:
+            print(
+                f"  http: {http['requests']} requests, {http['total_seconds']:.3f} s in total, "
+                f"mean {http['total_seconds'] / http['requests']:.3f} s, max {http['max_seconds']:.3f} s",
+                file=stream,
+            )
+
+
+def _peak_rss(who: str) -> Optional[int]:
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def _children_cpu() -> Optional[float]:
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return round(usage.ru_utime + usage.ru_stime, 6)
+
+
+# -- module-level helpers used by the instrumented code ----------------------
+
+_active: Optional[Profiler] = None
+
+
+def active() -> Optional[Profiler]:
+    return _active
+
+
+def phase(name: str) -> ContextManager[None]:
+    """Time the enclosed block as ``name`` (no-op when not profiling)."""
+
+    profiler = _active
+    return profiler.phase(name) if profiler is not None else _NULL_CONTEXT
+
+
+def track_file(path: object) -> ContextManager[None]:
+    """Record the enclosed block as the processing time of ``path``."""
+
+    profiler = _active
+    return profiler.track_file(path) if profiler is not None else _NULL_CONTEXT
+
+
+def timed(name: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator form of :func:`phase`."""
+
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with profiler.phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def timed_http(func: Callable[..., T]) -> Callable[..., T]:
+    """Time an HTTP helper whose result has ``url`` and ``status`` attributes."""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        profiler = _active
+        if profiler is None:
+            return func(*args, **kwargs)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - wall
+        profiler.add_phase("http", elapsed, time.process_time() - cpu)
+        profiler.add_request(getattr(result, "url", ""), elapsed, getattr(result, "status", None))
+        return result
+
+    return wrapper
+
+
+def iterate(name: str, items: Iterable[T]) -> Iterator[T]:
+    """Yield from ``items``, timing each step of the iterator as ``name``.
+
+    Used for lazy producers such as the tree walker or a worker pool, whose
+    cost is spent while the consumer asks for the next item.
+    """
+
+    iterator = iter(items)
+    if _active is None:
+        yield from iterator
+        return
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def timed_call(func: Callable[[Any], T], item: Any) -> Tuple[T, float]:
+    """Run ``func(item)`` and return its result with the elapsed wall time.
+
+    Module-level so it can be sent to worker processes.
+    """
+
+    started = time.perf_counter()
+    result = func(item)
+    return result, time.perf_counter() - started
+
+
+def map_files(
+    executor: Any,
+    func: Callable[[Any], T],
+    items: Iterable[Any],
+    *,
+    chunksize: int = 1,
+    label: Callable[[Any], object] = str,
+) -> Iterator[T]:
+    """``executor.map(func, items)`` that records per-item durations when profiling."""
+
+    profiler = _active
+    if profiler is None:
+        yield from executor.map(func, items, chunksize=chunksize)
+        return
+    ordered = list(items)
+    timed_results = executor.map(functools.partial(timed_call, func), ordered, chunksize=chunksize)
+    for item, (result, seconds) in zip(ordered, timed_results):
+        profiler.add_file(label(item), seconds)
+        yield result
+
+
+# -- CLI integration ---------------------------------------------------------
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the shared ``--profile``/``--profile-top`` options."""
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record per-phase wall/CPU time, the slowest files, HTTP latency and peak RSS.",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=DEFAULT_TOP,
+        metavar="N",
+        help=f"Number of slowest files to keep with --profile (default: {DEFAULT_TOP}).",
+    )
+
+
+@contextlib.contextmanager
+def session(args: argparse.Namespace) -> Iterator[Optional[Profiler]]:
+    """Activate a profiler for the duration of a tool run if ``--profile`` was given.
+
+    Yields the profiler (or ``None``) and prints its table on exit.
+    """
+
+    global _active
+    if not getattr(args, "profile", False):
+        yield None
+        return
+    profiler = Profiler(top=args.profile_top)
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = None
+        profiler.print_table()
+
+
+def report_of(profiler: Optional[Profiler]) -> Optional[Dict[str, Any]]:
+    return profiler.report() if profiler is not None else None
+
+
+def write_profile(profiler: Optional[Profiler], tool: str, log_dir: Path = LOG_DIR) -> Optional[Path]:
+    """Write the profile of a tool without a JSON report of its own."""
+
+    if profiler is None:
+        return None
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"{tool}-profile-{timestamp}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"generated_at": datetime.now(timezone.utc).isoformat(), "tool": tool, "profile": profiler.report()}
+    output_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    print(f"Profile written to {output_path}", file=sys.stderr)
+    return output_path
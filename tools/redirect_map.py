@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""Turn HTTrack redirect stubs and query-hash duplicates into ``_redirects``.
+
+HTTrack leaves three kinds of pages that only send visitors elsewhere:
+
+* **moved** – ``<TITLE>Page has moved</TITLE>`` stubs with a zero-delay meta
+  refresh, written where the live site answered with a redirect;
+* **variant** – ``index<hash>.html`` files saved for query URLs
+  (``nlping.ru/?id=…``, see the ``Mirrored from`` comment) whose content,
+  once the HTTrack comments are removed, equals another page;
+* **proxy** – ``_p_http_/<host>/<path>`` copies of absolute ``http:`` links,
+  redirected when ``<host>/<path>`` (or ``<path>`` for nlping.ru itself)
+  exists.
+
+Each one becomes a ``301`` in the Cloudflare Pages ``_redirects`` file at the
+project root. Chains are collapsed and loops dropped. Targets use the URL
+Pages serves the page under (``/page`` for ``page.html``, ``/dir/`` for
+``dir/index.html``). ``build_site.py`` leaves the redirected files out of
+``dist/``. Pages never matches query strings, so the original
+``/?id=…`` URLs still need a Pages Function.
+
+Every target is then checked with ``check_links.analyse_documents``: the file
+must exist and, with ``--base``, be served. Each source must also answer
+``301`` with the expected ``Location``. Stubs whose target is not in the
+mirror are reported as ``unresolved``.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sys
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote, unquote, urljoin, urlsplit
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+try:
+    from . import check_links, profiling
+    from .list_assets import HTML_EXTENSIONS, PROJECT_ROOT
+    from .walker import add_ignore_arguments, ignore_rules_from_args, iter_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import check_links  # type: ignore
+    import profiling  # type: ignore
+    from list_assets import HTML_EXTENSIONS, PROJECT_ROOT  # type: ignore
+    from walker import add_ignore_arguments, ignore_rules_from_args, iter_files  # type: ignore
+
+DEFAULT_OUTPUT = PROJECT_ROOT / "_redirects"
+LOG_DIR = PROJECT_ROOT / "logs"
+REDIRECTS_MARKER = "# Generated by tools/redirect_map.py"
+STATIC_REDIRECT_LIMIT = 2000  # Cloudflare Pages limit for static rules
+PROXY_DIR = "_p_http_"
+SITE_HOSTS = ("nlping.ru", "www.nlping.ru")
+
+MIRRORED_RE = re.compile(rb"<!-- Mirrored from (\S+) by HTTrack")
+HTTRACK_COMMENT_RE = re.compile(
+    rb"<!-- Added by HTTrack -->.*?<!-- /Added by HTTrack -->|<!-- (?:Mirrored from|Created by HTTrack)[^>]*-->",
+    re.DOTALL,
+)
+MOVED_TITLE_RE = re.compile(rb"<title>\s*Page has moved\s*</title>", re.IGNORECASE)
+REFRESH_RE = re.compile(
+    rb"""<meta\s+http-equiv=["']?refresh["']?\s+content=["']?\s*0\s*;\s*url=([^"'>]+)""",
+    re.IGNORECASE,
+)
+VARIANT_NAME_RE = re.compile(r"^index[0-9a-f]{4}\.html$")
+URL_SAFE = "/!$&'()*+,;=:@-._~"
+
+
+@dataclass
+class Redirect:
+    path: str
+    target: str
+    kind: str
+
+
+@dataclass
+class Unresolved:
+    path: str
+    kind: str
+    reason: str
+
+
+@dataclass
+class SourceProbe:
+    url: str
+    status: Optional[int]
+    location: Optional[str]
+    ok: bool
+    error: Optional[str] = None
+
+
+@dataclass
+class Page:
+    path: str
+    mirrored_from: Optional[str]
+    digest: str
+    refresh: Optional[str]
+
+
+def read_page(root: Path, path: Path) -> Page:
+    raw = path.read_bytes()
+    mirrored = MIRRORED_RE.search(raw)
+    refresh = REFRESH_RE.search(raw) if MOVED_TITLE_RE.search(raw) else None
+    return Page(
+        path=path.relative_to(root).as_posix(),
+        mirrored_from=mirrored.group(1).decode("latin-1") if mirrored else None,
+        digest=hashlib.md5(HTTRACK_COMMENT_RE.sub(b"", raw)).hexdigest(),
+        refresh=refresh.group(1).decode("utf-8", "replace").strip() if refresh else None,
+    )
+
+
+def is_variant(page: Page) -> bool:
+    """HTTrack names the copy of a query URL ``index<4 hex digits>.html``."""
+
+    name = page.path.rsplit("/", 1)[-1]
+    return bool(VARIANT_NAME_RE.match(name)) and bool(page.mirrored_from and "?" in page.mirrored_from)
+
+
+def page_url(path: str) -> str:
+    """URL Cloudflare Pages serves ``path`` under, without its ``.html`` redirect."""
+
+    if path == "index.html" or path.endswith("/index.html"):
+        path = path[: -len("index.html")]
+    elif path.endswith(".html"):
+        path = path[: -len(".html")]
+    return "/" + quote(path, safe=URL_SAFE)
+
+
+def source_urls(path: str) -> List[str]:
+    urls = ["/" + quote(path, safe=URL_SAFE)]
+    if path.endswith("/index.html"):
+        urls.append(page_url(path))
+    return urls
+
+
+def _local_target(root: Path, page: str, url: str) -> Optional[str]:
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    resolved = urljoin("/" + page, unquote(parts.path)).lstrip("/")
+    if resolved == "" or resolved.endswith("/"):
+        resolved += "index.html"
+    return resolved if (root / resolved).is_file() else None
+
+
+def _proxy_target(root: Path, path: str) -> Optional[str]:
+    _, host, rest = (path.split("/", 2) + ["", ""])[:3]
+    candidate = rest if host in SITE_HOSTS else f"{host}/{rest}"
+    if not rest or candidate.endswith("/"):
+        candidate += "index.html"
+    return candidate if (root / candidate).is_file() else None
+
+
+def find_redirects(root: Path, pages: Sequence[Page]) -> Tuple[List[Redirect], List[Unresolved]]:
+    """Detect stubs and variants and collapse their chains into final targets."""
+
+    by_digest: Dict[str, List[Page]] = defaultdict(list)
+    for page in pages:
+        if not is_variant(page) and page.refresh is None:
+            by_digest[page.digest].append(page)
+    found: Dict[str, Redirect] = {}
+    unresolved: List[Unresolved] = []
+    for page in pages:
+        if page.refresh is not None:
+            target = _local_target(root, page.path, page.refresh)
+            if target is None:
+                unresolved.append(Unresolved(page.path, "moved", f"refresh target {page.refresh} is not in the mirror"))
+            elif target == page.path:
+                unresolved.append(Unresolved(page.path, "moved", "refreshes to itself"))
+            else:
+                found[page.path] = Redirect(page.path, target, "moved")
+        elif is_variant(page):
+            originals = by_digest.get(page.digest)
+            if originals:
+                original = min(originals, key=lambda item: ("?" in (item.mirrored_from or ""), len(item.path), item.path))
+                found[page.path] = Redirect(page.path, original.path, "variant")
+        elif page.path.startswith(PROXY_DIR + "/"):
+            target = _proxy_target(root, page.path)
+            if target is None:
+                unresolved.append(Unresolved(page.path, "proxy", "no mirrored page for this URL"))
+            else:
+                found[page.path] = Redirect(page.path, target, "proxy")
+
+    redirects = []
+    stubs = {item.path for item in unresolved}
+    for redirect in found.values():
+        seen: Set[str] = {redirect.path}
+        target = redirect.target
+        while target in found and target not in seen:
+            seen.add(target)
+            target = found[target].target
+        if target in seen:
+            unresolved.append(Unresolved(redirect.path, redirect.kind, "redirect loop"))
+            continue
+        if target in stubs:
+            unresolved.append(Unresolved(redirect.path, redirect.kind, f"target {target} is itself an unresolved stub"))
+            continue
+        redirects.append(Redirect(redirect.path, target, redirect.kind))
+    redirects.sort(key=lambda item: item.path)
+    unresolved.sort(key=lambda item: item.path)
+    return redirects, unresolved
+
+
+def render_redirects(redirects: Iterable[Redirect]) -> str:
+    lines = [f"{REDIRECTS_MARKER}; rerun instead of editing."]
+    for redirect in redirects:
+        for url in source_urls(redirect.path):
+            lines.append(f"{url} {page_url(redirect.target)} 301")
+    return "\n".join(lines) + "\n"
+
+
+def load_redirects(path: Path) -> List[Tuple[str, str, int]]:
+    """Parse a ``_redirects`` file into ``(source, target, status)`` rules."""
+
+    rules = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        fields = line.split()
+        if not fields or fields[0].startswith("#") or len(fields) < 2:
+            continue
+        rules.append((fields[0], fields[1], int(fields[2]) if len(fields) > 2 else 302))
+    return rules
+
+
+def redirected_files(rules: Iterable[Tuple[str, str, int]]) -> Set[str]:
+    """Files made unreachable by ``rules`` (sources naming an ``.html`` file)."""
+
+    return {
+        unquote(source).lstrip("/")
+        for source, _, _ in rules
+        if "*" not in source and ":" not in source and source.endswith(".html")
+    }
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):  # noqa: D401 - urllib hook
+        return None
+
+
+@profiling.timed_http
+def probe_source(url: str, expected: str, timeout: float) -> SourceProbe:
+    """Request ``url`` without following redirects; expect a 301 to ``expected``."""
+
+    opener = build_opener(_NoRedirect)
+    try:
+        with opener.open(Request(url, method="HEAD"), timeout=timeout) as response:
+            status, location = response.status, response.headers.get("Location")
+    except HTTPError as exc:
+        status, location = exc.code, exc.headers.get("Location")
+    except URLError as exc:
+        return SourceProbe(url=url, status=None, location=None, ok=False, error=str(exc.reason))
+    ok = status == 301 and location is not None and urlsplit(location).path == urlsplit(expected).path
+    return SourceProbe(url=url, status=status, location=location, ok=ok)
+
+
+def verify(
+    root: Path,
+    redirects: Sequence[Redirect],
+    *,
+    base_url: Optional[str],
+    timeout: float,
+) -> Tuple[List[check_links.DocumentCheck], List[SourceProbe]]:
+    targets = sorted({redirect.target for redirect in redirects})
+    documents = check_links.analyse_documents(
+        [(f"redirect:{target}", root / target, page_url(target)) for target in targets],
+        base_url=base_url,
+        timeout=timeout,
+        include_remote=False,
+    )
+    probes = []
+    if base_url:
+        for redirect in redirects:
+            for url in source_urls(redirect.path):
+                expected = check_links.build_http_url(base_url, unquote(page_url(redirect.target)))
+                probes.append(probe_source(check_links.build_http_url(base_url, unquote(url)), expected, timeout))
+    return documents, probes
+
+
+def target_failures(documents: Iterable[check_links.DocumentCheck]) -> List[check_links.DocumentCheck]:
+    return [doc for doc in documents if {"missing_file", "http_error"} & set(doc.issues)]
+
+
+def write_log(
+    log_dir: Path,
+    redirects: Sequence[Redirect],
+    unresolved: Sequence[Unresolved],
+    documents: Sequence[check_links.DocumentCheck],
+    probes: Sequence[SourceProbe],
+    profile: Optional[dict] = None,
+) -> Path:
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"redirect_map-{timestamp}.json"
+    kinds: Dict[str, int] = defaultdict(int)
+    for redirect in redirects:
+        kinds[redirect.kind] += 1
+    payload: Dict[str, object] = {
+        "generated_at": timestamp,
+        "summary": {
+            "redirects": len(redirects),
+            **dict(sorted(kinds.items())),
+            "unresolved": len(unresolved),
+            "target_failures": len(target_failures(documents)),
+            "source_failures": sum(not probe.ok for probe in probes),
+        },
+        "redirects": [asdict(redirect) for redirect in redirects],
+        "unresolved": [asdict(item) for item in unresolved],
+        "targets": [{"path": doc.path, "exists": doc.exists, "http": asdict(doc.http) if doc.http else None, "issues": doc.issues} for doc in documents],
+        "sources": [asdict(probe) for probe in probes],
+    }
+    if profile is not None:
+        payload["profile"] = profile
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return output_path
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where to write the rules (default: _redirects)")
+    parser.add_argument("--dry-run", action="store_true", help="Detect and verify without writing _redirects")
+    parser.add_argument("--base", help="Also verify against a served copy (e.g. a Pages preview URL)")
+    parser.add_argument("--timeout", type=float, default=10.0, help="HTTP timeout in seconds (default: 10)")
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help="Where to store the JSON report (default: logs)")
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    with profiling.session(args) as profiler:
+        with profiling.phase("walk"):
+            paths = list(iter_files([PROJECT_ROOT], suffixes=HTML_EXTENSIONS, ignore=ignore_rules_from_args(args)))
+        with profiling.phase("read"):
+            pages = [read_page(PROJECT_ROOT, path) for path in paths]
+        redirects, unresolved = find_redirects(PROJECT_ROOT, pages)
+        documents, probes = verify(PROJECT_ROOT, redirects, base_url=args.base, timeout=args.timeout)
+        failures = target_failures(documents)
+        if not args.dry_run and not failures:
+            with profiling.phase("write"):
+                args.output.write_text(render_redirects(redirects), encoding="utf-8")
+        log_path = write_log(args.log_dir, redirects, unresolved, documents, probes, profile=profiling.report_of(profiler))
+
+    rules = sum(len(source_urls(redirect.path)) for redirect in redirects)
+    written = "not written" if args.dry_run or failures else f"written to {args.output}"
+    print(f"{len(redirects)} redirects ({rules} rules) {written}; {len(unresolved)} unresolved; log: {log_path}")
+    if rules > STATIC_REDIRECT_LIMIT:
+        print(f"Warning: Cloudflare Pages accepts at most {STATIC_REDIRECT_LIMIT} static redirects", file=sys.stderr)
+    for doc in failures:
+        print(f" - target {doc.path}: {', '.join(doc.issues)}", file=sys.stderr)
+    for probe in probes:
+        if not probe.ok:
+            print(f" - source {probe.url}: {probe.status} {probe.location or probe.error or ''}", file=sys.stderr)
+    return 1 if failures or any(not probe.ok for probe in probes) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
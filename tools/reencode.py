@@ -3,26 +3,44 @@
 The HTTrack snapshot keeps most of the content in Windows-1251.  This
 script walks through the provided paths, detects the current encoding and
 rewrites files in UTF-8 while storing a detailed JSON log for auditing.
+Charset declarations (``<meta charset>``, ``http-equiv`` and the XML prolog)
+are switched to UTF-8 in the same pass, so each file is read and written once.
 """
 
 from __future__ import annotations
 
 import argparse
+import codecs
 import datetime as dt
 import hashlib
 import json
-from dataclasses import dataclass, asdict
+import mmap
+import os
+import re
+from dataclasses import dataclass, asdict, field
 from pathlib import Path
-from typing import Iterable, Iterator, List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
 try:
     import chardet
 except ImportError:  # pragma: no cover - fallback in test environment
     chardet = None
 
+try:
+    from . import profiling
+    from .walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, iter_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, iter_files  # type: ignore
+
 
 SUPPORTED_SUFFIXES = {".html", ".htm", ".xml", ".xhtml"}
 DEFAULT_LIMIT = 150
+# Files above the threshold are memory-mapped and processed chunk by chunk so
+# peak memory stays proportional to CHUNK_SIZE rather than to the file size.
+LARGE_FILE_THRESHOLD = 8 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+UTF8_BOM = b"\xef\xbb\xbf"
 
 WINDOWS_1251_HINTS = (
     b"charset=windows-1251",
@@ -31,6 +49,46 @@ WINDOWS_1251_HINTS = (
     b"encoding=\"windows-1251\"",
     b"encoding='windows-1251'",
 )
+_HINTS_RE = re.compile(b"|".join(re.escape(hint) for hint in WINDOWS_1251_HINTS), re.IGNORECASE)
+_HINT_OVERLAP = max(len(hint) for hint in WINDOWS_1251_HINTS) - 1
+_WIDE_CHAR_RE = re.compile("[^\x00-\xff]")
+_CYRILLIC_RE = re.compile("[\u0400-\u04ff]")
+
+
+def _build_per_char_table() -> dict:
+    table = {}
+    for code in range(256):
+        try:
+            decoded = bytes([code]).decode("windows-1251")
+        except UnicodeDecodeError:
+            continue
+        if decoded != chr(code):
+            table[code] = decoded
+    return table
+
+
+# Maps every code point in the 0-255 range to its Windows-1251 reading; bytes
+# that are undefined in Windows-1251 (0x98) are left as they are.
+_PER_CHAR_TABLE = _build_per_char_table()
+
+# Charset declarations are rewritten to UTF-8 in the same pass that transcodes
+# the payload, so converted files never need a second read/write cycle.
+META_TAG_RE = re.compile(r"<meta\b[^>]*>", re.IGNORECASE)
+META_CHARSET_RE = re.compile(r"(charset\s*=\s*[\"']?)([\w.:-]+)", re.IGNORECASE)
+XML_DECLARATION_RE = re.compile(r"\ufeff?\s*<\?xml\b[^>]*?\?>", re.IGNORECASE)
+XML_ENCODING_RE = re.compile(r"(encoding\s*=\s*[\"'])([\w.:-]+)", re.IGNORECASE)
+UTF8_LABELS = {"utf-8", "utf8"}
+
+
+@dataclass
+class CharsetRewrite:
+    """A single charset declaration rewritten to UTF-8."""
+
+    kind: str
+    line: int
+    column: int
+    original: str
+    replacement: str
 
 
 @dataclass
@@ -44,18 +102,13 @@ class FileReport:
     original_hash: Optional[str] = None
     new_hash: Optional[str] = None
     error: Optional[str] = None
+    charset_rewrites: List[CharsetRewrite] = field(default_factory=list)
 
 
-def discover_files(paths: Iterable[Path]) -> Iterator[Path]:
+def discover_files(paths: Iterable[Path], ignore: IgnoreRules = DEFAULT_IGNORE) -> Iterator[Path]:
     """Yield candidate files within the provided paths."""
 
-    for path in paths:
-        if path.is_dir():
-            for child in sorted(path.rglob("*")):
-                if child.is_file() and child.suffix.lower() in SUPPORTED_SUFFIXES:
-                    yield child
-        elif path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
-            yield path
+    return iter_files(paths, suffixes=SUPPORTED_SUFFIXES, ignore=ignore)
 
 
 def _canonicalise(encoding: str) -> str:
@@ -67,6 +120,7 @@ def _canonicalise(encoding: str) -> str:
     return normalized
 
 
+@profiling.timed("detect")
 def detect_encoding(data: bytes) -> Optional[str]:
     """Return the best-effort encoding for the given payload."""
 
@@ -117,8 +171,7 @@ def _maybe_decode_double_encoded(payload: bytes) -> Optional[str]:
     proceed unchanged.
     """
 
-    lowered = payload.lower()
-    if not any(hint in lowered for hint in WINDOWS_1251_HINTS):
+    if _HINTS_RE.search(payload) is None:
         return None
 
     try:
@@ -126,49 +179,411 @@ def _maybe_decode_double_encoded(payload: bytes) -> Optional[str]:
     except UnicodeDecodeError:
         return None
 
+    per_char = _WIDE_CHAR_RE.search(text) is not None
     try:
-        raw_bytes = text.encode("latin1")
-    except UnicodeEncodeError:
-        # Some double-encoded documents contain punctuation such as en-dash
-        # (`\u2013`) that falls outside of Latin-1.  When that happens we fall
-        # back to a per-character conversion: treat every code point within the
-        # 0-255 range as if it were a Windows-1251 byte while leaving genuine
-        # Unicode characters intact.
-        recovered_chars = []
-        changed = False
-        for char in text:
-            code = ord(char)
-            if code <= 0xFF:
-                try:
-                    decoded_char = bytes([code]).decode("windows-1251")
-                except UnicodeDecodeError:
-                    decoded_char = char
-                if decoded_char != char:
-                    changed = True
-                recovered_chars.append(decoded_char)
-            else:
-                recovered_chars.append(char)
-        if not changed:
-            return None
-        recovered = "".join(recovered_chars)
-    else:
-        try:
-            recovered = raw_bytes.decode("windows-1251")
-        except UnicodeDecodeError:
-            return None
+        recovered = _recover_text(text, per_char)
+    except UnicodeDecodeError:
+        return None
+    if per_char and recovered == text:
+        return None
 
-    if not any("\u0400" <= char <= "\u04ff" for char in recovered):
+    if _CYRILLIC_RE.search(recovered) is None:
         return None
 
     return recovered
 
 
+def _recover_text(text: str, per_char: bool) -> str:
+    """Reinterpret Latin-1 mojibake in ``text`` as Windows-1251.
+
+    Raises ``UnicodeDecodeError`` when the strict conversion hits a byte that
+    Windows-1251 does not define.
+    """
+
+    if not per_char:
+        return text.encode("latin1").decode("windows-1251")
+    # Some double-encoded documents contain punctuation such as en-dash
+    # (`\u2013`) that falls outside of Latin-1.  When that happens we fall
+    # back to a per-character conversion: treat every code point within the
+    # 0-255 range as if it were a Windows-1251 byte while leaving genuine
+    # Unicode characters intact.
+    return text.translate(_PER_CHAR_TABLE)
+
+
+def _position(text: str, index: int) -> Tuple[int, int]:
+    line = text.count("\n", 0, index) + 1
+    column = index - (text.rfind("\n", 0, index) + 1) + 1
+    return line, column
+
+
+def rewrite_charset_declarations(text: str, *, at_start: bool = True) -> Tuple[str, List[CharsetRewrite]]:
+    """Point ``<meta>`` charsets and the XML prolog encoding at UTF-8.
+
+    Only declarations that name something other than UTF-8 are touched.  The
+    XML prolog is considered only when ``at_start`` is set, because it is
+    valid exclusively at the beginning of a document.  Positions in the
+    returned rewrites are 1-based line/column pairs of the declared value in
+    ``text``.
+    """
+
+    rewrites: List[CharsetRewrite] = []
+    pieces: List[str] = []
+    cursor = 0
+
+    def replace_value(kind: str, tag: re.Match, value_re: re.Pattern, replacement: str) -> None:
+        nonlocal cursor
+        for value in value_re.finditer(tag.group(0)):
+            if value.group(2).lower() in UTF8_LABELS:
+                continue
+            start = tag.start() + value.start(2)
+            end = tag.start() + value.end(2)
+            line, column = _position(text, start)
+            pieces.append(text[cursor:start])
+            pieces.append(replacement)
+            cursor = end
+            rewrites.append(
+                CharsetRewrite(
+                    kind=kind,
+                    line=line,
+                    column=column,
+                    original=value.group(2),
+                    replacement=replacement,
+                )
+            )
+
+    if at_start:
+        prolog = XML_DECLARATION_RE.match(text)
+        if prolog:
+            replace_value("xml", prolog, XML_ENCODING_RE, "UTF-8")
+
+    for tag in META_TAG_RE.finditer(text):
+        replace_value("meta", tag, META_CHARSET_RE, "utf-8")
+
+    if not rewrites:
+        return text, rewrites
+    pieces.append(text[cursor:])
+    return "".join(pieces), rewrites
+
+
+class _CharsetStreamRewriter:
+    """Apply :func:`rewrite_charset_declarations` to text arriving in chunks.
+
+    A trailing, still unclosed tag is held back until the next chunk so a
+    declaration split across a chunk boundary is still recognised.
+    """
+
+    MAX_CARRY = 4096
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.rewrites: List[CharsetRewrite] = []
+        self._carry = ""
+        self._at_start = True
+        self._line = 1
+        self._column = 1
+
+    def feed(self, text: str) -> str:
+        if not self.enabled:
+            return text
+        text = self._carry + text
+        cut = text.rfind("<")
+        if cut != -1 and text.find(">", cut) == -1 and len(text) - cut <= self.MAX_CARRY:
+            text, self._carry = text[:cut], text[cut:]
+        else:
+            self._carry = ""
+        return self._process(text)
+
+    def flush(self) -> str:
+        text, self._carry = self._carry, ""
+        return self._process(text)
+
+    def _process(self, segment: str) -> str:
+        if not segment:
+            return segment
+        updated, rewrites = rewrite_charset_declarations(segment, at_start=self._at_start)
+        self._at_start = False
+        for rewrite in rewrites:
+            if rewrite.line == 1:
+                rewrite.column += self._column - 1
+            rewrite.line += self._line - 1
+        self.rewrites.extend(rewrites)
+        newlines = segment.count("\n")
+        if newlines:
+            self._line += newlines
+            self._column = len(segment) - segment.rfind("\n")
+        else:
+            self._column += len(segment)
+        return updated
+
+
+class _StreamRecovery:
+    """Chunk-wise counterpart of :func:`_maybe_decode_double_encoded`."""
+
+    def __init__(self, per_char: bool) -> None:
+        self.per_char = per_char
+        self.changed = False
+        self.cyrillic = False
+
+    def __call__(self, text: str) -> str:
+        recovered = _recover_text(text, self.per_char)
+        self.changed = self.changed or recovered != text
+        self.cyrillic = self.cyrillic or _CYRILLIC_RE.search(recovered) is not None
+        return recovered
+
+    @property
+    def succeeded(self) -> bool:
+        return self.cyrillic and (self.changed or not self.per_char)
+
+
+@profiling.timed("hash")
 def compute_md5(data: bytes) -> str:
     return hashlib.md5(data).hexdigest()
 
 
-def convert_file(path: Path) -> FileReport:
-    payload = path.read_bytes()
+def _iter_chunks(view: mmap.mmap, chunk_size: int) -> Iterator[bytes]:
+    for offset in range(0, len(view), chunk_size):
+        yield view[offset : offset + chunk_size]
+
+
+def _scan_view(view: mmap.mmap, chunk_size: int) -> Tuple[str, Optional[str], bool, bool]:
+    """Hash the mapped file and validate UTF-8 in one sequential pass.
+
+    Returns the MD5 digest, the UTF-8 validation error (``None`` when the
+    payload is valid UTF-8), whether a Windows-1251 hint is present and
+    whether the UTF-8 text contains code points above U+00FF.
+    """
+
+    digest = hashlib.md5()
+    decoder = codecs.getincrementaldecoder("utf-8")("strict")
+    utf8_error: Optional[str] = None
+    has_hint = False
+    wide = False
+    tail = b""
+    for chunk in _iter_chunks(view, chunk_size):
+        digest.update(chunk)
+        if not has_hint:
+            window = tail + chunk
+            has_hint = _HINTS_RE.search(window) is not None
+            tail = window[-_HINT_OVERLAP:]
+        if utf8_error is None:
+            try:
+                text = decoder.decode(chunk)
+            except UnicodeDecodeError as exc:
+                utf8_error = str(exc)
+            else:
+                wide = wide or _WIDE_CHAR_RE.search(text) is not None
+    if utf8_error is None:
+        try:
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError as exc:
+            utf8_error = str(exc)
+    return digest.hexdigest(), utf8_error, has_hint, wide
+
+
+def _detect_view_encoding(view: mmap.mmap, chunk_size: int) -> Optional[str]:
+    """Chunked equivalent of :func:`detect_encoding` for non-UTF-8 payloads."""
+
+    if chardet is not None:
+        detector = chardet.UniversalDetector()
+        for chunk in _iter_chunks(view, chunk_size):
+            detector.feed(chunk)
+            if detector.done:
+                break
+        detector.close()
+        encoding = detector.result.get("encoding")
+        if encoding:
+            return _canonicalise(encoding)
+
+    for candidate in ("windows-1251", "koi8-r", "iso-8859-5"):
+        decoder = codecs.getincrementaldecoder(candidate)("strict")
+        try:
+            for chunk in _iter_chunks(view, chunk_size):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            continue
+        return candidate
+    return None
+
+
+def _stream_transcode(
+    view: mmap.mmap,
+    chunk_size: int,
+    target: Path,
+    encoding: str,
+    *,
+    rewrite_charset: bool,
+    recover: Optional[Callable[[str], str]] = None,
+) -> Tuple[str, List[CharsetRewrite]]:
+    """Decode ``view`` chunk by chunk and write UTF-8 to ``target``.
+
+    Returns the MD5 of the written bytes and the charset rewrites applied.
+    """
+
+    decoder = codecs.getincrementaldecoder(encoding)("strict")
+    rewriter = _CharsetStreamRewriter(rewrite_charset)
+    digest = hashlib.md5()
+    with target.open("wb") as handle:
+
+        def emit(text: str) -> None:
+            data = text.encode("utf-8")
+            digest.update(data)
+            handle.write(data)
+
+        for chunk in _iter_chunks(view, chunk_size):
+            text = decoder.decode(chunk)
+            if recover is not None:
+                text = recover(text)
+            emit(rewriter.feed(text))
+        text = decoder.decode(b"", final=True)
+        if recover is not None:
+            text = recover(text)
+        emit(rewriter.feed(text))
+        emit(rewriter.flush())
+    return digest.hexdigest(), rewriter.rewrites
+
+
+def _convert_view(
+    view: mmap.mmap,
+    path: Path,
+    target: Path,
+    *,
+    rewrite_charset: bool,
+    chunk_size: int,
+) -> FileReport:
+    original_hash, utf8_error, has_hint, wide = _scan_view(view, chunk_size)
+
+    if view[:3] == UTF8_BOM or utf8_error is None:
+        detected: Optional[str] = "utf-8"
+    else:
+        detected = _detect_view_encoding(view, chunk_size)
+
+    if detected is None:
+        return FileReport(
+            path=str(path),
+            status="error",
+            original_hash=original_hash,
+            error="encoding detection failed",
+        )
+
+    if detected in {"utf-8", "ascii", "utf_8"}:
+        if utf8_error is not None:
+            return FileReport(
+                path=str(path),
+                status="error",
+                original_hash=original_hash,
+                detected_encoding=detected,
+                error=f"utf-8 validation failed: {utf8_error}",
+            )
+
+        if has_hint:
+            recovery = _StreamRecovery(per_char=wide)
+            try:
+                new_hash, rewrites = _stream_transcode(
+                    view, chunk_size, target, "utf-8", rewrite_charset=rewrite_charset, recover=recovery
+                )
+            except UnicodeDecodeError:
+                pass
+            else:
+                if recovery.succeeded and new_hash != original_hash:
+                    return FileReport(
+                        path=str(path),
+                        status="converted",
+                        original_encoding="windows-1251",
+                        detected_encoding=detected,
+                        original_hash=original_hash,
+                        new_hash=new_hash,
+                        charset_rewrites=rewrites,
+                    )
+
+        if rewrite_charset:
+            new_hash, rewrites = _stream_transcode(view, chunk_size, target, "utf-8", rewrite_charset=True)
+            if rewrites:
+                return FileReport(
+                    path=str(path),
+                    status="charset_updated",
+                    original_encoding="utf-8",
+                    detected_encoding="utf-8",
+                    original_hash=original_hash,
+                    new_hash=new_hash,
+                    charset_rewrites=rewrites,
+                )
+
+        return FileReport(
+            path=str(path),
+            status="skipped",
+            original_hash=original_hash,
+            new_hash=original_hash,
+            detected_encoding="utf-8",
+            original_encoding="utf-8",
+        )
+
+    try:
+        new_hash, rewrites = _stream_transcode(
+            view, chunk_size, target, detected, rewrite_charset=rewrite_charset
+        )
+    except UnicodeDecodeError as exc:
+        return FileReport(
+            path=str(path),
+            status="error",
+            original_hash=original_hash,
+            detected_encoding=detected,
+            error=f"decode error: {exc}",
+        )
+
+    if new_hash == original_hash:
+        return FileReport(
+            path=str(path),
+            status="skipped",
+            original_hash=original_hash,
+            new_hash=original_hash,
+            detected_encoding=detected,
+            original_encoding=detected,
+        )
+
+    return FileReport(
+        path=str(path),
+        status="converted",
+        original_encoding=detected,
+        detected_encoding=detected,
+        original_hash=original_hash,
+        new_hash=new_hash,
+        charset_rewrites=rewrites,
+    )
+
+
+@profiling.timed("stream")
+def convert_large_file(path: Path, *, rewrite_charset: bool = True, chunk_size: int = CHUNK_SIZE) -> FileReport:
+    """Memory-mapped variant of :func:`convert_file` for big documents.
+
+    The output is streamed into a temporary sibling file which replaces the
+    original only when the content actually changed.
+    """
+
+    target = path.with_name(path.name + ".reencode-tmp")
+    try:
+        with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            report = _convert_view(view, path, target, rewrite_charset=rewrite_charset, chunk_size=chunk_size)
+        if report.status in {"converted", "charset_updated"}:
+            os.replace(target, path)
+    finally:
+        if target.exists():
+            target.unlink()
+    return report
+
+
+def convert_file(
+    path: Path,
+    *,
+    rewrite_charset: bool = True,
+    large_file_threshold: int = LARGE_FILE_THRESHOLD,
+    chunk_size: int = CHUNK_SIZE,
+) -> FileReport:
+    if path.stat().st_size > large_file_threshold:
+        return convert_large_file(path, rewrite_charset=rewrite_charset, chunk_size=chunk_size)
+
+    with profiling.phase("read"):
+        payload = path.read_bytes()
     original_hash = compute_md5(payload)
 
     if not payload:
@@ -194,7 +609,7 @@ def convert_file(path: Path) -> FileReport:
     # auto-recover mojibake when the markup still declares Windows-1251.
     if detected in {"utf-8", "ascii", "utf_8"}:
         try:
-            payload.decode("utf-8", errors="strict")
+            text = payload.decode("utf-8", errors="strict")
         except UnicodeDecodeError as exc:
             return FileReport(
                 path=str(path),
@@ -206,9 +621,13 @@ def convert_file(path: Path) -> FileReport:
 
         recovered = _maybe_decode_double_encoded(payload)
         if recovered is not None:
+            rewrites: List[CharsetRewrite] = []
+            if rewrite_charset:
+                recovered, rewrites = rewrite_charset_declarations(recovered)
             reencoded = recovered.encode("utf-8")
             if reencoded != payload:
-                path.write_bytes(reencoded)
+                with profiling.phase("write"):
+                    path.write_bytes(reencoded)
                 return FileReport(
                     path=str(path),
                     status="converted",
@@ -216,6 +635,24 @@ def convert_file(path: Path) -> FileReport:
                     detected_encoding=detected,
                     original_hash=original_hash,
                     new_hash=compute_md5(reencoded),
+                    charset_rewrites=rewrites,
+                )
+
+        if rewrite_charset:
+            # Content is fine, but the markup may still claim a legacy charset.
+            updated, rewrites = rewrite_charset_declarations(text)
+            if rewrites:
+                reencoded = updated.encode("utf-8")
+                with profiling.phase("write"):
+                    path.write_bytes(reencoded)
+                return FileReport(
+                    path=str(path),
+                    status="charset_updated",
+                    original_encoding="utf-8",
+                    detected_encoding="utf-8",
+                    original_hash=original_hash,
+                    new_hash=compute_md5(reencoded),
+                    charset_rewrites=rewrites,
                 )
 
         return FileReport(
@@ -238,6 +675,9 @@ def convert_file(path: Path) -> FileReport:
             error=f"decode error: {exc}",
         )
 
+    rewrites = []
+    if rewrite_charset:
+        decoded, rewrites = rewrite_charset_declarations(decoded)
     reencoded = decoded.encode("utf-8")
 
     if reencoded == payload:
@@ -251,7 +691,8 @@ def convert_file(path: Path) -> FileReport:
             original_encoding=detected,
         )
 
-    path.write_bytes(reencoded)
+    with profiling.phase("write"):
+        path.write_bytes(reencoded)
 
     return FileReport(
         path=str(path),
@@ -260,6 +701,7 @@ def convert_file(path: Path) -> FileReport:
         detected_encoding=detected,
         original_hash=original_hash,
         new_hash=compute_md5(reencoded),
+        charset_rewrites=rewrites,
     )
 
 
@@ -267,7 +709,7 @@ def ensure_logs_dir(log_dir: Path) -> None:
     log_dir.mkdir(parents=True, exist_ok=True)
 
 
-def write_log(log_dir: Path, records: List[FileReport]) -> Path:
+def write_log(log_dir: Path, records: List[FileReport], profile: Optional[dict] = None) -> Path:
     ensure_logs_dir(log_dir)
     timestamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     output_path = log_dir / f"reencode-{timestamp}.json"
@@ -275,6 +717,8 @@ def write_log(log_dir: Path, records: List[FileReport]) -> Path:
         "generated_at": timestamp,
         "files": [asdict(record) for record in records],
     }
+    if profile is not None:
+        serialised["profile"] = profile
     output_path.write_text(json.dumps(serialised, ensure_ascii=False, indent=2), "utf-8")
     return output_path
 
@@ -296,6 +740,22 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         default=Path("logs"),
         help="Where to store JSON reports (default: ./logs).",
     )
+    parser.add_argument(
+        "--large-file-threshold",
+        type=int,
+        default=LARGE_FILE_THRESHOLD,
+        help=(
+            "Files larger than this many bytes are memory-mapped and converted "
+            f"in {CHUNK_SIZE // 1024} KiB chunks (default: {LARGE_FILE_THRESHOLD})."
+        ),
+    )
+    parser.add_argument(
+        "--keep-charset",
+        action="store_true",
+        help="Leave <meta> charset and XML prolog declarations untouched.",
+    )
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
     return parser.parse_args(argv)
 
 
@@ -306,20 +766,33 @@ def main(argv: Optional[List[str]] = None) -> int:
     else:
         candidates = [Path(path) for path in args.scope]
 
-    files = list(discover_files(candidates))
-    if args.limit and len(files) > args.limit:
-        files = files[: args.limit]
-
-    reports: List[FileReport] = []
-    for path in files:
-        reports.append(convert_file(path))
+    with profiling.session(args) as profiler:
+        with profiling.phase("walk"):
+            files = list(discover_files(candidates, ignore_rules_from_args(args)))
+        if args.limit and len(files) > args.limit:
+            files = files[: args.limit]
+
+        reports: List[FileReport] = []
+        for path in files:
+            with profiling.track_file(path):
+                reports.append(
+                    convert_file(
+                        path,
+                        rewrite_charset=not args.keep_charset,
+                        large_file_threshold=args.large_file_threshold,
+                    )
+                )
 
-    log_path = write_log(Path(args.log_dir), reports)
+        log_path = write_log(Path(args.log_dir), reports, profile=profiling.report_of(profiler))
 
     converted = sum(1 for report in reports if report.status == "converted")
+    charset_updated = sum(1 for report in reports if report.status == "charset_updated")
     errors = [report for report in reports if report.status == "error"]
 
-    print(f"Processed {len(reports)} file(s); converted {converted}; log: {log_path}")
+    print(
+        f"Processed {len(reports)} file(s); converted {converted}; "
+        f"charset updated {charset_updated}; log: {log_path}"
+    )
     if errors:
         print("Errors detected:")
         for report in errors:
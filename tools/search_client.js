@@ -0,0 +1,240 @@
+/* Client of the static search index written by tools/search_index.py.
+ *
+ * A query is split and stemmed exactly as the pages were (stem() is a port
+ * of tools/stemmer.py, words() of search_index.words(); keep them in step).
+ * Only manifest.json, the shards of the query terms and the doc chunks of the
+ * best hits are fetched. A page is ranked by the number of query terms it
+ * contains, then by the sum of their precomputed BM25 scores; the last term
+ * also matches longer terms while it is being typed.
+ *
+ * window.siteSearch(query, limit) resolves to [{url, title, summary, score}].
+ * A page with <form data-search> (an input named "q") and an element with
+ * data-search-results gets results rendered on submit and for ?q= / ?s=.
+ */
+(function () {
+  "use strict";
+
+  const VOWELS = "аеиоуыэюя";
+  const PERFECTIVE_GERUND = [["в", "вши", "вшись"], ["ив", "ивши", "ившись", "ыв", "ывши", "ывшись"]];
+  const ADJECTIVE = [
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+  ];
+  const PARTICIPLE = [["ем", "нн", "вш", "ющ", "щ"], ["ивш", "ывш", "ующ"]];
+  const REFLEXIVE = ["ся", "сь"];
+  const VERB = [
+    ["ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"],
+    [
+      "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+      "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю",
+    ],
+  ];
+  const NOUN = [
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+    "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я",
+  ];
+  const DERIVATIONAL = ["ост", "ость"];
+  const TIDY_UP = ["ейш", "ейше", "н", "ь"];
+  const MIN_WORD_LENGTH = 2;
+  const MAX_WORD_LENGTH = 32;
+
+  function gopast(word, position, vowel) {
+    for (let index = position; index < word.length; index++) {
+      if (VOWELS.includes(word[index]) === vowel) return index + 1;
+    }
+    return -1;
+  }
+
+  function longest(word, limit, endings) {
+    let best = null;
+    for (const ending of endings) {
+      if (word.endsWith(ending) && word.length - ending.length >= limit && (best === null || ending.length > best.length)) {
+        best = ending;
+      }
+    }
+    return best;
+  }
+
+  function removeGrouped(word, rv, groups) {
+    const ending = longest(word, rv, groups[0].concat(groups[1]));
+    if (ending === null) return null;
+    const stem = word.slice(0, word.length - ending.length);
+    if (groups[0].includes(ending) && !(stem.length > rv && "ая".includes(stem[stem.length - 1]))) return null;
+    return stem;
+  }
+
+  function remove(word, rv, endings) {
+    const ending = longest(word, rv, endings);
+    return ending === null ? null : word.slice(0, word.length - ending.length);
+  }
+
+  function stem(word) {
+    word = word.replace(/ё/g, "е");
+    const rv = gopast(word, 0, true);
+    if (rv < 0 || rv >= word.length) return word;
+    const r1 = gopast(word, rv, false);
+    const vowel = r1 >= 0 ? gopast(word, r1, true) : -1;
+    let r2 = vowel >= 0 ? gopast(word, vowel, false) : -1;
+    if (r2 < 0) r2 = word.length;
+
+    const gerund = removeGrouped(word, rv, PERFECTIVE_GERUND);
+    if (gerund !== null) {
+      word = gerund;
+    } else {
+      word = remove(word, rv, REFLEXIVE) || word;
+      const adjective = remove(word, rv, ADJECTIVE);
+      if (adjective !== null) {
+        word = removeGrouped(adjective, rv, PARTICIPLE) || adjective;
+      } else {
+        word = removeGrouped(word, rv, VERB) || remove(word, rv, NOUN) || word;
+      }
+    }
+
+    if (word.endsWith("и") && word.length - 1 >= rv) word = word.slice(0, -1);
+
+    let ending = longest(word, Math.max(rv, r2), DERIVATIONAL);
+    if (ending !== null) word = word.slice(0, word.length - ending.length);
+
+    ending = longest(word, rv, TIDY_UP);
+    if (ending === "ь") {
+      word = word.slice(0, -1);
+    } else if (ending !== null) {
+      if (ending !== "н") word = word.slice(0, word.length - ending.length);
+      if (word.endsWith("нн") && word.length - 2 >= rv) word = word.slice(0, -1);
+    }
+    return word;
+  }
+
+  function words(text, stopwords) {
+    const found = text.toLowerCase().replace(/\u0301/g, "").replace(/ё/g, "е").match(/[0-9a-zа-я]+/g) || [];
+    return found.filter(
+      (word) => word.length >= MIN_WORD_LENGTH && word.length <= MAX_WORD_LENGTH && !stopwords.has(word)
+    );
+  }
+
+  function shardName(prefix) {
+    return Array.from(prefix, (char) => char.codePointAt(0).toString(16)).join("-");
+  }
+
+  // The shard of a term is the longest listed prefix it starts with (see search_index.plan_shards).
+  function shardOf(term, manifest, shards) {
+    const shortest = Math.min(term.length, manifest.prefix_length);
+    for (let length = Math.min(term.length, manifest.max_prefix_length); length >= shortest; length--) {
+      const name = shardName(term.slice(0, length));
+      if (shards.has(name)) return name;
+    }
+    return null;
+  }
+
+  // Longer terms that start with a partly typed one may sit in shards split off by longer prefixes.
+  function completionShards(term, own, manifest) {
+    const name = shardName(term);
+    return manifest.shards.filter((shard) => shard !== own && (shard === name || shard.startsWith(`${name}-`)));
+  }
+
+  const script = typeof document !== "undefined" ? document.currentScript : null;
+  const base = script ? new URL(".", script.src).href : "";
+  const loaded = new Map();
+
+  function load(path) {
+    if (!loaded.has(path)) {
+      loaded.set(
+        path,
+        fetch(base + path).then((response) => {
+          if (!response.ok) throw new Error(`${path}: HTTP ${response.status}`);
+          return response.json();
+        })
+      );
+    }
+    return loaded.get(path);
+  }
+
+  async function search(query, limit = 20) {
+    const manifest = await load("manifest.json");
+    const stopwords = new Set(manifest.stopwords);
+    const shards = new Set(manifest.shards);
+    const terms = Array.from(new Set(words(query, stopwords).map(stem)));
+    const names = terms.map((term) => shardOf(term, manifest, shards));
+    const postings = await Promise.all(names.map((name) => (name === null ? {} : load(`terms/${name}.json`))));
+
+    const scores = new Map();
+    const matched = new Map();
+    for (const [position, term] of terms.entries()) {
+      const own = postings[position];
+      let lists = Object.prototype.hasOwnProperty.call(own, term) ? [own[term]] : [];
+      if (!lists.length && position === terms.length - 1 && term.length >= manifest.prefix_length) {
+        const split = await Promise.all(completionShards(term, names[position], manifest).map((name) => load(`terms/${name}.json`)));
+        lists = [own, ...split].flatMap((shard) =>
+          Object.keys(shard).filter((key) => key.startsWith(term)).map((key) => shard[key])
+        );
+      }
+      for (const flat of lists) {
+        let doc = 0;
+        for (let index = 0; index < flat.length; index += 2) {
+          doc += flat[index];
+          scores.set(doc, (scores.get(doc) || 0) + flat[index + 1]);
+          if (!matched.has(doc)) matched.set(doc, new Set());
+          matched.get(doc).add(position);
+        }
+      }
+    }
+
+    const best = Array.from(scores.keys())
+      .sort((a, b) => matched.get(b).size - matched.get(a).size || scores.get(b) - scores.get(a) || a - b)
+      .slice(0, limit);
+    const chunks = Array.from(new Set(best.map((doc) => Math.floor(doc / manifest.docs_per_chunk))));
+    const documents = new Map(
+      await Promise.all(chunks.map(async (chunk) => [chunk, await load(`docs/${chunk}.json`)]))
+    );
+    return best.map((doc) => {
+      const [url, title, summary] = documents.get(Math.floor(doc / manifest.docs_per_chunk))[doc % manifest.docs_per_chunk];
+      return { url, title, summary, score: scores.get(doc) };
+    });
+  }
+
+  function bind() {
+    const form = document.querySelector("form[data-search]");
+    const list = document.querySelector("[data-search-results]");
+    if (!form || !list) return;
+    const input = form.querySelector('input[name="q"]');
+
+    async function run(query) {
+      const results = await search(query);
+      list.textContent = "";
+      for (const result of results) {
+        const item = document.createElement("li");
+        const link = document.createElement("a");
+        link.href = result.url;
+        link.textContent = result.title;
+        const summary = document.createElement("p");
+        summary.textContent = result.summary;
+        item.append(link, summary);
+        list.append(item);
+      }
+      if (!results.length && query.trim()) {
+        const item = document.createElement("li");
+        item.textContent = "Ничего не найдено";
+        list.append(item);
+      }
+    }
+
+    form.addEventListener("submit", (event) => {
+      event.preventDefault();
+      history.replaceState(null, "", `?q=${encodeURIComponent(input.value)}`);
+      run(input.value);
+    });
+    const params = new URLSearchParams(location.search);
+    const initial = params.get("q") || params.get("s");
+    if (initial) {
+      input.value = initial;
+      run(initial);
+    }
+  }
+
+  if (typeof window !== "undefined") {
+    window.siteSearch = search;
+    if (document.readyState === "loading") document.addEventListener("DOMContentLoaded", bind);
+    else bind();
+  }
+  if (typeof module !== "undefined") module.exports = { stem, words, shardName, search };
+})();
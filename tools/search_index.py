@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""Build a static, sharded full-text search index of the mirror.
+
+The WordPress search is gone with the backend.
+``python -m tools search-index`` replaces it with files Cloudflare Pages
+can serve:
+
+1. the visible text of every deployed page (the pages ``build_site.py``
+   copies, without those ``_redirects`` sends elsewhere or those marked
+   ``noindex``) is extracted with the ``check_utf8`` SEO parser and the
+   UTF-8/Windows-1251 decoding of ``fileio``. Text inside ``<head>``,
+   ``<script>``, ``<style>``, ``<noscript>``, ``<template>`` and ``<svg>``
+   is skipped;
+2. words are lower-cased, stop words dropped and the rest reduced by the
+   Snowball Russian stemmer (``stemmer.py``). Title words count
+   ``TITLE_WEIGHT`` times, ``<h1>`` and meta description words
+   ``HEADING_WEIGHT`` times;
+3. each (term, page) pair gets a precomputed BM25 score, so the client only
+   adds numbers. Postings are split into ``terms/<prefix>.json`` shards by
+   the first ``--prefix-length`` characters of the term; shards over
+   ``--shard-bytes`` are split further by longer prefixes (see
+   ``plan_shards``). Page titles, URLs and summaries go into
+   ``docs/<n>.json`` chunks of ``DOCS_PER_CHUNK``.
+
+``search.js`` (``tools/search_client.js``) stems a query the same way and
+fetches ``manifest.json``, the shards of its terms and the doc chunks of
+the best hits, nothing else. ``index.html`` is a minimal results page that
+also answers WordPress-style ``?s=`` links.
+
+Extraction is cached in ``artifacts/search_cache.json``: pages whose size
+and ``mtime_ns`` are unchanged are not read again, the others are parsed in
+``--jobs`` worker processes. Only output files whose bytes change are
+written, and stale shards are removed. Run it after ``python -m tools
+build``, which replaces ``dist/``. The report goes to
+``logs/search_index-<timestamp>.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from . import profiling
+    from .build_site import DEFAULT_OUTPUT as BUILD_OUTPUT
+    from .build_site import deploy_ignore, is_build
+    from .check_utf8 import SeoHTMLParser
+    from .fileio import decode_page
+    from .list_assets import HTML_EXTENSIONS, PROJECT_ROOT
+    from .redirect_map import load_redirects, page_url, redirected_files
+    from .stemmer import stem
+    from .walker import IgnoreRules, add_ignore_arguments, ignore_rules_from_args, scan_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from build_site import DEFAULT_OUTPUT as BUILD_OUTPUT  # type: ignore
+    from build_site import deploy_ignore, is_build  # type: ignore
+    from check_utf8 import SeoHTMLParser  # type: ignore
+    from fileio import decode_page  # type: ignore
+    from list_assets import HTML_EXTENSIONS, PROJECT_ROOT  # type: ignore
+    from redirect_map import load_redirects, page_url, redirected_files  # type: ignore
+    from stemmer import stem  # type: ignore
+    from walker import IgnoreRules, add_ignore_arguments, ignore_rules_from_args, scan_files  # type: ignore
+
+DEFAULT_OUTPUT = BUILD_OUTPUT / "search"
+DEFAULT_CACHE = PROJECT_ROOT / "artifacts" / "search_cache.json"
+LOG_DIR = PROJECT_ROOT / "logs"
+CLIENT_SCRIPT = Path(__file__).resolve().parent / "search_client.js"
+# Bump when extraction or stemming changes, so cached pages are re-read.
+CACHE_VERSION = "1"
+FORMAT_VERSION = 1
+DEFAULT_PREFIX_LENGTH = 2
+MAX_PREFIX_LENGTH = 6
+DEFAULT_SHARD_BYTES = 16 * 1024
+DOCS_PER_CHUNK = 100
+TITLE_WEIGHT = 5
+HEADING_WEIGHT = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+SCORE_SCALE = 100
+SUMMARY_LENGTH = 200
+MIN_WORD_LENGTH = 2
+MAX_WORD_LENGTH = 32
+HIDDEN_TAGS = frozenset({"head", "script", "style", "noscript", "template", "svg"})
+# Kept in step with words() in search_client.js.
+WORD_RE = re.compile("[0-9a-zа-я]+")
+STRESS_MARK = "\u0301"
+STOPWORDS = frozenset(
+    """
+    а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до его
+    ее ей ему если есть еще же за здесь и из или им их к как какой когда кто ли либо между меня мне мной
+    мы на над нам нас не него нее нет ни них но ну о об однако он она они оно от по под после при про раз
+    с себя со так также такой там те тем то того тоже той только том ты у уже хотя чего чем что чтобы эта
+    эти это этого этой этом этот я
+    """.split()
+)
+
+
+@dataclass
+class SearchStats:
+    pages: int = 0
+    extracted: int = 0
+    reused: int = 0
+    skipped: Dict[str, int] = field(default_factory=dict)
+    documents: int = 0
+    terms: int = 0
+    shards: int = 0
+    written: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    bytes: int = 0
+
+
+class TextParser(SeoHTMLParser):
+    """SEO fields (title, first ``<h1>``, meta) plus the visible text of a page."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.text_parts: List[str] = []
+        self.hidden: List[str] = []
+        self.noindex = False
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        super().handle_starttag(tag, attrs)
+        if tag == "body":
+            self.hidden = [name for name in self.hidden if name != "head"]
+        elif tag in HIDDEN_TAGS:
+            self.hidden.append(tag)
+        elif tag == "meta":
+            values = {name.lower(): (value or "").lower() for name, value in attrs if name}
+            if values.get("name") == "robots" and "noindex" in values.get("content", ""):
+                self.noindex = True
+        self.text_parts.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        super().handle_endtag(tag)
+        if tag in self.hidden:
+            del self.hidden[len(self.hidden) - 1 - self.hidden[::-1].index(tag) :]
+        self.text_parts.append(" ")
+
+    def handle_data(self, data: str) -> None:
+        super().handle_data(data)
+        if not self.hidden:
+            self.text_parts.append(data)
+
+    def text(self) -> str:
+        return " ".join("".join(self.text_parts).split())
+
+
+def words(text: str) -> List[str]:
+    """Indexable words of ``text``: lower-cased, stress marks removed, ``ё`` as ``е``, stop words dropped."""
+
+    return [
+        word
+        for word in WORD_RE.findall(text.lower().replace(STRESS_MARK, "").replace("ё", "е"))
+        if MIN_WORD_LENGTH <= len(word) <= MAX_WORD_LENGTH and word not in STOPWORDS
+    ]
+
+
+def terms(text: str) -> List[str]:
+    return [stem(word) for word in words(text)]
+
+
+def summary_of(text: str) -> str:
+    if len(text) <= SUMMARY_LENGTH:
+        return text
+    cut = text.rfind(" ", 0, SUMMARY_LENGTH)
+    return text[: cut if cut > 0 else SUMMARY_LENGTH] + "…"
+
+
+def extract_page(item: Tuple[str, str, int, int]) -> Tuple[str, Dict[str, object]]:
+    """Read one page and return its cache entry. Module-level for worker processes."""
+
+    path_str, key, size, mtime_ns = item
+    entry: Dict[str, object] = {"size": size, "mtime_ns": mtime_ns}
+    with profiling.phase("read"):
+        text, _ = decode_page(Path(path_str).read_bytes())
+    if text is None:
+        entry["skipped"] = "undecodable"
+        return key, entry
+    with profiling.phase("parse"):
+        parser = TextParser()
+        parser.feed(text)
+        parser.close()
+    if parser.noindex:
+        entry["skipped"] = "noindex"
+        return key, entry
+    seo = parser.result()
+    body = parser.text()
+    with profiling.phase("stem"):
+        counts = Counter(terms(body))
+        length = sum(counts.values())
+        for term in terms(seo.title or ""):
+            counts[term] += TITLE_WEIGHT
+        for term in terms(seo.h1 or "") + terms(seo.meta.get("description", "")):
+            counts[term] += HEADING_WEIGHT
+    if not counts:
+        entry["skipped"] = "empty"
+        return key, entry
+    title = " ".join((seo.title or seo.h1 or "").split()) or key
+    entry.update(
+        title=title,
+        summary=summary_of(" ".join(seo.meta.get("description", "").split()) or body),
+        length=length,
+        terms=dict(sorted(counts.items())),
+    )
+    return key, entry
+
+
+def load_cache(path: Path) -> Dict[str, Dict[str, object]]:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(payload, dict) or payload.get("version") != CACHE_VERSION:
+        return {}
+    return payload.get("pages", {})
+
+
+def save_cache(path: Path, pages: Dict[str, Dict[str, object]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"version": CACHE_VERSION, "pages": dict(sorted(pages.items()))}
+    path.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")) + "\n", encoding="utf-8")
+
+
+def site_pages(source: Path, output: Path, ignore: IgnoreRules) -> List[Tuple[str, str, int, int]]:
+    """``(path, key, size, mtime_ns)`` of every deployed page below ``source``."""
+
+    redirects = source / "_redirects"
+    skipped = redirected_files(load_redirects(redirects)) if redirects.is_file() else set()
+    pages = []
+    for entry in scan_files(source, suffixes=HTML_EXTENSIONS, ignore=deploy_ignore(ignore, source, output)):
+        key = Path(entry.path).relative_to(source).as_posix()
+        if key in skipped:
+            continue
+        stat = entry.stat()
+        pages.append((entry.path, key, stat.st_size, stat.st_mtime_ns))
+    return pages
+
+
+def _extract_all(pending: Sequence[Tuple[str, str, int, int]], jobs: int) -> Iterable[Tuple[str, Dict[str, object]]]:
+    if jobs <= 1 or len(pending) < 2:
+        for item in pending:
+            with profiling.track_file(item[1]):
+                result = extract_page(item)
+            yield result
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = profiling.map_files(executor, extract_page, pending, chunksize=16, label=lambda item: item[1])
+        yield from profiling.iterate("extract", results)
+
+
+def update_cache(
+    pages: Sequence[Tuple[str, str, int, int]],
+    cache: Dict[str, Dict[str, object]],
+    jobs: int,
+    stats: SearchStats,
+) -> Dict[str, Dict[str, object]]:
+    """Cache entries for ``pages``, re-extracting only those whose size or mtime changed."""
+
+    current: Dict[str, Dict[str, object]] = {}
+    pending = []
+    for item in pages:
+        _, key, size, mtime_ns = item
+        cached = cache.get(key)
+        if cached is not None and (cached.get("size"), cached.get("mtime_ns")) == (size, mtime_ns):
+            current[key] = cached
+            stats.reused += 1
+        else:
+            pending.append(item)
+    for key, entry in _extract_all(pending, jobs):
+        current[key] = entry
+        stats.extracted += 1
+    return dict(sorted(current.items()))
+
+
+def shard_name(prefix: str) -> str:
+    """File name of the shard holding terms that start with ``prefix`` (ASCII, URL-safe)."""
+
+    return "-".join(f"{ord(char):x}" for char in prefix)
+
+
+def _json(value: object) -> bytes:
+    return (json.dumps(value, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def plan_shards(sizes: Dict[str, int], length: int, limit: int) -> Dict[str, str]:
+    """Map every term to the prefix of its shard.
+
+    Terms are grouped by their first ``length`` characters. A group over
+    ``limit`` bytes keeps its terms of ``length`` characters or fewer and
+    splits the longer ones by one more character, up to
+    ``MAX_PREFIX_LENGTH``. A term's shard is thus the longest shard prefix
+    it starts with, which is how the client finds it.
+    """
+
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for term in sizes:
+        groups[term[:length]].append(term)
+    assignment: Dict[str, str] = {}
+    for prefix, members in groups.items():
+        longer = [term for term in members if len(term) > length]
+        if longer and length < MAX_PREFIX_LENGTH and sum(sizes[term] for term in members) > limit:
+            assignment.update((term, prefix) for term in members if len(term) <= length)
+            assignment.update(plan_shards({term: sizes[term] for term in longer}, length + 1, limit))
+        else:
+            assignment.update((term, prefix) for term in members)
+    return assignment
+
+
+def index_files(pages: Dict[str, Dict[str, object]], prefix_length: int, shard_bytes: int) -> Dict[str, bytes]:
+    """Contents of every output file, keyed by path relative to the output directory."""
+
+    documents = [(key, entry) for key, entry in pages.items() if "skipped" not in entry]
+    count = len(documents)
+    average_length = sum(int(entry["length"]) for _, entry in documents) / count if count else 0.0
+    postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+    for number, (_, entry) in enumerate(documents):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * int(entry["length"]) / average_length) if average_length else BM25_K1
+        for term, frequency in entry["terms"].items():  # type: ignore[union-attr]
+            postings[term].append((number, frequency * (BM25_K1 + 1) / (frequency + norm)))
+
+    encoded: Dict[str, List[int]] = {}
+    for term in sorted(postings):
+        entries = postings[term]
+        idf = math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+        # Document numbers are delta-encoded: [doc, score, gap, score, …].
+        flat: List[int] = []
+        previous = 0
+        for number, weight in entries:
+            flat.extend((number - previous, max(1, round(idf * weight * SCORE_SCALE))))
+            previous = number
+        encoded[term] = flat
+
+    sizes = {term: len(_json({term: flat})) for term, flat in encoded.items()}
+    shards: Dict[str, Dict[str, List[int]]] = defaultdict(dict)
+    for term, prefix in plan_shards(sizes, prefix_length, shard_bytes).items():
+        shards[shard_name(prefix)][term] = encoded[term]
+
+    files: Dict[str, bytes] = {}
+    for name, shard in shards.items():
+        files[f"terms/{name}.json"] = _json(shard)
+    for start in range(0, count, DOCS_PER_CHUNK):
+        chunk = documents[start : start + DOCS_PER_CHUNK]
+        files[f"docs/{start // DOCS_PER_CHUNK}.json"] = _json(
+            [[page_url(key), entry["title"], entry["summary"]] for key, entry in chunk]
+        )
+    files["manifest.json"] = _json(
+        {
+            "version": FORMAT_VERSION,
+            "documents": count,
+            "prefix_length": prefix_length,
+            "max_prefix_length": MAX_PREFIX_LENGTH,
+            "docs_per_chunk": DOCS_PER_CHUNK,
+            "stopwords": sorted(STOPWORDS),
+            "shards": sorted(shards),
+        }
+    )
+    files["search.js"] = CLIENT_SCRIPT.read_bytes()
+    files["index.html"] = SEARCH_PAGE.encode("utf-8")
+    return files
+
+
+def write_output(output: Path, files: Dict[str, bytes], stats: SearchStats) -> None:
+    """Write the files whose bytes changed and remove stale shards and doc chunks."""
+
+    for relative, data in sorted(files.items()):
+        target = output / relative
+        stats.bytes += len(data)
+        if target.is_file() and target.read_bytes() == data:
+            stats.unchanged += 1
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        stats.written += 1
+    for directory in ("terms", "docs"):
+        for path in sorted((output / directory).glob("*.json")):
+            if f"{directory}/{path.name}" not in files:
+                path.unlink()
+                stats.removed += 1
+
+
+def build_search_index(
+    source: Path,
+    output: Path,
+    *,
+    cache_path: Path = DEFAULT_CACHE,
+    ignore: IgnoreRules,
+    jobs: int = 1,
+    prefix_length: int = DEFAULT_PREFIX_LENGTH,
+    shard_bytes: int = DEFAULT_SHARD_BYTES,
+) -> SearchStats:
+    stats = SearchStats()
+    with profiling.phase("walk"):
+        pages = site_pages(source, output, ignore)
+    stats.pages = len(pages)
+    cached = update_cache(pages, load_cache(cache_path), jobs, stats)
+    with profiling.phase("write"):
+        save_cache(cache_path, cached)
+    for entry in cached.values():
+        if "skipped" in entry:
+            reason = str(entry["skipped"])
+            stats.skipped[reason] = stats.skipped.get(reason, 0) + 1
+    with profiling.phase("index"):
+        files = index_files(cached, prefix_length, shard_bytes)
+    stats.documents = stats.pages - sum(stats.skipped.values())
+    stats.terms = sum(len(entry.get("terms", {})) for entry in cached.values())  # type: ignore[arg-type]
+    stats.shards = sum(1 for name in files if name.startswith("terms/"))
+    with profiling.phase("write"):
+        write_output(output, files, stats)
+    return stats
+
+
+def write_log(log_dir: Path, stats: SearchStats, output: Path, profile: Optional[dict] = None) -> Path:
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"search_index-{timestamp}.json"
+    payload: Dict[str, object] = {"generated_at": timestamp, "output": str(output), **asdict(stats)}
+    if profile is not None:
+        payload["profile"] = profile
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return output_path
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Directory for the index files (default: dist/search)")
+    parser.add_argument(
+        "--cache", type=Path, default=DEFAULT_CACHE, help="Extraction cache (default: artifacts/search_cache.json)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for extracting changed pages (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--prefix-length",
+        type=int,
+        default=DEFAULT_PREFIX_LENGTH,
+        help=f"Term prefix length that selects a shard (default: {DEFAULT_PREFIX_LENGTH})",
+    )
+    parser.add_argument(
+        "--shard-bytes",
+        type=int,
+        default=DEFAULT_SHARD_BYTES,
+        help=f"Split shards larger than this by a longer prefix (default: {DEFAULT_SHARD_BYTES})",
+    )
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help="Where to store the JSON report (default: logs)")
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    output = args.output.resolve()
+    if output == PROJECT_ROOT or output in PROJECT_ROOT.parents:
+        print(f"Refusing to write the search index into {output}: it contains the source tree", file=sys.stderr)
+        return 1
+    if BUILD_OUTPUT in output.parents and not is_build(BUILD_OUTPUT):
+        print(f"{BUILD_OUTPUT} is not a build yet: run `python -m tools build` first", file=sys.stderr)
+        return 1
+    with profiling.session(args) as profiler:
+        stats = build_search_index(
+            PROJECT_ROOT,
+            output,
+            cache_path=args.cache,
+            ignore=ignore_rules_from_args(args),
+            jobs=args.jobs,
+            prefix_length=args.prefix_length,
+            shard_bytes=args.shard_bytes,
+        )
+        log_path = write_log(args.log_dir, stats, output, profile=profiling.report_of(profiler))
+
+    skipped = ", ".join(f"{count} {reason}" for reason, count in sorted(stats.skipped.items())) or "none"
+    print(
+        f"Indexed {stats.documents} of {stats.pages} pages ({stats.extracted} extracted, {stats.reused} cached; "
+        f"skipped: {skipped}) into {stats.shards} shards, {stats.bytes} bytes in {output} "
+        f"({stats.written} written, {stats.unchanged} unchanged, {stats.removed} removed); log: {log_path}"
+    )
+    return 0
+
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<meta name="robots" content="noindex">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Поиск по сайту</title>
+<style>
+body { font: 16px/1.5 sans-serif; max-width: 44em; margin: 2em auto; padding: 0 1em; }
+input { font: inherit; width: 70%; }
+li { margin-bottom: 1em; }
+</style>
+</head>
+<body>
+<h1>Поиск по сайту</h1>
+<form data-search action="">
+  <input type="search" name="q" autofocus> <button type="submit">Найти</button>
+</form>
+<ol data-search-results></ol>
+<script src="search.js"></script>
+</body>
+</html>
+"""
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
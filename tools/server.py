@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""Resident validation server with a small JSON API.
+
+Every checker run pays interpreter start-up, imports, the SEO baseline load
+and document parsing before it does any work. ``python -m tools serve``
+keeps that state in one long-lived process: the baseline is loaded once and
+every HTML/XML document is parsed once into a
+:class:`document.DocumentCache` that re-reads a file only when its size or
+``mtime_ns`` changed. The server listens on ``127.0.0.1`` and answers:
+
+``GET /status``
+    Root, baseline, cached documents and uptime.
+``GET /check?paths=index.html&paths=rss/index.html``
+    Link and UTF-8 reports for the given files or directories.
+``GET /who-uses?path=css/style.css``
+    Documents that reference an asset.
+``GET /encoding-status?paths=...``
+    Detected/declared encoding and mojibake flags per document.
+``POST /check/links``, ``POST /check/utf8``, ``POST /check``
+    Used by the CLIs (see ``server_client.py``) to forward resolved targets.
+
+Reports have the same layout as the files written by ``check_links.py`` and
+``check_utf8.py``. While running, the URL is recorded in
+``artifacts/validation_server.json`` so the CLIs can find it.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+try:
+    from . import check_links, check_utf8
+    from .document import DocumentCache
+    from .server_client import STATE_FILE
+    from .walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, scan_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import check_links  # type: ignore
+    import check_utf8  # type: ignore
+    from document import DocumentCache  # type: ignore
+    from server_client import STATE_FILE  # type: ignore
+    from walker import (  # type: ignore
+        DEFAULT_IGNORE,
+        IgnoreRules,
+        add_ignore_arguments,
+        ignore_rules_from_args,
+        scan_files,
+    )
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+Target = Tuple[str, Path, Optional[str]]
+
+
+class RequestError(Exception):
+    """A client error reported back as ``{"error": ...}`` with a status code."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class ValidationState:
+    """Baseline and parsed documents shared by all requests."""
+
+    def __init__(
+        self,
+        root: Path = PROJECT_ROOT,
+        baseline: Path = check_utf8.DEFAULT_BASELINE,
+        ignore: IgnoreRules = DEFAULT_IGNORE,
+    ) -> None:
+        self.root = root
+        self.baseline = baseline
+        self.ignore = ignore
+        self.baseline_map = check_utf8.load_baseline(baseline)
+        self.cache = DocumentCache(revalidate=True)
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def document_keys(self, suffixes=check_utf8.TEXT_EXTENSIONS) -> List[str]:
+        return [
+            check_utf8.ensure_relative(Path(entry.path))
+            for entry in scan_files(self.root, suffixes=suffixes, ignore=self.ignore)
+        ]
+
+    def warm(self) -> int:
+        """Parse every document below the root so the first request is fast."""
+
+        keys = self.document_keys()
+        for key in keys:
+            self.cache.document(key)
+        return len(keys)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "root": str(self.root),
+            "baseline": str(self.baseline),
+            "baseline_entries": len(self.baseline_map),
+            "documents_read": self.cache.reads,
+            "uptime_seconds": round(time.time() - self.started, 3),
+        }
+
+    # -- checks -------------------------------------------------------------
+
+    def check_links(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        documents = check_links.analyse_documents(
+            targets=_targets(request),
+            base_url=request.get("base"),
+            timeout=float(request.get("timeout", 10.0)),
+            include_remote=bool(request.get("include_remote", False)),
+            index=self.cache,
+        )
+        return check_links.build_report(documents, request.get("base"), request.get("sources", []))
+
+    def check_utf8(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        baseline = request.get("baseline")
+        if baseline is not None and Path(baseline).resolve() != self.baseline.resolve():
+            raise RequestError(409, f"server holds baseline {self.baseline}, not {baseline}")
+        reports = [
+            check_utf8.inspect_document(
+                source,
+                path,
+                request_path,
+                self.baseline_map,
+                base=request.get("base"),
+                timeout=float(request.get("timeout", 10.0)),
+                index=self.cache,
+            )
+            for source, path, request_path in _targets(request)
+        ]
+        return check_utf8.build_report(
+            reports,
+            manifest=Path(request["manifest"]) if request.get("manifest") else None,
+            baseline=Path(baseline) if baseline is not None else self.baseline,
+            base=request.get("base"),
+        )
+
+    def check_paths(self, paths: Sequence[str]) -> Dict[str, Any]:
+        scopes = [self._resolve(path) for path in paths]
+        sources = [check_links.ensure_relative(scope) for scope in scopes]
+        links_targets = check_links.scope_targets(scopes, self.ignore)
+        utf8_targets = check_utf8.scope_targets(scopes, self.ignore)
+        return {
+            "links": self.check_links({"targets": _encode_targets(links_targets), "sources": sources}),
+            "utf8": self.check_utf8({"targets": _encode_targets(utf8_targets)}),
+        }
+
+    # -- queries ------------------------------------------------------------
+
+    def who_uses(self, path: str) -> Dict[str, Any]:
+        key = check_utf8.ensure_relative(self._resolve(path))
+        users = []
+        for document_key in self.document_keys(check_utf8.HTML_EXTENSIONS):
+            facts = self.cache.document(document_key)
+            if facts is None:
+                continue
+            if any(entry.resolved_path == key for entries in facts.assets.values() for entry in entries):
+                users.append(document_key)
+        return {"path": key, "documents": users}
+
+    def encoding_status(self, paths: Sequence[str]) -> Dict[str, Any]:
+        results = []
+        for path in paths:
+            key = check_utf8.ensure_relative(self._resolve(path))
+            facts = self.cache.document(key)
+            entry: Dict[str, Any] = {"path": key, "exists": facts is not None}
+            if facts is not None:
+                entry.update(
+                    detected_encoding=facts.detected_encoding,
+                    declared_charset=facts.declared_charset,
+                    contains_replacement=facts.contains_replacement,
+                    contains_suspect_sequences=facts.contains_suspect_sequences,
+                )
+            results.append(entry)
+        return {"documents": results}
+
+    def _resolve(self, path: str) -> Path:
+        candidate = Path(path)
+        if not candidate.is_absolute():
+            candidate = self.root / candidate
+        return candidate.resolve()
+
+
+def _targets(request: Dict[str, Any]) -> List[Target]:
+    try:
+        return [(str(source), Path(path), request_path) for source, path, request_path in request["targets"]]
+    except (KeyError, TypeError, ValueError) as exc:
+        raise RequestError(400, f"invalid targets: {exc}") from exc
+
+
+def _encode_targets(targets: Sequence[Target]) -> List[List[Optional[str]]]:
+    return [[source, str(path.resolve()), request_path] for source, path, request_path in targets]
+
+
+def _paths(query: Dict[str, List[str]], name: str) -> List[str]:
+    values = [part for value in query.get(name, []) for part in value.split(",") if part]
+    if not values:
+        raise RequestError(400, f"missing '{name}' parameter")
+    return values
+
+
+class ValidationHandler(BaseHTTPRequestHandler):
+    server_version = "ValidationServer/1"
+    state: ValidationState
+
+    def do_GET(self) -> None:
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        routes = {
+            "/status": lambda: self.state.status(),
+            "/check": lambda: self.state.check_paths(_paths(query, "paths")),
+            "/who-uses": lambda: self.state.who_uses(_paths(query, "path")[0]),
+            "/encoding-status": lambda: self.state.encoding_status(_paths(query, "paths")),
+        }
+        self._dispatch(routes.get(parsed.path))
+
+    def do_POST(self) -> None:
+        routes = {
+            "/check/links": lambda body: self.state.check_links(body),
+            "/check/utf8": lambda body: self.state.check_utf8(body),
+            "/check": lambda body: {
+                "links": self.state.check_links(body["links"]),
+                "utf8": self.state.check_utf8(body["utf8"]),
+            },
+        }
+        route = routes.get(urlparse(self.path).path)
+        if route is None:
+            self._dispatch(None)
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+        except (ValueError, UnicodeDecodeError) as exc:
+            self._send(400, {"error": f"invalid JSON body: {exc}"})
+            return
+        self._dispatch(lambda: route(body))
+
+    def _dispatch(self, handler) -> None:
+        if handler is None:
+            self._send(404, {"error": f"unknown endpoint {self.path}"})
+            return
+        try:
+            with self.state.lock:
+                payload = handler()
+        except RequestError as exc:
+            self._send(exc.status, {"error": str(exc)})
+        except KeyError as exc:
+            self._send(400, {"error": f"missing field {exc}"})
+        else:
+            self._send(200, payload)
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:  # type: ignore[attr-defined]
+            super().log_message(format, *args)
+
+
+def make_server(state: ValidationState, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, *, verbose: bool = False):
+    handler = type("BoundValidationHandler", (ValidationHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.verbose = verbose  # type: ignore[attr-defined]
+    return server
+
+
+def write_state(url: str, state: ValidationState, state_file: Path = STATE_FILE) -> None:
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"url": url, "pid": os.getpid(), "project_root": str(PROJECT_ROOT), "baseline": str(state.baseline)}
+    state_file.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Interface to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--root", type=Path, default=PROJECT_ROOT, help="Directory to serve checks for (default: project root)")
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=check_utf8.DEFAULT_BASELINE,
+        help="SEO baseline to hold in memory (default: snapshot/seo_baseline.json.gz)",
+    )
+    parser.add_argument("--no-warm", action="store_true", help="Parse documents on first use instead of at start-up")
+    parser.add_argument("--verbose", action="store_true", help="Log every request to stderr")
+    add_ignore_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    started = time.perf_counter()
+    try:
+        state = ValidationState(args.root, args.baseline, ignore_rules_from_args(args))
+    except (OSError, json.JSONDecodeError) as exc:
+        print(f"Failed to load baseline {args.baseline}: {exc}", file=sys.stderr)
+        return 1
+    warmed = 0 if args.no_warm else state.warm()
+    server = make_server(state, args.host, args.port, verbose=args.verbose)
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}"
+    write_state(url, state)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Validation server on {url} ({warmed} documents parsed in {time.perf_counter() - started:.1f} s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if STATE_FILE.exists() and json.loads(STATE_FILE.read_text(encoding="utf-8")).get("pid") == os.getpid():
+            STATE_FILE.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
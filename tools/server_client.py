@@ -0,0 +1,104 @@
+"""Client side of the resident validation server (``server.py``).
+
+While ``python -m tools serve`` runs it records its URL in
+``artifacts/validation_server.json``. ``check_links.py``, ``check_utf8.py``
+and ``python -m tools check`` look for that file and, when the server is
+alive and serves the same project, send their resolved targets to it instead
+of reading and parsing the documents themselves. Any connection problem
+falls back to the local code path, so the CLIs behave the same with or
+without a server. ``--no-server`` disables forwarding.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+STATE_FILE = PROJECT_ROOT / "artifacts" / "validation_server.json"
+REQUEST_TIMEOUT = 600.0
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the shared ``--server``/``--no-server`` options."""
+
+    parser.add_argument(
+        "--server",
+        metavar="URL",
+        help="Forward the check to this validation server (default: the one recorded by 'python -m tools serve').",
+    )
+    parser.add_argument(
+        "--no-server",
+        action="store_true",
+        help="Always run locally, even if a validation server is running.",
+    )
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def find_server(explicit: Optional[str] = None, state_file: Path = STATE_FILE) -> Optional[str]:
+    """Return the base URL of a running server for this project, if any."""
+
+    if explicit:
+        return explicit.rstrip("/")
+    try:
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    try:
+        pid = int(state.get("pid", 0))
+    except (TypeError, ValueError):
+        return None
+    # os.kill(0, ...) and negative pids signal process groups, not the server.
+    if state.get("project_root") != str(PROJECT_ROOT) or pid <= 0 or not _process_alive(pid):
+        return None
+    return str(state["url"]).rstrip("/")
+
+
+def request_json(
+    url: str, endpoint: str, payload: Optional[Dict[str, Any]] = None, *, timeout: float = REQUEST_TIMEOUT
+) -> Optional[Dict[str, Any]]:
+    """GET (or POST ``payload`` to) ``url + endpoint``; ``None`` on any failure."""
+
+    data = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+    request = Request(
+        url + endpoint,
+        data=data,
+        method="POST" if data is not None else "GET",
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except (URLError, OSError, ValueError):
+        return None
+
+
+def forward(args: argparse.Namespace, endpoint: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Run a check on the server when allowed by ``args``; ``None`` means run locally."""
+
+    if any(getattr(args, name, None) for name in ("no_server", "profile", "index", "resume")):
+        return None
+    explicit = getattr(args, "server", None)
+    url = find_server(explicit)
+    if url is None:
+        return None
+    result = request_json(url, endpoint, payload)
+    if result is None and explicit:
+        print(f"Validation server {url} is not available; running locally.", file=sys.stderr)
+    return result
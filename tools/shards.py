@@ -0,0 +1,95 @@
+"""Stable partitioning of checker targets for CI fan-out.
+
+``check_links.py --shard 2/4`` and ``check_utf8.py --shard 2/4`` keep only
+the targets whose path hashes into shard 2 of 4. The hash is taken over the
+project-relative path, so a document always lands in the same shard whatever
+the walk order, runner or Python hash seed, and a path listed by both the
+manifest and a scope is never split across shards.
+
+A sharded report records ``"shard": {"index", "count", "positions"}``, where
+``positions`` are the indices of its entries in the unsharded run.
+``merge_reports.py`` uses them to restore the original order, so the merged
+report equals the report of a single full run.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+Target = Tuple[str, Path, Optional[str]]
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int
+    count: int
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+def parse_shard(value: str) -> Shard:
+    """Parse ``i/N`` (1-based) for ``--shard``."""
+
+    try:
+        index_text, count_text = value.split("/", 1)
+        shard = Shard(int(index_text), int(count_text))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}") from None
+    if shard.count < 1 or not 1 <= shard.index <= shard.count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and N, got {value!r}")
+    return shard
+
+
+def add_shard_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="i/N",
+        help="Only check the i-th of N stable partitions of the targets (merge with 'python -m tools merge-reports').",
+    )
+
+
+def shard_of(key: str, count: int) -> int:
+    """Return the 1-based shard of ``key``; independent of ``PYTHONHASHSEED``."""
+
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+
+def select_targets(
+    targets: Sequence[Target], shard: Shard, key: Callable[[Path], str]
+) -> Tuple[List[Target], List[int]]:
+    """Keep the targets of ``shard`` along with their positions in ``targets``."""
+
+    selected: List[Target] = []
+    positions: List[int] = []
+    shards: Dict[str, int] = {}
+    for position, target in enumerate(targets):
+        name = key(target[1])
+        if name not in shards:
+            shards[name] = shard_of(name, shard.count)
+        if shards[name] == shard.index:
+            selected.append(target)
+            positions.append(position)
+    return selected, positions
+
+
+def first_positions(targets: Sequence[Target], positions: Sequence[int], key: Callable[[Path], str]) -> List[int]:
+    """Positions of the first target per path, for reports that merge duplicates."""
+
+    seen = set()
+    result: List[int] = []
+    for target, position in zip(targets, positions):
+        name = key(target[1])
+        if name not in seen:
+            seen.add(name)
+            result.append(position)
+    return result
+
+
+def shard_info(shard: Shard, positions: Sequence[int]) -> Dict[str, object]:
+    return {"index": shard.index, "count": shard.count, "positions": list(positions)}
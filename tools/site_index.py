@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""Build a persistent one-pass index of the site mirror.
+
+Every file below the root is read once; the index stores its size, mtime and
+MD5 and, for HTML/XML documents, the detected and declared encoding, the
+mojibake flags, the SEO fields and the asset references of HTML documents and
+stylesheets (``@import`` and ``url()``). The data lives in SQLite
+(``artifacts/site_index.sqlite`` by default) and is updated incrementally:
+files whose size and ``mtime_ns`` are unchanged are not read again, removed
+files are dropped.
+
+``check_utf8.py``, ``check_links.py``, ``list_assets.py``, ``page_weight.py``
+and ``generate_md5_baseline.py`` accept ``--index`` to answer their questions
+from this store instead of re-reading the mirror. Run
+``python tools/site_index.py`` first so the index is current; a document
+whose size or ``mtime_ns`` changed since then is not answered from the index,
+so those tools parse it again.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from . import profiling
+    from .check_utf8 import SeoSnapshot
+    from .document import analyse_document, file_kind
+    from .list_assets import AssetEntry, collect_css_assets
+    from .walker import DEFAULT_IGNORE, IgnoreRules, add_ignore_arguments, ignore_rules_from_args, scan_files
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from check_utf8 import SeoSnapshot  # type: ignore
+    from document import analyse_document, file_kind  # type: ignore
+    from list_assets import AssetEntry, collect_css_assets  # type: ignore
+    from walker import (  # type: ignore
+        DEFAULT_IGNORE,
+        IgnoreRules,
+        add_ignore_arguments,
+        ignore_rules_from_args,
+        scan_files,
+    )
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_INDEX = PROJECT_ROOT / "artifacts" / "site_index.sqlite"
+SCHEMA_VERSION = "2"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    md5 TEXT NOT NULL,
+    detected_encoding TEXT,
+    declared_charset TEXT,
+    contains_replacement INTEGER,
+    contains_suspect_sequences INTEGER,
+    title TEXT,
+    h1 TEXT,
+    meta TEXT
+);
+CREATE TABLE IF NOT EXISTS assets (
+    document TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    url TEXT NOT NULL,
+    resolved_path TEXT,
+    PRIMARY KEY (document, category, url)
+);
+CREATE INDEX IF NOT EXISTS assets_resolved_path ON assets(resolved_path);
+"""
+
+
+@dataclass
+class IndexedDocument:
+    path: str
+    kind: str
+    size: int
+    mtime_ns: int
+    md5: str
+    detected_encoding: Optional[str]
+    declared_charset: Optional[str]
+    contains_replacement: bool
+    contains_suspect_sequences: bool
+    seo: SeoSnapshot
+
+
+@dataclass
+class UpdateStats:
+    total: int = 0
+    indexed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+FileRow = Tuple[
+    str, str, int, int, str,
+    Optional[str], Optional[str], Optional[int], Optional[int],
+    Optional[str], Optional[str], Optional[str],
+]
+AssetRow = Tuple[str, str, str, Optional[str]]
+
+
+def relative_key(real_path: str) -> str:
+    """Index key for an already resolved path (as ``ensure_relative`` does)."""
+
+    prefix = str(PROJECT_ROOT) + os.sep
+    if real_path.startswith(prefix):
+        return real_path[len(prefix):]
+    return real_path
+
+
+def extract_file(item: Tuple[str, str, int, int]) -> Tuple[FileRow, List[AssetRow]]:
+    """Read one file and return its ``files`` row and ``assets`` rows."""
+
+    path_str, key, size, mtime_ns = item
+    path = Path(path_str)
+    with profiling.phase("read"):
+        raw = path.read_bytes()
+    with profiling.phase("hash"):
+        digest = hashlib.md5(raw).hexdigest()
+    kind = file_kind(path.name)
+    if kind == "other":
+        assets: List[AssetRow] = []
+        if path.suffix.lower() == ".css":
+            with profiling.phase("parse"):
+                entries = collect_css_assets(path, raw.decode("utf-8", errors="replace"))
+            assets = [
+                (key, category, entry.url, entry.resolved_path) for category, items in entries.items() for entry in items
+            ]
+        return (key, kind, size, mtime_ns, digest, None, None, None, None, None, None, None), assets
+
+    facts = analyse_document(path, raw, key)
+    row: FileRow = (
+        key,
+        kind,
+        size,
+        mtime_ns,
+        digest,
+        facts.detected_encoding,
+        facts.declared_charset,
+        int(facts.contains_replacement),
+        int(facts.contains_suspect_sequences),
+        facts.seo.title,
+        facts.seo.h1,
+        json.dumps(facts.seo.meta, ensure_ascii=False, sort_keys=True),
+    )
+    assets = []
+    if kind == "html":
+        for category, entries in facts.assets.items():
+            for entry in entries:
+                assets.append((key, category, entry.url, entry.resolved_path))
+    return row, assets
+
+
+class SiteIndex:
+    """SQLite-backed store of per-file facts about the mirror."""
+
+    def __init__(self, path: Path = DEFAULT_INDEX) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self) -> None:
+        self.connection.executescript(SCHEMA)
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        if row is not None and row[0] != SCHEMA_VERSION:
+            self.connection.executescript("DROP TABLE assets; DROP TABLE files; DELETE FROM meta;")
+            self.connection.executescript(SCHEMA)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema', ?)", (SCHEMA_VERSION,)
+        )
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "SiteIndex":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    # -- building -----------------------------------------------------------
+
+    def update(
+        self,
+        root: Path = PROJECT_ROOT,
+        *,
+        jobs: int = 1,
+        ignore: IgnoreRules = DEFAULT_IGNORE,
+        rebuild: bool = False,
+    ) -> UpdateStats:
+        """Bring the index in line with ``root``, reading only changed files.
+
+        Only files below ``root`` are re-read (all of them with ``rebuild``)
+        or dropped when they are gone; rows for the rest of the mirror stay,
+        so a partial update keeps the index usable.
+        """
+
+        stats = UpdateStats()
+        known: Dict[str, Tuple[int, int]] = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.connection.execute("SELECT path, size, mtime_ns FROM files")
+        }
+        seen = set()
+        pending: List[Tuple[str, str, int, int]] = []
+        root_str = str(root)
+        real_root = os.path.realpath(root_str)
+        for entry in profiling.iterate("walk", scan_files(root, ignore=ignore)):
+            key = relative_key(real_root + entry.path[len(root_str):])
+            stat = entry.stat()
+            seen.add(key)
+            stats.total += 1
+            if not rebuild and known.get(key) == (stat.st_size, stat.st_mtime_ns):
+                stats.unchanged += 1
+                continue
+            pending.append((entry.path, key, stat.st_size, stat.st_mtime_ns))
+
+        with self.connection:
+            # Rows outside ``root`` belong to other walks of the same index.
+            inside = real_root.rstrip(os.sep) + os.sep
+            stale = [
+                (key,)
+                for key in known
+                if key not in seen and os.path.join(str(PROJECT_ROOT), key).startswith(inside)
+            ]
+            self.connection.executemany("DELETE FROM files WHERE path = ?", stale)
+            stats.removed = len(stale)
+            for row, assets in _extract_all(pending, jobs):
+                with profiling.phase("write"):
+                    self.connection.execute("DELETE FROM files WHERE path = ?", (row[0],))
+                    self.connection.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                    self.connection.executemany("INSERT OR IGNORE INTO assets VALUES (?, ?, ?, ?)", assets)
+                stats.indexed += 1
+        return stats
+
+    # -- queries ------------------------------------------------------------
+
+    def _current(self, key: str, size: int, mtime_ns: int) -> bool:
+        """Whether the file at ``key`` still has its indexed size and ``mtime_ns``."""
+
+        try:
+            stat = (PROJECT_ROOT / key).stat()
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns)
+
+    def document(self, key: str) -> Optional[IndexedDocument]:
+        """Indexed facts about ``key`` (``None`` if unknown or changed since indexing)."""
+
+        row = self.connection.execute(
+            "SELECT path, kind, size, mtime_ns, md5, detected_encoding, declared_charset,"
+            " contains_replacement, contains_suspect_sequences, title, h1, meta FROM files WHERE path = ?",
+            (key,),
+        ).fetchone()
+        if row is None or not self._current(key, row[2], row[3]):
+            return None
+        return IndexedDocument(
+            path=row[0],
+            kind=row[1],
+            size=row[2],
+            mtime_ns=row[3],
+            md5=row[4],
+            detected_encoding=row[5],
+            declared_charset=row[6],
+            contains_replacement=bool(row[7]),
+            contains_suspect_sequences=bool(row[8]),
+            seo=SeoSnapshot(title=row[9], h1=row[10], meta=json.loads(row[11]) if row[11] else {}),
+        )
+
+    def assets(self, key: str) -> Optional[Dict[str, List[AssetEntry]]]:
+        """Asset references of an indexed HTML document or stylesheet.
+
+        ``None`` if ``key`` is unknown or changed since indexing. ``exists`` is
+        answered from the index; paths outside it (directories, ignored
+        folders) fall back to the filesystem.
+        """
+
+        row = self.connection.execute("SELECT kind, size, mtime_ns FROM files WHERE path = ?", (key,)).fetchone()
+        if row is None or (row[0] != "html" and not key.lower().endswith(".css")):
+            return None
+        if not self._current(key, row[1], row[2]):
+            return None
+        rows = self.connection.execute(
+            "SELECT a.category, a.url, a.resolved_path, f.path IS NOT NULL"
+            " FROM assets a LEFT JOIN files f ON f.path = a.resolved_path"
+            " WHERE a.document = ? ORDER BY a.category, a.url, a.resolved_path",
+            (key,),
+        )
+        result: Dict[str, List[AssetEntry]] = {}
+        for category, url, resolved, indexed in rows:
+            exists: Optional[bool] = None
+            if resolved is not None:
+                exists = bool(indexed) or (PROJECT_ROOT / resolved).exists()
+            result.setdefault(category, []).append(
+                AssetEntry(url=url, resolved_path=resolved, exists=exists, category=category)
+            )
+        return result
+
+    def file_stats(self) -> Iterator[Tuple[str, int, int, str]]:
+        """Yield ``(path, size, mtime_ns, md5)`` for every indexed file."""
+
+        yield from self.connection.execute("SELECT path, size, mtime_ns, md5 FROM files ORDER BY path")
+
+    def users_of(self, resolved_path: str) -> List[str]:
+        """Documents referencing ``resolved_path`` as an asset."""
+
+        rows = self.connection.execute(
+            "SELECT DISTINCT document FROM assets WHERE resolved_path = ? ORDER BY document", (resolved_path,)
+        )
+        return [row[0] for row in rows]
+
+
+def open_site_index(path: Path) -> SiteIndex:
+    """Open the index named by a tool's ``--index``; unlike ``SiteIndex`` it never creates one."""
+
+    if not path.is_file():
+        raise SystemExit(f"Site index {path} does not exist: run `python tools/site_index.py` first")
+    return SiteIndex(path)
+
+
+def _extract_all(pending: Sequence[Tuple[str, str, int, int]], jobs: int) -> Iterable[Tuple[FileRow, List[AssetRow]]]:
+    if jobs <= 1 or len(pending) < 2:
+        for item in pending:
+            with profiling.track_file(item[1]):
+                result = extract_file(item)
+            yield result
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = profiling.map_files(executor, extract_file, pending, chunksize=16, label=lambda item: item[1])
+        yield from profiling.iterate("extract", results)
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=DEFAULT_INDEX,
+        help="SQLite file to create or update (default: artifacts/site_index.sqlite)",
+    )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=PROJECT_ROOT,
+        help="Directory to index (default: project root)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of extraction processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Re-read every file instead of trusting unchanged size/mtime",
+    )
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.root.is_dir():
+        print(f"Root directory {args.root} not found", file=sys.stderr)
+        return 1
+    with profiling.session(args) as profiler:
+        with SiteIndex(args.index) as index:
+            stats = index.update(
+                args.root,
+                jobs=args.jobs,
+                ignore=ignore_rules_from_args(args),
+                rebuild=args.rebuild,
+            )
+        print(
+            f"Indexed {stats.total} files into {args.index} "
+            f"(read {stats.indexed}, unchanged {stats.unchanged}, removed {stats.removed})"
+        )
+        profiling.write_profile(profiler, "site_index")
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+"""Snowball stemmer for Russian.
+
+A direct implementation of the Snowball "russian" algorithm
+(https://snowballstem.org/algorithms/russian/stemmer.html), including its
+``ё`` → ``е`` normalisation. Words without Russian vowels (Latin words,
+numbers) come back unchanged. ``search_client.js`` carries a line-by-line
+port; both must give the same stems, or queries miss the index.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+VOWELS = frozenset("аеиоуыэюя")
+
+# Endings of the first group only count after ``а`` or ``я``, which stay.
+PERFECTIVE_GERUND = (("в", "вши", "вшись"), ("ив", "ивши", "ившись", "ыв", "ывши", "ывшись"))
+ADJECTIVE = (
+    "ее", "ие", "ые", "ое", "ими", "ыми", "ей", "ий", "ый", "ой", "ем", "им", "ым", "ом",
+    "его", "ого", "ему", "ому", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею",
+)
+PARTICIPLE = (("ем", "нн", "вш", "ющ", "щ"), ("ивш", "ывш", "ующ"))
+REFLEXIVE = ("ся", "сь")
+VERB = (
+    ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть", "ешь", "нно"),
+    (
+        "ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым", "ен",
+        "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю",
+    ),
+)
+NOUN = (
+    "а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий", "й",
+    "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю", "ия", "ья", "я",
+)
+DERIVATIONAL = ("ост", "ость")
+SUPERLATIVE = ("ейш", "ейше")
+
+
+def _gopast(word: str, position: int, vowel: bool) -> int:
+    """Position just after the first vowel (or non-vowel) at or after ``position``; ``-1`` if none."""
+
+    for index in range(position, len(word)):
+        if (word[index] in VOWELS) == vowel:
+            return index + 1
+    return -1
+
+
+def regions(word: str) -> Tuple[int, int]:
+    """``(rv, r2)``: start of the region after the first vowel, and of R2."""
+
+    length = len(word)
+    rv = _gopast(word, 0, True)
+    if rv < 0:
+        return length, length
+    r1 = _gopast(word, rv, False)
+    vowel = _gopast(word, r1, True) if r1 >= 0 else -1
+    r2 = _gopast(word, vowel, False) if vowel >= 0 else -1
+    return rv, length if r2 < 0 else r2
+
+
+def _longest(word: str, limit: int, endings: Sequence[str]) -> Optional[str]:
+    best = None
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= limit and (best is None or len(ending) > len(best)):
+            best = ending
+    return best
+
+
+def _remove_grouped(word: str, rv: int, groups: Tuple[Sequence[str], Sequence[str]]) -> Optional[str]:
+    """Remove the longest ending of either group; ``None`` if there is none or its condition fails."""
+
+    ending = _longest(word, rv, tuple(groups[0]) + tuple(groups[1]))
+    if ending is None:
+        return None
+    stem = word[: -len(ending)]
+    if ending in groups[0] and not (len(stem) > rv and stem[-1] in "ая"):
+        return None
+    return stem
+
+
+def _remove(word: str, rv: int, endings: Sequence[str]) -> Optional[str]:
+    ending = _longest(word, rv, endings)
+    return None if ending is None else word[: -len(ending)]
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Stem of a lower-case word."""
+
+    word = word.replace("ё", "е")
+    rv, r2 = regions(word)
+    if rv >= len(word):
+        return word
+
+    # Step 1
+    stemmed = _remove_grouped(word, rv, PERFECTIVE_GERUND)
+    if stemmed is not None:
+        word = stemmed
+    else:
+        word = _remove(word, rv, REFLEXIVE) or word
+        adjective = _remove(word, rv, ADJECTIVE)
+        if adjective is not None:
+            word = _remove_grouped(adjective, rv, PARTICIPLE) or adjective
+        else:
+            word = _remove_grouped(word, rv, VERB) or _remove(word, rv, NOUN) or word
+
+    # Step 2
+    if word.endswith("и") and len(word) - 1 >= rv:
+        word = word[:-1]
+
+    # Step 3
+    ending = _longest(word, max(rv, r2), DERIVATIONAL)
+    if ending is not None:
+        word = word[: -len(ending)]
+
+    # Step 4
+    ending = _longest(word, rv, SUPERLATIVE + ("н", "ь"))
+    if ending == "ь":
+        word = word[:-1]
+    elif ending == "н":
+        if word.endswith("нн") and len(word) - 2 >= rv:
+            word = word[:-1]
+    elif ending is not None:
+        word = word[: -len(ending)]
+        if word.endswith("нн") and len(word) - 2 >= rv:
+            word = word[:-1]
+    return word
@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+
+@pytest.fixture
+def check_site(tmp_path: Path) -> Path:
+    """Two pages sharing a stylesheet, one with a missing image, in ``tmp_path / "site"``."""
+
+    root = tmp_path / "site"
+    (root / "css").mkdir(parents=True)
+    (root / "css" / "styles.css").write_text("body {}", "utf-8")
+    (root / "index.html").write_text(
+        '<html><head><meta charset="utf-8"><title>Главная</title>'
+        '<link rel="stylesheet" href="css/styles.css"></head>'
+        '<body><h1>НЛП</h1><img src="images/missing.png"></body></html>',
+        "utf-8",
+    )
+    (root / "about.html").write_text("<title>О нас</title>", "utf-8")
+    return root
+
+
+@pytest.fixture
+def check_pages(check_site: Path) -> Path:
+    """``check_site`` plus twelve pages, enough to spread over shards and checkpoints."""
+
+    for index in range(12):
+        (check_site / f"page-{index}.html").write_text(
+            f'<title>Страница {index}</title><img src="img/{index % 3}.png">', "utf-8"
+        )
+    return check_site
+
+
+@pytest.fixture
+def load_report() -> Callable[[Path], dict]:
+    """Load a JSON report without its ``generated_at`` timestamp."""
+
+    def load(path: Path) -> dict:
+        payload = json.loads(path.read_text("utf-8"))
+        payload.pop("generated_at")
+        return payload
+
+    return load
@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+from tools import reencode
+from tools.benchmarks import corpus, run
+
+
+def test_corpus_is_reproducible(tmp_path: Path) -> None:
+    first = corpus.generate_corpus(tmp_path / "a", pages=9, seed=7)
+    second = corpus.generate_corpus(tmp_path / "b", pages=9, seed=7)
+    for left, right in zip(first.pages + first.assets, second.pages + second.assets):
+        assert left.read_bytes() == right.read_bytes()
+    assert (tmp_path / "a" / corpus.BASELINE_NAME).read_bytes() == (tmp_path / "b" / corpus.BASELINE_NAME).read_bytes()
+
+    described = corpus.describe_corpus(tmp_path / "a")
+    assert sorted(described.pages) == sorted(first.pages)
+    assert {name: sorted(paths) for name, paths in described.variants.items()} == {
+        name: sorted(paths) for name, paths in first.variants.items()
+    }
+
+    for path in first.variants["cp1251"]:
+        assert reencode.detect_encoding(path.read_bytes()) == "windows-1251"
+    for path in first.variants["double-encoded"]:
+        recovered = reencode._maybe_decode_double_encoded(path.read_bytes())
+        assert recovered is not None and "НЛП-центр" in recovered
+
+
+def test_regressions_are_reported(tmp_path: Path) -> None:
+    baseline = tmp_path / "baseline.json"
+    status = run.main(
+        ["--corpus", str(tmp_path / "corpus"), "--pages", "6", "--repeat", "1", "--only", "md5",
+         "--baseline", str(baseline), "--update-baseline"]
+    )
+    assert status == 0
+    assert set(json.loads(baseline.read_text("utf-8"))["results"]) == {"md5"}
+
+    result = run.BenchmarkResult(name="md5", items=1, runs=1, min_seconds=2.0, median_seconds=2.0, mean_seconds=2.0)
+    regressions = run.find_regressions([result], {"md5": 1.0, "seo_parser": 1.0}, threshold=0.25)
+    assert [(item.name, item.ratio) for item in regressions] == [("md5", 2.0)]
+    assert run.find_regressions([result], {"md5": 1.8}, threshold=0.25) == []
+
+
+def test_baseline_from_another_environment_is_not_compared(tmp_path: Path, capsys) -> None:
+    baseline = tmp_path / "baseline.json"
+    common = ["--repeat", "1", "--only", "md5", "--baseline", str(baseline), "--output", str(tmp_path / "results.json")]
+    assert run.main(["--corpus", str(tmp_path / "six"), "--pages", "6", "--update-baseline"] + common) == 0
+    assert json.loads(baseline.read_text("utf-8"))["environment"]["pages"] == 6
+
+    # A reused corpus is described by its own parameters, not by --pages.
+    assert run.main(["--corpus", str(tmp_path / "six"), "--pages", "9", "--threshold", "1000"] + common) == 0
+    assert run.main(["--corpus", str(tmp_path / "nine"), "--pages", "9"] + common) == 1
+    assert "pages 6 vs 9" in capsys.readouterr().err
+    assert json.loads((tmp_path / "results.json").read_text("utf-8"))["environment_mismatches"] == {}
+
+    assert run.main(["--corpus", str(tmp_path / "nine"), "--threshold", "1000", "--ignore-environment"] + common) == 0
+    assert json.loads((tmp_path / "results.json").read_text("utf-8"))["environment_mismatches"] == {"pages": [6, 9]}
@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import pytest
+
+from tools import build_site
+from tools.walker import DEFAULT_IGNORE
+
+
+def make_source(root: Path) -> None:
+    (root / "css").mkdir(parents=True)
+    (root / "images").mkdir()
+    (root / "js").mkdir()
+    (root / "images" / "bg.png").write_bytes(b"png bytes")
+    (root / "images" / "unused.png").write_bytes(b"unused")
+    (root / "css" / "base.css").write_text("body { color: red }", encoding="utf-8")
+    (root / "css" / "site.css").write_text(
+        '@import "base.css";\nbody { background: url(\'../images/bg.png?v=1\') }\n'
+        "a { background: url(data:image/png;base64,AAAA) }\n.x { background: url(../images/missing.gif) }",
+        encoding="utf-8",
+    )
+    (root / "js" / "app.js").write_text("var a = 1;", encoding="utf-8")
+    (root / "README.md").write_text("not deployed", encoding="utf-8")
+    (root / "index.html").write_text(
+        '<html><head><link rel="stylesheet" href="css/site.css"><script src="js/app.js"></script></head>'
+        '<body><img src="images/bg.png"><a href="images/unused.png">full size</a></body></html>',
+        encoding="utf-8",
+    )
+
+
+def test_build_hashes_assets_and_rewrites_references(tmp_path: Path) -> None:
+    source, output = tmp_path / "src", tmp_path / "dist"
+    make_source(source)
+
+    result = build_site.build_site(source, output, ignore=DEFAULT_IGNORE)
+
+    manifest = result.manifest
+    assert set(manifest) == {"css/site.css", "css/base.css", "images/bg.png", "js/app.js"}
+    assert all(name.startswith("assets/") for name in manifest.values())
+    page = (output / "index.html").read_text(encoding="utf-8")
+    assert f'href="{manifest["css/site.css"]}"' in page
+    assert f'src="{manifest["js/app.js"]}"' in page
+    assert f'src="{manifest["images/bg.png"]}"' in page
+    assert 'href="images/unused.png"' in page
+    stylesheet = (output / manifest["css/site.css"]).read_text(encoding="utf-8")
+    assert f'@import "{Path(manifest["css/base.css"]).name}"' in stylesheet
+    assert f'url("{Path(manifest["images/bg.png"]).name}?v=1")' in stylesheet
+    assert "url(data:image/png;base64,AAAA)" in stylesheet
+    assert 'url("../images/missing.gif")' in stylesheet
+    assert (output / "images" / "bg.png").exists()
+    assert not (output / "README.md").exists()
+    headers = (output / "_headers").read_text(encoding="utf-8")
+    assert "/assets/*\n  ! Cache-Control\n  Cache-Control: public, max-age=31536000, immutable" in headers
+
+
+def test_names_change_only_with_content(tmp_path: Path) -> None:
+    source = tmp_path / "src"
+    make_source(source)
+    first = build_site.build_site(source, tmp_path / "dist", ignore=DEFAULT_IGNORE).manifest
+    assert build_site.build_site(source, tmp_path / "dist", ignore=DEFAULT_IGNORE).manifest == first
+
+    (source / "images" / "bg.png").write_bytes(b"new png bytes")
+    second = build_site.build_site(source, tmp_path / "dist", ignore=DEFAULT_IGNORE).manifest
+
+    assert second["js/app.js"] == first["js/app.js"]
+    assert second["css/base.css"] == first["css/base.css"]
+    assert second["images/bg.png"] != first["images/bg.png"]
+    assert second["css/site.css"] != first["css/site.css"]
+
+
+def test_refuses_to_replace_a_directory_that_is_not_a_build(tmp_path: Path) -> None:
+    source, output = tmp_path / "src", tmp_path / "dist"
+    make_source(source)
+    output.mkdir()
+    (output / "keep.txt").write_text("user data", encoding="utf-8")
+
+    with pytest.raises(build_site.BuildError):
+        build_site.build_site(source, output, ignore=DEFAULT_IGNORE)
+    with pytest.raises(build_site.BuildError):
+        build_site.build_site(source, source, ignore=DEFAULT_IGNORE)
+    assert (output / "keep.txt").exists()
+
+
+def test_redirected_pages_are_left_out(tmp_path: Path) -> None:
+    source, output = tmp_path / "src", tmp_path / "dist"
+    make_source(source)
+    (source / "index1a2b.html").write_text("<html><body>copy</body></html>", encoding="utf-8")
+    (source / "_redirects").write_text("/index1a2b.html / 301\n", encoding="utf-8")
+
+    result = build_site.build_site(source, output, ignore=DEFAULT_IGNORE)
+
+    assert result.redirected == 1
+    assert not (output / "index1a2b.html").exists()
+    assert (output / "_redirects").read_text(encoding="utf-8") == "/index1a2b.html / 301\n"
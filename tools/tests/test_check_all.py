@@ -0,0 +1,41 @@
+from pathlib import Path
+from typing import Callable
+
+from tools import check_all, check_links, check_utf8
+from tools.document import DocumentCache
+
+
+def test_each_document_is_read_once(check_site: Path) -> None:
+    site = check_site
+    cache = DocumentCache()
+    targets = check_links.scope_targets([site])
+    check_links.analyse_documents(targets=targets, base_url=None, timeout=1, include_remote=False, index=cache)
+    for source, path, request_path in check_utf8.scope_targets([site]):
+        check_utf8.inspect_document(source, path, request_path, {}, base=None, timeout=1, index=cache)
+    assert cache.reads == 2
+
+
+def test_reports_match_separate_runs(tmp_path: Path, check_site: Path, load_report: Callable[[Path], dict]) -> None:
+    site = check_site
+    baseline = tmp_path / "missing.json.gz"
+    scope = ["--scope", str(site)]
+
+    status = check_all.main(
+        scope
+        + [
+            "--baseline", str(baseline),
+            "--links-output", str(tmp_path / "combined_links.json"),
+            "--utf8-output", str(tmp_path / "combined_utf8.json"),
+        ]
+    )
+    assert status == 1  # images/missing.png
+    assert check_links.main(scope + ["--output", str(tmp_path / "links.json")]) == 1
+    assert (
+        check_utf8.main(
+            scope + ["--no-manifest", "--baseline", str(baseline), "--output", str(tmp_path / "utf8.json")]
+        )
+        == 0
+    )
+
+    assert load_report(tmp_path / "combined_links.json") == load_report(tmp_path / "links.json")
+    assert load_report(tmp_path / "combined_utf8.json") == load_report(tmp_path / "utf8.json")
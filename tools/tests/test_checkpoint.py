@@ -0,0 +1,69 @@
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from tools import check_links, check_utf8, checkpoint
+
+
+def interrupt_after(monkeypatch: pytest.MonkeyPatch, module, name: str, calls: int) -> None:
+    original = getattr(module, name)
+    seen = []
+
+    def wrapper(*args, **kwargs):
+        seen.append(1)
+        if len(seen) > calls:
+            raise KeyboardInterrupt
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(module, name, wrapper)
+
+
+@pytest.mark.parametrize("checker", ["links", "utf8"])
+def test_resumed_run_matches_uninterrupted(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    check_pages: Path,
+    load_report: Callable[[Path], dict],
+    checker: str,
+) -> None:
+    site = check_pages
+    if checker == "links":
+        module, step = check_links, "load_assets"
+        args = ["--scope", str(site), "--scope", str(site / "index.html"), "--no-server"]
+    else:
+        module, step = check_utf8, "inspect_document"
+        args = ["--scope", str(site), "--no-manifest", "--baseline", str(tmp_path / "none.json.gz"), "--no-server"]
+
+    full = tmp_path / "full.json"
+    status = module.main(args + ["--output", str(full), "--no-checkpoint"])
+    assert not checkpoint.journal_path_for(full).exists()
+
+    interrupted = tmp_path / "interrupted.json"
+    with monkeypatch.context() as patch:
+        interrupt_after(patch, module, step, 5)
+        assert module.main(args + ["--output", str(interrupted)]) == 130
+    journal = checkpoint.journal_path_for(interrupted)
+    assert not interrupted.exists()
+    with journal.open("a", encoding="utf-8") as handle:
+        handle.write('{"position": 99, "ent')  # killed mid-write
+
+    resumed = tmp_path / "resumed.json"
+    with monkeypatch.context() as patch:
+        interrupt_after(patch, module, step, 100)
+        assert module.main(args + ["--resume", str(journal), "--output", str(resumed)]) == status
+    assert load_report(resumed) == load_report(full)
+    assert not journal.exists()
+
+
+def test_resume_rejects_other_inputs(tmp_path: Path) -> None:
+    journal = checkpoint.Journal.create(tmp_path / "run.journal.jsonl", "check_utf8", "abc", 3)
+    journal.record(0, {"path": "index.html"})
+    journal.close()
+    with pytest.raises(checkpoint.JournalError):
+        checkpoint.Journal.resume(journal.path, "check_utf8", "other")
+    with pytest.raises(checkpoint.JournalError):
+        checkpoint.Journal.resume(journal.path, "check_links", "abc")
+    resumed = checkpoint.Journal.resume(journal.path, "check_utf8", "abc")
+    assert resumed.done == {0: {"path": "index.html"}}
+    resumed.close()
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+from tools import dedupe_assets
+from tools.fileio import decode_page
+from tools.list_assets import AssetCollector
+
+
+def make_site(root: Path) -> None:
+    (root / "img").mkdir()
+    (root / "mirror" / "uploads").mkdir(parents=True)
+    (root / "img" / "logo.png").write_bytes(b"logo bytes")
+    (root / "mirror" / "uploads" / "logo-copy.png").write_bytes(b"logo bytes")
+    (root / "img" / "other.png").write_bytes(b"other bytes")
+    (root / "img" / "stub.html").write_text("Page Not Found", encoding="utf-8")
+    (root / "img" / "stub2.html").write_text("Page Not Found", encoding="utf-8")
+    (root / "index.html").write_text(
+        '<html><body><img src="img/logo.png"><img src="img/other.png"><img src="img/stub.html"></body></html>',
+        encoding="utf-8",
+    )
+    (root / "about.html").write_text(
+        '<html><body><img src="img/logo.png"><img src="img/stub2.html"></body></html>', encoding="utf-8"
+    )
+    (root / "mirror" / "page.html").write_bytes(
+        "<html><body><p>Страница</p><img  src='uploads/logo-copy.png?v=2' alt=\"logo\">"
+        '<img srcset="uploads/logo-copy.png 1x, ../img/other.png 2x"></body></html>'.encode("cp1251")
+    )
+
+
+def inventory(root: Path) -> dict:
+    report = {}
+    for page in sorted(root.rglob("*.html")):
+        collector = AssetCollector(page)
+        collector.feed(decode_page(page.read_bytes())[0])
+        report[page.as_posix()] = collector.to_entries()
+    return report
+
+
+def test_duplicates_are_grouped_and_canonical_is_most_referenced(tmp_path: Path) -> None:
+    make_site(tmp_path)
+    report = inventory(tmp_path)
+    references = dedupe_assets.referenced_assets(report)
+    groups = dedupe_assets.find_duplicates(references, dedupe_assets.digest_assets(sorted(references), None))
+
+    assert len(groups) == 1
+    group = groups[0]
+    assert group.canonical == (tmp_path / "img" / "logo.png").as_posix()
+    assert group.duplicates == [(tmp_path / "mirror" / "uploads" / "logo-copy.png").as_posix()]
+    assert group.size == len(b"logo bytes")
+    assert not any(name.endswith(".html") for name in references)
+
+
+def test_rewrite_page_points_duplicates_at_canonical_copy(tmp_path: Path) -> None:
+    make_site(tmp_path)
+    report = inventory(tmp_path)
+    references = dedupe_assets.referenced_assets(report)
+    mapping = dedupe_assets.canonical_map(
+        dedupe_assets.find_duplicates(references, dedupe_assets.digest_assets(sorted(references), None))
+    )
+    pages = dedupe_assets.pages_to_rewrite(report, mapping)
+    assert pages == [tmp_path / "mirror" / "page.html"]
+    original = pages[0].read_bytes()
+
+    dry = dedupe_assets.rewrite_page(pages[0], mapping, dry_run=True)
+    assert dry.status == "would_rewrite"
+    assert pages[0].read_bytes() == original
+
+    result = dedupe_assets.rewrite_page(pages[0], mapping)
+    assert result.status == "rewritten"
+    assert result.rewritten == 2
+    text = pages[0].read_bytes().decode("cp1251")
+    assert 'src="../img/logo.png?v=2" alt="logo"' in text
+    assert 'srcset="../img/logo.png 1x, ../img/other.png 2x"' in text
+    assert "Страница" in text
@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from tools import generate_md5_baseline
+
+
+def make_tree(root: Path) -> None:
+    for index in range(12):
+        target = root / f"dir{index % 3}" / f"file{index}.html"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(f"page {index}".encode("utf-8") * (index + 1))
+
+
+def test_threaded_baseline_matches_serial(tmp_path: Path) -> None:
+    source = tmp_path / "site"
+    make_tree(source)
+    serial = tmp_path / "serial.txt.gz"
+    threaded = tmp_path / "threaded.txt.gz"
+
+    assert generate_md5_baseline.main(["--source", str(source), "--output", str(serial), "--jobs", "1"]) == 0
+    assert generate_md5_baseline.main(["--source", str(source), "--output", str(threaded), "--jobs", "4"]) == 0
+
+    serial_lines = gzip.open(serial, "rt", encoding="utf-8").read().splitlines()
+    assert serial_lines == gzip.open(threaded, "rt", encoding="utf-8").read().splitlines()
+    assert serial_lines[0] == "# algorithm: md5"
+    paths = [line.split("  ", 1)[1] for line in serial_lines[1:]]
+    assert paths == sorted(paths)
+    assert len(paths) == 12
+    digest, name = serial_lines[1].split("  ", 1)
+    assert digest == hashlib.md5((source / name).read_bytes()).hexdigest()
+
+
+def test_blake2b_recorded_in_header(tmp_path: Path) -> None:
+    source = tmp_path / "site"
+    make_tree(source)
+    output = tmp_path / "baseline.txt"
+
+    assert generate_md5_baseline.main(
+        ["--source", str(source), "--output", str(output), "--algorithm", "blake2b"]
+    ) == 0
+
+    lines = output.read_text("utf-8").splitlines()
+    assert lines[0] == "# algorithm: blake2b"
+    digest, name = lines[1].split("  ", 1)
+    assert digest == hashlib.blake2b((source / name).read_bytes()).hexdigest()
+
+
+def read_entries(path: Path) -> dict:
+    lines = gzip.open(path, "rt", encoding="utf-8").read().splitlines()
+    return {name: digest for digest, name in (line.split("  ", 1) for line in lines[1:])}
+
+
+def test_incremental_run_reuses_unchanged_stat(tmp_path: Path, capsys) -> None:
+    source = tmp_path / "site"
+    make_tree(source)
+    output = tmp_path / "baseline_md5.txt.gz"
+    argv = ["--source", str(source), "--output", str(output)]
+
+    assert generate_md5_baseline.main(argv) == 0
+    assert (tmp_path / "baseline_md5.stat.gz").exists()
+    capsys.readouterr()
+
+    changed = source / "dir0" / "file0.html"
+    changed.write_bytes(b"new content")
+    # Same size and mtime: only a paranoid run notices the new bytes.
+    sneaky = source / "dir1" / "file1.html"
+    stat = sneaky.stat()
+    sneaky.write_bytes(b"X" * stat.st_size)
+    os.utime(sneaky, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert generate_md5_baseline.main(argv) == 0
+    assert "(hashed 1, reused 11)" in capsys.readouterr().out
+    entries = read_entries(output)
+    assert entries["dir0/file0.html"] == hashlib.md5(b"new content").hexdigest()
+    assert entries["dir1/file1.html"] != hashlib.md5(sneaky.read_bytes()).hexdigest()
+
+    assert generate_md5_baseline.main(argv + ["--paranoid"]) == 0
+    assert "(hashed 12, reused 0)" in capsys.readouterr().out
+    assert read_entries(output)["dir1/file1.html"] == hashlib.md5(sneaky.read_bytes()).hexdigest()
+
+
+def test_verify_reports_modified_added_removed(tmp_path: Path, capsys) -> None:
+    source = tmp_path / "site"
+    make_tree(source)
+    output = tmp_path / "baseline_md5.txt.gz"
+    assert generate_md5_baseline.main(["--source", str(source), "--output", str(output)]) == 0
+    verify = ["--source", str(source), "--output", str(output), "--verify"]
+
+    assert generate_md5_baseline.main(verify) == 0
+    assert "hashed 0)" in capsys.readouterr().out
+
+    (source / "dir0" / "file0.html").write_bytes(b"changed")
+    (source / "dir1" / "file1.html").unlink()
+    (source / "new.html").write_bytes(b"added")
+    report = tmp_path / "verify.json"
+
+    assert generate_md5_baseline.main(verify + ["--report", str(report)]) == 1
+    out = capsys.readouterr().out
+    assert "M dir0/file0.html" in out
+    assert "A new.html" in out
+    assert "D dir1/file1.html" in out
+
+    payload = json.loads(report.read_text("utf-8"))
+    assert payload["modified"] == ["dir0/file0.html"]
+    assert payload["hashed"] == 1
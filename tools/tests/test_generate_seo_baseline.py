@@ -0,0 +1,59 @@
+import gzip
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from tools import generate_seo_baseline
+
+
+@pytest.mark.parametrize("pretty", [True, False])
+def test_stream_writer_matches_json_dumps(pretty: bool) -> None:
+    payload = {
+        "generated_at": "2025-10-01T00:00:00+00:00",
+        "source": "/site",
+        "html": [
+            {"path": "a.html", "title": "Привет", "h1": None, "meta": {"description": "d"}},
+            {"path": "b.html", "title": None, "h1": "H", "meta": {}},
+        ],
+        "feeds": [],
+    }
+    buffer = io.StringIO()
+    writer = generate_seo_baseline.JsonStreamWriter(buffer, pretty=pretty)
+    writer.field("generated_at", payload["generated_at"])
+    writer.field("source", payload["source"])
+    for key in ("html", "feeds"):
+        writer.begin_array(key)
+        for record in payload[key]:
+            writer.item(record)
+        writer.end_array()
+    writer.close()
+
+    assert buffer.getvalue() == json.dumps(payload, ensure_ascii=False, indent=2 if pretty else None)
+
+
+def test_parallel_output_matches_serial(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    site = tmp_path / "site"
+    for index in range(8):
+        page = site / f"dir{index % 2}" / f"page{index}.html"
+        page.parent.mkdir(parents=True, exist_ok=True)
+        page.write_bytes(f"<title>Страница {index}</title><h1>H{index}</h1>".encode("cp1251"))
+    (site / "empty.html").write_text("<p>no seo</p>", "utf-8")
+    (site / "feed.xml").write_bytes(
+        "<rss><channel><title>Лента</title><description>D</description></channel></rss>".encode("cp1251")
+    )
+    monkeypatch.setattr(generate_seo_baseline, "CONTENT_ROOT", site)
+
+    outputs = []
+    for jobs in ("1", "2"):
+        output = tmp_path / f"seo-{jobs}.json.gz"
+        assert generate_seo_baseline.main(["--output", str(output), "--jobs", jobs]) == 0
+        payload = json.loads(gzip.open(output, "rt", encoding="utf-8").read())
+        payload.pop("generated_at")
+        outputs.append(payload)
+
+    assert outputs[0] == outputs[1]
+    paths = [Path(record["path"]).relative_to(site).as_posix() for record in outputs[0]["html"]]
+    assert paths == sorted(paths) and len(paths) == 8
+    assert outputs[0]["feeds"][0]["title"] == "Лента"
@@ -0,0 +1,82 @@
+import struct
+from pathlib import Path
+
+from tools import image_dimensions
+
+
+def png(width: int, height: int) -> bytes:
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+
+
+def jpeg(width: int, height: int, orientation: int = 1) -> bytes:
+    tiff = b"II*\x00" + struct.pack("<IH", 8, 1) + struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0) + b"\x00" * 4
+    app1 = b"Exif\x00\x00" + tiff
+    sof = struct.pack(">BHHB", 8, height, width, 3) + b"\x01\x22\x00\x02\x11\x01\x03\x11\x01"
+    return (
+        b"\xff\xd8"
+        + b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+        + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1
+        + b"\xff\xc0" + struct.pack(">H", len(sof) + 2) + sof
+        + b"\xff\xda\x00\x02"
+    )
+
+
+def test_header_dimensions_and_index_reuse(tmp_path: Path) -> None:
+    images = {
+        "logo.png": png(367, 102),
+        "photo.jpg": jpeg(640, 480),
+        "rotated.jpg": jpeg(640, 480, orientation=6),
+        "anim.gif": b"GIF89a" + struct.pack("<HH", 64, 32) + b"\x00" * 8,
+        "stub.jpg": b"<html>Not Found</html>",
+    }
+    for name, data in images.items():
+        (tmp_path / name).write_bytes(data)
+
+    assert image_dimensions.read_dimensions(tmp_path / "logo.png") == (367, 102)
+    assert image_dimensions.read_dimensions(tmp_path / "photo.jpg") == (640, 480)
+    assert image_dimensions.read_dimensions(tmp_path / "rotated.jpg") == (480, 640)
+    assert image_dimensions.read_dimensions(tmp_path / "anim.gif") == (64, 32)
+
+    paths = sorted(tmp_path.iterdir())
+    index, stats = image_dimensions.build_index(paths, {})
+    assert (stats.read, stats.reused, list(stats.unreadable)) == (4, 0, [(tmp_path / "stub.jpg").as_posix()])
+    (tmp_path / "logo.png").write_bytes(png(100, 50))
+    index, stats = image_dimensions.build_index(paths, index)
+    assert (stats.read, stats.reused) == (1, 3)
+    assert index[(tmp_path / "logo.png").as_posix()][:2] == [100, 50]
+
+
+def test_rewrite_adds_dimensions_and_lazy_loading(tmp_path: Path) -> None:
+    (tmp_path / "img").mkdir()
+    (tmp_path / "img" / "logo.png").write_bytes(png(367, 102))
+    (tmp_path / "img" / "thumb.jpg").write_bytes(jpeg(150, 115))
+    page = tmp_path / "index.html"
+    page.write_bytes(
+        "<html><body><p>Главная</p>"
+        '<img class="png" src="img/logo.png" alt="НЛП" />'
+        '<img src="https://mc.yandex.ru/watch/1" alt="">'
+        "<img src='img/thumb.jpg' width=\"300\">"
+        '<IMG SRC="img/thumb.jpg" loading="eager">'
+        "<img src=img/logo.png>"
+        "<script>document.write('<img src=\"img/logo.png\">')</script>"
+        "<!-- <img src=\"img/logo.png\"> -->"
+        "</body></html>".encode("cp1251")
+    )
+    index, _ = image_dimensions.build_index(sorted((tmp_path / "img").iterdir()), {})
+    original = page.read_bytes()
+
+    dry = image_dimensions.rewrite_page(page, index, eager=2, dry_run=True)
+    assert dry.status == "would_rewrite"
+    assert page.read_bytes() == original
+
+    result = image_dimensions.rewrite_page(page, index, eager=2)
+    assert (result.status, result.images, result.dimensions_added, result.lazy_added) == ("rewritten", 5, 7, 2)
+    text = page.read_bytes().decode("cp1251")
+    assert '<img class="png" src="img/logo.png" alt="НЛП" width="367" height="102" />' in text
+    assert '<img src="https://mc.yandex.ru/watch/1" alt="">' in text
+    assert "<img src='img/thumb.jpg' width=\"300\" height=\"230\" loading=\"lazy\">" in text
+    assert '<IMG SRC="img/thumb.jpg" loading="eager" width="150" height="115">' in text
+    assert '<img src=img/logo.png width="367" height="102" loading="lazy">' in text
+    assert text.endswith("document.write('<img src=\"img/logo.png\">')</script><!-- <img src=\"img/logo.png\"> --></body></html>")
+
+    assert image_dimensions.rewrite_page(page, index, eager=2).status == "unchanged"
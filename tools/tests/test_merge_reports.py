@@ -0,0 +1,47 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from tools import check_links, check_utf8, merge_reports, shards
+
+
+def test_shard_selection_is_stable() -> None:
+    assert shards.parse_shard("2/3") == shards.Shard(2, 3)
+    for bad in ("0/3", "4/3", "3", "a/b"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            shards.parse_shard(bad)
+    targets = [("scope", Path(f"doc-{index}.html"), None) for index in range(50)] * 2
+    selected = [shards.select_targets(targets, shards.Shard(index, 3), str) for index in (1, 2, 3)]
+    assert sorted(position for _, positions in selected for position in positions) == list(range(100))
+    assert all(len(positions) < 100 for _, positions in selected)
+    assert [shards.shard_of("index.html", 4)] * 2 == [shards.shard_of("index.html", 4) for _ in range(2)]
+
+
+@pytest.mark.parametrize("checker", ["links", "utf8"])
+def test_merged_shards_equal_full_run(
+    tmp_path: Path, check_pages: Path, load_report: Callable[[Path], dict], checker: str
+) -> None:
+    site = check_pages
+    module = check_links if checker == "links" else check_utf8
+    args = ["--scope", str(site), "--scope", str(site / "index.html"), "--no-server"]
+    if checker == "utf8":
+        args += ["--no-manifest", "--baseline", str(tmp_path / "missing.json.gz")]
+
+    full = tmp_path / "full.json"
+    status = module.main(args + ["--output", str(full)])
+    parts = []
+    for index in (1, 2, 3):
+        part = tmp_path / f"shard-{index}.json"
+        module.main(args + ["--shard", f"{index}/3", "--output", str(part)])
+        parts.append(part)
+    assert all(json.loads(part.read_text("utf-8"))["shard"]["count"] == 3 for part in parts)
+
+    merged = tmp_path / "merged.json"
+    assert merge_reports.main([str(part) for part in reversed(parts)] + ["--output", str(merged)]) == status
+    assert load_report(merged) == load_report(full)
+
+    assert merge_reports.main([str(part) for part in parts[:2]] + ["--output", str(merged)]) == 1
+    assert merge_reports.main([str(full), "--output", str(merged)]) == 1
@@ -0,0 +1,84 @@
+from tools import minify_html
+
+PAGE = """<!DOCTYPE html>
+<html>
+  <head>
+    <title>  Заголовок   страницы </title>
+    <!-- HTTrack comment -->
+    <meta name="description"   content="Описание  страницы" />
+    <style type="text/css">
+      /* layout */
+      .menu  a { color : red ; }
+    </style>
+  </head>
+  <body>
+    <!--noindex--><a href="out.html">out</a><!--/noindex-->
+    <!--[if lte IE 7]><link rel="stylesheet" href="ie.css"><![endif]-->
+    <h1>  Главный   заголовок </h1>
+    <p>Первый   <b>жирный</b>
+       <i>курсив</i></p>
+    <pre>  a
+    b</pre>
+    <img  src="logo.png"   alt="logo" >
+    <script type="text/javascript">
+      var a = 1;
+
+      if (a) {
+        a += 1;
+      }
+    </script>
+  </body>
+</html>
+"""
+
+
+def test_minify_html_drops_comments_and_whitespace_but_keeps_content():
+    result = minify_html.minify_html(PAGE)
+
+    assert "HTTrack comment" not in result
+    assert "<!--noindex-->" in result and "<!--/noindex-->" in result
+    assert "<!--[if lte IE 7]>" in result
+    assert "<title>  Заголовок   страницы </title>" in result
+    assert "<h1>  Главный   заголовок </h1>" in result
+    assert "<pre>  a\n    b</pre>" in result
+    assert "<p>Первый <b>жирный</b> <i>курсив</i></p>" in result
+    assert '<img src="logo.png" alt="logo">' in result
+    assert '<meta name="description" content="Описание  страницы" />' in result
+    assert "<head><title>" in result
+    assert "<style type=\"text/css\">.menu a{color : red}</style>" in result
+    assert "var a = 1;\nif (a) {\na += 1;\n}</script>" in result
+
+
+def test_minify_js_leaves_template_literals_and_other_script_types_alone():
+    template = "<script>\n  var s = `a\n    b`;\n</script>"
+    assert minify_html.minify_html(template) == template
+    template_html = '<script type="text/x-template">\n  <div>  x </div>\n</script>'
+    assert minify_html.minify_html(template_html) == template_html
+
+
+def test_minify_file_keeps_encoding_and_honours_dry_run(tmp_path):
+    page = tmp_path / "page.html"
+    original = PAGE.encode("cp1251")
+    page.write_bytes(original)
+
+    dry = minify_html.minify_file(page, dry_run=True)
+    assert dry.status == "would_minify"
+    assert dry.encoding == "cp1251"
+    assert page.read_bytes() == original
+
+    result = minify_html.minify_file(page)
+    assert result.status == "minified"
+    assert result.after_size < result.before_size
+    assert page.read_bytes().decode("cp1251") == minify_html.minify_html(PAGE)
+
+
+def test_minify_file_refuses_when_assets_would_change(tmp_path, monkeypatch):
+    page = tmp_path / "page.html"
+    page.write_text(PAGE, encoding="utf-8")
+    monkeypatch.setattr(minify_html, "minify_html", lambda text: text.replace('<img  src="logo.png"   alt="logo" >', ""))
+
+    result = minify_html.minify_file(page)
+
+    assert result.status == "refused"
+    assert result.reason == "asset references differ"
+    assert page.read_text(encoding="utf-8") == PAGE
@@ -0,0 +1,101 @@
+import gzip
+import struct
+import zlib
+from pathlib import Path
+
+from tools import optimise_images
+
+
+def png_chunk(kind: bytes, body: bytes) -> bytes:
+    return struct.pack(">I4s", len(body), kind) + body + struct.pack(">I", zlib.crc32(kind + body))
+
+
+def make_png(width: int = 64, height: int = 64) -> bytes:
+    rows = b"".join(b"\x00" + bytes((x * y) % 256 for x in range(width)) for y in range(height))
+    idat = zlib.compress(rows, 1)
+    return (
+        optimise_images.PNG_SIGNATURE
+        + png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+        + png_chunk(b"gAMA", struct.pack(">I", 45455))
+        + png_chunk(b"tEXt", b"Software\x00HTTrack")
+        + png_chunk(b"IDAT", idat[:100])
+        + png_chunk(b"IDAT", idat[100:])
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def segment(marker: int, payload: bytes) -> bytes:
+    return bytes((0xFF, marker)) + struct.pack(">H", len(payload) + 2) + payload
+
+
+def exif(orientation: int) -> bytes:
+    ifd = struct.pack("<H", 1) + struct.pack("<HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack("<I", 0)
+    return b"Exif\x00\x00" + b"II" + struct.pack("<HI", 42, 8) + ifd
+
+
+def make_jpeg(orientation: int) -> bytes:
+    return (
+        b"\xff\xd8"
+        + segment(0xE0, b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00")
+        + segment(0xE1, exif(orientation))
+        + segment(0xE1, b"http://ns.adobe.com/xap/1.0/\x00<x:xmpmeta/>")
+        + segment(0xE2, b"ICC_PROFILE\x00\x01\x01profile")
+        + segment(0xFE, b"comment")
+        + segment(0xDB, b"\x00" + bytes(64))
+        + segment(0xDA, b"\x01\x01\x00\x00\x3f\x00")
+        + b"\x12\x34\xff\x00\x56\xff\xd0\x78"
+        + b"\xff\xd9"
+    )
+
+
+def test_png_is_recompressed_without_changing_pixels() -> None:
+    data = make_png()
+    optimised, removed = optimise_images.optimise_png(data)
+    assert len(optimised) < len(data)
+    assert "tEXt" in removed
+    kinds = [kind for kind, _ in optimise_images._png_chunks(optimised)]
+    assert kinds == [b"IHDR", b"gAMA", b"IDAT", b"IEND"]
+    assert optimise_images._png_rendering(optimised) == optimise_images._png_rendering(data)
+
+
+def test_jpeg_metadata_is_stripped_but_orientation_and_icc_kept() -> None:
+    upright, removed = optimise_images.optimise_jpeg(make_jpeg(1))
+    assert sorted(removed) == ["APP1", "COM", "EXIF"]
+    assert b"ICC_PROFILE" in upright and b"Exif" not in upright
+    assert upright.endswith(b"\x12\x34\xff\x00\x56\xff\xd0\x78\xff\xd9")
+
+    rotated, removed = optimise_images.optimise_jpeg(make_jpeg(6))
+    assert sorted(removed) == ["APP1", "COM"]
+    assert b"Exif" in rotated
+
+
+def test_optimise_files_records_checksums(tmp_path: Path) -> None:
+    gif = (
+        b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff"
+        + b"\x21\xfe\x05hello\x00"
+        + b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00"
+        + b"\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02\x44\x01\x00"
+        + b"\x3b"
+    )
+    files = {"a.png": make_png(), "b.jpg": make_jpeg(1), "c.gif": gif, "d.png": b"\x89PNG\r\n\x1a\nbroken"}
+    for name, data in files.items():
+        (tmp_path / name).write_bytes(data)
+    paths = [tmp_path / name for name in files]
+
+    dry = list(optimise_images.optimise_files(paths, jobs=1, dry_run=True))
+    assert [result.status for result in dry] == ["would_optimise"] * 3 + ["skipped"]
+    assert all((tmp_path / name).read_bytes() == data for name, data in files.items())
+
+    results = list(optimise_images.optimise_files(paths, jobs=2, dry_run=False))
+    assert [result.status for result in results] == ["optimised"] * 3 + ["skipped"]
+    assert b"hello" not in (tmp_path / "c.gif").read_bytes()
+    assert b"NETSCAPE2.0" in (tmp_path / "c.gif").read_bytes()
+
+    record = tmp_path / "optimised_images.txt.gz"
+    assert optimise_images.update_record(record, results) == 3
+    again = list(optimise_images.optimise_files(paths, jobs=1, dry_run=False))
+    assert [result.status for result in again] == ["unchanged"] * 3 + ["skipped"]
+    entries = optimise_images.load_record(record)
+    assert len(entries) == 3
+    assert all(before_size > after_size for _, _, before_size, after_size in entries.values())
+    assert gzip.open(record, "rt").readline().startswith("#")
@@ -0,0 +1,115 @@
+import json
+from pathlib import Path
+
+from tools import list_assets, page_weight, site_index
+
+SITE_CSS = """@charset "utf-8";
+@import "base.css";
+@import url(print.css) print;
+/* .old { background: url(img/old.png) } */
+.logo { background: url("img/logo.png") no-repeat, url(data:image/gif;base64,R0lGOD==) }
+@font-face {
+    font-family: 'Icons';
+    src: url('font/icons.eot');
+    src: url('font/icons.eot?#iefix') format('embedded-opentype'),
+         url(font/icons.woff) format('woff'),
+         url('font/icons.svg#icons') format('svg');
+}
+.remote { background: url(https://example.com/bg.png) }
+"""
+
+
+def make_site(root: Path) -> None:
+    for directory in ("css/img", "css/font", "js"):
+        (root / directory).mkdir(parents=True, exist_ok=True)
+    (root / "css" / "site.css").write_text(SITE_CSS, encoding="utf-8")
+    (root / "css" / "base.css").write_text(".menu { background: url(img/logo.png) }", encoding="utf-8")
+    (root / "css" / "print.css").write_text("body { color: black }", encoding="utf-8")
+    (root / "css" / "img" / "logo.png").write_bytes(b"p" * 1000)
+    (root / "css" / "font" / "icons.eot").write_bytes(b"e" * 5000)
+    (root / "css" / "font" / "icons.woff").write_bytes(b"w" * 3000)
+    (root / "css" / "font" / "icons.svg").write_bytes(b"s" * 9000)
+    (root / "js" / "app.js").write_bytes(b"j" * 2000)
+    (root / "index.html").write_text(
+        '<html><head><link rel="stylesheet" href="css/site.css?ver=2">'
+        '<link rel="canonical" href="index.html"><link rel="icon" href="css/img/logo.png">'
+        '<script src="js/app.js"></script><script src="https://example.com/counter.js"></script></head>'
+        '<body><img src="css/img/logo.png"><img src="img/gone.jpg"></body></html>',
+        encoding="utf-8",
+    )
+
+
+def test_stylesheet_dependencies(tmp_path: Path) -> None:
+    make_site(tmp_path)
+    sheet = tmp_path / "css" / "site.css"
+    assets = list_assets.collect_css_assets(sheet, SITE_CSS)
+    assert {category: [entry.url for entry in entries] for category, entries in assets.items()} == {
+        "font-fallbacks": ["font/icons.eot", "font/icons.eot?#iefix", "font/icons.svg#icons"],
+        "fonts": ["font/icons.woff"],
+        "images": ["https://example.com/bg.png", "img/logo.png"],
+        "stylesheets": ["base.css", "print.css"],
+    }
+    assert assets["fonts"][0].resolved_path == str((tmp_path / "css" / "font" / "icons.woff").resolve())
+
+    with site_index.SiteIndex(tmp_path / "index.sqlite") as index:
+        index.update(tmp_path)
+        assert index.assets(str(sheet.resolve())) == assets
+        assert index.users_of(str((tmp_path / "css" / "img" / "logo.png").resolve())) == [
+            str((tmp_path / "css" / "base.css").resolve()),
+            str((tmp_path / "css" / "site.css").resolve()),
+            str((tmp_path / "index.html").resolve()),
+        ]
+
+    collector = list_assets.AssetCollector(tmp_path / "index.html")
+    collector.feed((tmp_path / "index.html").read_text(encoding="utf-8"))
+    report = {"index.html": collector.to_entries()}
+    assert sorted(Path(key).name for key in list_assets.collect_stylesheet_assets(report)) == [
+        "base.css",
+        "print.css",
+        "site.css",
+    ]
+
+
+def test_weight_and_budgets(tmp_path: Path) -> None:
+    site = tmp_path / "site"
+    make_site(site)
+    page = site / "index.html"
+
+    weight = page_weight.page_weight(page, page_weight.AssetGraph())
+    css_bytes = sum((site / "css" / name).stat().st_size for name in ("site.css", "base.css", "print.css"))
+    assert weight.categories == {
+        "html": page.stat().st_size,
+        "stylesheets": css_bytes,
+        "scripts": 2000,
+        "images": 1000,
+        "fonts": 3000,
+        "media": 0,
+        "embeds": 0,
+        "other": 0,
+    }
+    assert (weight.requests, weight.remote) == (7, 2)
+    assert weight.missing == [str((site / "img" / "gone.jpg").resolve())]
+    with site_index.SiteIndex(tmp_path / "index.sqlite") as index:
+        index.update(site)
+        assert page_weight.page_weight(page, page_weight.AssetGraph(index)) == weight
+
+    broken = site / "broken.html"
+    broken.write_bytes(b'<html><link rel="stylesheet" href="css/site.css">\x98</html>')
+    skipped = page_weight.page_weight(broken, page_weight.AssetGraph())
+    assert (skipped.skipped, skipped.requests, skipped.categories["stylesheets"]) == (page_weight.UNDECODABLE, 1, 0)
+    page_weight.apply_budgets(skipped, {"requests": 0})
+    assert skipped.over_budget == {}
+    assert page_weight.summarise([weight, skipped])["skipped"] == 1
+    with site_index.SiteIndex(tmp_path / "index.sqlite") as index:
+        index.update(site)
+        assert page_weight.page_weight(broken, page_weight.AssetGraph(index)) == skipped
+    broken.unlink()
+
+    assert page_weight.parse_budget("images=1.5KB") == ("images", 1536)
+    logs = tmp_path / "logs"
+    assert page_weight.main([str(site), "--budget", "total=1MB", "--budget", "requests=7", "--log-dir", str(logs)]) == 0
+    assert page_weight.main([str(site), "--budget", "fonts=2KB", "--budget", "requests=6", "--log-dir", str(logs / "over")]) == 1
+    report = json.loads(next((logs / "over").glob("page_weight-*.json")).read_text(encoding="utf-8"))
+    assert report["budgets"] == {"fonts": 2048, "requests": 6}
+    assert report["summary"]["over_budget"] == 1
+    assert report["pages"][0]["over_budget"] == {"fonts": 3000, "requests": 7}
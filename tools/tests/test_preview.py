@@ -0,0 +1,122 @@
+import gzip
+import http.client
+import threading
+from pathlib import Path
+
+from tools import build_site, preview
+
+
+def start_preview(root: Path, **options):
+    httpd = preview.make_server(preview.PagesSite(root, **options), port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, http.client.HTTPConnection("127.0.0.1", httpd.server_address[1], timeout=5)
+
+
+def fetch(conn: http.client.HTTPConnection, path: str, method: str = "GET", **headers: str):
+    conn.request(method, path, headers=headers)
+    response = conn.getresponse()
+    return response.status, dict(response.getheaders()), response.read()
+
+
+def make_site(root: Path) -> None:
+    (root / "blog").mkdir(parents=True)
+    (root / "index.html").write_text("<title>Главная</title>", encoding="utf-8")
+    (root / "about.html").write_text("<title>О нас</title>" + "x" * 2000, encoding="utf-8")
+    (root / "blog" / "index.html").write_text("<title>Блог</title>", encoding="utf-8")
+    (root / "style.css").write_text("body { color: red }", encoding="utf-8")
+    (root / "_redirects").write_text("/old /about 301\n/feed/* /blog/:splat 302\n", encoding="utf-8")
+
+
+def test_clean_urls_redirects_and_headers(tmp_path: Path) -> None:
+    make_site(tmp_path)
+    (tmp_path / "_headers").write_text(
+        build_site.HEADERS_TEMPLATE.format(
+            marker=build_site.HEADERS_MARKER, html_max_age=300, asset_dir=build_site.ASSET_DIR
+        ),
+        encoding="utf-8",
+    )
+    httpd, conn = start_preview(tmp_path)
+    try:
+        status, headers, body = fetch(conn, "/about")
+        assert status == 200 and "О нас" in body.decode("utf-8")
+        assert headers["Content-Type"] == "text/html; charset=utf-8"
+        assert headers["Cache-Control"] == "public, max-age=300, must-revalidate"
+        assert fetch(conn, "/about.html")[1]["Location"] == "/about"
+        assert fetch(conn, "/blog")[1]["Location"] == "/blog/"
+        assert fetch(conn, "/blog/index.html")[0] == 308
+        assert fetch(conn, "/blog/")[0] == 200
+        assert fetch(conn, "/old?page=2")[1]["Location"] == "/about?page=2"
+        status, headers, _ = fetch(conn, "/feed/rss", "HEAD")
+        assert (status, headers["Location"]) == (302, "/blog/rss")
+        assert fetch(conn, "/_redirects")[0] == 200  # config files are never served: SPA fallback
+    finally:
+        conn.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "assets" / "app.0123456789.css").write_text("a{}", encoding="utf-8")
+    httpd, conn = start_preview(tmp_path)
+    try:
+        headers = fetch(conn, "/assets/app.0123456789.css")[1]
+        assert headers["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert headers["Content-Type"] == "text/css; charset=utf-8"
+    finally:
+        conn.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_conditional_range_and_gzip_responses(tmp_path: Path) -> None:
+    make_site(tmp_path)
+    httpd, conn = start_preview(tmp_path)
+    try:
+        status, headers, body = fetch(conn, "/about", **{"Accept-Encoding": "gzip"})
+        assert headers["Content-Encoding"] == "gzip" and headers["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(body) == (tmp_path / "about.html").read_bytes()
+        assert fetch(conn, "/about", **{"If-None-Match": headers["ETag"]})[0] == 304
+
+        status, headers, body = fetch(conn, "/style.css", Range="bytes=0-3")
+        assert (status, body, headers["Content-Range"]) == (206, b"body", "bytes 0-3/19")
+        assert fetch(conn, "/style.css", Range="bytes=100-")[0] == 416
+
+        (tmp_path / "style.css").write_text("body { color: blue }", encoding="utf-8")
+        assert fetch(conn, "/style.css")[2] == b"body { color: blue }"
+    finally:
+        conn.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_not_found_handling(tmp_path: Path) -> None:
+    make_site(tmp_path)
+    httpd, conn = start_preview(tmp_path)
+    try:
+        status, _, body = fetch(conn, "/missing.png")
+        assert status == 200 and "Главная" in body.decode("utf-8")
+    finally:
+        conn.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+    httpd, conn = start_preview(tmp_path, strict_404=True)
+    try:
+        assert fetch(conn, "/missing.png")[0] == 404
+        assert fetch(conn, "/a%00b")[0] == 404
+    finally:
+        conn.close()
+        httpd.shutdown()
+        httpd.server_close()
+
+    (tmp_path / "blog" / "404.html").write_text("blog 404", encoding="utf-8")
+    (tmp_path / "404.html").write_text("site 404", encoding="utf-8")
+    httpd, conn = start_preview(tmp_path)
+    try:
+        status, _, body = fetch(conn, "/blog/2014/gone")
+        assert (status, body) == (404, b"blog 404")
+        status, _, body = fetch(conn, "/gone")
+        assert (status, body) == (404, b"site 404")
+    finally:
+        conn.close()
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+
+from tools import check_links, profiling
+
+
+def test_profiler_keeps_slowest_files_and_phases() -> None:
+    profiler = profiling.Profiler(top=2)
+    for name, seconds in (("a.html", 0.3), ("b.html", 0.1), ("c.html", 0.5)):
+        profiler.add_file(name, seconds)
+    profiler.add_phase("parse", 0.2, 0.1)
+    profiler.add_phase("parse", 0.3, 0.2)
+    profiler.add_request("http://localhost/", 0.05, 200)
+
+    report = profiler.report()
+    assert [item["path"] for item in report["files"]["slowest"]] == ["c.html", "a.html"]
+    assert report["files"]["timed"] == 3
+    assert report["phases"]["parse"] == {"calls": 2, "wall_seconds": 0.5, "cpu_seconds": 0.3}
+    assert report["http"]["requests"] == 1
+    assert profiling.active() is None
+
+
+def test_profile_is_embedded_in_report(tmp_path: Path, capsys) -> None:
+    page = tmp_path / "index.html"
+    page.write_text('<html><head><link rel="stylesheet" href="style.css"></head></html>', "utf-8")
+    (tmp_path / "style.css").write_text("body {}", "utf-8")
+
+    plain = tmp_path / "plain.json"
+    assert check_links.main(["--scope", str(page), "--output", str(plain)]) == 0
+    assert "profile" not in json.loads(plain.read_text("utf-8"))
+
+    profiled = tmp_path / "profiled.json"
+    assert check_links.main(["--scope", str(page), "--output", str(profiled), "--profile"]) == 0
+    profile = json.loads(profiled.read_text("utf-8"))["profile"]
+    assert {"walk", "read", "parse"} <= set(profile["phases"])
+    assert profile["files"]["slowest"][0]["path"] == str(page)
+    assert profiling.active() is None
+    assert "slowest of 1 files" in capsys.readouterr().err
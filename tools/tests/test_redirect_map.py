@@ -0,0 +1,85 @@
+from pathlib import Path
+
+from tools import redirect_map
+
+BODY = "<html><head><title>Статья</title></head><body><p>Текст</p></body></html>\n"
+
+
+def mirrored(url: str, body: str = BODY) -> str:
+    comment = f"<!-- Mirrored from {url} by HTTrack Website Copier/3.x [XR&CO'2014], Fri, 05 Sep 2025 14:09:43 GMT -->\n"
+    return comment + body + comment
+
+
+def moved(target: str) -> str:
+    return (
+        '<HTML>\n<!-- Created by HTTrack Website Copier/3.49-2 [XR&CO\'2014] -->\n<HEAD>\n'
+        f'<META HTTP-EQUIV="Refresh" CONTENT="0; URL={target}"><TITLE>Page has moved</TITLE>\n'
+        f'</HEAD>\n<BODY>\n<A HREF="{target}"><h3>Click here...</h3></A>\n</BODY>\n</HTML>\n'
+    )
+
+
+def make_mirror(root: Path) -> None:
+    files = {
+        "ABC-1.html": mirrored("nlping.ru/ABC-1"),
+        "index1a2b.html": mirrored("nlping.ru/?id=ABC-1"),
+        "index3c4d.html": mirrored("nlping.ru/?id=unique", BODY.replace("Текст", "Другой текст")),
+        "index5e6f.html": moved("index1a2b.html?id=ABC-1"),
+        "order/index.html": moved("index.html"),
+        "blog/index.html": mirrored("nlping.ru/blog/"),
+        "old/index.html": moved("../blog/"),
+        "_p_http_/nlping.ru/ABC-1.html": "Page Not Found",
+        "_p_http_/nlping.ru/gone.html": "Access Denied",
+        "index7a8b.html": moved("_p_http_/nlping.ru/gone.html"),
+    }
+    for name, text in files.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(text, encoding="utf-8")
+
+
+def find(root: Path):
+    pages = [redirect_map.read_page(root, path) for path in sorted(root.rglob("*.html"))]
+    return redirect_map.find_redirects(root, pages)
+
+
+def test_stubs_and_variants_become_collapsed_redirects(tmp_path: Path) -> None:
+    make_mirror(tmp_path)
+
+    redirects, unresolved = find(tmp_path)
+
+    assert [(item.path, item.target, item.kind) for item in redirects] == [
+        ("_p_http_/nlping.ru/ABC-1.html", "ABC-1.html", "proxy"),
+        ("index1a2b.html", "ABC-1.html", "variant"),
+        ("index5e6f.html", "ABC-1.html", "moved"),
+        ("old/index.html", "blog/index.html", "moved"),
+    ]
+    assert {item.path: item.reason for item in unresolved} == {
+        "_p_http_/nlping.ru/gone.html": "no mirrored page for this URL",
+        "index7a8b.html": "target _p_http_/nlping.ru/gone.html is itself an unresolved stub",
+        "order/index.html": "refreshes to itself",
+    }
+    assert redirect_map.render_redirects(redirects).splitlines()[1:] == [
+        "/_p_http_/nlping.ru/ABC-1.html /ABC-1 301",
+        "/index1a2b.html /ABC-1 301",
+        "/index5e6f.html /ABC-1 301",
+        "/old/index.html /blog/ 301",
+        "/old/ /blog/ 301",
+    ]
+
+
+def test_targets_are_verified_and_rules_round_trip(tmp_path: Path) -> None:
+    make_mirror(tmp_path)
+    redirects, _ = find(tmp_path)
+    (tmp_path / "blog" / "index.html").unlink()
+
+    documents, probes = redirect_map.verify(tmp_path, redirects, base_url=None, timeout=1.0)
+
+    assert probes == []
+    assert [Path(doc.path).name for doc in redirect_map.target_failures(documents)] == ["index.html"]
+    output = tmp_path / "_redirects"
+    output.write_text(redirect_map.render_redirects(redirects), encoding="utf-8")
+    assert redirect_map.redirected_files(redirect_map.load_redirects(output)) == {
+        "_p_http_/nlping.ru/ABC-1.html",
+        "index1a2b.html",
+        "index5e6f.html",
+        "old/index.html",
+    }
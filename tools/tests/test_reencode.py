@@ -60,12 +60,67 @@ def test_reencode_recovers_double_encoded_cp1251(tmp_path: Path) -> None:
     assert exit_code == 0
     result = source.read_text("utf-8")
     assert "НЛП" in result
-    assert "charset=windows-1251" in result  # meta is updated later
+    assert "charset=utf-8" in result
+    assert "windows-1251" not in result
 
     log = read_json(get_log_path(log_dir))
     entry = log["files"][0]
     assert entry["status"] == "converted"
     assert entry["original_encoding"] == "windows-1251"
+    assert entry["charset_rewrites"] == [
+        {"kind": "meta", "line": 1, "column": 73, "original": "windows-1251", "replacement": "utf-8"}
+    ]
+
+
+def test_reencode_rewrites_meta_and_xml_prolog(tmp_path: Path) -> None:
+    payload = (
+        '<?xml version="1.0" encoding="windows-1251"?>\n'
+        "<html><head>\n"
+        '<meta charset="windows-1251">\n'
+        "</head><body>Привет</body></html>"
+    )
+    source = tmp_path / "page.xhtml"
+    source.write_bytes(payload.encode("cp1251"))
+
+    log_dir = tmp_path / "logs"
+    exit_code = reencode.main(["--paths", str(source), "--log-dir", str(log_dir)])
+
+    assert exit_code == 0
+    result = source.read_text("utf-8")
+    assert result.startswith('<?xml version="1.0" encoding="UTF-8"?>')
+    assert '<meta charset="utf-8">' in result
+
+    entry = read_json(get_log_path(log_dir))["files"][0]
+    assert [(item["kind"], item["line"], item["column"]) for item in entry["charset_rewrites"]] == [
+        ("xml", 1, 31),
+        ("meta", 3, 16),
+    ]
+
+
+def test_reencode_updates_charset_of_utf8_file(tmp_path: Path) -> None:
+    source = tmp_path / "page.html"
+    source.write_text('<meta http-equiv="Content-Type" content="text/html; charset=cp1251">Ок', "utf-8")
+
+    log_dir = tmp_path / "logs"
+    exit_code = reencode.main(["--paths", str(source), "--log-dir", str(log_dir)])
+
+    assert exit_code == 0
+    assert "charset=utf-8" in source.read_text("utf-8")
+    entry = read_json(get_log_path(log_dir))["files"][0]
+    assert entry["status"] == "charset_updated"
+    assert entry["original_hash"] != entry["new_hash"]
+
+
+def test_reencode_keep_charset(tmp_path: Path) -> None:
+    source = tmp_path / "page.html"
+    source.write_text('<meta charset="windows-1251">Ок', "utf-8")
+
+    log_dir = tmp_path / "logs"
+    exit_code = reencode.main(["--paths", str(source), "--log-dir", str(log_dir), "--keep-charset"])
+
+    assert exit_code == 0
+    assert source.read_text("utf-8") == '<meta charset="windows-1251">Ок'
+    assert read_json(get_log_path(log_dir))["files"][0]["status"] == "skipped"
 
 
 def test_reencode_skips_utf8(tmp_path: Path) -> None:
@@ -112,3 +167,36 @@ def test_reencode_reports_detection_error(tmp_path: Path, monkeypatch: pytest.Mo
     entry = log["files"][0]
     assert entry["status"] == "error"
     assert entry["error"] == "encoding detection failed"
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        ('<meta charset="windows-1251">\n<p>Привет, мир!</p>\n' * 20).encode("cp1251"),
+        (
+            '<meta http-equiv="Content-Type" content="text/html; charset=windows-1251">\n'
+            + "<p>НЛП — для руководителей</p>\n".encode("cp1251").decode("latin1") * 20
+        ).encode("utf-8"),
+        ('<meta charset="koi8-r">\n<p>Уже UTF-8</p>\n' * 20).encode("utf-8"),
+        "<p>Уже UTF-8</p>".encode("utf-8"),
+    ],
+    ids=["cp1251", "double-encoded", "utf8-declaration", "utf8"],
+)
+def test_chunked_conversion_matches_in_memory(tmp_path: Path, payload: bytes) -> None:
+    in_memory = tmp_path / "memory.html"
+    chunked = tmp_path / "chunked.html"
+    in_memory.write_bytes(payload)
+    chunked.write_bytes(payload)
+
+    expected = reencode.convert_file(in_memory)
+    actual = reencode.convert_file(chunked, large_file_threshold=0, chunk_size=7)
+
+    assert chunked.read_bytes() == in_memory.read_bytes()
+    assert (actual.status, actual.original_encoding, actual.original_hash, actual.new_hash) == (
+        expected.status,
+        expected.original_encoding,
+        expected.original_hash,
+        expected.new_hash,
+    )
+    assert actual.charset_rewrites == expected.charset_rewrites
+    assert not list(tmp_path.glob("*.reencode-tmp"))
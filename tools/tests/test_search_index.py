@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tools import search_index, stemmer, walker
+
+CLIENT = Path(search_index.__file__).resolve().parent / "search_client.js"
+
+
+def make_site(root: Path) -> None:
+    root.mkdir()
+    (root / "index.html").write_text(
+        '<html><head><title>Якоря в НЛП</title><meta name="description" content="Как ставить якоря">'
+        "<style>.x { color: red }</style><script>var hidden = 1;</script></head>"
+        "<body><h1>Якорение</h1><p>Якорь связывает состояние с раздражителем.</p></body></html>",
+        encoding="utf-8",
+    )
+    (root / "course.html").write_text(
+        "<html><head><title>Курс</title></head><body><p>Программирование состояний и якорей.</p></body></html>",
+        encoding="windows-1251",
+    )
+    (root / "private.html").write_text(
+        '<html><head><meta name="robots" content="noindex"><title>Скрыто</title></head><body>якорь</body></html>',
+        encoding="utf-8",
+    )
+    (root / "close.html").write_text("<script>window.close();</script>", encoding="utf-8")
+
+
+def build(site: Path, output: Path, cache: Path, **options) -> search_index.SearchStats:
+    return search_index.build_search_index(
+        site, output, cache_path=cache, ignore=walker.IgnoreRules(base=site), jobs=1, **options
+    )
+
+
+def test_stemmer() -> None:
+    samples = {
+        "якоря": "якор",
+        "якорей": "якор",
+        "программирование": "программирован",
+        "состояниями": "состоян",
+        "ёлками": "елк",
+        "лучшей": "лучш",
+        "nlp": "nlp",
+    }
+    assert {word: stemmer.stem(word) for word in samples} == samples
+    assert search_index.words("Что́ такое НЛП? Это 2 ёжика и nlp") == ["такое", "нлп", "ежика", "nlp"]
+
+
+def test_build_is_incremental(tmp_path: Path) -> None:
+    site, output, cache = tmp_path / "site", tmp_path / "search", tmp_path / "cache.json"
+    make_site(site)
+
+    stats = build(site, output, cache)
+    assert (stats.pages, stats.extracted, stats.documents) == (4, 4, 2)
+    assert stats.skipped == {"empty": 1, "noindex": 1}
+    manifest = json.loads((output / "manifest.json").read_text(encoding="utf-8"))
+    assert manifest["documents"] == 2
+    shard = json.loads((output / "terms" / f"{search_index.shard_name('як')}.json").read_text(encoding="utf-8"))
+    # course.html sorts first; the title/description weight puts index.html ahead.
+    assert shard["якор"][0::2] == [0, 1]
+    assert shard["якор"][3] > shard["якор"][1]
+    assert json.loads((output / "docs" / "0.json").read_text(encoding="utf-8"))[1][1] == "Якоря в НЛП"
+    indexed = set()
+    for path in (output / "terms").glob("*.json"):
+        indexed.update(json.loads(path.read_text(encoding="utf-8")))
+    assert {"hidden", "color", "скрыт"}.isdisjoint(indexed)
+
+    stats = build(site, output, cache)
+    assert (stats.extracted, stats.reused, stats.written) == (0, 4, 0)
+
+    (site / "course.html").unlink()
+    stats = build(site, output, cache)
+    assert (stats.extracted, stats.documents) == (0, 1)
+    assert not (output / "terms" / f"{search_index.shard_name('пр')}.json").exists()
+
+    small = build(site, tmp_path / "small", tmp_path / "small.json", shard_bytes=1)
+    assert small.shards > stats.shards
+    assert search_index.plan_shards({"як": 1, "якор": 5, "якут": 5, "дом": 1}, 2, 8) == {
+        "як": "як",
+        "якор": "яко",
+        "якут": "яку",
+        "дом": "до",
+    }
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_client_matches_index(tmp_path: Path) -> None:
+    site, output = tmp_path / "site", tmp_path / "search"
+    make_site(site)
+    # With one-byte shards every prefix is split as far as it goes, so completions of a
+    # partly typed last word ("прог") only live in longer-prefix shards.
+    build(site, output, tmp_path / "cache.json", shard_bytes=1)
+    assert not (output / "terms" / f"{search_index.shard_name('прог')}.json").exists()
+    words = ["якоря", "программирование", "состояниями", "ёлками", "лучшей", "nlp", "раздражителем"]
+    script = f"""
+        const fs = require("fs");
+        globalThis.fetch = async (path) => ({{ ok: true, json: async () => JSON.parse(fs.readFileSync({json.dumps(str(output))} + "/" + path, "utf8")) }});
+        const client = require({json.dumps(str(CLIENT))});
+        Promise.all([client.search("якорь состоя"), client.search("прог"), client.search("прог якорь")]).then(
+            ([results, completed, first]) => {{
+                console.log(JSON.stringify({{ stems: {json.dumps(words)}.map(client.stem), results, completed, first }}));
+            }}
+        );
+    """
+    completed = subprocess.run(
+        ["node", "-e", script], capture_output=True, text=True, check=True, env={**os.environ, "NODE_OPTIONS": ""}
+    )
+    payload = json.loads(completed.stdout)
+    assert payload["stems"] == [stemmer.stem(word) for word in words]
+    assert [result["url"] for result in payload["results"]] == ["/", "/course"]
+    assert [result["url"] for result in payload["completed"]] == ["/course"]
+    # Only the last word is completed.
+    assert [result["url"] for result in payload["first"]] == ["/", "/course"]
@@ -0,0 +1,64 @@
+import json
+import threading
+from pathlib import Path
+from typing import Callable
+
+from tools import check_links, check_utf8, server, server_client
+
+
+def start_server(site: Path, baseline: Path):
+    state = server.ValidationState(site, baseline)
+    state.warm()
+    httpd = server.make_server(state, port=0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+def test_queries_and_revalidation(tmp_path: Path, check_site: Path) -> None:
+    site = check_site
+    httpd, url = start_server(site, tmp_path / "missing.json.gz")
+    try:
+        assert server_client.request_json(url, "/status")["documents_read"] == 2
+        users = server_client.request_json(url, "/who-uses?path=css/styles.css")
+        assert [Path(item).name for item in users["documents"]] == ["index.html"]
+
+        (site / "about.html").write_bytes("<title>О нас</title>".encode("cp1251"))
+        status = server_client.request_json(url, "/encoding-status?paths=about.html")
+        assert status["documents"][0]["detected_encoding"] not in (None, "utf-8")
+        assert server_client.request_json(url, "/status")["documents_read"] == 3
+        assert server_client.request_json(url, "/who-uses") is None  # 400: missing path
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_forwarded_reports_match_local_runs(
+    tmp_path: Path, check_site: Path, load_report: Callable[[Path], dict]
+) -> None:
+    site = check_site
+    baseline = tmp_path / "missing.json.gz"
+    httpd, url = start_server(site, baseline)
+    scope = ["--scope", str(site)]
+    utf8_args = scope + ["--no-manifest", "--baseline", str(baseline)]
+    try:
+        assert check_links.main(scope + ["--server", url, "--output", str(tmp_path / "remote_links.json")]) == 1
+        assert check_utf8.main(utf8_args + ["--server", url, "--output", str(tmp_path / "remote_utf8.json")]) == 0
+        reads = server_client.request_json(url, "/status")["documents_read"]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    assert reads == 2
+
+    assert check_links.main(scope + ["--no-server", "--output", str(tmp_path / "links.json")]) == 1
+    assert check_utf8.main(utf8_args + ["--no-server", "--output", str(tmp_path / "utf8.json")]) == 0
+    assert load_report(tmp_path / "remote_links.json") == load_report(tmp_path / "links.json")
+    assert load_report(tmp_path / "remote_utf8.json") == load_report(tmp_path / "utf8.json")
+
+    # The server is gone: an explicit --server falls back to the local run.
+    assert check_links.main(scope + ["--server", url, "--output", str(tmp_path / "fallback.json")]) == 1
+    assert json.loads((tmp_path / "fallback.json").read_text("utf-8"))["summary"]
+
+    state_file = tmp_path / "server.json"
+    for pid in ({}, {"pid": 0}, {"pid": -1}):
+        state_file.write_text(json.dumps({"project_root": str(server_client.PROJECT_ROOT), "url": url, **pid}), "utf-8")
+        assert server_client.find_server(state_file=state_file) is None
@@ -0,0 +1,93 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from tools import check_links, check_utf8, list_assets, site_index
+
+
+def make_site(root: Path) -> None:
+    (root / "css").mkdir(parents=True)
+    (root / "css" / "styles.css").write_text("body {}", "utf-8")
+    (root / "index.html").write_bytes(
+        (
+            '<html><head><meta http-equiv="Content-Type" content="text/html; charset=windows-1251">'
+            '<title>Главная</title>'
+            '<meta name="description" content="Описание">'
+            '<link rel="stylesheet" href="css/styles.css"></head>'
+            '<body><h1>НЛП</h1><img src="images/missing.png"></body></html>'
+        ).encode("cp1251")
+    )
+    (root / "about.html").write_text("<title>О нас</title>", "utf-8")
+
+
+def test_update_is_incremental(tmp_path: Path) -> None:
+    site = tmp_path / "site"
+    make_site(site)
+    with site_index.SiteIndex(tmp_path / "index.sqlite") as index:
+        first = index.update(site)
+        assert (first.total, first.indexed, first.unchanged) == (3, 3, 0)
+
+        about = site / "about.html"
+        about.write_text("<title>О компании</title>", "utf-8")
+        stat = about.stat()
+        os.utime(about, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        (site / "css" / "styles.css").unlink()
+
+        second = index.update(site)
+        assert (second.total, second.indexed, second.unchanged, second.removed) == (2, 1, 1, 1)
+        assert index.document(str(about.resolve())).seo.title == "О компании"
+
+        partial = index.update(site / "css", rebuild=True)
+        assert (partial.total, partial.removed) == (0, 0)
+        assert index.document(str(about.resolve())) is not None
+
+
+def test_queries_match_direct_extraction(tmp_path: Path) -> None:
+    site = tmp_path / "site"
+    make_site(site)
+    page = site / "index.html"
+    with site_index.SiteIndex(tmp_path / "index.sqlite") as index:
+        index.update(site)
+        key = str(page.resolve())
+
+        document = index.document(key)
+        assert document.detected_encoding == "cp1251"
+        assert document.declared_charset == "windows-1251"
+        assert document.seo.meta == {"description": "Описание"}
+
+        assets = index.assets(key)
+        assert [(entry.url, entry.exists) for entry in assets["stylesheets"]] == [("css/styles.css", True)]
+        assert [(entry.url, entry.exists) for entry in assets["images"]] == [("images/missing.png", False)]
+        assert index.users_of(str((site / "css" / "styles.css").resolve())) == [key]
+
+        direct = check_utf8.inspect_document("scope", page, "/index.html", {}, base=None, timeout=1)
+        indexed = check_utf8.inspect_document("scope", page, "/index.html", {}, base=None, timeout=1, index=index)
+        assert json.dumps(indexed.__dict__, default=lambda o: o.__dict__, ensure_ascii=False) == json.dumps(
+            direct.__dict__, default=lambda o: o.__dict__, ensure_ascii=False
+        )
+
+
+def test_changed_files_are_not_answered_from_the_index(tmp_path: Path) -> None:
+    site = tmp_path / "site"
+    make_site(site)
+    page = site / "about.html"
+    with site_index.SiteIndex(tmp_path / "index.sqlite") as index:
+        index.update(site)
+        key = str(page.resolve())
+        assert index.document(key).seo.title == "О нас"
+
+        page.write_text('<title>О компании</title><img src="logo.png">', "utf-8")
+        stat = page.stat()
+        os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert index.document(key) is None
+        assert index.assets(key) is None
+        report = check_utf8.inspect_document("scope", page, "/about.html", {}, base=None, timeout=1, index=index)
+        assert report.seo.title == "О компании"
+        assert [entry.url for entry in check_links.load_assets(page, index)["images"]] == ["logo.png"]
+        assert [entry.url for entry in list_assets.collect_assets([page], index)[key]["images"]] == ["logo.png"]
+
+    with pytest.raises(SystemExit, match="does not exist"):
+        site_index.open_site_index(tmp_path / "missing.sqlite")
+    assert not (tmp_path / "missing.sqlite").exists()
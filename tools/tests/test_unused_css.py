@@ -0,0 +1,117 @@
+import json
+from pathlib import Path
+
+from tools import unused_css
+
+PAGE = """<!DOCTYPE html>
+<html><body>
+<div id="page" class="wide">
+  <ul class="menu"><li><a href="/">Главная</a><li class="active"><a href="/about">О нас</a></ul>
+  <p>First<p class="note">Second
+  <input type="text" name="q">
+</div>
+<script>$(".menu").addClass("is-open")</script>
+</body></html>
+"""
+
+
+def make_dom(tmp_path: Path, html: str = PAGE) -> unused_css.PageDom:
+    page = tmp_path / "page.html"
+    page.write_text(html, encoding="utf-8")
+    parser = unused_css.PageParser(page)
+    parser.feed(html)
+    parser.close()
+    words = frozenset(unused_css.SCRIPT_WORD_RE.findall("\n".join(parser.inline_scripts)))
+    return unused_css.PageDom("page.html", parser.elements, words)
+
+
+def test_selector_verdicts(tmp_path: Path) -> None:
+    dom = make_dom(tmp_path)
+    expected = {
+        "#page.wide": "used",
+        "div > ul.menu li + li.active a": "used",
+        "ul li:first-child a": "used",
+        "ul li:nth-child(2n+1).active": "unused",
+        "li:last-child:not(.active)": "unused",
+        "p ~ p.note": "used",
+        "p.note > p": "unused",  # the unclosed <p> is closed by the next one
+        "input[type=text][name^='q']": "used",
+        "a:hover": "used",  # state pseudo-classes and pseudo-elements are assumed to match
+        "li.active a::before": "used",
+        "li:not(:hover)": "used",
+        "ul.menu.is-open": "script",
+        ".missing": "unused",
+        "table td": "unused",
+        "a:-moz-any-link": "used",
+        "li >": "kept",
+    }
+    assert {selector: dom.verdict(selector) for selector in expected} == expected
+
+
+def test_tree_matches_browser_parsing(tmp_path: Path) -> None:
+    dom = make_dom(
+        tmp_path,
+        "<html><body>"
+        '<table class="t"><tr><th>Head<tr><td class="c">Cell<table class="inner"><td>Nested</table></table>'
+        '<form><table class="f"><thead><tr><th>x</thead><tr><td>y</table></form>'
+        '<p class="lead"><span>Intro<div class="d">Block</div>'
+        '<ul><li><span>One<li class="two">Two</ul>'
+        "</body></html>",
+    )
+    expected = {
+        ".t > tbody > tr > td.c": "used",  # implied <tbody>
+        ".t > tr": "unused",
+        "tbody th": "used",
+        "form tbody th": "unused",  # the only th of that form is in <thead>
+        "form tbody td": "used",
+        ".inner > tbody > tr > td": "used",  # <td> right under <table> gets <tbody><tr>
+        "td.c > table": "used",
+        "body > .d": "used",  # <div> closes the <p> even though <span> is the current element
+        "p.lead .d": "unused",
+        "p.lead > span": "used",
+        "ul > li.two": "used",  # <li> closes the open <li> through the <span>
+        "li li": "unused",
+    }
+    assert {selector: dom.verdict(selector) for selector in expected} == expected
+
+
+def test_report_and_verified_pruned_output(tmp_path: Path) -> None:
+    site = tmp_path / "site"
+    (site / "css").mkdir(parents=True)
+    (site / "css" / "site.css").write_text(
+        '@charset "utf-8";\n'
+        '@import url("extra.css");\n'
+        "/* layout */\n"
+        "#page { margin: 0 auto }\n"
+        ".unused, .gone { color: red }\n"
+        "@media print { .unused { display: none } }\n"
+        "@media screen { #page { width: 960px } .unused { width: 0 } }\n"
+        '@font-face { font-family: "X"; src: url("x.woff") }\n'
+        ".keep-me { color: blue }\n",
+        encoding="utf-8",
+    )
+    (site / "css" / "extra.css").write_text(".menu li { float: left }\n", encoding="utf-8")
+    head = '<html><head><link rel="stylesheet" href="css/site.css"></head>'
+    (site / "index.html").write_text(head + '<body><div id="page"></div></body></html>', encoding="utf-8")
+    (site / "about.html").write_text(head + '<body><ul class="menu"><li>x</li></ul></body></html>', encoding="utf-8")
+    output, logs = tmp_path / "pruned", tmp_path / "logs"
+
+    args = [str(site), "--output", str(output), "--keep", r"^\.keep-", "--log-dir", str(logs)]
+    assert unused_css.main(args) == 0
+
+    report = json.loads(next(logs.glob("unused_css-*.json")).read_text(encoding="utf-8"))
+    sheets = {Path(sheet["path"]).name: sheet for sheet in report["stylesheets"]}
+    assert (sheets["site.css"]["used"], sheets["site.css"]["kept"], sheets["site.css"]["unused"]) == (2, 1, 3)
+    assert sheets["site.css"]["status"] == "written"
+    assert sheets["extra.css"]["status"] == "unchanged"
+    assert [rule["line"] for rule in sheets["site.css"]["unused_rules"]] == [5, 6, 7]
+    pages = {Path(page["path"]).name: page["stylesheets"] for page in report["pages"]}
+    about = {Path(path).name: counts for path, counts in pages["about.html"].items()}
+    assert about["site.css"] == {"used": 0, "script": 0, "kept": 1, "unused": 5}
+    assert about["extra.css"]["used"] == 1
+
+    pruned = (output / str(site / "css" / "site.css").lstrip("/")).read_text(encoding="utf-8")
+    assert pruned.startswith('@charset "utf-8";\n@import url("extra.css");\n#page { margin: 0 auto }\n')
+    assert ".unused" not in pruned and "@media print" not in pruned
+    assert "@media screen {\n#page { width: 960px }\n}" in pruned
+    assert "@font-face" in pruned and ".keep-me" in pruned
@@ -0,0 +1,67 @@
+import subprocess
+import threading
+from pathlib import Path
+
+from tools import utf8_guard
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True)
+
+
+def make_repo(root: Path) -> Path:
+    git(root, "init", "-q")
+    git(root, "config", "user.email", "guard@example.com")
+    git(root, "config", "user.name", "Guard")
+    (root / "old.html").write_bytes('<meta charset="windows-1251">\n<p>Старое</p>\n'.encode("cp1251"))
+    (root / "page.html").write_text('<meta charset="utf-8">\n<p>Главная</p>\n', "utf-8")
+    git(root, "add", ".")
+    git(root, "commit", "-q", "-m", "init")
+    return root
+
+
+def test_only_added_lines_are_checked(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path)
+    # Touching a line of an existing cp1251 file still flags it, but not its untouched declaration.
+    (repo / "old.html").write_bytes('<meta charset="windows-1251">\n<p>Новое</p>\n'.encode("cp1251"))
+    (repo / "page.html").write_text(
+        '<meta charset="utf-8">\n<p>Главная</p>\n<p>«Цитата» �</p>\n<p>РќР›Рџ Ð</p>\n', "utf-8"
+    )
+    (repo / "feed.xml").write_text('<?xml version="1.0" encoding="windows-1251"?>\n<rss/>\n', "utf-8")
+    (repo / "notes.txt").write_text("charset=windows-1251\n", "utf-8")
+    git(repo, "add", ".")
+
+    files, findings = utf8_guard.run_guard(repo)
+    assert sorted(item.path for item in files) == ["feed.xml", "old.html", "page.html"]
+    assert sorted((item.path, item.line, item.issue) for item in findings) == [
+        ("feed.xml", 1, "legacy_charset"),
+        ("old.html", 2, "not_utf8"),
+        ("page.html", 3, "replacement_char"),
+        ("page.html", 4, "suspect_sequences"),
+    ]
+    assert utf8_guard.main(["--repo", str(repo)]) == 1
+
+    git(repo, "reset", "-q")
+    (repo / "page.html").write_text('<meta charset="utf-8">\n<p>«Главная» — НЛП</p>\n', "utf-8")
+    git(repo, "add", "page.html")
+    assert utf8_guard.run_guard(repo)[1] == []
+    assert utf8_guard.main(["--repo", str(repo)]) == 0
+    git(repo, "commit", "-q", "-m", "clean")
+    assert utf8_guard.main(["--repo", str(repo), "--against", "HEAD~1"]) == 0
+
+
+def test_blob_stream_larger_than_pipe_buffers(tmp_path: Path) -> None:
+    repo = make_repo(tmp_path)
+    blob = subprocess.run(
+        ["git", "-C", str(repo), "rev-parse", "HEAD:page.html"], check=True, capture_output=True, text=True
+    ).stdout.strip()
+    # 4000 ids and their contents each exceed a 64 KiB pipe buffer.
+    blobs = [blob] * 4000
+    sizes = []
+    reader = threading.Thread(
+        target=lambda: sizes.extend(len(content) for _, content in utf8_guard.iter_blobs(repo, blobs)), daemon=True
+    )
+    reader.start()
+    reader.join(timeout=30)
+    assert not reader.is_alive(), "git cat-file --batch deadlocked"
+    assert sizes == [(repo / "page.html").stat().st_size] * 4000
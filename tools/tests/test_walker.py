@@ -0,0 +1,59 @@
+import argparse
+from pathlib import Path
+
+from tools import walker
+
+
+def make_tree(root: Path) -> None:
+    for name in (
+        "a.html",
+        "a-b/c.HTML",
+        "a/b.css",
+        "a/z/deep.htm",
+        ".git/objects/ab",
+        "logs/run.json",
+        "nested/logs/kept.html",
+        "img/__pycache__/x.pyc",
+    ):
+        target = root / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(name, "utf-8")
+
+
+def test_order_matches_sorted_rglob(tmp_path: Path) -> None:
+    make_tree(tmp_path)
+    expected = [path for path in sorted(tmp_path.rglob("*")) if path.is_file()]
+
+    assert list(walker.iter_files([tmp_path], ignore=walker.NO_IGNORE)) == expected
+
+
+def test_default_rules_and_suffix_filter(tmp_path: Path) -> None:
+    make_tree(tmp_path)
+    rules = walker.IgnoreRules(base=tmp_path)
+
+    found = [path.relative_to(tmp_path).as_posix() for path in walker.iter_files([tmp_path], ignore=rules)]
+    assert found == ["a/b.css", "a/z/deep.htm", "a-b/c.HTML", "a.html", "nested/logs/kept.html"]
+
+    html = walker.iter_files([tmp_path], suffixes={".html", ".htm"}, ignore=rules)
+    assert [path.name for path in html] == ["deep.htm", "c.HTML", "a.html", "kept.html"]
+
+
+def test_explicit_roots_are_never_ignored(tmp_path: Path) -> None:
+    make_tree(tmp_path)
+    rules = walker.IgnoreRules(base=tmp_path)
+
+    assert [path.name for path in walker.iter_files([tmp_path / "logs"], ignore=rules)] == ["run.json"]
+
+
+def test_exclude_arguments(tmp_path: Path) -> None:
+    parser = argparse.ArgumentParser()
+    walker.add_ignore_arguments(parser)
+    args = parser.parse_args(["--exclude", "*.css", "--exclude", "a/z"])
+
+    rules = walker.ignore_rules_from_args(args)
+
+    assert rules.ignores("b.css", "/anywhere/b.css")
+    assert rules.ignores(".git", "/anywhere/.git")
+    assert rules.ignores("z", str(walker.PROJECT_ROOT / "a" / "z"))
+    assert not rules.ignores("z", str(walker.PROJECT_ROOT / "b" / "z"))
+    assert not walker.ignore_rules_from_args(parser.parse_args(["--no-default-excludes"])).ignores(".git", "/x/.git")
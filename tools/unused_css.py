@@ -0,0 +1,1042 @@
+#!/usr/bin/env python3
+"""Report the CSS rules no page uses and emit pruned stylesheets.
+
+Every page of the main site loads ``css/styles.css`` and eight other sheets,
+and the WordPress pages load the theme and plugin CSS, most of which never
+matches anything. This tool:
+
+1. parses every page into a small element tree (the same ``HTMLParser`` pass
+   collects its stylesheets and scripts through ``AssetCollector``), and
+   follows ``@import`` from the linked stylesheets. The tree follows the
+   browser rules that change selector matching: implied ``<tbody>``/``<tr>``
+   in tables, and ``<p>``, ``<li>``, ``<dt>``/``<dd>`` closed by a later
+   start tag even when other elements are still open inside them;
+2. splits each stylesheet into rules (descending into ``@media``,
+   ``@supports`` and ``@document``) and matches every selector against the
+   tree of every page that loads the sheet;
+3. classifies each style rule as ``used`` (a selector matches an element),
+   ``script`` (no match, but every class/id it needs that the page lacks
+   appears as a word in the page's scripts, so JavaScript may add it),
+   ``kept`` (a selector this parser does not understand, or one matching a
+   ``--keep`` pattern) or ``unused``. ``@font-face``, ``@keyframes``,
+   ``@import`` and other at-rules are always kept.
+
+Matching is conservative: pseudo-elements and state pseudo-classes
+(``:hover``, ``:focus``, ``:checked`` …) are assumed to match, ``:not()``
+only excludes what it can decide exactly, and unknown pseudo-classes match.
+Structural ones (``:first-child``, ``:nth-of-type(2n+1)`` …) are evaluated.
+
+With ``--output DIR`` a pruned copy of each stylesheet (the original text of
+the rules that are not ``unused``, in their original order) is written to the
+same relative path under ``DIR``. It is written only when re-parsing it gives,
+for every analysed page that loads the sheet, the same ordered list of
+applying rules and the same at-rules as the original. That check uses the
+same element trees, so it guards the pruning, not the parser. Pages outside the
+scanned paths are not considered, so keep the default scope (the project
+root) before deploying pruned sheets. The report goes to
+``logs/unused_css-<timestamp>.json``, with per-page and per-stylesheet counts
+and the line and selector of every unused rule.
+"""
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import posixpath
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Pattern, Sequence, Set, Tuple, Union
+
+try:
+    from . import profiling
+    from .build_site import css_target
+    from .fileio import decode_page
+    from .list_assets import PROJECT_ROOT, AssetCollector, css_references, iter_html_files
+    from .walker import add_ignore_arguments, ignore_rules_from_args
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    import profiling  # type: ignore
+    from build_site import css_target  # type: ignore
+    from fileio import decode_page  # type: ignore
+    from list_assets import PROJECT_ROOT, AssetCollector, css_references, iter_html_files  # type: ignore
+    from walker import add_ignore_arguments, ignore_rules_from_args  # type: ignore
+
+LOG_DIR = PROJECT_ROOT / "logs"
+
+GROUP_AT_RULES = frozenset({"media", "supports", "document", "-moz-document"})
+VOID_ELEMENTS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "meta", "param", "source", "track", "wbr"}
+)
+BLOCK_CLOSES_P = frozenset(
+    {
+        "address", "article", "aside", "blockquote", "details", "div", "dl", "fieldset", "figcaption", "figure",
+        "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "main", "menu", "nav", "ol", "p",
+        "pre", "section", "table", "ul",
+    }
+)
+# Scope boundaries (HTML tree construction, "has an element in … scope").
+SCOPE_BOUNDARIES = frozenset(
+    {"applet", "caption", "html", "marquee", "object", "table", "td", "template", "th"}
+)
+BUTTON_SCOPE_BOUNDARIES = SCOPE_BOUNDARIES | {"button"}
+# Special elements that stop the search for an open <li>, <dt> or <dd>.
+LIST_ITEM_BOUNDARIES = frozenset(
+    {
+        "applet", "area", "article", "aside", "base", "blockquote", "body", "br", "button", "caption", "center",
+        "col", "colgroup", "details", "dir", "dl", "embed", "fieldset", "figcaption", "figure", "footer", "form",
+        "frame", "frameset", "h1", "h2", "h3", "h4", "h5", "h6", "head", "header", "hr", "html", "iframe", "img",
+        "input", "link", "listing", "main", "marquee", "menu", "meta", "nav", "noembed", "noframes", "noscript",
+        "object", "ol", "param", "plaintext", "pre", "script", "section", "select", "source", "style", "summary",
+        "table", "tbody", "td", "template", "textarea", "tfoot", "th", "thead", "title", "tr", "track", "ul",
+        "wbr", "xmp",
+    }
+)
+# Start tag -> open list items it closes (up to the first LIST_ITEM_BOUNDARIES element).
+LIST_ITEMS = {"li": frozenset({"li"}), "dt": frozenset({"dt", "dd"}), "dd": frozenset({"dt", "dd"})}
+TABLE_SECTIONS = frozenset({"tbody", "thead", "tfoot"})
+# Start tag -> open elements it implicitly closes when they are the current element.
+IMPLIED_END = {
+    "option": frozenset({"option"}),
+    "optgroup": frozenset({"option", "optgroup"}),
+}
+PSEUDO_ELEMENTS = frozenset({"after", "before", "first-letter", "first-line", "marker", "placeholder", "selection"})
+STRUCTURAL_PSEUDO_CLASSES = frozenset(
+    {"root", "first-child", "last-child", "only-child", "first-of-type", "last-of-type", "only-of-type"}
+)
+NTH_PSEUDO_CLASSES = frozenset({"nth-child", "nth-last-child", "nth-of-type", "nth-last-of-type"})
+
+IDENT = r"-?(?:[_a-zA-Z]|[^\x00-\x7f]|\\.)(?:[\w-]|[^\x00-\x7f]|\\.)*"
+SELECTOR_TOKEN_RE = re.compile(
+    rf"""
+    (?P<combinator>\s*[>+~]\s*|\s+)
+    | (?P<tag>\*|{IDENT})(?:\|(?P<namespaced>\*|{IDENT}))?
+    | \#(?P<id>(?:[\w-]|[^\x00-\x7f]|\\.)+)
+    | \.(?P<class>{IDENT})
+    | \[\s*(?P<attr>{IDENT})\s*(?:(?P<op>[~|^$*]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>{IDENT}))\s*(?P<flag>[iIsS])?\s*)?\]
+    | (?P<colons>::?)(?P<pseudo>{IDENT})
+    """,
+    re.VERBOSE,
+)
+NTH_RE = re.compile(r"^(?:(?P<a>[+-]?\d*)n\s*(?:(?P<sign>[+-])\s*(?P<b>\d+))?|(?P<only>[+-]?\d+))$")
+ESCAPE_RE = re.compile(r"\\([0-9a-fA-F]{1,6}\s?|.)")
+COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+SCRIPT_WORD_RE = re.compile(r"[A-Za-z_][\w-]*")
+
+
+# --- stylesheets -------------------------------------------------------------
+
+
+@dataclass
+class StyleRule:
+    prelude: str
+    start: int
+    end: int
+    line: int
+    selectors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class AtRule:
+    prelude: str
+    start: int
+    end: int
+    line: int
+
+
+@dataclass
+class GroupRule:
+    prelude: str
+    start: int
+    body_start: int
+    end: int
+    line: int
+    children: List["Node"] = field(default_factory=list)
+
+
+Node = Union[StyleRule, AtRule, GroupRule]
+
+
+def _skip_string(text: str, index: int) -> int:
+    quote = text[index]
+    index += 1
+    while index < len(text) and text[index] != quote:
+        index += 2 if text[index] == "\\" else 1
+    return index + 1
+
+
+def _scan(text: str, index: int, stops: str) -> int:
+    """Index of the first character in ``stops`` outside strings, comments and brackets."""
+
+    depth = 0
+    while index < len(text):
+        char = text[index]
+        if char in "\"'":
+            index = _skip_string(text, index)
+            continue
+        if text.startswith("/*", index):
+            end = text.find("*/", index + 2)
+            index = len(text) if end < 0 else end + 2
+            continue
+        if char == "\\":
+            index += 2
+            continue
+        if depth == 0 and char in stops:
+            return index
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth = max(depth - 1, 0)
+        index += 1
+    return index
+
+
+def _block_end(text: str, index: int) -> int:
+    """Index just past the ``}`` matching the ``{`` at ``index``."""
+
+    depth = 0
+    while index < len(text):
+        index = _scan(text, index, "{}")
+        if index >= len(text):
+            break
+        depth += 1 if text[index] == "{" else -1
+        index += 1
+        if depth == 0:
+            return index
+    return len(text)
+
+
+def split_selectors(prelude: str) -> List[str]:
+    """Split a selector list on its top-level commas."""
+
+    parts, start = [], 0
+    while True:
+        comma = _scan(prelude, start, ",")
+        parts.append(prelude[start:comma].strip())
+        if comma >= len(prelude):
+            return [part for part in parts if part]
+        start = comma + 1
+
+
+def parse_stylesheet(text: str, start: int = 0, end: Optional[int] = None) -> List[Node]:
+    """Split ``text[start:end]`` into rules, keeping the source offsets of each."""
+
+    end = len(text) if end is None else end
+    nodes: List[Node] = []
+    index = start
+    while index < end:
+        while index < end:
+            if text.startswith("/*", index):
+                close = text.find("*/", index + 2)
+                index = end if close < 0 else close + 2
+            elif text.startswith(("<!--", "-->"), index):
+                index += 4 if text[index] == "<" else 3
+            elif text[index].isspace():
+                index += 1
+            else:
+                break
+        if index >= end:
+            break
+        stop = min(_scan(text, index, "{;}"), end)
+        prelude = COMMENT_RE.sub(" ", text[index:stop]).strip()
+        line = text.count("\n", 0, index) + 1
+        if stop >= end or text[stop] != "{":
+            # A statement at-rule (``@import …;``) or a stray token up to ``;``/``}``.
+            if prelude.startswith("@"):
+                nodes.append(AtRule(prelude, index, min(stop + 1, end), line))
+            index = stop + 1
+            continue
+        block_end = min(_block_end(text, stop), end)
+        if prelude.startswith("@"):
+            name = prelude[1:].split(None, 1)[0].split("(", 1)[0].lower() if len(prelude) > 1 else ""
+            if name in GROUP_AT_RULES:
+                inner_end = block_end - 1 if text[block_end - 1] == "}" else block_end
+                group = GroupRule(prelude, index, stop + 1, block_end, line)
+                group.children = parse_stylesheet(text, stop + 1, inner_end)
+                nodes.append(group)
+            else:
+                nodes.append(AtRule(prelude, index, block_end, line))
+        else:
+            nodes.append(StyleRule(prelude, index, block_end, line, split_selectors(prelude)))
+        index = block_end
+    return nodes
+
+
+def style_rules(nodes: Sequence[Node], context: Tuple[str, ...] = ()) -> Iterable[Tuple[Tuple[str, ...], StyleRule]]:
+    for node in nodes:
+        if isinstance(node, StyleRule):
+            yield context, node
+        elif isinstance(node, GroupRule):
+            yield from style_rules(node.children, context + (node.prelude,))
+
+
+def at_rules(text: str, nodes: Sequence[Node], context: Tuple[str, ...] = ()) -> Iterable[Tuple[Tuple[str, ...], str]]:
+    for node in nodes:
+        if isinstance(node, AtRule):
+            yield context, text[node.start : node.end]
+        elif isinstance(node, GroupRule):
+            yield from at_rules(text, node.children, context + (node.prelude,))
+
+
+def prune(text: str, nodes: Sequence[Node], keep) -> str:
+    """Serialise the nodes for which ``keep(rule)`` is true, dropping empty groups."""
+
+    parts: List[str] = []
+    for node in nodes:
+        if isinstance(node, GroupRule):
+            inner = prune(text, node.children, keep)
+            if inner:
+                parts.append(f"{text[node.start : node.body_start]}\n{inner}\n}}")
+        elif isinstance(node, AtRule) or keep(node):
+            parts.append(text[node.start : node.end])
+    return "\n".join(parts)
+
+
+# --- selectors ---------------------------------------------------------------
+
+
+@dataclass
+class Compound:
+    tag: Optional[str] = None
+    ids: FrozenSet[str] = frozenset()
+    classes: FrozenSet[str] = frozenset()
+    attributes: Tuple[Tuple[str, Optional[str], str, bool], ...] = ()
+    pseudos: Tuple[Tuple[str, Optional[str]], ...] = ()
+
+
+# A complex selector from left to right: (combinator before it, compound).
+Selector = Tuple[Tuple[str, Compound], ...]
+
+
+def _unescape(value: str) -> str:
+    def replace(match: re.Match) -> str:
+        escaped = match.group(1)
+        if re.match(r"[0-9a-fA-F]", escaped):
+            return chr(int(escaped.strip(), 16))
+        return escaped
+
+    return ESCAPE_RE.sub(replace, value)
+
+
+def _pseudo_argument(text: str, index: int) -> Tuple[Optional[str], int]:
+    if index >= len(text) or text[index] != "(":
+        return None, index
+    close = _scan(text, index + 1, ")")
+    if close >= len(text):
+        raise ValueError("unbalanced pseudo-class argument")
+    return text[index + 1 : close].strip(), close + 1
+
+
+@functools.lru_cache(maxsize=None)
+def parse_selector(text: str) -> Optional[Selector]:
+    """Parse one complex selector; ``None`` if it uses syntax this module does not know."""
+
+    text = COMMENT_RE.sub(" ", text).strip()
+    compounds: List[Tuple[str, Compound]] = []
+    current: Dict[str, list] = {}
+    combinator, index = " ", 0
+
+    def flush() -> None:
+        nonlocal current
+        if current:
+            compounds.append(
+                (
+                    combinator,
+                    Compound(
+                        tag=(current.get("tag") or [None])[0],
+                        ids=frozenset(current.get("ids", ())),
+                        classes=frozenset(current.get("classes", ())),
+                        attributes=tuple(current.get("attributes", ())),
+                        pseudos=tuple(current.get("pseudos", ())),
+                    ),
+                )
+            )
+        current = {}
+
+    try:
+        while index < len(text):
+            match = SELECTOR_TOKEN_RE.match(text, index)
+            if match is None:
+                return None
+            index = match.end()
+            if match.group("combinator") is not None:
+                if not current:
+                    return None
+                flush()
+                combinator = match.group("combinator").strip() or " "
+                continue
+            if match.group("tag") is not None:
+                if current:
+                    return None
+                tag = match.group("namespaced") or match.group("tag")
+                current["tag"] = [None if tag == "*" else _unescape(tag).lower()]
+            elif match.group("id") is not None:
+                current.setdefault("ids", []).append(_unescape(match.group("id")))
+            elif match.group("class") is not None:
+                current.setdefault("classes", []).append(_unescape(match.group("class")))
+            elif match.group("attr") is not None:
+                value = match.group("dq") if match.group("dq") is not None else match.group("sq")
+                if value is None:
+                    value = match.group("bare") or ""
+                fold = (match.group("flag") or "").lower() == "i"
+                current.setdefault("attributes", []).append(
+                    (_unescape(match.group("attr")).lower(), match.group("op"), _unescape(value), fold)
+                )
+            else:
+                name = match.group("pseudo").lower()
+                argument, index = _pseudo_argument(text, index)
+                if match.group("colons") == "::" or name in PSEUDO_ELEMENTS or name.startswith("-"):
+                    name = ""  # pseudo-elements and vendor pseudo-classes never filter elements
+                current.setdefault("pseudos", []).append((name, argument))
+    except ValueError:
+        return None
+    if not current:
+        return None
+    flush()
+    return tuple(compounds)
+
+
+def _nth(argument: Optional[str]) -> Optional[Tuple[int, int]]:
+    if argument is None:
+        return None
+    value = argument.replace(" ", "").lower()
+    if value == "odd":
+        return 2, 1
+    if value == "even":
+        return 2, 0
+    match = NTH_RE.match(value)
+    if match is None:
+        return None
+    if match.group("only") is not None:
+        return 0, int(match.group("only"))
+    a = match.group("a")
+    a_value = -1 if a == "-" else 1 if a in ("", "+") else int(a)
+    b_value = int(match.group("b") or 0) * (-1 if match.group("sign") == "-" else 1)
+    return a_value, b_value
+
+
+def _nth_matches(a: int, b: int, position: int) -> bool:
+    if a == 0:
+        return position == b
+    return (position - b) % a == 0 and (position - b) // a >= 0
+
+
+# --- documents ---------------------------------------------------------------
+
+
+class Element:
+    __slots__ = ("tag", "attributes", "ids", "classes", "parent", "children", "position")
+
+    def __init__(self, tag: str, attributes: Dict[str, str], parent: Optional["Element"]) -> None:
+        self.tag = tag
+        self.attributes = attributes
+        self.ids = frozenset(attributes["id"].split()) if attributes.get("id") else frozenset()
+        self.classes = frozenset(attributes.get("class", "").split())
+        self.parent = parent
+        self.children: List[Element] = []
+        self.position = 0
+        if parent is not None:
+            self.position = len(parent.children)
+            parent.children.append(self)
+
+    def siblings_before(self) -> List["Element"]:
+        return self.parent.children[: self.position] if self.parent is not None else []
+
+
+class PageParser(HTMLParser):
+    """Build an element tree and collect assets and inline scripts in one pass."""
+
+    def __init__(self, page: Path) -> None:
+        super().__init__(convert_charrefs=True)
+        self.collector = AssetCollector(page)
+        self.root = Element("#document", {}, None)
+        self.stack: List[Element] = [self.root]
+        self.elements: List[Element] = []
+        self.inline_scripts: List[str] = []
+        self._in_script = False
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self.collector.handle_starttag(tag, attrs)
+        if tag in BLOCK_CLOSES_P:
+            self._close_in_scope("p", BUTTON_SCOPE_BOUNDARIES)
+        if tag in LIST_ITEMS:
+            self._close_list_item(LIST_ITEMS[tag])
+        if tag in TABLE_SECTIONS or tag in ("tr", "td", "th"):
+            self._open_table_context(tag)
+        closes = IMPLIED_END.get(tag, frozenset())
+        while len(self.stack) > 1 and self.stack[-1].tag in closes:
+            self.stack.pop()
+        element = self._open(tag, {name.lower(): value or "" for name, value in attrs if name})
+        if tag in VOID_ELEMENTS:
+            self.stack.pop()
+        self._in_script = tag == "script"
+
+    def _open(self, tag: str, attributes: Dict[str, str]) -> Element:
+        element = Element(tag, attributes, self.stack[-1])
+        self.elements.append(element)
+        self.stack.append(element)
+        return element
+
+    def _find(self, tags: FrozenSet[str], boundaries: FrozenSet[str]) -> Optional[int]:
+        """Stack depth of the innermost open element in ``tags``, searching down to ``boundaries``."""
+
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag in tags:
+                return depth
+            if self.stack[depth].tag in boundaries:
+                return None
+        return None
+
+    def _close_in_scope(self, tag: str, boundaries: FrozenSet[str]) -> None:
+        depth = self._find(frozenset({tag}), boundaries)
+        if depth is not None:
+            del self.stack[depth:]
+
+    def _close_list_item(self, tags: FrozenSet[str]) -> None:
+        # div, p and address are special but do not stop the search.
+        depth = self._find(tags, LIST_ITEM_BOUNDARIES - tags)
+        if depth is not None:
+            del self.stack[depth:]
+
+    def _open_table_context(self, tag: str) -> None:
+        """Close open cells/rows/sections and insert the implied ``tbody``/``tr`` as browsers do."""
+
+        if tag in ("td", "th"):
+            wanted = frozenset({"tr", "tbody", "thead", "tfoot", "table"})
+        elif tag == "tr":
+            wanted = frozenset({"tbody", "thead", "tfoot", "table"})
+        else:
+            wanted = frozenset({"table"})
+        depth = self._find(wanted, frozenset({"html", "template"}))
+        if depth is None:
+            return  # outside a table the tag is ignored by browsers; keep it as an element
+        del self.stack[depth + 1:]
+        if tag in ("tr", "td", "th") and self.stack[-1].tag == "table":
+            self._open("tbody", {})
+        if tag in ("td", "th") and self.stack[-1].tag != "tr":
+            self._open("tr", {})
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS and self.stack[-1].tag == tag:
+            self.stack.pop()
+        self._in_script = False
+
+    def handle_endtag(self, tag: str) -> None:
+        self._in_script = False
+        for depth in range(len(self.stack) - 1, 0, -1):
+            if self.stack[depth].tag == tag:
+                del self.stack[depth:]
+                return
+
+    def handle_data(self, data: str) -> None:
+        if self._in_script:
+            self.inline_scripts.append(data)
+
+
+class PageDom:
+    """Element tree of one page, indexed for selector matching."""
+
+    def __init__(self, path: str, elements: Sequence[Element], script_words: FrozenSet[str] = frozenset()) -> None:
+        self.path = path
+        self.elements = list(elements)
+        self.by_id: Dict[str, List[Element]] = {}
+        self.by_class: Dict[str, List[Element]] = {}
+        self.by_tag: Dict[str, List[Element]] = {}
+        for element in self.elements:
+            for value in element.ids:
+                self.by_id.setdefault(value, []).append(element)
+            for value in element.classes:
+                self.by_class.setdefault(value, []).append(element)
+            self.by_tag.setdefault(element.tag, []).append(element)
+        self.script_words = script_words
+        self._verdicts: Dict[str, str] = {}
+
+    def _candidates(self, compound: Compound) -> Sequence[Element]:
+        if compound.ids:
+            return self.by_id.get(next(iter(compound.ids)), ())
+        if compound.classes:
+            return min((self.by_class.get(name, ()) for name in compound.classes), key=len)
+        if compound.tag:
+            return self.by_tag.get(compound.tag, ())
+        return self.elements
+
+    def matches(self, selector: Selector) -> bool:
+        for _, compound in selector:
+            if any(name not in self.by_id for name in compound.ids) or any(name not in self.by_class for name in compound.classes):
+                return False
+        memo: Dict[Tuple[int, Element], bool] = {}
+        *_, (_, last) = selector
+        return any(_matches_complex(selector, len(selector) - 1, element, memo) for element in self._candidates(last))
+
+    def scriptable(self, selector: Selector) -> bool:
+        """True if the classes and ids this page lacks all occur as words in its scripts."""
+
+        missing = [
+            name
+            for _, compound in selector
+            for names, index in ((compound.classes, self.by_class), (compound.ids, self.by_id))
+            for name in names
+            if name not in index
+        ]
+        return bool(missing) and all(name in self.script_words for name in missing)
+
+    def verdict(self, selector_text: str, keep: Sequence[Pattern[str]] = ()) -> str:
+        """``used``, ``script``, ``kept`` or ``unused`` for one selector (cached per page)."""
+
+        cached = self._verdicts.get(selector_text)
+        if cached is None:
+            selector = parse_selector(selector_text)
+            if selector is None or any(pattern.search(selector_text) for pattern in keep):
+                cached = "kept"
+            elif self.matches(selector):
+                cached = "used"
+            elif self.scriptable(selector):
+                cached = "script"
+            else:
+                cached = "unused"
+            self._verdicts[selector_text] = cached
+        return cached
+
+
+def _attribute_matches(element: Element, name: str, op: Optional[str], value: str, fold: bool) -> bool:
+    actual = element.attributes.get(name)
+    if actual is None:
+        return False
+    if op is None:
+        return True
+    if fold:
+        actual, value = actual.lower(), value.lower()
+    if op == "=":
+        return actual == value
+    if op == "~=":
+        return value in actual.split()
+    if op == "|=":
+        return actual == value or actual.startswith(value + "-")
+    if not value:
+        return False
+    if op == "^=":
+        return actual.startswith(value)
+    if op == "$=":
+        return actual.endswith(value)
+    return value in actual  # *=
+
+
+def _selector_list(argument: Optional[str]) -> Optional[List[Selector]]:
+    if not argument:
+        return None
+    parsed = [parse_selector(part) for part in split_selectors(argument)]
+    return None if any(selector is None for selector in parsed) else parsed  # type: ignore[return-value]
+
+
+def _is_exact(selector: Selector) -> bool:
+    """True when matching ``selector`` involves no assumed pseudo-class."""
+
+    return all(
+        not name or name in NTH_PSEUDO_CLASSES or name in STRUCTURAL_PSEUDO_CLASSES
+        for _, compound in selector
+        for name, _ in compound.pseudos
+    )
+
+
+def _pseudo_matches(element: Element, name: str, argument: Optional[str]) -> bool:
+    if not name:
+        return True  # pseudo-element
+    siblings = element.parent.children if element.parent is not None else [element]
+    if name == "root":
+        return element.parent is not None and element.parent.tag == "#document"
+    if name in ("first-child", "last-child", "only-child"):
+        first, last = element.position == 0, element.position == len(siblings) - 1
+        return first if name == "first-child" else last if name == "last-child" else first and last
+    if name in ("first-of-type", "last-of-type", "only-of-type", "nth-of-type", "nth-last-of-type"):
+        same = [sibling for sibling in siblings if sibling.tag == element.tag]
+        index = same.index(element)
+        if name == "first-of-type":
+            return index == 0
+        if name == "last-of-type":
+            return index == len(same) - 1
+        if name == "only-of-type":
+            return len(same) == 1
+        nth = _nth(argument)
+        position = index + 1 if name == "nth-of-type" else len(same) - index
+        return True if nth is None else _nth_matches(*nth, position)
+    if name in ("nth-child", "nth-last-child"):
+        nth = _nth(argument)
+        position = element.position + 1 if name == "nth-child" else len(siblings) - element.position
+        return True if nth is None else _nth_matches(*nth, position)
+    if name in ("is", "matches", "where", "any"):
+        selectors = _selector_list(argument)
+        return True if selectors is None else any(_matches_complex(s, len(s) - 1, element) for s in selectors)
+    if name == "not":
+        selectors = _selector_list(argument)
+        if selectors is None or not all(_is_exact(s) for s in selectors):
+            return True
+        return not any(_matches_complex(s, len(s) - 1, element) for s in selectors)
+    return True  # state and unknown pseudo-classes are assumed to match
+
+
+def _matches_compound(compound: Compound, element: Element) -> bool:
+    if compound.tag is not None and compound.tag != element.tag:
+        return False
+    if not (compound.ids <= element.ids and compound.classes <= element.classes):
+        return False
+    if compound.attributes and not all(_attribute_matches(element, *attribute) for attribute in compound.attributes):
+        return False
+    return not compound.pseudos or all(_pseudo_matches(element, name, argument) for name, argument in compound.pseudos)
+
+
+def _matches_complex(selector: Selector, index: int, element: Element, memo: Optional[Dict[Tuple[int, Element], bool]] = None) -> bool:
+    """Match ``selector[: index + 1]`` with ``element`` as its subject.
+
+    ``memo`` caches the result per (index, element), which keeps descendant
+    and sibling combinators linear in the size of the tree.
+    """
+
+    if memo is not None:
+        cached = memo.get((index, element))
+        if cached is not None:
+            return cached
+    combinator, compound = selector[index]
+    if not _matches_compound(compound, element):
+        result = False
+    elif index == 0:
+        result = True
+    elif combinator == ">":
+        parent = element.parent
+        result = parent is not None and parent.tag != "#document" and _matches_complex(selector, index - 1, parent, memo)
+    elif combinator == " ":
+        result = False
+        ancestor = element.parent
+        while ancestor is not None and ancestor.tag != "#document":
+            if _matches_complex(selector, index - 1, ancestor, memo):
+                result = True
+                break
+            ancestor = ancestor.parent
+    elif combinator == "+":
+        before = element.siblings_before()
+        result = bool(before) and _matches_complex(selector, index - 1, before[-1], memo)
+    else:  # ~
+        result = any(_matches_complex(selector, index - 1, sibling, memo) for sibling in element.siblings_before())
+    if memo is not None:
+        memo[(index, element)] = result
+    return result
+
+
+# --- site analysis -----------------------------------------------------------
+
+
+@dataclass
+class SheetResult:
+    path: str
+    pages: int = 0
+    bytes: int = 0
+    rules: int = 0
+    used: int = 0
+    script: int = 0
+    kept: int = 0
+    unused: int = 0
+    pruned_bytes: Optional[int] = None
+    status: str = "analysed"
+    reason: Optional[str] = None
+    unused_rules: List[Dict[str, object]] = field(default_factory=list)
+
+
+@dataclass
+class PageResult:
+    path: str
+    stylesheets: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+
+class Stylesheets:
+    """Parsed stylesheets and script words, read once per file."""
+
+    def __init__(self) -> None:
+        self.texts: Dict[str, Optional[str]] = {}
+        self.encodings: Dict[str, str] = {}
+        self.nodes: Dict[str, List[Node]] = {}
+        self.words: Dict[str, FrozenSet[str]] = {}
+
+    def load(self, path: str) -> Optional[List[Node]]:
+        if path not in self.texts:
+            try:
+                text, encoding = decode_page(Path(PROJECT_ROOT, path).read_bytes())
+            except OSError:
+                text = None
+            self.texts[path] = text
+            if text is not None:
+                self.encodings[path] = encoding
+                self.nodes[path] = parse_stylesheet(text)
+        return self.nodes.get(path)
+
+    def closure(self, links: Iterable[str]) -> List[str]:
+        """The linked stylesheets and everything they ``@import``, without repeats."""
+
+        ordered: List[str] = []
+        pending = list(links)
+        while pending:
+            path = pending.pop(0)
+            if path in ordered or self.load(path) is None:
+                continue
+            ordered.append(path)
+            text = self.texts[path] or ""
+            pending.extend(
+                target
+                for node in self.nodes[path]
+                if isinstance(node, AtRule) and node.prelude.lower().startswith("@import")
+                for target in (css_target(path, url) for url in css_references(text[node.start : node.end]))
+                if target
+            )
+        return ordered
+
+    def script_words(self, path: str) -> FrozenSet[str]:
+        if path not in self.words:
+            try:
+                text = Path(PROJECT_ROOT, path).read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                text = ""
+            self.words[path] = frozenset(SCRIPT_WORD_RE.findall(text))
+        return self.words[path]
+
+
+def _local(entries) -> List[str]:
+    return sorted({entry.resolved_path for entry in entries if entry.resolved_path and entry.exists})
+
+
+def load_page(page: Path, sheets: Stylesheets) -> Optional[Tuple[PageDom, List[str]]]:
+    """Parse ``page``; returns its indexed tree and the stylesheets it loads."""
+
+    try:
+        text, _ = decode_page(page.read_bytes())
+    except OSError:
+        return None
+    if text is None:
+        return None
+    parser = PageParser(page)
+    parser.feed(text)
+    parser.close()
+    assets = parser.collector.to_entries()
+    links = [path for path in _local(assets.get("stylesheets", ())) if path.lower().endswith(".css")]
+    if not links:
+        return None
+    words: Set[str] = set(SCRIPT_WORD_RE.findall("\n".join(parser.inline_scripts)))
+    for script in _local(assets.get("scripts", ())):
+        words |= sheets.script_words(script)
+    return PageDom(_relative(page), parser.elements, frozenset(words)), sheets.closure(links)
+
+
+def _relative(path: Path) -> str:
+    try:
+        return path.resolve().relative_to(PROJECT_ROOT).as_posix()
+    except ValueError:
+        return path.resolve().as_posix()
+
+
+def rule_verdict(dom: PageDom, rule: StyleRule, keep: Sequence[Pattern[str]] = ()) -> str:
+    """The strongest verdict among the selectors of ``rule`` on one page."""
+
+    verdicts = {dom.verdict(selector, keep) for selector in rule.selectors}
+    for verdict in ("used", "kept", "script"):
+        if verdict in verdicts:
+            return verdict
+    return "unused" if rule.selectors else "kept"
+
+
+def applying_rules(
+    text: str, nodes: Sequence[Node], dom: PageDom, keep: Sequence[Pattern[str]] = ()
+) -> List[Tuple[Tuple[str, ...], str]]:
+    """What the cascade of one page sees from a stylesheet: the rules that may apply, in order, and its at-rules."""
+
+    applying = [
+        (context, text[rule.start : rule.end])
+        for context, rule in style_rules(nodes)
+        if rule_verdict(dom, rule, keep) != "unused"
+    ]
+    return applying + list(at_rules(text, nodes))
+
+
+@dataclass
+class Analysis:
+    sheets: Stylesheets
+    pages: List[Tuple[PageDom, List[str]]] = field(default_factory=list)
+    results: Dict[str, SheetResult] = field(default_factory=dict)
+    page_results: List[PageResult] = field(default_factory=list)
+    live: Dict[str, Set[int]] = field(default_factory=dict)
+
+
+def analyse(pages: Iterable[Path], *, keep: Sequence[Pattern[str]] = (), only: Optional[Set[str]] = None) -> Analysis:
+    """Match every stylesheet against the pages that load it.
+
+    ``live`` maps each stylesheet to the numbers (in ``style_rules`` order) of
+    the rules that are not unused on at least one page.
+    """
+
+    analysis = Analysis(Stylesheets())
+    with profiling.phase("parse"):
+        for page in pages:
+            with profiling.track_file(page):
+                parsed = load_page(page, analysis.sheets)
+            if parsed is not None:
+                dom, closure = parsed
+                closure = [path for path in closure if only is None or path in only]
+                if closure:
+                    analysis.pages.append((dom, closure))
+
+    best: Dict[str, Dict[int, str]] = {}
+    rank = {"used": 3, "kept": 2, "script": 1}
+    with profiling.phase("match"):
+        for dom, closure in analysis.pages:
+            page_result = PageResult(dom.path)
+            for path in closure:
+                rules = list(style_rules(analysis.sheets.nodes[path]))
+                if path not in analysis.results:
+                    size = len((analysis.sheets.texts[path] or "").encode("utf-8"))
+                    analysis.results[path] = SheetResult(path, bytes=size, rules=len(rules))
+                analysis.results[path].pages += 1
+                counts = {"used": 0, "script": 0, "kept": 0, "unused": 0}
+                verdicts = best.setdefault(path, {})
+                for number, (_, rule) in enumerate(rules):
+                    verdict = rule_verdict(dom, rule, keep)
+                    counts[verdict] += 1
+                    if verdict != "unused" and rank[verdict] > rank.get(verdicts.get(number, ""), 0):
+                        verdicts[number] = verdict
+                page_result.stylesheets[path] = counts
+            analysis.page_results.append(page_result)
+
+    for path, sheet in analysis.results.items():
+        verdicts = best[path]
+        analysis.live[path] = set(verdicts)
+        for number, (context, rule) in enumerate(style_rules(analysis.sheets.nodes[path])):
+            verdict = verdicts.get(number, "unused")
+            setattr(sheet, verdict, getattr(sheet, verdict) + 1)
+            if verdict == "unused":
+                sheet.unused_rules.append({"line": rule.line, "selector": " ".join(rule.prelude.split()), "context": list(context)})
+    return analysis
+
+
+def prune_sheet(analysis: Analysis, path: str, *, keep: Sequence[Pattern[str]] = ()) -> Optional[str]:
+    """Pruned text of one stylesheet, or ``None`` (with the result's ``reason`` set) if it fails verification."""
+
+    sheet, live = analysis.results[path], analysis.live[path]
+    text, nodes = analysis.sheets.texts[path] or "", analysis.sheets.nodes[path]
+    numbers = {id(rule): number for number, (_, rule) in enumerate(style_rules(nodes))}
+    pruned = prune(text, nodes, lambda rule: numbers[id(rule)] in live)
+    pruned_nodes = parse_stylesheet(pruned)
+    sheet.pruned_bytes = len(pruned.encode("utf-8"))
+    for dom, closure in analysis.pages:
+        if sheet.path in closure and applying_rules(pruned, pruned_nodes, dom, keep) != applying_rules(text, nodes, dom, keep):
+            sheet.status, sheet.reason = "refused", f"rules applying to {dom.path} differ after pruning"
+            return None
+    return pruned
+
+
+def summarise(sheets: Sequence[SheetResult], pages: Sequence[PageResult]) -> Dict[str, int]:
+    summary: Dict[str, int] = {"pages": len(pages), "stylesheets": len(sheets)}
+    for key in ("rules", "used", "script", "kept", "unused", "bytes"):
+        summary[key] = sum(getattr(sheet, key) for sheet in sheets)
+    summary["pruned_bytes"] = sum(sheet.bytes if sheet.pruned_bytes is None else sheet.pruned_bytes for sheet in sheets)
+    for sheet in sheets:
+        summary[sheet.status] = summary.get(sheet.status, 0) + 1
+    return summary
+
+
+def write_log(
+    log_dir: Path,
+    sheets: Sequence[SheetResult],
+    pages: Sequence[PageResult],
+    *,
+    output: Optional[Path],
+    profile: Optional[dict] = None,
+) -> Path:
+    log_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    output_path = log_dir / f"unused_css-{timestamp}.json"
+    payload: Dict[str, object] = {
+        "generated_at": timestamp,
+        "output": str(output) if output is not None else None,
+        "summary": summarise(sheets, pages),
+        "stylesheets": [asdict(sheet) for sheet in sheets],
+        "pages": [asdict(page) for page in pages],
+    }
+    if profile is not None:
+        payload["profile"] = profile
+    output_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return output_path
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", default=["."], help="HTML files or directories to analyse (default: project root)")
+    parser.add_argument(
+        "--stylesheet",
+        action="append",
+        default=[],
+        help="Only analyse this stylesheet (project-relative path; repeatable)",
+    )
+    parser.add_argument(
+        "--keep",
+        action="append",
+        default=[],
+        help="Regular expression; rules with a matching selector are never pruned (repeatable)",
+    )
+    parser.add_argument("--output", type=Path, help="Write verified pruned stylesheets under this directory")
+    parser.add_argument("--log-dir", type=Path, default=LOG_DIR, help="Where to store the JSON report (default: logs)")
+    add_ignore_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        keep = [re.compile(pattern) for pattern in args.keep]
+    except re.error as exc:
+        print(f"Invalid --keep pattern: {exc}", file=sys.stderr)
+        return 1
+    if args.output is not None and args.output.resolve() in (PROJECT_ROOT, *PROJECT_ROOT.parents):
+        print("--output must not be the project root or one of its parents", file=sys.stderr)
+        return 1
+    only = {posixpath.normpath(path) for path in args.stylesheet} or None
+    with profiling.session(args) as profiler:
+        with profiling.phase("walk"):
+            html_files = list(iter_html_files([Path(p).resolve() for p in args.paths], ignore_rules_from_args(args)))
+        analysis = analyse(html_files, keep=keep, only=only)
+        if not analysis.results:
+            print("No page loads a local stylesheet.", file=sys.stderr)
+            return 1
+        ordered = [analysis.results[path] for path in sorted(analysis.results)]
+        pages = analysis.page_results
+        if args.output is not None:
+            with profiling.phase("prune"):
+                for sheet in ordered:
+                    if not sheet.unused:
+                        sheet.status = "unchanged"
+                        continue
+                    pruned = prune_sheet(analysis, sheet.path, keep=keep)
+                    if pruned is None:
+                        continue
+                    target = args.output / sheet.path.lstrip("/")  # paths outside the project are absolute
+                    try:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        target.write_bytes((pruned + "\n").encode(analysis.sheets.encodings[sheet.path]))
+                        sheet.status = "written"
+                    except (OSError, UnicodeEncodeError) as exc:
+                        sheet.status, sheet.reason = "error", str(exc)
+        with profiling.phase("write"):
+            log_path = write_log(args.log_dir, ordered, pages, output=args.output, profile=profiling.report_of(profiler))
+
+    summary = summarise(ordered, pages)
+    print(
+        f"{summary['pages']} pages load {summary['stylesheets']} local stylesheets with {summary['rules']} style rules: "
+        f"{summary['used']} used, {summary['script']} possibly added by scripts, {summary['kept']} kept, "
+        f"{summary['unused']} unused; log: {log_path}"
+    )
+    for sheet in ordered:
+        if sheet.status in ("refused", "error"):
+            print(f" - {sheet.path}: {sheet.status}: {sheet.reason}", file=sys.stderr)
+    return 1 if summary.get("error") else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Pre-commit guard against new Windows-1251 content and U+FFFD characters.
+
+MB-07 asks the repository to refuse commits that bring ``windows-1251``
+back. Running ``check_utf8.py`` from a hook is too slow for that: it reads
+whole files from the working tree (not what is staged) and compares SEO
+fields. This guard only looks at what the commit adds:
+
+* one ``git diff --cached -U0 --full-index`` call lists the staged HTML/XML
+  documents, the blob id of their new version and the added line ranges;
+* one ``git cat-file --batch`` process streams those blobs;
+* only the added lines are scanned, with the charset detection and the
+  ``SUSPECT_*`` sequences from ``check_utf8.py``.
+
+Added lines are rejected when they declare ``windows-1251``/``cp1251``
+(``charset=`` or the XML prolog), contain U+FFFD or belong to a blob that
+does not decode as UTF-8. Double-encoding artefacts are reported as
+warnings (errors with ``--strict``).
+
+Install it as the repository hook with ``python -m tools guard --install``;
+``--against REV`` checks the commits since ``REV`` instead (for CI).
+"""
+from __future__ import annotations
+
+import argparse
+import codecs
+import re
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from .check_utf8 import (
+        TEXT_EXTENSIONS,
+        decode_content,
+        detect_declared_charset,
+        detect_suspect_sequences,
+    )
+except ImportError:  # pragma: no cover - executed as a script from tools/
+    from check_utf8 import (  # type: ignore
+        TEXT_EXTENSIONS,
+        decode_content,
+        detect_declared_charset,
+        detect_suspect_sequences,
+    )
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+LEGACY_CHARSETS = {"windows-1251", "cp1251", "x-cp1251"}
+XML_ENCODING_RE = re.compile(r"<\?xml[^>]*\bencoding\s*=\s*[\"']([\w.:-]+)", re.IGNORECASE)
+HUNK_RE = re.compile(rb"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+INDEX_RE = re.compile(rb"^index [0-9a-f]+\.\.([0-9a-f]+)")
+HOOK_SCRIPT = """#!/bin/sh
+# Installed by 'python -m tools guard --install'.
+exec python3 -m tools guard
+"""
+
+ERROR_ISSUES = ("legacy_charset", "replacement_char", "not_utf8")
+
+
+@dataclass
+class StagedFile:
+    path: str
+    blob: str
+    added: List[int] = field(default_factory=list)
+
+
+@dataclass
+class Finding:
+    path: str
+    line: int
+    issue: str
+    excerpt: str
+
+    def format(self) -> str:
+        return f"{self.path}:{self.line}: {self.issue}: {self.excerpt}"
+
+
+def _git(repo: Path, *args: str) -> bytes:
+    return subprocess.run(
+        ["git", "-C", str(repo), *args], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    ).stdout
+
+
+def _unquote(raw: bytes) -> str:
+    # git C-quotes paths with special characters: "dir/\320\277.html"
+    if raw.startswith(b'"') and raw.endswith(b'"'):
+        raw = codecs.escape_decode(raw[1:-1])[0]
+    return raw.decode("utf-8", errors="surrogateescape")
+
+
+def parse_diff(patch: bytes, suffixes=TEXT_EXTENSIONS) -> List[StagedFile]:
+    """Extract the new blob id and added line numbers of every matching file."""
+
+    files: List[StagedFile] = []
+    current: Optional[StagedFile] = None
+    blob: Optional[str] = None
+    for line in patch.split(b"\n"):
+        if line.startswith(b"diff --git "):
+            current, blob = None, None
+        elif line.startswith(b"index "):
+            match = INDEX_RE.match(line)
+            blob = match.group(1).decode("ascii") if match else None
+        elif line.startswith(b"+++ "):
+            target = line[4:]
+            if target == b"/dev/null" or blob is None:
+                continue
+            path = _unquote(target)[2:]  # strip "b/"
+            if Path(path).suffix.lower() in suffixes:
+                current = StagedFile(path=path, blob=blob)
+                files.append(current)
+        elif line.startswith(b"@@") and current is not None:
+            match = HUNK_RE.match(line)
+            if match:
+                start = int(match.group(1))
+                count = int(match.group(2)) if match.group(2) is not None else 1
+                current.added.extend(range(start, start + count))
+    return [item for item in files if item.added]
+
+
+def staged_files(repo: Path, against: Optional[str] = None, suffixes=TEXT_EXTENSIONS) -> List[StagedFile]:
+    revisions = [against, "HEAD"] if against else ["--cached"]
+    patch = _git(
+        repo,
+        "-c", "core.quotePath=false",
+        "diff", *revisions,
+        "-U0", "--full-index", "--no-color", "--no-ext-diff", "--no-renames", "--text",
+        "--diff-filter=ACMR", "--src-prefix=a/", "--dst-prefix=b/",
+    )
+    return parse_diff(patch, suffixes)
+
+
+def iter_blobs(repo: Path, blobs: Sequence[str]) -> Iterator[Tuple[str, bytes]]:
+    """Stream ``blobs`` through a single ``git cat-file --batch`` process.
+
+    The ids are written from a separate thread: written up front, they fill
+    git's stdin while its output fills ours, and both sides block.
+    """
+
+    if not blobs:
+        return
+    process = subprocess.Popen(
+        ["git", "-C", str(repo), "cat-file", "--batch"], stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+    assert process.stdin is not None and process.stdout is not None
+    stdin = process.stdin
+
+    def feed() -> None:
+        try:
+            stdin.write("".join(f"{blob}\n" for blob in blobs).encode("ascii"))
+            stdin.close()
+        except BrokenPipeError:  # the reader stopped early and git exited
+            pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        for blob in blobs:
+            header = process.stdout.readline().split()
+            if len(header) != 3:  # "<sha> missing"
+                yield blob, b""
+                continue
+            size = int(header[2])
+            content = process.stdout.read(size)
+            process.stdout.read(1)  # trailing newline
+            yield blob, content
+    finally:
+        process.stdout.close()
+        process.wait()
+        writer.join()
+
+
+def _excerpt(text: str, limit: int = 80) -> str:
+    text = text.strip()
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _legacy_charset(text: str) -> Optional[str]:
+    declared = detect_declared_charset(text)
+    if declared in LEGACY_CHARSETS:
+        return declared
+    match = XML_ENCODING_RE.search(text)
+    if match and match.group(1).lower() in LEGACY_CHARSETS:
+        return match.group(1).lower()
+    return None
+
+
+def scan_blob(staged: StagedFile, raw: bytes) -> List[Finding]:
+    """Check the added lines of one staged document."""
+
+    _, encoding = decode_content(raw)
+    lines = raw.split(b"\n")
+    findings: List[Finding] = []
+    if encoding == "cp1251":
+        line = staged.added[0]
+        excerpt = lines[line - 1].decode("cp1251") if line <= len(lines) else ""
+        findings.append(Finding(staged.path, line, "not_utf8", _excerpt(excerpt)))
+    for line in staged.added:
+        if line > len(lines):
+            continue
+        line_raw = lines[line - 1]
+        line_text = line_raw.decode(encoding, errors="replace")
+        if _legacy_charset(line_text):
+            findings.append(Finding(staged.path, line, "legacy_charset", _excerpt(line_text)))
+        if "\ufffd" in line_text or b"\xef\xbf\xbd" in line_raw:
+            findings.append(Finding(staged.path, line, "replacement_char", _excerpt(line_text)))
+            continue
+        # «» are valid UTF-8 that SUSPECT_BYTE_SEQUENCES also matches; only flag real artefacts.
+        unquoted = line_raw.replace(b"\xc2\xab", b"").replace(b"\xc2\xbb", b"")
+        if detect_suspect_sequences(unquoted.decode(encoding, errors="replace"), unquoted):
+            findings.append(Finding(staged.path, line, "suspect_sequences", _excerpt(line_text)))
+    return findings
+
+
+def run_guard(repo: Path, against: Optional[str] = None, suffixes=TEXT_EXTENSIONS) -> Tuple[List[StagedFile], List[Finding]]:
+    files = staged_files(repo, against, suffixes)
+    by_blob: Dict[str, List[StagedFile]] = {}
+    for item in files:
+        by_blob.setdefault(item.blob, []).append(item)
+    findings: List[Finding] = []
+    for blob, raw in iter_blobs(repo, list(by_blob)):
+        for item in by_blob[blob]:
+            findings.extend(scan_blob(item, raw))
+    return files, findings
+
+
+def install_hook(repo: Path) -> Path:
+    hooks = Path(_git(repo, "rev-parse", "--git-path", "hooks").decode("utf-8").strip())
+    if not hooks.is_absolute():
+        hooks = repo / hooks
+    hook = hooks / "pre-commit"
+    hooks.mkdir(parents=True, exist_ok=True)
+    hook.write_text(HOOK_SCRIPT, encoding="utf-8")
+    hook.chmod(0o755)
+    return hook
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repo", type=Path, default=PROJECT_ROOT, help="Repository to check (default: project root)")
+    parser.add_argument("--against", metavar="REV", help="Check the lines added between REV and HEAD instead of the index")
+    parser.add_argument("--strict", action="store_true", help="Fail on double-encoding artefacts as well")
+    parser.add_argument("--install", action="store_true", help="Install the guard as the pre-commit hook and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.install:
+        print(f"Installed {install_hook(args.repo)}")
+        return 0
+
+    started = time.perf_counter()
+    try:
+        files, findings = run_guard(args.repo, args.against)
+    except subprocess.CalledProcessError as exc:
+        print(f"utf8_guard: git failed: {exc.stderr.decode('utf-8', 'replace').strip()}", file=sys.stderr)
+        return 1
+    except OSError as exc:
+        print(f"utf8_guard: cannot run git: {exc}", file=sys.stderr)
+        return 1
+    failing = ERROR_ISSUES + (("suspect_sequences",) if args.strict else ())
+    errors = [finding for finding in findings if finding.issue in failing]
+    for finding in findings:
+        prefix = "error" if finding in errors else "warning"
+        print(f"{prefix}: {finding.format()}", file=sys.stderr)
+    added = sum(len(item.added) for item in files)
+    print(
+        f"utf8_guard: {added} added lines in {len(files)} documents, "
+        f"{len(errors)} errors, {len(findings) - len(errors)} warnings ({time.perf_counter() - started:.2f} s)",
+        file=sys.stderr,
+    )
+    if errors:
+        print("utf8_guard: convert the files to UTF-8 (tools/reencode.py) before committing.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,178 @@
+"""Shared ``os.scandir`` based tree walker for the snapshot tools.
+
+Every tool used to run ``sorted(path.rglob("*"))`` followed by ``is_file()``,
+which stats each entry twice and descends into ``.git`` and the local output
+folders. The walker below relies on the type information cached in
+``os.DirEntry``, prunes ignored directories before descending and yields files
+as a stream in the same order as ``sorted(rglob("*"))`` (pre-order, children
+sorted by name).
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import os
+from pathlib import Path
+from typing import Collection, Iterable, Iterator, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Ignored wherever they appear in the tree.
+DEFAULT_IGNORED_NAMES = frozenset(
+    {
+        ".git",
+        "__pycache__",
+        ".pytest_cache",
+        ".mypy_cache",
+        ".ruff_cache",
+        ".tox",
+        ".nox",
+        ".venv",
+        "venv",
+        "hts-cache",
+        ".DS_Store",
+    }
+)
+# Ignored only directly below the project root (tool outputs, kept out of git).
+DEFAULT_IGNORED_PATHS = frozenset({"logs", "snapshot", "artifacts", "dist"})
+
+
+def _is_pattern(name: str) -> bool:
+    return any(char in name for char in "*?[")
+
+
+def _matches_suffix(name: str, suffixes: Optional[Collection[str]]) -> bool:
+    if suffixes is None:
+        return True
+    return os.path.splitext(name)[1].lower() in suffixes
+
+
+class IgnoreRules:
+    """Decide which entries the walker skips.
+
+    ``names`` match the entry name anywhere in the tree and may contain
+    ``fnmatch`` wildcards. ``paths`` are POSIX paths relative to ``base``.
+    Explicitly requested roots are never ignored, only their descendants.
+    """
+
+    def __init__(
+        self,
+        names: Collection[str] = DEFAULT_IGNORED_NAMES,
+        paths: Collection[str] = DEFAULT_IGNORED_PATHS,
+        *,
+        base: Path = PROJECT_ROOT,
+    ) -> None:
+        self.names = frozenset(name for name in names if not _is_pattern(name))
+        self.patterns = tuple(name for name in names if _is_pattern(name))
+        self.paths = frozenset(path.strip("/") for path in paths)
+        self._base_prefix = os.path.realpath(base) + os.sep
+
+    def ignores(self, name: str, path: str) -> bool:
+        if name in self.names:
+            return True
+        if self.patterns and any(fnmatch.fnmatchcase(name, pattern) for pattern in self.patterns):
+            return True
+        if self.paths and path.startswith(self._base_prefix):
+            relative = path[len(self._base_prefix):]
+            if os.sep != "/":
+                relative = relative.replace(os.sep, "/")
+            return relative in self.paths
+        return False
+
+
+DEFAULT_IGNORE = IgnoreRules()
+NO_IGNORE = IgnoreRules(names=(), paths=())
+
+
+def scan_files(
+    root: Path,
+    *,
+    suffixes: Optional[Collection[str]] = None,
+    ignore: IgnoreRules = DEFAULT_IGNORE,
+) -> Iterator[os.DirEntry]:
+    """Yield ``os.DirEntry`` objects for files below ``root`` in sorted order.
+
+    Entry paths keep the form of ``root`` (relative roots give relative
+    paths, as with ``Path.rglob``). Symlinked directories are not followed;
+    callers can use ``entry.stat()`` to reuse the cached stat result.
+    """
+
+    root_str = str(root)
+    real_root = os.path.realpath(root_str)
+    stack: List[Iterator[os.DirEntry]] = [_sorted_entries(root_str)]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        if ignore.ignores(entry.name, real_root + entry.path[len(root_str):]):
+            continue
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(_sorted_entries(entry.path))
+                continue
+            is_file = entry.is_file()
+        except OSError:
+            continue
+        if is_file and _matches_suffix(entry.name, suffixes):
+            yield entry
+
+
+def _sorted_entries(path: str) -> Iterator[os.DirEntry]:
+    try:
+        with os.scandir(path) as iterator:
+            entries = sorted(iterator, key=lambda entry: entry.name)
+    except OSError:
+        return iter(())
+    return iter(entries)
+
+
+def iter_files(
+    roots: Iterable[Path],
+    *,
+    suffixes: Optional[Collection[str]] = None,
+    ignore: IgnoreRules = DEFAULT_IGNORE,
+) -> Iterator[Path]:
+    """Yield files from ``roots`` (files or directories) as ``Path`` objects.
+
+    Directory roots are expanded with :func:`scan_files`; file roots are
+    yielded as given when their suffix matches.
+    """
+
+    for root in roots:
+        if root.is_dir():
+            for entry in scan_files(root, suffixes=suffixes, ignore=ignore):
+                yield Path(entry.path)
+        elif root.is_file() and _matches_suffix(root.name, suffixes):
+            yield root
+
+
+def add_ignore_arguments(parser: argparse.ArgumentParser) -> None:
+    """Register the shared ``--exclude``/``--no-default-excludes`` options."""
+
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="NAME_OR_PATH",
+        help=(
+            "Skip entries with this name or glob anywhere in the tree, or a path "
+            "relative to the project root when it contains '/' (can repeat)."
+        ),
+    )
+    parser.add_argument(
+        "--no-default-excludes",
+        action="store_true",
+        help="Also walk .git, caches and the logs/, snapshot/, artifacts/, dist/ outputs.",
+    )
+
+
+def ignore_rules_from_args(args: argparse.Namespace) -> IgnoreRules:
+    names = set() if args.no_default_excludes else set(DEFAULT_IGNORED_NAMES)
+    paths = set() if args.no_default_excludes else set(DEFAULT_IGNORED_PATHS)
+    for value in args.exclude:
+        if "/" in value:
+            paths.add(value)
+        else:
+            names.add(value)
+    return IgnoreRules(names=names, paths=paths)